@@ -36,5 +36,8 @@ setup(
         'Topic :: Internet :: WWW/HTTP :: Dynamic Content',
     ],
     install_requires=requires,
+    extras_require={
+        'async': ['aiohttp'],
+    },
     test_suite='tethys_dataset_services.tests'
 )
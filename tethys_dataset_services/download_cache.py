@@ -0,0 +1,225 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import threading
+
+
+log = logging.getLogger('tethys_dataset_services.download_cache')
+
+
+class DownloadCache(object):
+    """
+    Local cache of downloaded files. Entries are addressed by a key and store the validators (ETag and Last-Modified) needed to revalidate them with the server. The least recently used entries are evicted when the cache exceeds its size limit.  # noqa: E501
+
+    Each entry is stored as two files in the cache directory: "<key>" with the data and "<key>.json" with the meta-data. The modification time of the meta-data file records the last use of the entry.  # noqa: E501
+    """
+
+    def __init__(self, directory, max_size=None):
+        """
+        Constructor for download caches.
+
+        Args:
+          directory (string): Path to the directory where the cached files are stored. Created if it does not exist.
+          max_size (int, optional): Maximum total size in bytes of the cached files. Defaults to None (no limit).
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self._lock = threading.RLock()
+
+        try:
+            os.makedirs(directory)
+        except OSError:
+            pass
+
+    @staticmethod
+    def resource_key(resource):
+        """
+        Get the cache key of a CKAN resource. The key changes whenever the id, last_modified or hash of the resource changes.  # noqa: E501
+
+        Args:
+          resource (dict): CKAN resource meta-data dictionary.
+
+        Returns:
+          string: The cache key.
+        """
+        identity = json.dumps([resource.get('id'), resource.get('last_modified'), resource.get('hash')])
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+    def data_path(self, key):
+        """
+        Get the path of the data file of an entry.
+        """
+        return os.path.join(self.directory, key)
+
+    def _meta_path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def get(self, key):
+        """
+        Get the meta-data of an entry and mark it as recently used.
+
+        Args:
+          key (string): Key of the entry.
+
+        Returns:
+          dict: Meta-data of the entry or None if the key is not cached.
+        """
+        with self._lock:
+            if not os.path.isfile(self.data_path(key)):
+                return None
+
+            try:
+                with open(self._meta_path(key)) as f:
+                    meta = json.load(f)
+                os.utime(self._meta_path(key), None)
+            except (OSError, ValueError):
+                return None
+
+            return meta
+
+    def put(self, key, path, link_to=None, **meta):
+        """
+        Move a file into the cache, replacing any previous entry with the same key, and evict the least recently used entries if needed.  # noqa: E501
+
+        Args:
+          key (string): Key of the entry.
+          path (string): Path of the file to move into the cache.
+          link_to (string, optional): Path where the data of the entry is placed (see link), in the same locked operation, so the entry can not be evicted in between.  # noqa: E501
+          **meta: Meta-data to store with the entry (e.g.: etag, last_modified).
+
+        Returns:
+          string: Path of the data file of the entry.
+        """
+        with self._lock:
+            data_path = self.data_path(key)
+            os.replace(path, data_path)
+
+            meta['size'] = os.path.getsize(data_path)
+            self._write_meta(key, meta)
+
+            if link_to is not None:
+                self.link(key, link_to)
+
+            self.evict(keep=key)
+            return data_path
+
+    def update(self, key, link_to=None, **meta):
+        """
+        Update the meta-data of an entry (e.g.: with new validators after a revalidation).
+
+        Args:
+          key (string): Key of the entry.
+          link_to (string, optional): Path where the data of the entry is placed (see link), in the same locked operation, so the entry can not be evicted in between.  # noqa: E501
+          **meta: Meta-data to update.
+
+        Returns:
+          bool: True if the entry was updated, False if the key is not cached.
+        """
+        with self._lock:
+            current = self.get(key)
+            if current is None:
+                return False
+
+            current.update(meta)
+            self._write_meta(key, current)
+
+            if link_to is not None:
+                self.link(key, link_to)
+
+            return True
+
+    def _write_meta(self, key, meta):
+        tmp_path = self._meta_path(key) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path(key))
+
+    def link(self, key, destination):
+        """
+        Place the data of an entry at the destination. The file is hard-linked when possible and copied otherwise. Do not modify hard-linked files in place; this would also modify the cached data.  # noqa: E501
+
+        Args:
+          key (string): Key of the entry.
+          destination (string): Path where the file is placed. An existing file is replaced.
+        """
+        tmp_path = destination + '.link'
+
+        with self._lock:
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+
+            try:
+                os.link(self.data_path(key), tmp_path)
+            except OSError:
+                shutil.copyfile(self.data_path(key), tmp_path)
+
+            os.replace(tmp_path, destination)
+
+    def remove(self, key):
+        """
+        Remove an entry from the cache.
+        """
+        with self._lock:
+            for path in (self._meta_path(key), self.data_path(key)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def entries(self):
+        """
+        List the cached entries, least recently used first.
+
+        Returns:
+          list: (key, size, last used time) tuples.
+        """
+        entries = []
+
+        for file_name in os.listdir(self.directory):
+            if not file_name.endswith('.json'):
+                continue
+
+            key = file_name[:-5]
+            try:
+                last_used = os.path.getmtime(self._meta_path(key))
+                size = os.path.getsize(self.data_path(key))
+            except OSError:
+                continue
+
+            entries.append((key, size, last_used))
+
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    def size(self):
+        """
+        Get the total size in bytes of the cached files.
+        """
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        """
+        Remove the least recently used entries until the cache fits its size limit.
+
+        Args:
+          keep (string, optional): Key of an entry that must not be evicted (e.g.: the entry that was just added).
+        """
+        if self.max_size is None:
+            return
+
+        with self._lock:
+            entries = self.entries()
+            total = sum(size for _, size, _ in entries)
+
+            for key, size, _ in entries:
+                if total <= self.max_size:
+                    break
+
+                if key == keep:
+                    continue
+
+                log.debug('Evicting "{0}" ({1} bytes) from the download cache.'.format(key, size))
+                self.remove(key)
+                total -= size
@@ -1,3 +1,5 @@
 from .ckan_engine import CkanDatasetEngine  # noqa: F401
 from .hydroshare_engine import HydroShareDatasetEngine  # noqa: F401
 from .geoserver_engine import GeoServerSpatialDatasetEngine  # noqa: F401
+from .async_ckan_engine import AsyncCkanDatasetEngine  # noqa: F401
+from .async_geoserver_engine import AsyncGeoServerSpatialDatasetEngine  # noqa: F401
@@ -0,0 +1,846 @@
+import os
+import json
+import asyncio
+import logging
+import warnings
+from functools import partial
+from io import BytesIO
+from urllib.parse import urlparse
+
+from .ckan_engine import CkanDatasetEngine, DatasetDownloadError
+from .async_support import aiohttp, ApiResponse, RETRY_ERRORS, UNSENT_ERRORS, REQUEST_ERRORS
+
+
+log = logging.getLogger('tethys_dataset_services.async_ckan_engine')
+
+
+class AsyncCkanDatasetEngine(CkanDatasetEngine):
+    """
+    Definition for asyncio CKAN Dataset Engine objects.
+
+    Provides awaitable versions of the methods of CkanDatasetEngine, built on a pooled aiohttp.ClientSession (install with "pip install tethys_dataset_services[async]"). Requests are built and responses are parsed by the same code as the synchronous engine, so both return the same response dictionaries. File reads and writes run in the default executor of the event loop.  # noqa: E501
+
+    Examples:
+
+      async with AsyncCkanDatasetEngine(endpoint, apikey=apikey, max_connections=200) as engine:
+          results = await asyncio.gather(*(engine.get_dataset(dataset_id) for dataset_id in dataset_ids))
+    """
+    # Size in bytes of the chunks read from files that are uploaded
+    UPLOAD_CHUNK_SIZE = 262144
+
+    @property
+    def session(self):
+        """
+        The aiohttp.ClientSession used by the engine. Created on first use, inside the running event loop.
+        """
+        if self._session is None or self._session.closed:
+            if aiohttp is None:
+                raise ImportError('The aiohttp package is required to use AsyncCkanDatasetEngine. Install it with '
+                                  '"pip install tethys_dataset_services[async]".')
+
+            connector = aiohttp.TCPConnector(limit=self._max_connections,
+                                             limit_per_host=self._max_connections_per_host,
+                                             force_close=not self._keep_alive)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self._get_client_timeout())
+            self._owns_session = True
+
+        return self._session
+
+    def __init__(self, endpoint, apikey=None, username=None, password=None, max_connections=100,
+                 max_connections_per_host=0, keep_alive=True, timeout=None, download_chunk_size=1048576,
+                 download_cache=None, retry_policy=None, session=None):
+        """
+        Default constructor for asyncio CKAN Dataset Engines.
+
+        Args:
+          endpoint (string): URL of the dataset service API endpoint (e.g.: www.host.com/api/3/action)
+          apikey (string, optional): API key that will be used to authenticate with the dataset service.
+          username (string, optional): Username that will be used to authenticate with the dataset service.
+          password (string, optional): Password that will be used to authenticate with the dataset service.
+          max_connections (int, optional): Maximum number of connections open at once. Requests wait for a free connection beyond this limit. Defaults to 100.  # noqa: E501
+          max_connections_per_host (int, optional): Maximum number of connections open at once to a single host. Defaults to 0 (no limit other than max_connections).  # noqa: E501
+          keep_alive (bool, optional): Keep connections open between requests. Defaults to True.
+          timeout (float or tuple, optional): Total timeout in seconds of every request, or a (connect, read) tuple. Defaults to None (no timeout).  # noqa: E501
+          download_chunk_size (int, optional): Size in bytes of the chunks read when downloading resources. Defaults to 1 MB.
+          download_cache (DownloadCache or string, optional): Cache of downloaded resources, or path to its directory. Defaults to None (no cache).  # noqa: E501
+          retry_policy (RetryPolicy, optional): Policy used to retry failed requests. Defaults to RetryPolicy(). Use RetryPolicy(max_attempts=1) to disable retries.  # noqa: E501
+          session (aiohttp.ClientSession, optional): Existing session to make the requests with. It is not closed by the engine. Defaults to None (the engine creates its own session).  # noqa: E501
+        """
+        super(AsyncCkanDatasetEngine, self).__init__(
+            endpoint=endpoint,
+            apikey=apikey,
+            username=username,
+            password=password,
+            pool_maxsize=max_connections,
+            keep_alive=keep_alive,
+            timeout=timeout,
+            download_chunk_size=download_chunk_size,
+            download_cache=download_cache,
+            retry_policy=retry_policy
+        )
+
+        self._max_connections = max_connections
+        self._max_connections_per_host = max_connections_per_host
+        self._session = session
+        self._owns_session = session is None
+
+    def __enter__(self):
+        raise TypeError('Use "async with" with AsyncCkanDatasetEngine.')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def _get_client_timeout(self):
+        """
+        Convert the timeout of the engine to an aiohttp.ClientTimeout.
+        """
+        if isinstance(self._timeout, tuple):
+            connect, read = self._timeout
+            return aiohttp.ClientTimeout(total=None, sock_connect=connect, sock_read=read)
+
+        return aiohttp.ClientTimeout(total=self._timeout)
+
+    async def close(self):
+        """
+        Close the session of the engine and its pooled connections, unless the session was given to the engine. The engine can still be used afterwards; a new session will be created as needed.  # noqa: E501
+        """
+        session, self._session = self._session, None
+
+        if session is not None and self._owns_session and not session.closed:
+            await session.close()
+
+    async def _execute_request(self, url, data, headers, file=None, progress=None):
+        """
+        Execute the request with the aiohttp session. See CkanDatasetEngine._execute_request.
+
+        Returns:
+          tuple: status_code, response
+        """
+        idempotent = url.endswith(self.IDEMPOTENT_ACTION_SUFFIXES)
+
+        async def post():
+            # Multipart bodies are consumed when sent: build a new one for every attempt
+            body = self._get_form_data(data, file, progress) if file else data
+
+            async with self.session.post(url, data=body, headers=headers) as r:
+                return ApiResponse(r.status, r.headers, await r.text())
+
+        r = await self._retry_policy.call_async(post, idempotent=idempotent, retry_on=RETRY_ERRORS,
+                                                unsent_on=UNSENT_ERRORS,
+                                                on_retry=(lambda: self._rewind_files(file)) if file else None)
+        return r.status, r.text
+
+    def _get_form_data(self, data, file, progress=None):
+        """
+        Build the multipart body of an upload. Files are streamed from disk in chunks.
+        """
+        form = aiohttp.FormData()
+
+        for key, value in data.items():
+            form.add_field(key, value if isinstance(value, (str, bytes)) else str(value))
+
+        uploads = []
+        for key, value in file.items():
+            name, file_object = value if isinstance(value, tuple) else (os.path.basename(value.name), value)
+            uploads.append((key, name, file_object))
+
+        total = sum(self._get_remaining_size(file_object) for _, _, file_object in uploads)
+        sent = [0]
+
+        def report(size):
+            sent[0] += size
+            progress(sent[0], total)
+
+        for key, name, file_object in uploads:
+            form.add_field(key, self._read_file(file_object, report if progress is not None else None),
+                           filename=name, content_type='application/octet-stream')
+
+        return form
+
+    @staticmethod
+    def _get_remaining_size(file_object):
+        """
+        Get the number of bytes left to read from a file object.
+        """
+        position = file_object.tell()
+        end = file_object.seek(0, os.SEEK_END)
+        file_object.seek(position)
+        return end - position
+
+    async def _read_file(self, file_object, report=None):
+        """
+        Read a file in chunks without blocking the event loop.
+        """
+        loop = asyncio.get_running_loop()
+
+        while True:
+            chunk = await loop.run_in_executor(None, file_object.read, self.UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+
+            if report is not None:
+                report(len(chunk))
+
+            yield chunk
+
+    async def _execute_optional_method(self, method, console=False, file=None, progress=None, **kwargs):
+        """
+        Execute an API method that older servers may not provide. See CkanDatasetEngine._execute_optional_method.
+        """
+        if method in self._unsupported_methods:
+            return None
+
+        url, data, headers = self._prepare_request(method=method, file=file, data_dict=dict(kwargs))
+        status, response = await self._execute_request(url=url, data=data, headers=headers, file=file,
+                                                       progress=progress)
+
+        if self._is_unknown_action(status, response):
+            log.info('The {0} method is not available on "{1}".'.format(method, self.endpoint))
+            self._unsupported_methods.add(method)
+            return None
+
+        return self._parse_response(status, response, console)
+
+    async def execute_api_method(self, method, console=False, file=None, apikey=None, progress=None, **kwargs):
+        # Execute
+        url, data, headers = self._prepare_request(method=method, file=file, apikey=apikey, data_dict=kwargs)
+        status, response = await self._execute_request(url=url, data=data, headers=headers, file=file,
+                                                       progress=progress)
+
+        return self._parse_response(status, response, console)
+
+    async def execute_batch(self, calls, max_workers=None, console=False):
+        """
+        Execute many CKAN API methods concurrently. See CkanDatasetEngine.execute_batch.
+
+        Args:
+          calls (iterable): (method, kwargs) pairs. The method can be the name of a CKAN API method (e.g.: 'package_show') or a coroutine method of this engine (e.g.: engine.get_dataset).  # noqa: E501
+          max_workers (int, optional): Maximum number of calls in flight at once. Defaults to the max_connections of the engine.  # noqa: E501
+          console (bool, optional): Pretty print the results to the console for debugging. Defaults to False.
+
+        Returns:
+          list: The response dictionaries in the same order as calls.
+        """
+        semaphore = asyncio.Semaphore(max_workers or self._max_connections)
+
+        async def execute(call):
+            method, kwargs = call
+
+            async with semaphore:
+                try:
+                    if callable(method):
+                        return await method(console=console, **kwargs)
+
+                    return await self.execute_api_method(method=method, console=console, **kwargs)
+
+                except Exception as e:
+                    log.exception('Exception encountered while executing batch call "{0}".'.format(method))
+                    return {'success': False,
+                            'error': {'message': str(e)}}
+
+        return list(await asyncio.gather(*(execute(call) for call in calls)))
+
+    async def search_datasets(self, query=None, filtered_query=None, console=False, **kwargs):
+        """
+        Search CKAN datasets that match a query. See CkanDatasetEngine.search_datasets.
+        """
+        if not query and not filtered_query:
+            raise Exception("Need query or filtered_query to proceed ...")
+
+        # Assemble data dictionary
+        data = kwargs
+
+        # Assemble the query parameters
+        if query:
+            data['q'] = self._get_query_params(query)
+
+        if filtered_query:
+            data['fq'] = self._get_query_params(filtered_query)
+
+        # Execute
+        method = 'package_search'
+        return await self.execute_api_method(method=method, console=console, **data)
+
+    async def iter_search_datasets(self, query=None, filtered_query=None, page_size=100, prefetch=True, **kwargs):
+        """
+        Iterate asynchronously over all CKAN datasets that match a query. See CkanDatasetEngine.iter_search_datasets.
+
+        Examples:
+
+          async for dataset in engine.iter_search_datasets(query={'tags': 'hydrology'}, page_size=500):
+              print(dataset['name'])
+        """
+        if not query and not filtered_query:
+            raise Exception("Need query or filtered_query to proceed ...")
+
+        start = kwargs.pop('start', 0)
+        kwargs['rows'] = page_size
+
+        async def fetch_page(page_start):
+            result = await self.search_datasets(query=query, filtered_query=filtered_query, start=page_start,
+                                                **kwargs)
+
+            if not result or not result.get('success'):
+                raise Exception(str(result))
+
+            return result['result']
+
+        next_page = None
+
+        try:
+            page = await fetch_page(start)
+
+            while True:
+                datasets = page['results']
+                start += len(datasets)
+                has_more = len(datasets) > 0 and start < page.get('count', 0)
+
+                # Request the next page before handing out the current one
+                if has_more and prefetch:
+                    next_page = asyncio.ensure_future(fetch_page(start))
+
+                page = None
+
+                for dataset in datasets:
+                    yield dataset
+
+                if not has_more:
+                    break
+
+                if next_page is not None:
+                    page = await next_page
+                    next_page = None
+                else:
+                    page = await fetch_page(start)
+
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
+    async def search_resources(self, query, console=False, **kwargs):
+        """
+        Search CKAN resources that match a query. See CkanDatasetEngine.search_resources.
+        """
+        # Assemble data dictionary
+        data = kwargs
+
+        # Assemble the query parameters
+        data['query'] = self._get_query_params(query)
+
+        # Execute
+        method = 'resource_search'
+        return await self.execute_api_method(method=method, console=console, **data)
+
+    async def list_datasets(self, with_resources=False, console=False, **kwargs):
+        """
+        List CKAN datasets. See CkanDatasetEngine.list_datasets.
+        """
+        # Execute API Method
+        if not with_resources:
+            method = 'package_list'
+        else:
+            method = 'current_package_list_with_resources'
+
+        return await self.execute_api_method(method=method, console=console, **kwargs)
+
+    async def get_dataset(self, dataset_id, console=False, **kwargs):
+        """
+        Retrieve CKAN dataset. See CkanDatasetEngine.get_dataset.
+        """
+        # Assemble data dictionary
+        data = kwargs
+        data['id'] = dataset_id
+
+        # Execute
+        method = 'package_show'
+        return await self.execute_api_method(method=method, console=console, **data)
+
+    async def get_resource(self, resource_id, console=False, **kwargs):
+        """
+        Retrieve CKAN resource. See CkanDatasetEngine.get_resource.
+        """
+        # Assemble data dictionary
+        data = kwargs
+        data['id'] = resource_id
+
+        # Execute
+        method = 'resource_show'
+        return await self.execute_api_method(method=method, console=console, **data)
+
+    async def create_dataset(self, name, console=False, **kwargs):
+        """
+        Create a new CKAN dataset. See CkanDatasetEngine.create_dataset.
+        """
+        # Assemble the data dictionary
+        data = kwargs
+        data['name'] = name
+
+        # Execute
+        method = 'package_create'
+        return await self.execute_api_method(method=method, console=console, **data)
+
+    async def create_resource(self, dataset_id, url=None, file=None, console=False, progress=None, part_size=None,
+                              dedupe=False, **kwargs):
+        """
+        Create a new CKAN resource. See CkanDatasetEngine.create_resource. The progress of uploads is reported as progress(bytes_sent, total) in bytes of the file.  # noqa: E501
+        """
+        # Assemble the data dictionary
+        method = 'resource_create'
+        data = self._prepare_resource_data(dataset_id, url, file, kwargs)
+
+        if file and not os.path.isfile(file):
+            raise IOError('The file "{0}" does not exist.'.format(file))
+
+        # Skip files that were uploaded already
+        if file and dedupe:
+            existing_resource, file_hash, size = await self._find_duplicate_resource(dataset_id, file)
+
+            if existing_resource is not None:
+                log.info('Skipping the upload of "{0}": identical to resource "{1}".'.format(
+                    file, existing_resource.get('id')))
+                return {'success': True, 'result': existing_resource}
+
+            data.setdefault('hash', file_hash)
+            data.setdefault('size', str(size))
+
+        # Prepare file
+        if file and part_size:
+            # Create the resource first, then upload its file in parts
+            data['url'] = os.path.basename(file)
+            data.setdefault('url_type', 'upload')
+            response = await self.execute_api_method(method=method, console=console, **data)
+
+            if response and response['success']:
+                resource_id = response['result']['id']
+                upload_response = await self.upload_resource_chunked(resource_id, file, part_size=part_size,
+                                                                     progress=progress, console=console)
+                if not upload_response or not upload_response['success']:
+                    return upload_response
+
+                response = await self.get_resource(resource_id, console=console)
+        elif file:
+            with open(file, 'rb') as upload_file:
+                file = {'upload': (self._get_upload_file_name(file, data), upload_file)}
+                response = await self.execute_api_method(method=method, console=console, file=file,
+                                                         progress=progress, **data)
+        else:
+            response = await self.execute_api_method(method=method, console=console, **data)
+
+        return response
+
+    async def _find_duplicate_resource(self, dataset_id, file):
+        """
+        Find a resource of a dataset with the same hash and size as a file. See CkanDatasetEngine._find_duplicate_resource.  # noqa: E501
+        """
+        size = os.path.getsize(file)
+        result = await self.get_dataset(dataset_id)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._match_duplicate_resource, result, file, size)
+
+    async def upload_resource_chunked(self, resource_id, file, part_size=16777216, progress=None, console=False):
+        """
+        Upload the file of an existing resource in parts. See CkanDatasetEngine.upload_resource_chunked.
+        """
+        if not os.path.isfile(file):
+            raise IOError('The file "{0}" does not exist.'.format(file))
+
+        name = os.path.basename(file)
+        size = os.path.getsize(file)
+        part_count = max(1, -(-size // part_size))
+
+        # Resume the upload in progress for the resource, if it is the upload of this file
+        upload_id = None
+        first_part = 1
+        result = await self.execute_api_method(method='cloudstorage_check_multipart', id=resource_id)
+
+        if result and result['success'] and result['result']:
+            upload = result['result']['upload']
+
+            if upload.get('name') in (None, name):
+                upload_id = upload['id']
+                first_part = upload.get('parts', 0) + 1
+            else:
+                await self.execute_api_method(method='cloudstorage_abort_multipart', id=resource_id)
+
+        if upload_id is None:
+            result = await self.execute_api_method(method='cloudstorage_initiate_multipart', console=console,
+                                                   id=resource_id, name=name, size=size)
+            if not result or not result['success']:
+                return result
+
+            upload_id = result['result']['id']
+
+        loop = asyncio.get_running_loop()
+
+        with open(file, 'rb') as f:
+            f.seek((first_part - 1) * part_size)
+
+            for part_number in range(first_part, part_count + 1):
+                content = await loop.run_in_executor(None, f.read, part_size)
+                result = await self._upload_part(upload_id, part_number, name, content, console)
+                if not result or not result['success']:
+                    return result
+
+                if progress is not None:
+                    progress(min(part_number * part_size, size), size)
+
+        return await self.execute_api_method(method='cloudstorage_finish_multipart', console=console,
+                                             id=resource_id, uploadId=upload_id)
+
+    async def _upload_part(self, upload_id, part_number, name, content, console=False):
+        """
+        Upload one part of a multipart upload. Errors that remain after the retries are returned as a failed response.
+        """
+        try:
+            return await self.execute_api_method(method='cloudstorage_upload_multipart', console=console,
+                                                 file={'upload': (name, BytesIO(content))}, uploadId=upload_id,
+                                                 partNumber=str(part_number))
+        except REQUEST_ERRORS as e:
+            log.error('Unable to upload part {0} of "{1}": {2}'.format(part_number, name, e))
+            return {'success': False, 'error': {'message': str(e)}}
+
+    async def update_dataset(self, dataset_id, console=False, **kwargs):
+        """
+        Update CKAN dataset. See CkanDatasetEngine.update_dataset.
+        """
+        # Assemble the data dictionary
+        data = kwargs
+        data['id'] = dataset_id
+
+        # Patch only the given fields in a single request if the server supports it
+        result = await self._execute_optional_method(method='package_patch', console=console, **data)
+
+        if result is not None or 'package_patch' not in self._unsupported_methods:
+            return result
+
+        # Preserve the resources and tags if not included in parameters
+        original_result = await self.get_dataset(dataset_id)
+
+        if original_result['success']:
+            original_dataset = original_result['result']
+
+            if 'resources' not in data:
+                data['resources'] = original_dataset['resources']
+
+            if 'tags' not in data:
+                data['tags'] = original_dataset['tags']
+
+        # Execute
+        method = 'package_update'
+        return await self.execute_api_method(method=method, console=console, **data)
+
+    async def update_resource(self, resource_id, url=None, file=None, console=False, known_resource=None,
+                              progress=None, **kwargs):
+        """
+        Update CKAN resource. See CkanDatasetEngine.update_resource.
+        """
+        # Validate file and url parameters (mutually exclusive)
+        if url and file:
+            raise IOError('The url and file parameters are mutually exclusive: use one, not both.')
+
+        # Assemble the data dictionary
+        data = kwargs
+        data['id'] = resource_id
+
+        if url:
+            data['url'] = url
+
+        # Default naming convention
+        if 'name' not in data and file:
+            data['name'] = os.path.basename(file)
+
+        # Prepare file
+        update_file = None
+        if file:
+            if not os.path.isfile(file):
+                raise IOError('The file "{0}" does not exist.'.format(file))
+            else:
+                update_file = open(file, 'rb')
+                file = {'upload': (os.path.basename(file), update_file)}
+
+        try:
+            # Patch only the given fields in a single request if the server supports it
+            response = await self._execute_optional_method(method='resource_patch', console=console, file=file,
+                                                           progress=progress, **data)
+
+            if response is None and 'resource_patch' in self._unsupported_methods:
+                # resource_update replaces the url if it is not given
+                if 'url' not in data:
+                    if known_resource is not None:
+                        data['url'] = known_resource['url']
+                    else:
+                        result = await self.get_resource(resource_id)
+                        if result['success']:
+                            data['url'] = result['result']['url']
+
+                if update_file:
+                    update_file.seek(0)
+
+                # Execute
+                method = 'resource_update'
+                response = await self.execute_api_method(method=method, console=console, file=file,
+                                                         progress=progress, **data)
+
+        finally:
+            # Clean up
+            if update_file:
+                update_file.close()
+
+        return response
+
+    async def delete_dataset(self, dataset_id, console=False, file=None, **kwargs):
+        """
+        Delete CKAN dataset. See CkanDatasetEngine.delete_dataset.
+        """
+        # Assemble the data dictionary
+        data = kwargs
+        data['id'] = dataset_id
+
+        # Execute
+        method = 'package_delete'
+        return await self.execute_api_method(method=method, console=console, file=file, **data)
+
+    async def delete_resource(self, resource_id, console=False, **kwargs):
+        """
+        Delete CKAN resource. See CkanDatasetEngine.delete_resource.
+        """
+        # Assemble the data dictionary
+        data = kwargs
+        data['id'] = resource_id
+
+        # Execute
+        method = 'resource_delete'
+        return await self.execute_api_method(method=method, console=console, **data)
+
+    async def download_dataset(self, dataset_id, location=None, console=False, max_workers=None, max_per_host=None,
+                               resume=True, verify_hash=False, **kwargs):
+        """
+        Downloads all resources in a dataset concurrently. See CkanDatasetEngine.download_dataset.
+
+        Raises:
+            DatasetDownloadError: if any of the resources could not be downloaded. Raised after all resources were attempted.  # noqa: E501
+        """
+        result = await self.get_dataset(dataset_id, console=console, **kwargs)
+        if result['success']:
+            dataset = result['result']
+
+            location = location or dataset['name']
+            resources = dataset['resources']
+
+            if not resources:
+                return []
+
+            # Limit the concurrent downloads, in total and from each host
+            slots = asyncio.Semaphore(max_workers or self._max_connections)
+            host_slots = {}
+            for resource in resources:
+                host = urlparse(resource['url']).netloc
+                if host not in host_slots:
+                    host_slots[host] = asyncio.Semaphore(max_per_host or self._max_connections)
+
+            failures = {}
+
+            async def download(resource, local_file_name):
+                # Wait for the host before taking a global slot, so a busy host does not keep other hosts idle
+                async with host_slots[urlparse(resource['url']).netloc], slots:
+                    try:
+                        return await self._download_resource(resource, location, local_file_name, resume=resume,
+                                                             verify_hash=verify_hash)
+                    except Exception as e:
+                        failures[resource.get('id')] = e
+                        return None
+
+            local_file_names = self._get_local_file_names(resources)
+            downloaded_resources = list(await asyncio.gather(*(
+                download(resource, local_file_name) for resource, local_file_name in zip(resources, local_file_names)
+            )))
+
+            if failures:
+                raise DatasetDownloadError(dataset_id, downloaded_resources, failures)
+
+            return downloaded_resources
+        else:
+            raise Exception(str(result))
+
+    async def download_resouce(self, resource_id, location=None, local_file_name=None, console=False, **kwargs):
+        """
+        Deprecated alias for download_resource method for backwards compatibility (the old method was misspelled).
+        """
+        warnings.warn(
+            "This method has been deprecated because it was misspelled. Use download_resource instead.",
+            DeprecationWarning
+        )
+        return await self.download_resource(
+            resource_id=resource_id,
+            location=location,
+            local_file_name=local_file_name,
+            console=console,
+            **kwargs
+        )
+
+    async def download_resource(self, resource_id, location=None, local_file_name=None, console=False, resume=True,
+                                verify_hash=False, **kwargs):
+        """
+        Download a resource from a resource id. See CkanDatasetEngine.download_resource.
+
+        Returns:
+            Path and name of the downloaded file.
+        """
+        result = await self.get_resource(resource_id, console=console, **kwargs)
+        if result['success']:
+            resource = result['result']
+            return await self._download_resource(resource, location, local_file_name, resume=resume,
+                                                 verify_hash=verify_hash)
+        else:
+            raise Exception(str(result))
+
+    async def _download_resource(self, resource, location=None, local_file_name=None, resume=True,
+                                 verify_hash=False):
+        """
+        Download a resource from the resource meta-data dictionary. See CkanDatasetEngine._download_resource.
+        """
+        loop = asyncio.get_running_loop()
+        local_file = await loop.run_in_executor(None, self._get_local_file, resource, location, local_file_name)
+
+        # download resource
+        try:
+            if self._download_cache is None:
+                await self._fetch_resource(resource, local_file, resume=resume, verify_hash=verify_hash)
+            else:
+                await self._fetch_cached_resource(resource, local_file, resume=resume, verify_hash=verify_hash)
+
+        except Exception:
+            log.exception('Unable to download resource "{0}" from "{1}".'.format(resource.get('id'), resource['url']))
+            raise
+
+        return local_file
+
+    async def _fetch_cached_resource(self, resource, path, resume=True, verify_hash=False):
+        """
+        Place a resource at path using the download cache. See CkanDatasetEngine._fetch_cached_resource.
+
+        The cache reads, writes and copies files, so it is used from the default executor of the event loop.
+        """
+        cache = self._download_cache
+        loop = asyncio.get_running_loop()
+        key = cache.resource_key(resource)
+        headers = await loop.run_in_executor(None, self._get_cache_headers, key)
+
+        if headers is None:
+            try:
+                await loop.run_in_executor(None, cache.link, key, path)
+                return
+            except FileNotFoundError:
+                headers = {}
+
+        staging_file = cache.data_path(key) + '.download'
+        response = await self._fetch_resource(resource, staging_file, resume=resume, verify_hash=verify_hash,
+                                              headers=headers)
+
+        # Refresh the validators and the last use of the cached copy
+        if response.status == 304:
+            updated = await loop.run_in_executor(None, partial(cache.update, key, link_to=path,
+                                                               **self._get_response_validators(response.headers)))
+            if updated:
+                return
+
+            response = await self._fetch_resource(resource, staging_file, resume=resume, verify_hash=verify_hash)
+
+        await loop.run_in_executor(None, partial(cache.put, key, staging_file, link_to=path, url=resource['url'],
+                                                 etag=response.headers.get('ETag'),
+                                                 last_modified=response.headers.get('Last-Modified')))
+
+    async def _fetch_resource(self, resource, path, resume=True, verify_hash=False, headers=None):
+        """
+        Stream a resource into path through a ".part" file. See CkanDatasetEngine._fetch_resource.
+
+        Returns:
+          aiohttp.ClientResponse: The released response. Nothing is downloaded if the server answered 304 Not Modified to conditional headers.  # noqa: E501
+        """
+        url = resource['url']
+        part_file = path + '.part'
+        loop = asyncio.get_running_loop()
+
+        hasher = None
+        expected_hash = None
+        if verify_hash:
+            hasher, expected_hash = self._get_resource_hasher(resource)
+
+        if resume:
+            if_range, offset = await loop.run_in_executor(None, self._get_part_resume, part_file)
+        else:
+            if_range, offset = None, 0
+
+        request_headers = dict(headers or {})
+        if offset:
+            request_headers['Range'] = 'bytes={0}-'.format(offset)
+            request_headers['If-Range'] = if_range
+
+        async def get():
+            return await self.session.get(url, headers=request_headers or None)
+
+        r = await self._retry_policy.call_async(get, retry_on=RETRY_ERRORS)
+
+        try:
+            if r.status == 304:
+                return r
+
+            if offset and r.status == 416:
+                # The partial file is not a prefix of the resource anymore: start over
+                r.release()
+                await loop.run_in_executor(None, self._remove_part_file, part_file)
+                return await self._fetch_resource(resource, path, resume=False, verify_hash=verify_hash,
+                                                  headers=headers)
+
+            r.raise_for_status()
+
+            # The whole resource is sent if the server does not support ranges or the resource changed: start over
+            if r.status != 206:
+                offset = 0
+                await loop.run_in_executor(None, self._write_part_validators, part_file, r.headers)
+
+            if offset and hasher is not None:
+                await loop.run_in_executor(None, self._update_hasher_from_file, hasher, part_file)
+
+            f = await loop.run_in_executor(None, open, part_file, 'ab' if offset else 'wb')
+            try:
+                async for chunk in r.content.iter_chunked(self._download_chunk_size):
+                    await loop.run_in_executor(None, f.write, chunk)
+                    if hasher is not None:
+                        hasher.update(chunk)
+            finally:
+                await loop.run_in_executor(None, f.close)
+
+        finally:
+            r.release()
+
+        await loop.run_in_executor(None, self._complete_download, url, part_file, path, hasher, expected_hash)
+        return r
+
+    async def validate(self):
+        """
+        Validate CKAN dataset engine. Will throw an error if not valid.
+        """
+        api_endpoint = self._get_api_root()
+        session = self.session
+
+        try:
+            # aiohttp.InvalidURL is a ValueError
+            async with session.get(api_endpoint) as r:
+                status = r.status
+                text = await r.text()
+
+        except ValueError:
+            raise AssertionError('The URL "{0}" provided for the CKAN dataset service endpoint '
+                                 'is invalid.'.format(self.endpoint))
+
+        if status != 200:
+            raise AssertionError('The URL "{0}" is not a valid endpoint for a CKAN dataset '
+                                 'service.'.format(self.endpoint))
+
+        if 'version' not in json.loads(text):
+            raise AssertionError('The URL "{0}" is not a valid endpoint for a CKAN dataset '
+                                 'service.'.format(self.endpoint))
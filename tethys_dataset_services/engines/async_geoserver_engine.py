@@ -0,0 +1,1362 @@
+import json
+import asyncio
+import logging
+from functools import partial
+from xml.etree import ElementTree
+
+import geoserver
+
+from .geoserver_engine import GeoServerSpatialDatasetEngine
+from .async_support import aiohttp, ApiResponse, RETRY_ERRORS, UNSENT_ERRORS, REQUEST_ERRORS
+from ..retry import wait_until_async
+from ..utilities import ConvertDictToXml, ConvertXmlToDict
+
+
+log = logging.getLogger('tethys_dataset_services.async_geoserver_engine')
+
+
+class RestObject(object):
+    """
+    GeoServer object read from the REST API. Carries the attribute names of the equivalent gsconfig object, so it is transcribed the same way. The REST path of the object (without extension) is kept in the private _path attribute.  # noqa: E501
+    """
+
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+    def __repr__(self):
+        return '<RestObject {0}>'.format(getattr(self, 'name', None))
+
+
+class AsyncGeoServerSpatialDatasetEngine(GeoServerSpatialDatasetEngine):
+    """
+    Definition for asyncio GeoServer Dataset Engine objects.
+
+    Provides awaitable versions of the list, get, create, update and delete methods of GeoServerSpatialDatasetEngine that talk to the GeoServer REST API directly through a pooled aiohttp.ClientSession (install with "pip install tethys_dataset_services[async]"). Objects are read as JSON into stand-ins of the gsconfig objects and transcribed by the same code as the synchronous engine, so both return the same response dictionaries.  # noqa: E501
+
+    The methods that upload files (create_shapefile_resource, create_coverage_resource and add_granules_to_image_mosaic) and create_sql_view are awaitable too, but they run the implementation of the synchronous engine in the default executor of the event loop, with requests and gsconfig instead of the aiohttp session.  # noqa: E501
+
+    Examples:
+
+      async with AsyncGeoServerSpatialDatasetEngine(endpoint, username='admin', password='geoserver') as engine:
+          results = await asyncio.gather(*(engine.get_layer(layer_id) for layer_id in layer_ids))
+    """
+    # REST path, collection key and resource type of each kind of store
+    STORE_TYPES = (
+        ('datastores', 'dataStores', 'dataStore'),
+        ('coveragestores', 'coverageStores', 'coverageStore'),
+        ('wmsstores', 'wmsStores', 'wmsStore'),
+    )
+
+    # REST path, collection key and resource type of the resources of each kind of store
+    RESOURCE_TYPES = {
+        'dataStore': ('featuretypes', 'featureTypes', 'featureType'),
+        'coverageStore': ('coverages', 'coverages', 'coverage'),
+    }
+
+    # REST API names of the gsconfig attributes that are named differently
+    REST_ATTRIBUTE_NAMES = {
+        'native_name': 'nativeName',
+        'native_bbox': 'nativeBoundingBox',
+        'latlon_bbox': 'latLonBoundingBox',
+        'projection': 'srs',
+        'projection_policy': 'projectionPolicy',
+        'request_srs_list': 'requestSRS',
+        'response_srs_list': 'responseSRS',
+        'supported_formats': 'supportedFormats',
+        'default_style': 'defaultStyle',
+        'layers': 'publishables',
+    }
+
+    @property
+    def session(self):
+        """
+        The aiohttp.ClientSession used by the engine. Created on first use, inside the running event loop.
+        """
+        if self._session is None or self._session.closed:
+            if aiohttp is None:
+                raise ImportError('The aiohttp package is required to use AsyncGeoServerSpatialDatasetEngine. Install '
+                                  'it with "pip install tethys_dataset_services[async]".')
+
+            auth = aiohttp.BasicAuth(self.username, self.password or '') if self.username else None
+            connector = aiohttp.TCPConnector(limit=self._max_connections,
+                                             limit_per_host=self._max_connections_per_host,
+                                             force_close=not self._keep_alive)
+            self._session = aiohttp.ClientSession(connector=connector, auth=auth,
+                                                  timeout=aiohttp.ClientTimeout(total=self._timeout))
+            self._owns_session = True
+
+        return self._session
+
+    def __init__(self, endpoint, apikey=None, username=None, password=None, max_connections=100,
+                 max_connections_per_host=0, keep_alive=True, timeout=None, retry_policy=None,
+                 visibility_timeout=5.0, session=None):
+        """
+        Default constructor for asyncio GeoServer Dataset Engines.
+
+        Args:
+          endpoint (string): URL of the GeoServer REST endpoint (e.g.: www.host.com/geoserver/rest)
+          apikey (string, optional): API key that will be used to authenticate with the dataset service.
+          username (string, optional): Username that will be used to authenticate with the dataset service.
+          password (string, optional): Password that will be used to authenticate with the dataset service.
+          max_connections (int, optional): Maximum number of connections open at once. Requests wait for a free connection beyond this limit. Defaults to 100.  # noqa: E501
+          max_connections_per_host (int, optional): Maximum number of connections open at once to a single host. Defaults to 0 (no limit other than max_connections).  # noqa: E501
+          keep_alive (bool, optional): Keep connections open between requests. Defaults to True.
+          timeout (float, optional): Total timeout in seconds of every request. Defaults to None (no timeout).
+          retry_policy (RetryPolicy, optional): Policy used to retry failed requests. Defaults to RetryPolicy(). Use RetryPolicy(max_attempts=1) to disable retries.  # noqa: E501
+          visibility_timeout (float, optional): Maximum number of seconds to wait for a newly created object to become visible in the catalog. Defaults to 5.  # noqa: E501
+          session (aiohttp.ClientSession, optional): Existing session to make the requests with. It must carry the credentials for GeoServer and it is not closed by the engine. Defaults to None (the engine creates its own session).  # noqa: E501
+        """
+        super(AsyncGeoServerSpatialDatasetEngine, self).__init__(
+            endpoint=endpoint,
+            apikey=apikey,
+            username=username,
+            password=password,
+            retry_policy=retry_policy,
+            visibility_timeout=visibility_timeout
+        )
+
+        self._max_connections = max_connections
+        self._max_connections_per_host = max_connections_per_host
+        self._keep_alive = keep_alive
+        self._timeout = timeout
+        self._session = session
+        self._owns_session = session is None
+
+    def __enter__(self):
+        raise TypeError('Use "async with" with AsyncGeoServerSpatialDatasetEngine.')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """
+        Close the session of the engine and its pooled connections, unless the session was given to the engine. The engine can still be used afterwards; a new session will be created as needed.  # noqa: E501
+        """
+        session, self._session = self._session, None
+
+        if session is not None and self._owns_session and not session.closed:
+            await session.close()
+
+    async def _request(self, method, url, data=None, headers=None, params=None):
+        """
+        Make a request with the aiohttp session, retrying it according to the retry policy.
+
+        Returns:
+          ApiResponse: status, headers, body and reason of the response.
+        """
+        async def request():
+            async with self.session.request(method, url, data=data, headers=headers, params=params) as r:
+                return ApiResponse(r.status, r.headers, await r.text(), r.reason)
+
+        return await self._retry_policy.call_async(request,
+                                                   idempotent=method in self._retry_policy.IDEMPOTENT_METHODS,
+                                                   retry_on=RETRY_ERRORS, unsent_on=UNSENT_ERRORS)
+
+    def _rest_url(self, *path):
+        """
+        Create the URL of the JSON representation of a REST path.
+        """
+        return self._assemble_url(*path) + '.json'
+
+    async def _get_json(self, url):
+        """
+        Get a JSON document from the REST API.
+
+        Returns:
+          dict: The document or None if it does not exist.
+        """
+        r = await self._request('GET', url, headers={'Accept': 'application/json'})
+
+        if r.status == 404:
+            return None
+
+        if r.status != 200:
+            raise self._failed_request_error('GET', url, r)
+
+        return json.loads(r.text)
+
+    async def _send_json(self, method, url, body, params=None):
+        """
+        Send a JSON document to the REST API.
+        """
+        headers = {'Content-Type': 'application/json',
+                   'Accept': 'application/json'}
+        return await self._request(method, url, data=json.dumps(body), headers=headers, params=params)
+
+    @staticmethod
+    def _failed_request_error(method, url, r):
+        """
+        Describe a failed request like gsconfig does.
+        """
+        return geoserver.catalog.FailedRequestError('Tried to make a {0} request to {1} but got a {2} status code: '
+                                                    '\n{3}'.format(method, url, r.status, r.text))
+
+    @staticmethod
+    def _response_error(r):
+        """
+        Describe a failed create request like the synchronous engine does.
+        """
+        return '{1}({0}): {2}'.format(r.status, r.reason, r.text)
+
+    @staticmethod
+    def _as_list(collection, key):
+        """
+        Get the items of a REST collection. GeoServer returns an empty string for empty collections and a single object for collections of one item.  # noqa: E501
+        """
+        if not isinstance(collection, dict):
+            return []
+
+        items = collection.get(key) or []
+        return items if isinstance(items, list) else [items]
+
+    @staticmethod
+    def _bbox(bbox):
+        """
+        Convert a REST bounding box to the (minx, maxx, miny, maxy, crs) tuple of gsconfig.
+        """
+        if not bbox:
+            return None
+
+        crs = bbox.get('crs')
+
+        # Projected CRSs are given as objects with the WKT in "$"
+        if isinstance(crs, dict):
+            crs = crs.get('$')
+
+        return tuple(str(bbox.get(key)) for key in ('minx', 'maxx', 'miny', 'maxy')) + (crs,)
+
+    def _catalog_reference(self):
+        """
+        Stand-in of the gsconfig catalog, which is transcribed as its base URL.
+        """
+        return RestObject(gs_base_url=self._get_non_rest_endpoint() + '/')
+
+    def _split_name(self, name, workspace=None):
+        """
+        Split a "workspace:name" reference of the REST API.
+        """
+        if ':' in name:
+            return name.split(':', 1)
+
+        return workspace, name
+
+    def _style_reference(self, style):
+        """
+        Convert a style reference of the REST API into a style stand-in.
+        """
+        workspace = style.get('workspace')
+
+        if isinstance(workspace, dict):
+            workspace = workspace.get('name')
+
+        workspace, name = self._split_name(style['name'], workspace)
+        return RestObject(name=name, workspace=workspace)
+
+    def _workspace_object(self, name):
+        return RestObject(
+            _path='workspaces/{0}'.format(name),
+            resource_type='workspace',
+            name=name,
+            catalog=self._catalog_reference(),
+            href=self._assemble_url('workspaces', name + '.xml'),
+            datastore_url=self._assemble_url('workspaces', name, 'datastores.xml'),
+            coveragestore_url=self._assemble_url('workspaces', name, 'coveragestores.xml'),
+            wmsstore_url=self._assemble_url('workspaces', name, 'wmsstores.xml'),
+        )
+
+    def _store_object(self, data, path, resource_type):
+        attributes = dict(
+            _path=path,
+            resource_type=resource_type,
+            name=data['name'],
+            workspace=(data.get('workspace') or {}).get('name'),
+            type=data.get('type'),
+            enabled=data.get('enabled'),
+            catalog=self._catalog_reference(),
+            href=self._assemble_url(path + '.xml'),
+        )
+
+        if resource_type == 'dataStore':
+            attributes['connection_parameters'] = {
+                entry['@key']: entry.get('$') for entry in self._as_list(data.get('connectionParameters'), 'entry')
+            }
+        elif resource_type == 'coverageStore':
+            attributes['url'] = data.get('url')
+        else:
+            attributes['capabilitiesURL'] = data.get('capabilitiesURL')
+
+        return RestObject(**attributes)
+
+    def _resource_object(self, data, path, resource_type):
+        workspace = (data.get('namespace') or {}).get('name')
+        store = self._split_name((data.get('store') or {}).get('name', ''), workspace)[1]
+
+        attributes = dict(
+            _path=path,
+            resource_type=resource_type,
+            name=data['name'],
+            native_name=data.get('nativeName'),
+            workspace=workspace,
+            store=store or None,
+            title=data.get('title'),
+            abstract=data.get('abstract'),
+            keywords=self._as_list(data.get('keywords'), 'string'),
+            # gsconfig reads these as the text of the XML elements
+            enabled=str(data.get('enabled', '')).lower() or None,
+            advertised=str(data.get('advertised', True)).lower(),
+            native_bbox=self._bbox(data.get('nativeBoundingBox')),
+            latlon_bbox=self._bbox(data.get('latLonBoundingBox')),
+            projection=data.get('srs'),
+            projection_policy=data.get('projectionPolicy'),
+            catalog=self._catalog_reference(),
+            href=self._assemble_url(path + '.xml'),
+        )
+
+        if resource_type == 'featureType':
+            attributes['attributes'] = [a['name'] for a in self._as_list(data.get('attributes'), 'attribute')]
+        else:
+            attributes['supported_formats'] = self._as_list(data.get('supportedFormats'), 'string')
+            attributes['request_srs_list'] = self._as_list(data.get('requestSRS'), 'string')
+            attributes['response_srs_list'] = self._as_list(data.get('responseSRS'), 'string')
+
+        return RestObject(**attributes)
+
+    def _layer_object(self, data, name, resource):
+        default_style = data.get('defaultStyle')
+
+        return RestObject(
+            _path='layers/{0}'.format(name),
+            resource_type='layer',
+            name=name,
+            type=data.get('type'),
+            resource=resource,
+            default_style=self._style_reference(default_style) if default_style else None,
+            styles=[self._style_reference(style) for style in self._as_list(data.get('styles'), 'style')],
+            attribution=(data.get('attribution') or {}).get('title'),
+            enabled=data.get('enabled', True),
+            advertised=data.get('advertised', True),
+            queryable=data.get('queryable', True),
+            opaque=data.get('opaque', True),
+            catalog=self._catalog_reference(),
+            href=self._assemble_url('layers', name + '.xml'),
+        )
+
+    def _layer_group_object(self, data, path):
+        workspace = (data.get('workspace') or {}).get('name')
+        styles = [(style or {}).get('name') if isinstance(style, dict) else style or None
+                  for style in self._as_list(data.get('styles'), 'style')]
+
+        return RestObject(
+            _path=path,
+            resource_type='layerGroup',
+            name=data['name'],
+            workspace=workspace,
+            mode=data.get('mode'),
+            title=data.get('title'),
+            abstract=data.get('abstractTxt'),
+            layers=[p.get('name') for p in self._as_list(data.get('publishables'), 'published')],
+            styles=styles,
+            bounds=self._bbox(data.get('bounds')),
+            catalog=self._catalog_reference(),
+            href=self._assemble_url(path + '.xml'),
+        )
+
+    def _style_object(self, data, path):
+        workspace = (data.get('workspace') or {}).get('name')
+        version = (data.get('languageVersion') or {}).get('version')
+
+        return RestObject(
+            _path=path,
+            name=data['name'],
+            workspace=workspace,
+            fqn='{0}:{1}'.format(workspace, data['name']) if workspace else data['name'],
+            filename=data.get('filename'),
+            style_format='sld11' if version == '1.1.0' else 'sld10',
+            catalog=self._catalog_reference(),
+            href=self._assemble_url(path + '.xml'),
+            body_href=self._assemble_url(path + '.sld'),
+        )
+
+    def _transcribe_geoserver_objects(self, gs_object_list, fields=None):
+        """
+        Convert a list of REST objects to a list of Python dictionaries. The properties of REST objects are read already, so they are transcribed in turn. Objects that could not be read are given as error dictionaries.  # noqa: E501
+        """
+        return [gs_object if isinstance(gs_object, dict) else self._safe_transcribe_geoserver_object(gs_object, fields)
+                for gs_object in gs_object_list]
+
+    async def _fetch_objects(self, items, fetch):
+        """
+        Fetch the objects of (name, key) items concurrently with fetch(key). Failures are reported as error dictionaries instead of raised, so one bad object does not fail a whole listing.  # noqa: E501
+        """
+        async def fetch_safely(name, key):
+            try:
+                return await fetch(key)
+
+            except Exception as e:
+                log.exception('Unable to retrieve properties of GeoServer object "{0}".'.format(name))
+                return {'name': name,
+                        'error': str(e)}
+
+        gs_objects = await asyncio.gather(*(fetch_safely(name, key) for name, key in items))
+
+        # Objects deleted since they were listed are skipped
+        return [gs_object for gs_object in gs_objects if gs_object is not None]
+
+    async def _list(self, items, fetch, with_properties, debug, fields):
+        """
+        Handle list calls of (name, key) items. The objects are only fetched, with fetch(key), if their properties are requested.  # noqa: E501
+        """
+        if not with_properties and fields is None:
+            gs_objects = [RestObject(name=name) for name, _ in items]
+        else:
+            gs_objects = await self._fetch_objects(items, fetch)
+
+        return self._handle_list(gs_objects, with_properties, debug, fields)
+
+    async def _get_default_workspace_name(self):
+        """
+        Get the name of the default workspace. The name is cached until refresh() is called.
+        """
+        if self._default_workspace is None:
+            data = await self._get_json(self._rest_url('workspaces', 'default'))
+            self._default_workspace = data['workspace']['name']
+
+        return self._default_workspace
+
+    async def _get_workspace_object(self, name):
+        data = await self._get_json(self._rest_url('workspaces', name))
+        return self._workspace_object(data['workspace']['name']) if data else None
+
+    async def _get_store_object(self, name, workspace):
+        for store_path, _, resource_type in self.STORE_TYPES:
+            path = 'workspaces/{0}/{1}/{2}'.format(workspace, store_path, name)
+            data = await self._get_json(self._rest_url(path))
+
+            if data:
+                return self._store_object(data[resource_type], path, resource_type)
+
+        return None
+
+    async def _get_resource_object(self, name, store=None, workspace=None):
+        if store:
+            store_object = await self._get_store_object(store, workspace)
+
+            if store_object is None or store_object.resource_type not in self.RESOURCE_TYPES:
+                return None
+
+            resource_path, _, resource_type = self.RESOURCE_TYPES[store_object.resource_type]
+            candidates = [('{0}/{1}/{2}'.format(store_object._path, resource_path, name), resource_type)]
+        else:
+            candidates = [('workspaces/{0}/{1}/{2}'.format(workspace, resource_path, name), resource_type)
+                          for resource_path, _, resource_type in self.RESOURCE_TYPES.values()]
+
+        for path, resource_type in candidates:
+            data = await self._get_json(self._rest_url(path))
+
+            if data:
+                return self._resource_object(data[resource_type], path, resource_type)
+
+        return None
+
+    async def _get_layer_object(self, name, fields=None):
+        data = await self._get_json(self._rest_url('layers', name))
+
+        if not data:
+            return None
+
+        data = data['layer']
+        reference = data.get('resource') or {}
+        workspace, resource_name = self._split_name(reference.get('name', ''))
+        resource = RestObject(name=resource_name, workspace=workspace, native_bbox=None, projection=None)
+
+        # The bounding box of the resource is only needed for the WMS urls
+        if reference.get('href') and (fields is None or any(f == 'wms' or f.startswith('wms.') for f in fields)):
+            resource_data = await self._get_json(reference['href'])
+
+            if resource_data:
+                resource_data = next(iter(resource_data.values()))
+                resource.native_bbox = self._bbox(resource_data.get('nativeBoundingBox'))
+                resource.projection = resource_data.get('srs')
+
+        return self._layer_object(data, name, resource)
+
+    async def _get_layer_group_object(self, name, workspace=None):
+        path = 'layergroups/{0}'.format(name)
+
+        if workspace:
+            path = 'workspaces/{0}/{1}'.format(workspace, path)
+
+        data = await self._get_json(self._rest_url(path))
+        return self._layer_group_object(data['layerGroup'], path) if data else None
+
+    async def _get_style_object(self, name, workspace=None):
+        path = 'styles/{0}'.format(name)
+
+        if workspace:
+            path = 'workspaces/{0}/{1}'.format(workspace, path)
+
+        data = await self._get_json(self._rest_url(path))
+        return self._style_object(data['style'], path) if data else None
+
+    async def _get_workspace_names(self):
+        data = await self._get_json(self._rest_url('workspaces'))
+        return [w['name'] for w in self._as_list((data or {}).get('workspaces'), 'workspace')]
+
+    async def _wait_until_visible(self, func):
+        """
+        Await func until it returns the newly created object, backing off exponentially from 50 ms. Returns None if the object is not visible before the visibility timeout.  # noqa: E501
+        """
+        return await wait_until_async(func, timeout=self._visibility_timeout,
+                                      retry_on=(geoserver.catalog.FailedRequestError,))
+
+    async def _create_result_async(self, return_result, get_object, response, resource_type, name, workspace,
+                                   store=None):
+        """
+        Build the result of a create method for its return_result argument, awaiting get_object for a full result. See GeoServerSpatialDatasetEngine._create_result.  # noqa: E501
+        """
+        if return_result == 'full':
+            gs_object = await get_object()
+            return self._transcribe_geoserver_object(gs_object) if gs_object is not None else {}
+
+        return self._create_result(return_result, None, response, resource_type, name, workspace, store=store)
+
+    def _rest_style(self, style):
+        """
+        Convert a style identifier (e.g.: "workspace:name") into a REST style reference.
+        """
+        if not style:
+            return ''
+
+        workspace, name = self._process_identifier(style)
+        return {'name': name, 'workspace': workspace} if workspace else {'name': name}
+
+    @staticmethod
+    def _rest_bbox(bbox):
+        """
+        Convert a (minx, maxx, miny, maxy, crs) tuple into a REST bounding box.
+        """
+        if not bbox:
+            return None
+
+        return dict(zip(('minx', 'maxx', 'miny', 'maxy', 'crs'), bbox))
+
+    def _get_rest_changes(self, attributes_dict, rest_object):
+        """
+        Convert the changes to a gsconfig object into a REST document. Attributes the object does not have are ignored, like the synchronous engine does.  # noqa: E501
+        """
+        changes = {}
+
+        for attribute, value in attributes_dict.items():
+            if attribute.startswith('_') or not hasattr(rest_object, attribute):
+                continue
+
+            if attribute in ('native_bbox', 'latlon_bbox', 'bounds'):
+                value = self._rest_bbox(value)
+            elif attribute in ('keywords', 'request_srs_list', 'response_srs_list', 'supported_formats'):
+                value = {'string': list(value)}
+            elif attribute == 'default_style':
+                value = self._rest_style(value)
+            elif attribute == 'styles':
+                value = {'style': [self._rest_style(style) for style in value]}
+            elif attribute == 'layers':
+                value = {'published': [{'@type': 'layer', 'name': layer} for layer in value]}
+            elif attribute == 'attribution':
+                value = {'title': value}
+
+            if attribute == 'abstract' and rest_object.resource_type == 'layerGroup':
+                name = 'abstractTxt'
+            else:
+                name = self.REST_ATTRIBUTE_NAMES.get(attribute, attribute)
+
+            changes[name] = value
+
+        return changes
+
+    async def _handle_delete(self, identifier, gs_object, purge, recurse, debug):
+        """
+        Handle delete calls
+        """
+        # Initialize response dictionary
+        response_dict = {'success': False}
+
+        if gs_object:
+            params = {}
+
+            if purge:
+                params['purge'] = str(purge).lower()
+
+            if recurse:
+                params['recurse'] = 'true'
+
+            url = self._rest_url(gs_object._path)
+            r = await self._request('DELETE', url, params=params)
+
+            if r.status == 200:
+                response_dict['success'] = True
+                response_dict['result'] = None
+            else:
+                response_dict['error'] = str(self._failed_request_error('DELETE', url, r))
+
+        else:
+            response_dict['error'] = 'GeoServer object does not exist: "{0}".'.format(identifier)
+
+        self._handle_debug(response_dict, debug)
+        return response_dict
+
+    async def _get(self, identifier, fetch, not_found, debug, fields):
+        """
+        Handle get calls
+        """
+        try:
+            gs_object = await fetch()
+
+            if not gs_object:
+                response_dict = {'success': False,
+                                 'error': not_found.format(identifier)}
+            else:
+                response_dict = {'success': True,
+                                 'result': self._transcribe_geoserver_object(gs_object, fields)}
+
+        except geoserver.catalog.FailedRequestError as e:
+            response_dict = {'success': False,
+                             'error': str(e)}
+
+        self._handle_debug(response_dict, debug)
+        return response_dict
+
+    async def list_resources(self, with_properties=False, store=None, workspace=None, debug=False, fields=None):
+        """
+        List the names of all resources available from the spatial dataset service. See GeoServerSpatialDatasetEngine.list_resources.  # noqa: E501
+        """
+        try:
+            if store:
+                workspace = workspace or await self._get_default_workspace_name()
+                store_object = await self._get_store_object(store, workspace)
+
+                if store_object is None:
+                    response_dict = {'success': False,
+                                     'error': 'Store "{0}" not found.'.format(store)}
+                    self._handle_debug(response_dict, debug)
+                    return response_dict
+
+                resource_types = [self.RESOURCE_TYPES[store_object.resource_type]] \
+                    if store_object.resource_type in self.RESOURCE_TYPES else []
+                collections = [(store_object._path + '/' + resource_path, key, resource_type)
+                               for resource_path, key, resource_type in resource_types]
+            else:
+                workspaces = [workspace] if workspace else await self._get_workspace_names()
+                collections = [('workspaces/{0}/{1}'.format(ws, resource_path), key, resource_type)
+                               for ws in workspaces
+                               for resource_path, key, resource_type in self.RESOURCE_TYPES.values()]
+
+            listings = await asyncio.gather(*(self._get_json(self._rest_url(path)) for path, _, _ in collections))
+
+        except geoserver.catalog.FailedRequestError as e:
+            response_dict = {'success': False,
+                             'error': str(e)}
+            self._handle_debug(response_dict, debug)
+            return response_dict
+
+        items = [(item['name'], ('{0}/{1}'.format(path, item['name']), resource_type))
+                 for (path, key, resource_type), listing in zip(collections, listings)
+                 for item in self._as_list((listing or {}).get(key), resource_type)]
+
+        async def fetch(resource):
+            path, resource_type = resource
+            data = await self._get_json(self._rest_url(path))
+            return self._resource_object(data[resource_type], path, resource_type) if data else None
+
+        return await self._list(items, fetch, with_properties, debug, fields)
+
+    async def list_layers(self, with_properties=False, debug=False, fields=None):
+        """
+        List names of all layers available from the spatial dataset service. See GeoServerSpatialDatasetEngine.list_layers.  # noqa: E501
+        """
+        data = await self._get_json(self._rest_url('layers'))
+        items = [(layer['name'],) * 2 for layer in self._as_list((data or {}).get('layers'), 'layer')]
+        return await self._list(items, lambda name: self._get_layer_object(name, fields), with_properties, debug,
+                                fields)
+
+    async def list_layer_groups(self, with_properties=False, debug=False, fields=None):
+        """
+        List the names of all layer groups available from the spatial dataset service. See GeoServerSpatialDatasetEngine.list_layer_groups.  # noqa: E501
+        """
+        data = await self._get_json(self._rest_url('layergroups'))
+        items = [(group['name'],) * 2 for group in self._as_list((data or {}).get('layerGroups'), 'layerGroup')]
+        return await self._list(items, self._get_layer_group_object, with_properties, debug, fields)
+
+    async def list_workspaces(self, with_properties=False, debug=False, fields=None):
+        """
+        List the names of all workspaces available from the spatial dataset service. See GeoServerSpatialDatasetEngine.list_workspaces.  # noqa: E501
+        """
+        names = await self._get_workspace_names()
+
+        # Workspaces have no properties other than their name
+        workspaces = [self._workspace_object(name) for name in names]
+        return self._handle_list(workspaces, with_properties, debug, fields)
+
+    async def list_stores(self, workspace=None, with_properties=False, debug=False, fields=None):
+        """
+        List the names of all stores available from the spatial dataset service. See GeoServerSpatialDatasetEngine.list_stores.  # noqa: E501
+        """
+        if workspace and await self._get_workspace_object(workspace) is None:
+            response_dict = {'success': False,
+                             'error': 'Invalid workspace "{0}".'.format(workspace)}
+            self._handle_debug(response_dict, debug)
+            return response_dict
+
+        workspaces = [workspace] if workspace else await self._get_workspace_names()
+        collections = [('workspaces/{0}/{1}'.format(ws, store_path), key, resource_type)
+                       for ws in workspaces for store_path, key, resource_type in self.STORE_TYPES]
+        listings = await asyncio.gather(*(self._get_json(self._rest_url(path)) for path, _, _ in collections))
+
+        items = [(item['name'], ('{0}/{1}'.format(path, item['name']), resource_type))
+                 for (path, key, resource_type), listing in zip(collections, listings)
+                 for item in self._as_list((listing or {}).get(key), resource_type)]
+
+        async def fetch(store):
+            path, resource_type = store
+            data = await self._get_json(self._rest_url(path))
+            return self._store_object(data[resource_type], path, resource_type) if data else None
+
+        return await self._list(items, fetch, with_properties, debug, fields)
+
+    async def list_styles(self, workspace=None, with_properties=False, debug=False, fields=None):
+        """
+        List the names of all styles available from the spatial dataset service. See GeoServerSpatialDatasetEngine.list_styles.  # noqa: E501
+        """
+        path = 'workspaces/{0}/styles'.format(workspace) if workspace else 'styles'
+        data = await self._get_json(self._rest_url(path))
+        items = [(style['name'],) * 2 for style in self._as_list((data or {}).get('styles'), 'style')]
+        return await self._list(items, lambda name: self._get_style_object(name, workspace), with_properties, debug,
+                                fields)
+
+    async def get_resource(self, resource_id, store_id=None, debug=False, fields=None):
+        """
+        Retrieve a resource object. See GeoServerSpatialDatasetEngine.get_resource.
+        """
+        workspace, name = self._process_identifier(resource_id)
+
+        async def fetch():
+            return await self._get_resource_object(name, store_id, workspace or
+                                                   await self._get_default_workspace_name())
+
+        return await self._get(resource_id, fetch, 'Resource "{0}" not found.', debug, fields)
+
+    async def get_layer(self, layer_id, store_id=None, debug=False, fields=None):
+        """
+        Retrieve a layer object. See GeoServerSpatialDatasetEngine.get_layer.
+        """
+        async def fetch():
+            layer = await self._get_layer_object(layer_id, fields)
+            if layer and store_id:
+                layer.store = store_id
+            return layer
+
+        response_dict = await self._get(layer_id, fetch, 'Layer "{0}" not found.', False, fields)
+
+        # Get layer caching properties (the REST API of GeoWebCache serves them)
+        if response_dict['success'] and (fields is None or 'tile_caching' in fields):
+            gwc_url = '{0}layers/{1}.xml'.format(self.gwc_endpoint, layer_id)
+            r = await self._request('GET', gwc_url)
+
+            if r.status == 200:
+                root = ElementTree.XML(r.text)
+                tile_caching_dict = ConvertXmlToDict(root)
+                response_dict['result']['tile_caching'] = tile_caching_dict['GeoServerLayer']
+
+        self._handle_debug(response_dict, debug)
+        return response_dict
+
+    async def get_layer_group(self, layer_group_id, debug=False, fields=None):
+        """
+        Retrieve a layer group object. See GeoServerSpatialDatasetEngine.get_layer_group.
+        """
+        workspace, name = self._process_identifier(layer_group_id)
+        return await self._get(layer_group_id, lambda: self._get_layer_group_object(name, workspace),
+                               'Layer Group "{0}" not found.', debug, fields)
+
+    async def get_store(self, store_id, debug=False, fields=None):
+        """
+        Retrieve a store object. See GeoServerSpatialDatasetEngine.get_store.
+        """
+        workspace, name = self._process_identifier(store_id)
+
+        async def fetch():
+            return await self._get_store_object(name, workspace or await self._get_default_workspace_name())
+
+        return await self._get(store_id, fetch, 'Store "{0}" not found.', debug, fields)
+
+    async def get_workspace(self, workspace_id, debug=False, fields=None):
+        """
+        Retrieve a workspace object. See GeoServerSpatialDatasetEngine.get_workspace.
+        """
+        return await self._get(workspace_id, lambda: self._get_workspace_object(workspace_id),
+                               'Workspace "{0}" not found.', debug, fields)
+
+    async def get_style(self, style_id, debug=False, fields=None):
+        """
+        Retrieve a style object. See GeoServerSpatialDatasetEngine.get_style.
+        """
+        workspace, name = self._process_identifier(style_id)
+        return await self._get(style_id, lambda: self._get_style_object(name, workspace),
+                               'Style "{0}" not found.', debug, fields)
+
+    async def create_postgis_feature_resource(self, store_id, host, port, database, user, password, table=None,
+                                              wait=True, return_result='full', debug=False):
+        """
+        Link an existing PostGIS database to GeoServer as a feature store. See GeoServerSpatialDatasetEngine.create_postgis_feature_resource.  # noqa: E501
+        """
+        self._check_return_result(return_result)
+
+        # Results of new objects are built from the create response if not waiting for them
+        created_result = 'name' if return_result == 'full' and not wait else return_result
+
+        workspace, name = self._process_identifier(store_id)
+
+        # Get default work space if none is given
+        if not workspace:
+            workspace = await self._get_default_workspace_name()
+
+        # Create the store if it doesn't exist already
+        store = await self._get_store_object(name, workspace)
+
+        if store is None:
+            parameters = (('host', host), ('port', port), ('database', database), ('user', user),
+                          ('passwd', password), ('dbtype', 'postgis'))
+            body = {'dataStore': {'name': name,
+                                  'connectionParameters': {'entry': [{'@key': key, '$': str(value)}
+                                                                     for key, value in parameters]}}}
+
+            # Execute: POST /workspaces/<ws>/datastores
+            response = await self._send_json('POST', self._rest_url('workspaces', workspace, 'datastores'), body)
+
+            if response.status != 201:
+                response_dict = {'success': False,
+                                 'error': self._response_error(response)}
+                self._handle_debug(response_dict, debug)
+                return response_dict
+
+        if not table:
+            # Wrap up successfully with new store created
+            if store is not None:
+                resource_dict = self._create_result(return_result, lambda: store, None, 'dataStore', name, workspace)
+            else:
+                resource_dict = await self._create_result_async(
+                    created_result, lambda: self._wait_until_visible(lambda: self._get_store_object(name, workspace)),
+                    response, 'dataStore', name, workspace
+                )
+
+            response_dict = {'success': True,
+                             'result': resource_dict}
+            self._handle_debug(response_dict, debug)
+            return response_dict
+
+        # Throw error if resource already exists
+        try:
+            if await self._get_resource_object(table, name, workspace):
+                response_dict = {'success': False,
+                                 'error': 'There is already a resource named {0} in {1}'.format(table, workspace)}
+                self._handle_debug(response_dict, debug)
+                return response_dict
+
+        except geoserver.catalog.FailedRequestError:
+            pass
+
+        return await self._add_table(name, workspace, table, created_result, debug)
+
+    async def add_table_to_postgis_store(self, store_id, table, return_result='full', debug=False):
+        """
+        Add an existing postgis table as a feature resource to a postgis store that already exists. See GeoServerSpatialDatasetEngine.add_table_to_postgis_store.  # noqa: E501
+        """
+        self._check_return_result(return_result)
+
+        workspace, name = self._process_identifier(store_id)
+
+        # Get default work space if none is given
+        if not workspace:
+            workspace = await self._get_default_workspace_name()
+
+        # Throw error store does not exist
+        try:
+            store = await self._get_store_object(name, workspace)
+        except geoserver.catalog.FailedRequestError:
+            store = None
+
+        if store is None:
+            response_dict = {'success': False,
+                             'error': 'There is no store named {0} in {1}'.format(name, workspace)}
+            self._handle_debug(response_dict, debug)
+            return response_dict
+
+        response_dict = await self._add_table(name, workspace, table, 'name' if return_result == 'name' else None,
+                                              False)
+
+        # Wrap up successfully with the store, like the synchronous engine
+        if response_dict['success'] and return_result == 'full':
+            store = await self._get_store_object(name, workspace)
+            response_dict['result'] = self._transcribe_geoserver_object(store)
+
+        self._handle_debug(response_dict, debug)
+        return response_dict
+
+    async def add_tables_to_postgis_store(self, store_id, tables, max_workers=None, return_result='full',
+                                          debug=False):
+        """
+        Add existing postgis tables as feature resources to a postgis store that already exists. See GeoServerSpatialDatasetEngine.add_tables_to_postgis_store.  # noqa: E501
+
+        Args:
+          max_workers (int, optional): Maximum number of tables published at once. Defaults to the max_connections of the engine.  # noqa: E501
+        """
+        self._check_return_result(return_result)
+
+        workspace, name = self._process_identifier(store_id)
+
+        # Get default work space if none is given
+        if not workspace:
+            workspace = await self._get_default_workspace_name()
+
+        # Throw error store does not exist
+        try:
+            store = await self._get_store_object(name, workspace)
+        except geoserver.catalog.FailedRequestError:
+            store = None
+
+        if store is None:
+            response_dict = {'success': False,
+                             'error': 'There is no store named {0} in {1}'.format(name, workspace)}
+            self._handle_debug(response_dict, debug)
+            return response_dict
+
+        semaphore = asyncio.Semaphore(max_workers or self._max_connections)
+
+        async def add_table(table):
+            async with semaphore:
+                try:
+                    return await self._add_table(name, workspace, table, 'name' if return_result else None, False)
+                except REQUEST_ERRORS as e:
+                    return {'success': False,
+                            'error': str(e)}
+
+        # Publish each table once, in the given order
+        tables = list(dict.fromkeys(tables))
+        table_results = dict(zip(tables, await asyncio.gather(*(add_table(table) for table in tables))))
+
+        # Read the store once for all tables
+        if return_result == 'full' and any(table_result['success'] for table_result in table_results.values()):
+            store_dict = self._transcribe_geoserver_object(await self._get_store_object(name, workspace))
+
+            for table_result in table_results.values():
+                if table_result['success']:
+                    table_result['result'] = store_dict
+
+        failed = [table for table, table_result in table_results.items() if not table_result['success']]
+        response_dict = {'success': not failed,
+                         'result': table_results}
+
+        if failed:
+            response_dict['error'] = 'Unable to add tables: {0}.'.format(', '.join(failed))
+
+        self._handle_debug(response_dict, debug)
+        return response_dict
+
+    async def _add_table(self, name, workspace, table, return_result, debug):
+        """
+        Publish a table of a PostGIS store as a feature type. A full result waits until the new resource is visible.
+        """
+        body = {'featureType': {'name': table}}
+
+        # Execute: POST /workspaces/<ws>/datastores/<ds>/featuretypes
+        response = await self._send_json('POST', self._rest_url('workspaces', workspace, 'datastores', name,
+                                                                'featuretypes'), body)
+
+        if response.status != 201:
+            response_dict = {'success': False,
+                             'error': self._response_error(response)}
+            self._handle_debug(response_dict, debug)
+            return response_dict
+
+        resource_dict = await self._create_result_async(
+            return_result, lambda: self._wait_until_visible(lambda: self._get_resource_object(table, name, workspace)),
+            response, 'featureType', table, workspace, store=name
+        )
+
+        response_dict = {'success': True,
+                         'result': resource_dict}
+        self._handle_debug(response_dict, debug)
+        return response_dict
+
+    async def create_layer_group(self, layer_group_id, layers, styles, bounds=None, return_result='full', debug=False):
+        """
+        Create a layer group. See GeoServerSpatialDatasetEngine.create_layer_group.
+        """
+        self._check_return_result(return_result)
+
+        workspace, name = self._process_identifier(layer_group_id)
+
+        try:
+            if await self._get_layer_group_object(name, workspace):
+                raise geoserver.catalog.ConflictingDataError('LayerGroup named {0} already exists!'.format(name))
+
+            body = {'layerGroup': {'name': name,
+                                   'publishables': {'published': [{'@type': 'layer', 'name': layer}
+                                                                  for layer in layers]},
+                                   'styles': {'style': [self._rest_style(style) for style in styles]}}}
+
+            if bounds:
+                body['layerGroup']['bounds'] = self._rest_bbox(bounds)
+
+            path = 'workspaces/{0}/layergroups'.format(workspace) if workspace else 'layergroups'
+            url = self._rest_url(path)
+            r = await self._send_json('POST', url, body)
+
+            if r.status != 201:
+                raise self._failed_request_error('POST', url, r)
+
+            layer_group_dict = await self._create_result_async(
+                return_result, lambda: self._get_layer_group_object(name, workspace), r, 'layerGroup', name, workspace
+            )
+            response_dict = {'success': True,
+                             'result': layer_group_dict}
+
+        except (geoserver.catalog.ConflictingDataError, geoserver.catalog.FailedRequestError) as e:
+            response_dict = {'success': False,
+                             'error': str(e)}
+
+        self._handle_debug(response_dict, debug)
+        return response_dict
+
+    async def create_workspace(self, workspace_id, uri, return_result='full', debug=False):
+        """
+        Create a new workspace. See GeoServerSpatialDatasetEngine.create_workspace.
+        """
+        self._check_return_result(return_result)
+
+        # Creating the namespace creates the workspace as well
+        body = {'namespace': {'prefix': workspace_id, 'uri': uri}}
+        r = await self._send_json('POST', self._rest_url('namespaces'), body)
+
+        if r.status != 201:
+            response_dict = {'success': False,
+                             'error': self._response_error(r)}
+        else:
+            workspace_dict = self._create_result(return_result, lambda: self._workspace_object(workspace_id), r,
+                                                 'workspace', workspace_id, workspace_id)
+            response_dict = {'success': True,
+                             'result': workspace_dict}
+
+        self._handle_debug(response_dict, debug)
+        return response_dict
+
+    async def create_style(self, style_id, sld, overwrite=False, return_result='full', debug=False):
+        """
+        Create a new SLD style object. See GeoServerSpatialDatasetEngine.create_style.
+        """
+        self._check_return_result(return_result)
+
+        workspace, name = self._process_identifier(style_id)
+        path = 'workspaces/{0}/styles'.format(workspace) if workspace else 'styles'
+
+        try:
+            style = await self._get_style_object(name, workspace)
+
+            if style is not None and not overwrite:
+                raise geoserver.catalog.ConflictingDataError('There is already a style named {0}'.format(name))
+
+            # Register the style, then upload its body
+            if style is None:
+                url = self._rest_url(path)
+                body = {'style': {'name': name, 'filename': name + '.sld'}}
+                r = await self._send_json('POST', url, body)
+
+                if r.status != 201:
+                    raise self._failed_request_error('POST', url, r)
+
+            url = self._assemble_url(path, name + '.sld')
+            r = await self._request('PUT', url, data=sld, headers={'Content-Type': 'application/vnd.ogc.sld+xml'})
+
+            if not 200 <= r.status < 300:
+                raise self._failed_request_error('PUT', url, r)
+
+            style_dict = await self._create_result_async(return_result, lambda: self._get_style_object(name, workspace),
+                                                         r, 'style', name, workspace)
+            response_dict = {'success': True,
+                             'result': style_dict}
+
+        except (geoserver.catalog.ConflictingDataError, geoserver.catalog.FailedRequestError) as e:
+            response_dict = {'success': False,
+                             'error': str(e)}
+
+        self._handle_debug(response_dict, debug)
+        return response_dict
+
+    async def _run_sync(self, method, *args, **kwargs):
+        """
+        Run a method of the synchronous engine in the default executor of the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(method, *args, **kwargs))
+
+    async def _qualify_identifier(self, identifier):
+        """
+        Prefix an identifier without a workspace with the default workspace, so the synchronous engine does not look it up.  # noqa: E501
+        """
+        workspace, name = self._process_identifier(identifier)
+        return '{0}:{1}'.format(workspace or await self._get_default_workspace_name(), name)
+
+    async def link_sqlalchemy_db_to_geoserver(self, store_id, sqlalchemy_engine, docker=False, debug=False,
+                                              docker_ip_address='172.17.0.1'):
+        """
+        Link a PostGIS database to GeoServer using an SQLAlchemy engine object. See GeoServerSpatialDatasetEngine.link_sqlalchemy_db_to_geoserver.  # noqa: E501
+        """
+        connection_dict = sqlalchemy_engine.url.translate_connect_args()
+        return await self.create_postgis_feature_resource(
+            store_id=store_id,
+            host=docker_ip_address if docker else connection_dict['host'],
+            port=connection_dict['port'],
+            database=connection_dict['database'],
+            user=connection_dict['username'],
+            password=connection_dict['password'],
+            debug=debug
+        )
+
+    async def create_sql_view(self, feature_type_name, postgis_store_id, sql, geometry_column, geometry_type,
+                              geometry_srid=4326, default_style_id=None, key_column=None, parameters=None,
+                              return_result='full', debug=False):
+        """
+        Create a new feature type configured as an SQL view. Runs in the default executor. See GeoServerSpatialDatasetEngine.create_sql_view.  # noqa: E501
+        """
+        return await self._run_sync(
+            super(AsyncGeoServerSpatialDatasetEngine, self).create_sql_view, feature_type_name, postgis_store_id, sql,
+            geometry_column, geometry_type, geometry_srid=geometry_srid, default_style_id=default_style_id,
+            key_column=key_column, parameters=parameters, return_result=return_result, debug=debug
+        )
+
+    async def create_shapefile_resource(self, store_id, shapefile_base=None, shapefile_zip=None, shapefile_upload=None,
+                                        overwrite=False, charset=None, return_result='full', debug=False):
+        """
+        Add a shapefile resource to GeoServer. Runs in the default executor. See GeoServerSpatialDatasetEngine.create_shapefile_resource.  # noqa: E501
+        """
+        store_id = await self._qualify_identifier(store_id)
+        return await self._run_sync(
+            super(AsyncGeoServerSpatialDatasetEngine, self).create_shapefile_resource, store_id,
+            shapefile_base=shapefile_base, shapefile_zip=shapefile_zip, shapefile_upload=shapefile_upload,
+            overwrite=overwrite, charset=charset, return_result=return_result, debug=debug
+        )
+
+    async def create_coverage_resource(self, store_id, coverage_type, coverage_file=None, coverage_upload=None,
+                                       coverage_name=None, overwrite=False, query_after_success=True, progress=None,
+                                       return_result='full', debug=False):
+        """
+        Add a coverage resource to GeoServer. Runs in the default executor, so progress is called from a worker thread. See GeoServerSpatialDatasetEngine.create_coverage_resource.  # noqa: E501
+        """
+        store_id = await self._qualify_identifier(store_id)
+        return await self._run_sync(
+            super(AsyncGeoServerSpatialDatasetEngine, self).create_coverage_resource, store_id, coverage_type,
+            coverage_file=coverage_file, coverage_upload=coverage_upload, coverage_name=coverage_name,
+            overwrite=overwrite, query_after_success=query_after_success, progress=progress,
+            return_result=return_result, debug=debug
+        )
+
+    async def add_granules_to_image_mosaic(self, store_id, granules, external=False, batch_size=100,
+                                           coverage_name=None, max_workers=None, debug=False):
+        """
+        Add granules to an ImageMosaic store. Runs in the default executor. See GeoServerSpatialDatasetEngine.add_granules_to_image_mosaic.  # noqa: E501
+        """
+        store_id = await self._qualify_identifier(store_id)
+        return await self._run_sync(
+            super(AsyncGeoServerSpatialDatasetEngine, self).add_granules_to_image_mosaic, store_id, granules,
+            external=external, batch_size=batch_size, coverage_name=coverage_name, max_workers=max_workers,
+            debug=debug
+        )
+
+    async def _update(self, gs_object, identifier, not_found, attributes_dict):
+        """
+        Apply changes to an object with a PUT of its REST document.
+        """
+        if gs_object is None:
+            raise geoserver.catalog.FailedRequestError(not_found.format(identifier))
+
+        url = self._rest_url(gs_object._path)
+        body = {gs_object.resource_type: self._get_rest_changes(attributes_dict, gs_object)}
+        r = await self._send_json('PUT', url, body)
+
+        if r.status != 200:
+            raise self._failed_request_error('PUT', url, r)
+
+    async def update_resource(self, resource_id, store=None, debug=False, **kwargs):
+        """
+        Update an existing resource. See GeoServerSpatialDatasetEngine.update_resource.
+        """
+        workspace, name = self._process_identifier(resource_id)
+
+        try:
+            workspace = workspace or await self._get_default_workspace_name()
+            resource = await self._get_resource_object(name, store, workspace)
+            await self._update(resource, resource_id, 'Resource "{0}" not found.', kwargs)
+
+            # Return the updated resource dictionary
+            resource = await self._get_resource_object(name, store, workspace)
+            response_dict = {'success': True,
+                             'result': self._transcribe_geoserver_object(resource)}
+
+        except geoserver.catalog.FailedRequestError as e:
+            response_dict = {'success': False,
+                             'error': str(e)}
+
+        self._handle_debug(response_dict, debug)
+        return response_dict
+
+    async def update_layer(self, layer_id, debug=False, **kwargs):
+        """
+        Update an existing layer. See GeoServerSpatialDatasetEngine.update_layer.
+        """
+        # Pop tile caching properties to handle separately
+        tile_caching = kwargs.pop('tile_caching', None)
+
+        try:
+            layer = await self._get_layer_object(layer_id)
+            await self._update(layer, layer_id, 'Layer "{0}" not found.', kwargs)
+
+            # Return the updated layer dictionary
+            layer_dict = self._transcribe_geoserver_object(await self._get_layer_object(layer_id))
+            response_dict = {'success': True,
+                             'result': layer_dict}
+
+            # Handle tile caching properties (the REST API of GeoWebCache serves them)
+            if tile_caching is not None:
+                gwc_url = '{0}layers/{1}.xml'.format(self.gwc_endpoint, layer_id)
+                xml = ConvertDictToXml({'GeoServerLayer': tile_caching})
+                r = await self._request('POST', gwc_url, data=ElementTree.tostring(xml),
+                                        headers={'Content-Type': 'text/xml'})
+
+                if r.status == 200:
+                    layer_dict['tile_caching'] = tile_caching
+                else:
+                    response_dict = {'success': False,
+                                     'error': r.text}
+
+        except geoserver.catalog.FailedRequestError as e:
+            response_dict = {'success': False,
+                             'error': str(e)}
+
+        self._handle_debug(response_dict, debug)
+        return response_dict
+
+    async def update_layer_group(self, layer_group_id, debug=False, **kwargs):
+        """
+        Update an existing layer group. See GeoServerSpatialDatasetEngine.update_layer_group.
+        """
+        workspace, name = self._process_identifier(layer_group_id)
+
+        try:
+            layer_group = await self._get_layer_group_object(name, workspace)
+            await self._update(layer_group, layer_group_id, 'Layer Group "{0}" not found.', kwargs)
+
+            # Return the updated layer group dictionary
+            layer_group = await self._get_layer_group_object(name, workspace)
+            response_dict = {'success': True,
+                             'result': self._transcribe_geoserver_object(layer_group)}
+
+        except geoserver.catalog.FailedRequestError as e:
+            response_dict = {'success': False,
+                             'error': str(e)}
+
+        self._handle_debug(response_dict, debug)
+        return response_dict
+
+    async def delete_resource(self, resource_id, store_id, purge=False, recurse=False, debug=False):
+        """
+        Delete a resource. See GeoServerSpatialDatasetEngine.delete_resource.
+        """
+        workspace, name = self._process_identifier(resource_id)
+
+        # Get default work space if none is given
+        if not workspace:
+            workspace = await self._get_default_workspace_name()
+
+        resource = await self._get_resource_object(name, store_id, workspace)
+        return await self._handle_delete(identifier=name, gs_object=resource, purge=purge, recurse=recurse,
+                                         debug=debug)
+
+    async def delete_layer(self, layer_id, store_id=None, purge=False, recurse=False, debug=False):
+        """
+        Delete a layer. See GeoServerSpatialDatasetEngine.delete_layer.
+        """
+        layer = await self._get_layer_object(layer_id, fields=())
+        return await self._handle_delete(identifier=layer_id, gs_object=layer, purge=purge, recurse=recurse,
+                                         debug=debug)
+
+    async def delete_layer_group(self, layer_group_id, purge=False, recurse=False, debug=False):
+        """
+        Delete a layer group. See GeoServerSpatialDatasetEngine.delete_layer_group.
+        """
+        workspace, name = self._process_identifier(layer_group_id)
+        layer_group = await self._get_layer_group_object(name, workspace)
+        return await self._handle_delete(identifier=layer_group_id, gs_object=layer_group, purge=purge,
+                                         recurse=recurse, debug=debug)
+
+    async def delete_workspace(self, workspace_id, purge=False, recurse=False, debug=False):
+        """
+        Delete a workspace. See GeoServerSpatialDatasetEngine.delete_workspace.
+        """
+        workspace = await self._get_workspace_object(workspace_id)
+        return await self._handle_delete(identifier=workspace_id, gs_object=workspace, purge=purge,
+                                         recurse=recurse, debug=debug)
+
+    async def delete_store(self, store_id, purge=False, recurse=False, debug=False):
+        """
+        Delete a store. See GeoServerSpatialDatasetEngine.delete_store.
+        """
+        workspace, name = self._process_identifier(store_id)
+
+        try:
+            store = await self._get_store_object(name, workspace or await self._get_default_workspace_name())
+            return await self._handle_delete(identifier=store_id, gs_object=store, purge=purge, recurse=recurse,
+                                             debug=debug)
+
+        except geoserver.catalog.FailedRequestError as e:
+            response_dict = {'success': False,
+                             'error': str(e)}
+            self._handle_debug(response_dict, debug)
+            return response_dict
+
+    async def delete_style(self, style_id, purge=False, recurse=False, debug=False):
+        """
+        Delete a style. See GeoServerSpatialDatasetEngine.delete_style.
+        """
+        workspace, name = self._process_identifier(style_id)
+
+        try:
+            style = await self._get_style_object(name, workspace)
+            return await self._handle_delete(identifier=style_id, gs_object=style, purge=purge, recurse=recurse,
+                                             debug=debug)
+
+        except geoserver.catalog.FailedRequestError as e:
+            response_dict = {'success': False,
+                             'error': str(e)}
+            self._handle_debug(response_dict, debug)
+            return response_dict
+
+    async def validate(self):
+        """
+        Validate the GeoServer spatial dataset engine. Will throw and error if not valid.
+        """
+        try:
+            # aiohttp.InvalidURL is a ValueError
+            r = await self._request('GET', self.endpoint)
+
+        except ValueError:
+            raise AssertionError('The URL "{0}" provided for the GeoServer spatial dataset service endpoint is '
+                                 'invalid.'.format(self.endpoint))
+
+        if r.status == 401:
+            raise AssertionError('The username and password of the GeoServer spatial dataset service engine are '
+                                 'not valid.')
+
+        if r.status != 200 or 'Geoserver Configuration API' not in r.text:
+            raise AssertionError('The URL "{0}" is not a valid GeoServer spatial dataset service '
+                                 'endpoint.'.format(self.endpoint))
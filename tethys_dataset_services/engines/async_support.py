@@ -0,0 +1,28 @@
+import asyncio
+
+try:
+    import aiohttp
+
+    # Errors that are retried and errors that show the request never reached the server
+    RETRY_ERRORS = (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+    UNSENT_ERRORS = (aiohttp.ClientConnectorError,)
+    REQUEST_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+except ImportError:
+    aiohttp = None
+    RETRY_ERRORS = (asyncio.TimeoutError,)
+    UNSENT_ERRORS = ()
+    REQUEST_ERRORS = (asyncio.TimeoutError,)
+
+
+class ApiResponse(object):
+    """
+    Status, headers and body of a completed API request.
+    """
+    __slots__ = ('status', 'headers', 'text', 'reason')
+
+    def __init__(self, status, headers, text, reason=None):
+        self.status = status
+        self.headers = headers
+        self.text = text
+        self.reason = reason
@@ -1,22 +1,53 @@
 import os
 import json
+import hashlib
 import pprint
 import warnings
 import logging
+import threading
+import weakref
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlparse
 
 import requests
-from requests_toolbelt import MultipartEncoder
+from requests.adapters import HTTPAdapter
+from requests_toolbelt import MultipartEncoder, MultipartEncoderMonitor
 
 from ..base import DatasetEngine
+from ..download_cache import DownloadCache
+from ..retry import RetryPolicy
 
 
 log = logging.getLogger('tethys_dataset_services.ckan_engine')
 
 
+class DatasetDownloadError(Exception):
+    """
+    Raised by CkanDatasetEngine.download_dataset when some of the resources of a dataset could not be downloaded.
+
+    Attributes:
+      downloaded (list): Path of the file downloaded for each resource, in resource order. None for the resources that failed.  # noqa: E501
+      failures (dict): Exception raised for each resource that failed, keyed by resource id.
+    """
+    def __init__(self, dataset_id, downloaded, failures):
+        self.downloaded = downloaded
+        self.failures = failures
+        message = 'Unable to download {0} of {1} resources of dataset "{2}": {3}'.format(
+            len(failures), len(downloaded), dataset_id,
+            ', '.join('{0} ({1})'.format(resource_id, e) for resource_id, e in failures.items())
+        )
+        super(DatasetDownloadError, self).__init__(message)
+
+
 class CkanDatasetEngine(DatasetEngine):
     """
     Definition for CKAN Dataset Engine objects.
     """
+    # API methods (actions) that can safely be repeated, identified by suffix
+    IDEMPOTENT_ACTION_SUFFIXES = ('_show', '_list', '_search', '_autocomplete', '_patch', '_update', '_delete',
+                                  '_check_multipart', '_upload_multipart')
 
     @property
     def type(self):
@@ -25,6 +56,120 @@ class CkanDatasetEngine(DatasetEngine):
         """
         return 'CKAN'
 
+    @property
+    def retry_policy(self):
+        """
+        The RetryPolicy applied to the requests of the engine. Its counters report the retries made.
+        """
+        return self._retry_policy
+
+    @property
+    def session(self):
+        """
+        The requests.Session used by the calling thread. Each thread gets its own session, but all sessions of an engine
+        share a single pooled adapter, so connections are reused across threads and the per-host limit is honored.
+        The engine only keeps weak references to the sessions, so the session of a finished worker thread is released.
+        """
+        session = getattr(self._local, 'session', None)
+
+        if session is None:
+            session = requests.Session()
+            adapter = self._get_adapter()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+
+            if not self._keep_alive:
+                session.headers['Connection'] = 'close'
+
+            with self._lock:
+                self._sessions.add(session)
+
+            self._local.session = session
+
+        return session
+
+    def __init__(self, endpoint, apikey=None, username=None, password=None, pool_connections=10, pool_maxsize=10,
+                 pool_block=False, keep_alive=True, timeout=None, download_chunk_size=1048576,
+                 download_cache=None, retry_policy=None):
+        """
+        Default constructor for CKAN Dataset Engines.
+
+        Args:
+          endpoint (string): URL of the dataset service API endpoint (e.g.: www.host.com/api/3/action)
+          apikey (string, optional): API key that will be used to authenticate with the dataset service.
+          username (string, optional): Username that will be used to authenticate with the dataset service.
+          password (string, optional): Password that will be used to authenticate with the dataset service.
+          pool_connections (int, optional): Number of per-host connection pools to keep. Defaults to 10.
+          pool_maxsize (int, optional): Maximum number of connections kept open to a single host. Defaults to 10.
+          pool_block (bool, optional): Block when all connections to a host are in use instead of opening extra connections. Set to True to strictly enforce pool_maxsize. Defaults to False.  # noqa: E501
+          keep_alive (bool, optional): Keep connections open between requests. Defaults to True.
+          timeout (float or tuple, optional): Timeout in seconds passed to every request (see requests docs). Defaults to None (no timeout).  # noqa: E501
+          download_chunk_size (int, optional): Size in bytes of the chunks read when downloading resources. Defaults to 1 MB.
+          download_cache (DownloadCache or string, optional): Cache of downloaded resources, or path to its directory. Cached resources are revalidated with the server and linked or copied into place instead of downloaded again. Defaults to None (no cache).  # noqa: E501
+          retry_policy (RetryPolicy, optional): Policy used to retry failed requests. Defaults to RetryPolicy(). Use RetryPolicy(max_attempts=1) to disable retries.  # noqa: E501
+        """
+        super(CkanDatasetEngine, self).__init__(
+            endpoint=endpoint,
+            apikey=apikey,
+            username=username,
+            password=password
+        )
+
+        self._pool_connections = pool_connections
+        self._pool_maxsize = pool_maxsize
+        self._pool_block = pool_block
+        self._keep_alive = keep_alive
+        self._timeout = timeout
+        self._download_chunk_size = download_chunk_size
+
+        if isinstance(download_cache, str):
+            download_cache = DownloadCache(download_cache)
+        self._download_cache = download_cache
+
+        self._retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+
+        # API methods (e.g.: package_patch) that the server reported it does not provide
+        self._unsupported_methods = set()
+
+        self._adapter = None
+        self._sessions = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _get_adapter(self):
+        """
+        Get the pooled adapter shared by all sessions of this engine, creating it if necessary.
+        """
+        with self._lock:
+            if self._adapter is None:
+                self._adapter = HTTPAdapter(pool_connections=self._pool_connections,
+                                            pool_maxsize=self._pool_maxsize,
+                                            pool_block=self._pool_block)
+            return self._adapter
+
+    def close(self):
+        """
+        Close all pooled connections held by the engine. The engine can still be used afterwards; new connections will be opened as needed.  # noqa: E501
+        """
+        with self._lock:
+            sessions = list(self._sessions)
+            self._sessions = weakref.WeakSet()
+            adapter = self._adapter
+            self._adapter = None
+            self._local = threading.local()
+
+        for session in sessions:
+            session.close()
+
+        if adapter is not None:
+            adapter.close()
+
     def _prepare_request(self, method, data_dict=None, file=None, apikey=None):
         """
         Preprocess the parameters for CKAN API call. This is derived from CKAN's API client which can be found here:
@@ -59,8 +204,7 @@ class CkanDatasetEngine(DatasetEngine):
         url = '/'.join((self.endpoint.rstrip('/'), method))
         return url, data_dict, headers
 
-    @staticmethod
-    def _execute_request(url, data, headers, file=None):
+    def _execute_request(self, url, data, headers, file=None, progress=None):
         """
         Execute the request using the requests module. See: https://github.com/ckan/ckanapi/tree/master/ckanapi/common.py  # noqa: E501
 
@@ -69,21 +213,43 @@ class CkanDatasetEngine(DatasetEngine):
           data (dict): Key value parameters to send with request, usually the 'data_dict' returned by '_prepare_request'.  # noqa: E501
           headers (dict): Key value parameters to include in the headers, usually the 'headers' returned by '_prepare_request'.  # noqa: E501
           file (dict): Dictionary containing file to upload. See: http://docs.python-requests.org/en/latest/user/quickstart/#post-a-multipart-encoded-file  # noqa: E501
+          progress (callable, optional): Function called as progress(bytes_sent, total) while a file is uploaded.
 
         Returns:
           tuple: status_code, response
         """
+        idempotent = url.endswith(self.IDEMPOTENT_ACTION_SUFFIXES)
+
         if file:
-            # data = dict((k.encode('utf-8'), v.encode('utf-8')) for (k, v) in data.items())
             data.update(file)
-            # data = {str(k): v for k, v in data.items()}
-            m = MultipartEncoder(fields=data)
-            headers['Content-Type'] = m.content_type
-            r = requests.post(url, data=m, headers=headers)
+
+            def post_multipart():
+                # Stream the multipart body from disk instead of building it in memory
+                m = MultipartEncoder(fields=data)
+
+                if progress is not None:
+                    m = MultipartEncoderMonitor(m, lambda monitor: progress(monitor.bytes_read, monitor.len))
+
+                headers['Content-Type'] = m.content_type
+                return self.session.post(url, data=m, headers=headers, timeout=self._timeout)
+
+            r = self._retry_policy.call(post_multipart, idempotent=idempotent,
+                                        on_retry=lambda: self._rewind_files(file))
         else:
-            r = requests.post(url, data=data, headers=headers, files=file)
+            r = self._retry_policy.call(self.session.post, url, data=data, headers=headers, timeout=self._timeout,
+                                        idempotent=idempotent)
         return r.status_code, r.text
 
+    @staticmethod
+    def _rewind_files(file):
+        """
+        Rewind the file objects of an upload so it can be sent again.
+        """
+        for value in file.values():
+            file_object = value[1] if isinstance(value, tuple) else value
+            if hasattr(file_object, 'seek'):
+                file_object.seek(0)
+
     @staticmethod
     def _parse_response(status, response, console=False):
         """
@@ -114,13 +280,82 @@ class CkanDatasetEngine(DatasetEngine):
             log.exception('Status Code {0}: {1}'.format(status, response.encode('utf-8')))
             return None
 
-    def execute_api_method(self, method, console=False, file=None, apikey=None, **kwargs):
+    @staticmethod
+    def _is_unknown_action(status, response):
+        """
+        Check if a response reports that the API method (action) called does not exist on the server.
+        """
+        return status in (400, 404) and 'Action name not known' in (response or '')
+
+    def _execute_optional_method(self, method, console=False, file=None, progress=None, **kwargs):
+        """
+        Execute an API method that older servers may not provide (e.g.: package_patch). Methods the server reports as unknown are remembered and not requested again.  # noqa: E501
+
+        Returns:
+          dict: The response dictionary, or None if the server does not provide the method.
+        """
+        if method in self._unsupported_methods:
+            return None
+
+        url, data, headers = self._prepare_request(method=method, file=file, data_dict=dict(kwargs))
+        status, response = self._execute_request(url=url, data=data, headers=headers, file=file, progress=progress)
+
+        if self._is_unknown_action(status, response):
+            log.info('The {0} method is not available on "{1}".'.format(method, self.endpoint))
+            self._unsupported_methods.add(method)
+            return None
+
+        return self._parse_response(status, response, console)
+
+    def execute_api_method(self, method, console=False, file=None, apikey=None, progress=None, **kwargs):
         # Execute
         url, data, headers = self._prepare_request(method=method, file=file, apikey=apikey, data_dict=kwargs)
-        status, response = self._execute_request(url=url, data=data, headers=headers, file=file)
+        status, response = self._execute_request(url=url, data=data, headers=headers, file=file, progress=progress)
 
         return self._parse_response(status, response, console)
 
+    def execute_batch(self, calls, max_workers=None, console=False):
+        """
+        Execute many CKAN API methods concurrently.
+
+        The calls are run on a pool of threads that share the connection pool of the engine. Set pool_maxsize on the engine to at least max_workers to keep every worker on a pooled connection.  # noqa: E501
+
+        Args:
+          calls (iterable): (method, kwargs) pairs. The method can be the name of a CKAN API method (e.g.: 'package_show') or a method of this engine (e.g.: engine.get_dataset).  # noqa: E501
+          max_workers (int, optional): Maximum number of calls in flight at once. Defaults to the pool_maxsize of the engine.  # noqa: E501
+          console (bool, optional): Pretty print the results to the console for debugging. Defaults to False.
+
+        Returns:
+          list: The response dictionaries in the same order as calls. A call that raises is reported as a response dictionary with "success" False and the exception message as its error message (as in CKAN error responses: {"message": ...}).  # noqa: E501
+
+        Examples:
+
+          calls = [('package_show', {'id': dataset_id}) for dataset_id in dataset_ids]
+
+          results = engine.execute_batch(calls, max_workers=16)
+        """
+        def execute(call):
+            method, kwargs = call
+
+            try:
+                if callable(method):
+                    return method(console=console, **kwargs)
+
+                return self.execute_api_method(method=method, console=console, **kwargs)
+
+            except Exception as e:
+                log.exception('Exception encountered while executing batch call "{0}".'.format(method))
+                return {'success': False,
+                        'error': {'message': str(e)}}
+
+        calls = list(calls)
+
+        if not calls:
+            return []
+
+        with ThreadPoolExecutor(max_workers=max_workers or self._pool_maxsize) as executor:
+            return list(executor.map(execute, calls))
+
     def _get_query_params(self, query_dict):
         """
         Assembles query string from python dictionary
@@ -167,6 +402,78 @@ class CkanDatasetEngine(DatasetEngine):
         method = 'package_search'
         return self.execute_api_method(method=method, console=console, **data)
 
+    def iter_search_datasets(self, query=None, filtered_query=None, page_size=100, prefetch=True, **kwargs):
+        """
+        Iterate over all CKAN datasets that match a query, one dataset at a time.
+
+        Pages of results are requested from the CKAN package_search API method as the iterator is consumed. When prefetch is enabled, the next page is fetched in the background while the current page is consumed, so no more than two pages are held in memory at once. No more pages are fetched once the consumer stops iterating.  # noqa: E501
+
+        Args:
+          query (dict, optional if filtered_query set): Key value pairs representing field and values to search for.
+          filtered_query (dict, optional if filtered_query set): Key value pairs representing field and values to search for.  # noqa: E501
+          page_size (int, optional): Number of datasets to request per page. Defaults to 100.
+          prefetch (bool, optional): Fetch the next page in the background. Defaults to True.
+          **kwargs: Any number of optional keyword arguments for the package_search method (see CKAN docs). Use "start" to skip a number of datasets.  # noqa: E501
+
+        Yields:
+          dict: Dataset dictionaries.
+
+        Examples:
+
+          for dataset in engine.iter_search_datasets(query={'tags': 'hydrology'}, page_size=500):
+              print(dataset['name'])
+        """
+        if not query and not filtered_query:
+            raise Exception("Need query or filtered_query to proceed ...")
+
+        start = kwargs.pop('start', 0)
+        kwargs['rows'] = page_size
+
+        def fetch_page(page_start):
+            result = self.search_datasets(query=query, filtered_query=filtered_query, start=page_start, **kwargs)
+
+            if not result or not result.get('success'):
+                raise Exception(str(result))
+
+            return result['result']
+
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        next_page = None
+
+        try:
+            page = fetch_page(start)
+
+            while True:
+                datasets = page['results']
+                start += len(datasets)
+                has_more = len(datasets) > 0 and start < page.get('count', 0)
+
+                # Request the next page before handing out the current one
+                if has_more and executor:
+                    next_page = executor.submit(fetch_page, start)
+
+                # Drop the reference to the page so it can be freed once consumed
+                page = None
+
+                for dataset in datasets:
+                    yield dataset
+
+                if not has_more:
+                    break
+
+                if next_page is not None:
+                    page = next_page.result()
+                    next_page = None
+                else:
+                    page = fetch_page(start)
+
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
+            if executor:
+                executor.shutdown(wait=False)
+
     def search_resources(self, query, console=False, **kwargs):
         """
         Search CKAN resources that match a query.
@@ -287,7 +594,8 @@ class CkanDatasetEngine(DatasetEngine):
         method = 'package_create'
         return self.execute_api_method(method=method, console=console, **data)
 
-    def create_resource(self, dataset_id, url=None, file=None, console=False, **kwargs):
+    def create_resource(self, dataset_id, url=None, file=None, console=False, progress=None, part_size=None,
+                        dedupe=False, **kwargs):
         """
         Create a new CKAN resource.
 
@@ -299,20 +607,75 @@ class CkanDatasetEngine(DatasetEngine):
           url (string, optional): URL for the resource that will be added to the dataset.
           file (string, optional): Absolute path to a file to upload for the resource.
           console (bool, optional): Pretty print the result to the console for debugging. Defaults to False.
+          progress (callable, optional): Function called as progress(bytes_sent, total) while the file is uploaded.
+          part_size (int, optional): Upload the file in parts of this size in bytes with upload_resource_chunked (requires the ckanext-cloudstorage extension). Defaults to None (single request).  # noqa: E501
+          dedupe (bool, optional): Skip the upload and return the existing resource if the dataset already has a resource with the same hash and size as the file. The hash and size of uploaded files are recorded on the new resource. Defaults to False.  # noqa: E501
           **kwargs: Any number of optional keyword arguments for the method (see CKAN docs).
 
         Returns:
           The response dictionary or None if an error occurs.
         """
+        # Assemble the data dictionary
+        method = 'resource_create'
+        data = self._prepare_resource_data(dataset_id, url, file, kwargs)
+
+        # Skip files that were uploaded already
+        if file and dedupe:
+            if not os.path.isfile(file):
+                raise IOError('The file "{0}" does not exist.'.format(file))
+
+            existing_resource, file_hash, size = self._find_duplicate_resource(dataset_id, file)
+
+            if existing_resource is not None:
+                log.info('Skipping the upload of "{0}": identical to resource "{1}".'.format(
+                    file, existing_resource.get('id')))
+                return {'success': True, 'result': existing_resource}
+
+            data.setdefault('hash', file_hash)
+            data.setdefault('size', str(size))
+
+        # Prepare file
+        if file and part_size:
+            if not os.path.isfile(file):
+                raise IOError('The file "{0}" does not exist.'.format(file))
+
+            # Create the resource first, then upload its file in parts
+            data['url'] = os.path.basename(file)
+            data.setdefault('url_type', 'upload')
+            response = self.execute_api_method(method=method, console=console, **data)
+
+            if response and response['success']:
+                resource_id = response['result']['id']
+                upload_response = self.upload_resource_chunked(resource_id, file, part_size=part_size,
+                                                               progress=progress, console=console)
+                if not upload_response or not upload_response['success']:
+                    return upload_response
+
+                response = self.get_resource(resource_id, console=console)
+        elif file:
+            if not os.path.isfile(file):
+                raise IOError('The file "{0}" does not exist.'.format(file))
+            else:
+                with open(file, 'rb') as upload_file:
+                    file = {'upload': (self._get_upload_file_name(file, data), upload_file)}
+                    response = self.execute_api_method(method=method, console=console, file=file, progress=progress,
+                                                       **data)
+        else:
+            response = self.execute_api_method(method=method, console=console, file=file, **data)
+
+        return response
+
+    @staticmethod
+    def _prepare_resource_data(dataset_id, url, file, data):
+        """
+        Validate the url and file parameters of a new resource and assemble the data dictionary of resource_create.
+        """
         # Validate file and url parameters (mutually exclusive)
         if url and file:
             raise IOError('The url and file parameters are mutually exclusive: use one, not both.')
         elif not url and not file:
             raise IOError('The url or file parameter is required, but do not use both.')
 
-        # Assemble the data dictionary
-        method = 'resource_create'
-        data = kwargs
         data['package_id'] = dataset_id
 
         if url:
@@ -324,29 +687,155 @@ class CkanDatasetEngine(DatasetEngine):
         if 'name' not in data and file:
             data['name'] = os.path.basename(file)
 
-        # Prepare file
-        if file:
-            if not os.path.isfile(file):
-                raise IOError('The file "{0}" does not exist.'.format(file))
+        return data
+
+    @staticmethod
+    def _get_upload_file_name(file, data):
+        """
+        Get the name a file is uploaded with: the name of the resource with the extension of the file.
+        """
+        filename, extension = os.path.splitext(file)
+        upload_file_name = data['name']
+        if not upload_file_name.endswith(extension):
+            upload_file_name += extension
+        return upload_file_name
+
+    def _find_duplicate_resource(self, dataset_id, file):
+        """
+        Find a resource of a dataset with the same hash and size as a file. Resources of a different size are discarded before the file is hashed.  # noqa: E501
+
+        Returns:
+          tuple: the duplicate resource (None if there is none), the sha256 digest of the file and the size of the file.
+        """
+        size = os.path.getsize(file)
+        result = self.get_dataset(dataset_id)
+        return self._match_duplicate_resource(result, file, size)
+
+    def _match_duplicate_resource(self, result, file, size):
+        """
+        Find the resource of a package_show result with the same hash and size as a file. See _find_duplicate_resource.
+        """
+        resources = (result['result'].get('resources') or []) if result and result['success'] else []
+
+        candidates = []
+        for resource in resources:
+            try:
+                if resource.get('size') not in (None, '') and int(resource['size']) != size:
+                    continue
+            except (TypeError, ValueError):
+                continue
+
+            hasher, digest = self._get_resource_hasher(resource)
+            if hasher is not None:
+                candidates.append((resource, hasher.name, digest))
+
+        digests = self._hash_file(file, {name for _, name, _ in candidates} | {'sha256'})
+
+        for resource, algorithm, digest in candidates:
+            if digests[algorithm] == digest:
+                return resource, digests['sha256'], size
+
+        return None, digests['sha256'], size
+
+    @staticmethod
+    def _hash_file(path, algorithms, buffer_size=1048576):
+        """
+        Hash a file with several algorithms in a single pass, reading it into one reusable buffer.
+
+        Returns:
+          dict: hex digest of the file for each algorithm.
+        """
+        hashers = {algorithm: hashlib.new(algorithm) for algorithm in algorithms}
+        buffer = bytearray(buffer_size)
+        view = memoryview(buffer)
+
+        with open(path, 'rb', buffering=0) as f:
+            for read in iter(lambda: f.readinto(buffer), 0):
+                for hasher in hashers.values():
+                    hasher.update(view[:read])
+
+        return {algorithm: hasher.hexdigest() for algorithm, hasher in hashers.items()}
+
+    def upload_resource_chunked(self, resource_id, file, part_size=16777216, progress=None, console=False):
+        """
+        Upload the file of an existing resource in parts.
+
+        Uses the multipart API methods of the ckanext-cloudstorage extension. Failed parts are retried according to the
+        retry_policy of the engine. An interrupted upload of the same file to the resource is resumed from the parts
+        that the server already accepted.
+
+        Args:
+          resource_id (string): The id of the resource.
+          file (string): Absolute path to the file to upload.
+          part_size (int, optional): Size of the parts in bytes. Defaults to 16 MB.
+          progress (callable, optional): Function called as progress(bytes_sent, total) after each part is accepted.
+          console (bool, optional): Pretty print the result to the console for debugging. Defaults to False.
+
+        Returns:
+          The response dictionary of the cloudstorage_finish_multipart method, or of the method that failed.
+        """
+        if not os.path.isfile(file):
+            raise IOError('The file "{0}" does not exist.'.format(file))
+
+        name = os.path.basename(file)
+        size = os.path.getsize(file)
+        part_count = max(1, -(-size // part_size))
+
+        # Resume the upload in progress for the resource, if it is the upload of this file
+        upload_id = None
+        first_part = 1
+        result = self.execute_api_method(method='cloudstorage_check_multipart', id=resource_id)
+
+        if result and result['success'] and result['result']:
+            upload = result['result']['upload']
+
+            if upload.get('name') in (None, name):
+                upload_id = upload['id']
+                first_part = upload.get('parts', 0) + 1
             else:
-                filename, extension = os.path.splitext(file)
-                upload_file_name = data['name']
-                if not upload_file_name.endswith(extension):
-                    upload_file_name += extension
-                with open(file, 'rb') as upload_file:
-                    file = {'upload': (upload_file_name, upload_file)}
-                    response = self.execute_api_method(method=method, console=console, file=file, **data)
-        else:
-            response = self.execute_api_method(method=method, console=console, file=file, **data)
+                self.execute_api_method(method='cloudstorage_abort_multipart', id=resource_id)
 
-        return response
+        if upload_id is None:
+            result = self.execute_api_method(method='cloudstorage_initiate_multipart', console=console,
+                                             id=resource_id, name=name, size=size)
+            if not result or not result['success']:
+                return result
+
+            upload_id = result['result']['id']
+
+        with open(file, 'rb') as f:
+            f.seek((first_part - 1) * part_size)
+
+            for part_number in range(first_part, part_count + 1):
+                result = self._upload_part(upload_id, part_number, name, f.read(part_size), console)
+                if not result or not result['success']:
+                    return result
+
+                if progress is not None:
+                    progress(min(part_number * part_size, size), size)
+
+        return self.execute_api_method(method='cloudstorage_finish_multipart', console=console, id=resource_id,
+                                       uploadId=upload_id)
+
+    def _upload_part(self, upload_id, part_number, name, content, console=False):
+        """
+        Upload one part of a multipart upload. Errors that remain after the retries are returned as a failed response.
+        """
+        try:
+            return self.execute_api_method(method='cloudstorage_upload_multipart', console=console,
+                                           file={'upload': (name, BytesIO(content))}, uploadId=upload_id,
+                                           partNumber=str(part_number))
+        except requests.RequestException as e:
+            log.error('Unable to upload part {0} of "{1}": {2}'.format(part_number, name, e))
+            return {'success': False, 'error': {'message': str(e)}}
 
     def update_dataset(self, dataset_id, console=False, **kwargs):
         """
         Update CKAN dataset
 
-        Wrapper for the CKAN package_update API method. See the CKAN API docs for this method to see applicable options
-        (http://docs.ckan.org/en/ckan-2.2/api.html).
+        Wrapper for the CKAN package_patch API method, which only sends the fields given. Falls back to the
+        package_update API method on servers that do not provide package_patch (CKAN < 2.3). See the CKAN API docs for
+        these methods to see applicable options (http://docs.ckan.org/en/latest/api/).
 
         Args:
           dataset_id (string): The id or name of the dataset to update.
@@ -360,6 +849,12 @@ class CkanDatasetEngine(DatasetEngine):
         data = kwargs
         data['id'] = dataset_id
 
+        # Patch only the given fields in a single request if the server supports it
+        result = self._execute_optional_method(method='package_patch', console=console, **data)
+
+        if result is not None or 'package_patch' not in self._unsupported_methods:
+            return result
+
         # Preserve the resources and tags if not included in parameters
         """
         Note: The default behavior of 'package_update' is to replace the resources and tags attributes with empty
@@ -385,18 +880,22 @@ class CkanDatasetEngine(DatasetEngine):
         method = 'package_update'
         return self.execute_api_method(method=method, console=console, **data)
 
-    def update_resource(self, resource_id, url=None, file=None, console=False, **kwargs):
+    def update_resource(self, resource_id, url=None, file=None, console=False, known_resource=None, progress=None,
+                        **kwargs):
         """
         Update CKAN resource
 
-        Wrapper for the CKAN resource_update API method. See the CKAN API docs for this method to see applicable options
-        (http://docs.ckan.org/en/ckan-2.2/api.html).
+        Wrapper for the CKAN resource_patch API method, which only sends the fields given. Falls back to the
+        resource_update API method on servers that do not provide resource_patch (CKAN < 2.3). See the CKAN API docs
+        for these methods to see applicable options (http://docs.ckan.org/en/latest/api/).
 
         Args:
           resource_id (string): The id of the resource that will be updated.
           url (string, optional): URL of the resource that will be added to the dataset.
           file (string, optional): Absolute path to a file to upload for the resource.
           console (bool, optional): Pretty print the result to the console for debugging. Defaults to False.
+          known_resource (dict, optional): Current resource dictionary. Avoids looking up the url of the resource when falling back to resource_update.  # noqa: E501
+          progress (callable, optional): Function called as progress(bytes_sent, total) while the file is uploaded.
           **kwargs: Any number of optional keyword arguments for the method (see CKAN docs).
 
         Returns:
@@ -424,18 +923,30 @@ class CkanDatasetEngine(DatasetEngine):
                 raise IOError('The file "{0}" does not exist.'.format(file))
             else:
                 update_file = open(file, 'rb')
-                file = {'upload': update_file}
-
-        # if not url and not file:
-        if 'url' not in data:
-            result = self.get_resource(resource_id)
-            if result['success']:
-                resource = result['result']
-                data['url'] = resource['url']
-
-        # Execute
-        method = 'resource_update'
-        response = self.execute_api_method(method=method, console=console, file=file, **data)
+                file = {'upload': (os.path.basename(file), update_file)}
+
+        # Patch only the given fields in a single request if the server supports it
+        response = self._execute_optional_method(method='resource_patch', console=console, file=file,
+                                                 progress=progress, **data)
+
+        if response is None and 'resource_patch' in self._unsupported_methods:
+            # resource_update replaces the url if it is not given
+            if 'url' not in data:
+                if known_resource is not None:
+                    data['url'] = known_resource['url']
+                else:
+                    result = self.get_resource(resource_id)
+                    if result['success']:
+                        resource = result['result']
+                        data['url'] = resource['url']
+
+            if update_file:
+                update_file.seek(0)
+
+            # Execute
+            method = 'resource_update'
+            response = self.execute_api_method(method=method, console=console, file=file, progress=progress,
+                                               **data)
 
         # Clean up
         if update_file and not update_file.closed:
@@ -489,7 +1000,8 @@ class CkanDatasetEngine(DatasetEngine):
         method = 'resource_delete'
         return self.execute_api_method(method=method, console=console, **data)
 
-    def download_dataset(self, dataset_id, location=None, console=False, **kwargs):
+    def download_dataset(self, dataset_id, location=None, console=False, max_workers=None, max_per_host=None,
+                         resume=True, verify_hash=False, **kwargs):
         """
         Downloads all resources in a dataset
 
@@ -499,21 +1011,53 @@ class CkanDatasetEngine(DatasetEngine):
             dataset_id (string): The id of the dataset to download.
             location (string, optional): Path to the location for the resource to be downloaded. Default is a subdirectory in the current directory named after the dataset.  # noqa: E501
             console (bool, optional): Pretty print the result to the console for debugging. Defaults to False.
+            max_workers (int, optional): Maximum number of resources downloaded at the same time. Defaults to the pool_maxsize of the engine.  # noqa: E501
+            max_per_host (int, optional): Maximum number of resources downloaded at the same time from a single host. Defaults to the pool_maxsize of the engine.  # noqa: E501
+            resume (bool, optional): Resume interrupted downloads from their ".part" files. Defaults to True.
+            verify_hash (bool, optional): Verify the downloaded files against the "hash" field of the resources. Defaults to False.  # noqa: E501
             **kwargs: Any number of optional keyword arguments to pass to the get_dataset method (see CKAN docs).
 
         Returns:
-            A list of the files that were downloaded.
+            A list of the files that were downloaded. Each file is named "<name>.<format>" after its resource, or "<name>-<id>.<format>" if other resources of the dataset have the same name and format.  # noqa: E501
+
+        Raises:
+            DatasetDownloadError: if any of the resources could not be downloaded. Raised after all resources were attempted.  # noqa: E501
         """
         result = self.get_dataset(dataset_id, console=console, **kwargs)
         if result['success']:
             dataset = result['result']
 
             location = location or dataset['name']
+            resources = dataset['resources']
+
+            if not resources:
+                return []
+
+            # Limit the concurrent downloads from each host
+            host_slots = {}
+            for resource in resources:
+                host = urlparse(resource['url']).netloc
+                if host not in host_slots:
+                    host_slots[host] = threading.BoundedSemaphore(max_per_host or self._pool_maxsize)
 
-            downloaded_resources = []
-            for resource in dataset['resources']:
-                downloaded_resource = self._download_resource(resource, location)
-                downloaded_resources.append(downloaded_resource)
+            failures = {}
+
+            def download(resource, local_file_name):
+                with host_slots[urlparse(resource['url']).netloc]:
+                    try:
+                        return self._download_resource(resource, location, local_file_name, resume=resume,
+                                                       verify_hash=verify_hash)
+                    except Exception as e:
+                        failures[resource.get('id')] = e
+                        return None
+
+            max_workers = min(max_workers or self._pool_maxsize, len(resources))
+
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                downloaded_resources = list(executor.map(download, resources, self._get_local_file_names(resources)))
+
+            if failures:
+                raise DatasetDownloadError(dataset_id, downloaded_resources, failures)
 
             return downloaded_resources
         else:
@@ -547,7 +1091,8 @@ class CkanDatasetEngine(DatasetEngine):
             **kwargs
         )
 
-    def download_resource(self, resource_id, location=None, local_file_name=None, console=False, **kwargs):
+    def download_resource(self, resource_id, location=None, local_file_name=None, console=False, resume=True,
+                          verify_hash=False, **kwargs):
         """
         Download a resource from a resource id
 
@@ -558,6 +1103,8 @@ class CkanDatasetEngine(DatasetEngine):
             location (string, optional): Path to the location for the resource to be downloaded. Defaults to current directory.  # noqa: E501
             local_file_name (string, optional): Name for downloaded file.
             console (bool, optional): Pretty print the result to the console for debugging. Defaults to False.
+            resume (bool, optional): Resume an interrupted download from its ".part" file using an HTTP Range request. Defaults to True.  # noqa: E501
+            verify_hash (bool, optional): Verify the downloaded file against the "hash" field of the resource, if it has one. Defaults to False.  # noqa: E501
             **kwargs: Any number of optional keyword arguments to pass to the get_resource method (see CKAN docs).
 
         Returns:
@@ -566,20 +1113,40 @@ class CkanDatasetEngine(DatasetEngine):
         result = self.get_resource(resource_id, console=console, **kwargs)
         if result['success']:
             resource = result['result']
-            downloaded_resource = self._download_resource(resource, location, local_file_name)
+            downloaded_resource = self._download_resource(resource, location, local_file_name, resume=resume,
+                                                          verify_hash=verify_hash)
 
             return downloaded_resource
         else:
             raise Exception(str(result))  # TODO: raise an error stating that dataset doesn't exist
 
-    def _download_resource(self, resource, location=None, local_file_name=None):
+    def _download_resource(self, resource, location=None, local_file_name=None, resume=True, verify_hash=False):
         """
-        Download a resource from the resource meta-data dictionary
+        Download a resource from the resource meta-data dictionary. The resource is streamed into a ".part" file that is moved into place once complete, so an interrupted download can be resumed.  # noqa: E501
+        """
+        local_file = self._get_local_file(resource, location, local_file_name)
+
+        # download resource
+        try:
+            if self._download_cache is None:
+                self._fetch_resource(resource, local_file, resume=resume, verify_hash=verify_hash)
+            else:
+                self._fetch_cached_resource(resource, local_file, resume=resume, verify_hash=verify_hash)
+
+        except Exception:
+            log.exception('Unable to download resource "{0}" from "{1}".'.format(resource.get('id'), resource['url']))
+            raise
+
+        return local_file
+
+    @staticmethod
+    def _get_local_file(resource, location=None, local_file_name=None):
+        """
+        Get the path a resource is downloaded to, creating its directory if needed.
         """
         # create filename with extension
         if not local_file_name:
-            local_file_name = resource['name'] or resource['id']
-            local_file_name = '.'.join((local_file_name, resource['format']))
+            local_file_name = CkanDatasetEngine._get_local_file_name(resource)
 
         # ensure that the location exists
         if location:
@@ -590,33 +1157,242 @@ class CkanDatasetEngine(DatasetEngine):
         else:
             location = './'
 
-        local_file = os.path.join(location, local_file_name)
-        url = resource['url']
+        return os.path.join(location, local_file_name)
 
-        # download resource
-        try:
-            r = requests.get(url, stream=True)
-            with open(local_file, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=1024):
+    @staticmethod
+    def _get_local_file_name(resource, unique=False):
+        """
+        Get the default file name of a resource: "<name>.<format>", or "<name>-<id>.<format>" if unique is True.
+        """
+        local_file_name = resource['name'] or resource['id']
+
+        if unique and resource['name']:
+            local_file_name = '{0}-{1}'.format(local_file_name, resource['id'])
+
+        return '.'.join((local_file_name, resource['format']))
+
+    @staticmethod
+    def _get_local_file_names(resources):
+        """
+        Get the file names the resources of a dataset are downloaded to. Resources that share a name and format are told apart by their id, so concurrent downloads never write to the same file.  # noqa: E501
+        """
+        names = [CkanDatasetEngine._get_local_file_name(resource) for resource in resources]
+        counts = Counter(name.lower() for name in names)
+
+        return [name if counts[name.lower()] == 1 else CkanDatasetEngine._get_local_file_name(resource, unique=True)
+                for name, resource in zip(names, resources)]
+
+    def _fetch_cached_resource(self, resource, path, resume=True, verify_hash=False):
+        """
+        Place a resource at path using the download cache. Cached copies are revalidated with their ETag and Last-Modified validators. Cached copies without validators are used as is, because the cache key already changes with the id, last_modified and hash of the resource.  # noqa: E501
+
+        The entry is stored or updated and placed at path in one locked operation of the cache, so concurrent downloads can not evict it in between. An entry evicted before that is downloaded again.  # noqa: E501
+        """
+        cache = self._download_cache
+        key = cache.resource_key(resource)
+        headers = self._get_cache_headers(key)
+
+        if headers is None:
+            try:
+                cache.link(key, path)
+                return
+            except FileNotFoundError:
+                headers = {}
+
+        staging_file = cache.data_path(key) + '.download'
+        response = self._fetch_resource(resource, staging_file, resume=resume, verify_hash=verify_hash,
+                                        headers=headers)
+
+        # Refresh the validators and the last use of the cached copy
+        if response.status_code == 304:
+            if cache.update(key, link_to=path, **self._get_response_validators(response.headers)):
+                return
+
+            response = self._fetch_resource(resource, staging_file, resume=resume, verify_hash=verify_hash)
+
+        cache.put(key, staging_file, link_to=path, url=resource['url'], etag=response.headers.get('ETag'),
+                  last_modified=response.headers.get('Last-Modified'))
+
+    @staticmethod
+    def _get_response_validators(response_headers):
+        """
+        Get the ETag and Last-Modified validators sent with a response, leaving out the ones it did not send.
+        """
+        validators = {'etag': response_headers.get('ETag'), 'last_modified': response_headers.get('Last-Modified')}
+        return {name: value for name, value in validators.items() if value}
+
+    def _get_cache_headers(self, key):
+        """
+        Get the conditional headers that revalidate a cached resource.
+
+        Returns:
+          dict: The headers (empty if the resource is not cached), or None if the cached copy can be used without revalidation.  # noqa: E501
+        """
+        meta = self._download_cache.get(key)
+        headers = {}
+
+        if meta is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+            if not headers:
+                return None
+
+        return headers
+
+    def _fetch_resource(self, resource, path, resume=True, verify_hash=False, headers=None):
+        """
+        Stream a resource into path through a ".part" file, resuming an existing ".part" file with an HTTP Range request. The ETag or Last-Modified validator of the response that started the ".part" file is sent as If-Range, so the server sends the whole resource again (and the download restarts from zero) if the resource changed in between. A ".part" file without a validator is not resumed.  # noqa: E501
+
+        Returns:
+          requests.Response: The response. Nothing is downloaded if the server answered 304 Not Modified to conditional headers.  # noqa: E501
+        """
+        url = resource['url']
+        part_file = path + '.part'
+
+        hasher = None
+        expected_hash = None
+        if verify_hash:
+            hasher, expected_hash = self._get_resource_hasher(resource)
+
+        if_range, offset = self._get_part_resume(part_file) if resume else (None, 0)
+        request_headers = dict(headers or {})
+        if offset:
+            request_headers['Range'] = 'bytes={0}-'.format(offset)
+            request_headers['If-Range'] = if_range
+
+        with self._retry_policy.request('GET', self.session.get, url, stream=True, headers=request_headers or None,
+                                        timeout=self._timeout) as r:
+            if r.status_code == 304:
+                return r
+
+            if offset and r.status_code == 416:
+                # The partial file is not a prefix of the resource anymore: start over
+                r.close()
+                self._remove_part_file(part_file)
+                return self._fetch_resource(resource, path, resume=False, verify_hash=verify_hash, headers=headers)
+
+            r.raise_for_status()
+
+            # The whole resource is sent if the server does not support ranges or the resource changed: start over
+            if r.status_code != 206:
+                offset = 0
+                self._write_part_validators(part_file, r.headers)
+
+            if offset and hasher is not None:
+                self._update_hasher_from_file(hasher, part_file)
+
+            with open(part_file, 'ab' if offset else 'wb') as f:
+                for chunk in r.iter_content(chunk_size=self._download_chunk_size):
                     if chunk:  # filter out keep-alive new chunks
                         f.write(chunk)
-                        f.flush()
-        except Exception as e:
-            print(e)
+                        if hasher is not None:
+                            hasher.update(chunk)
 
-        return local_file
+        self._complete_download(url, part_file, path, hasher, expected_hash)
+        return r
+
+    @staticmethod
+    def _complete_download(url, part_file, path, hasher=None, expected_hash=None):
+        """
+        Verify the checksum of a downloaded ".part" file, if requested, and move it into place.
+        """
+        if hasher is not None and hasher.hexdigest() != expected_hash:
+            CkanDatasetEngine._remove_part_file(part_file)
+            raise ValueError('Checksum of the file downloaded from "{0}" does not match the hash of the resource: '
+                             '"{1}" != "{2}".'.format(url, hasher.hexdigest(), expected_hash))
+
+        os.replace(part_file, path)
+        CkanDatasetEngine._remove_part_file(part_file)
+
+    @staticmethod
+    def _get_part_resume(part_file):
+        """
+        Get the If-Range value and the offset that resume a ".part" file. Returns (None, 0) if it can not be resumed.
+        """
+        if_range = CkanDatasetEngine._get_part_if_range(part_file) if os.path.isfile(part_file) else None
+
+        if not if_range:
+            return None, 0
+
+        return if_range, os.path.getsize(part_file)
+
+    @staticmethod
+    def _get_part_if_range(part_file):
+        """
+        Get the If-Range value that resumes a ".part" file: the strong ETag or the Last-Modified date of the response that started it. Returns None if neither was stored.  # noqa: E501
+        """
+        try:
+            with open(part_file + '.validators') as f:
+                validators = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        etag = validators.get('etag')
+        # Weak ETags can not be used in If-Range
+        if etag and not etag.startswith('W/'):
+            return etag
+
+        return validators.get('last_modified')
+
+    @staticmethod
+    def _write_part_validators(part_file, response_headers):
+        """
+        Store the ETag and Last-Modified validators of the response that starts a ".part" file next to it.
+        """
+        with open(part_file + '.validators', 'w') as f:
+            json.dump({'etag': response_headers.get('ETag'),
+                       'last_modified': response_headers.get('Last-Modified')}, f)
+
+    @staticmethod
+    def _remove_part_file(part_file):
+        """
+        Remove a ".part" file, if it exists, and its stored validators.
+        """
+        for file_path in (part_file, part_file + '.validators'):
+            if os.path.lexists(file_path):
+                os.remove(file_path)
+
+    @staticmethod
+    def _get_resource_hasher(resource):
+        """
+        Get a hash object and expected digest for the "hash" field of a resource. The algorithm is taken from an "algorithm:" prefix (e.g.: "sha256:...") or guessed from the length of the digest. Returns (None, None) if the resource has no usable hash.  # noqa: E501
+        """
+        resource_hash = (resource.get('hash') or '').strip().lower()
+
+        if ':' in resource_hash:
+            algorithm, _, digest = resource_hash.partition(':')
+        else:
+            algorithm = {32: 'md5', 40: 'sha1', 64: 'sha256', 128: 'sha512'}.get(len(resource_hash))
+            digest = resource_hash
+
+        if not algorithm or not digest:
+            return None, None
+
+        try:
+            return hashlib.new(algorithm), digest
+        except ValueError:
+            log.warning('Unable to verify the download of resource "{0}": unsupported hash algorithm '
+                        '"{1}".'.format(resource.get('id'), algorithm))
+            return None, None
+
+    def _update_hasher_from_file(self, hasher, path):
+        """
+        Update a hash object with the contents of a file.
+        """
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(self._download_chunk_size), b''):
+                hasher.update(chunk)
 
     def validate(self):
         """
         Validate CKAN dataset engine. Will throw an error if not valid.
         """
-        # Strip off the '/action' or '/action/' portion of the endpoint URL
-        if self.endpoint[-1] == '/':
-            api_endpoint = self.endpoint[:-8]
-        else:
-            api_endpoint = self.endpoint[:-7]
+        api_endpoint = self._get_api_root()
         try:
-            r = requests.get(api_endpoint)
+            r = self.session.get(api_endpoint, timeout=self._timeout)
 
         except requests.exceptions.MissingSchema:
             raise AssertionError('The URL "{0}" provided for the CKAN dataset service endpoint '
@@ -629,3 +1405,13 @@ class CkanDatasetEngine(DatasetEngine):
         if 'version' not in r.json():
             raise AssertionError('The URL "{0}" is not a valid endpoint for a CKAN dataset '
                                  'service.'.format(self.endpoint))
+
+    def _get_api_root(self):
+        """
+        Get the URL of the API root, which reports the version of the API.
+        """
+        # Strip off the '/action' or '/action/' portion of the endpoint URL
+        if self.endpoint[-1] == '/':
+            return self.endpoint[:-8]
+        else:
+            return self.endpoint[:-7]
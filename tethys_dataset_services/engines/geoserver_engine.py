@@ -2,11 +2,13 @@ from past.types import basestring
 from builtins import *  # noqa: F403, F401
 
 import os
-import shutil
 import pprint
+import logging
 import requests
+import threading
 import time
-from io import BytesIO
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from xml.etree import ElementTree
 from zipfile import ZipFile, is_zipfile
 
@@ -16,14 +18,218 @@ from geoserver.catalog import Catalog as GeoServerCatalog
 from geoserver.support import JDBCVirtualTable, JDBCVirtualTableGeometry, JDBCVirtualTableParam
 from geoserver.util import shapefile_and_friends
 
-from ..utilities import ConvertDictToXml, ConvertXmlToDict
+from ..utilities import ConvertDictToXml, ConvertXmlToDict, UploadBody, ZipStream
 from ..base import SpatialDatasetEngine
+from ..retry import RetryPolicy, wait_until
+
+
+log = logging.getLogger('tethys_dataset_services.geoserver_engine')
+
+
+_UNFORMATTED = object()
+
+
+class OgcUrlMap(dict):
+    """
+    Dictionary of format keys to OGC urls. The parameters shared by the urls (e.g.: layer, style, bbox and srs) are stored once and a url is only formatted when its value is first read, so the map can be used (e.g.: serialized with json.dumps) as any other dictionary.  # noqa: E501
+
+    Args:
+      build_url (callable): Function that assembles a url given an output_format and the shared parameters.
+      formats (iterable): (key, output_format) pairs of the urls in the mapping.
+      **params: Parameters passed to build_url for every url.
+    """
+    __slots__ = ('_build_url', '_formats', '_params')
+
+    def __init__(self, build_url, formats, **params):
+        self._build_url = build_url
+        self._formats = dict(formats)
+        self._params = params
+        super(OgcUrlMap, self).__init__((key, _UNFORMATTED) for key in self._formats)
+
+    def __getitem__(self, key):
+        value = super(OgcUrlMap, self).__getitem__(key)
+
+        if value is _UNFORMATTED:
+            value = self._build_url(output_format=self._formats[key], **self._params)
+            super(OgcUrlMap, self).__setitem__(key, value)
+
+        return value
+
+    def __iter__(self):
+        # Overridden so that dict(), update() and ** unpacking read the values through __getitem__
+        return iter(list(self.keys()))
+
+    def __eq__(self, other):
+        return self.to_dict() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+    def __reduce__(self):
+        return dict, (self.to_dict(),)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def items(self):
+        return self.to_dict().items()
+
+    def values(self):
+        return self.to_dict().values()
+
+    def pop(self, key, *default):
+        if key not in self:
+            return super(OgcUrlMap, self).pop(key, *default)
+
+        value = self[key]
+        super(OgcUrlMap, self).pop(key)
+        return value
+
+    def popitem(self):
+        key = next(reversed(list(self.keys())))
+        return key, self.pop(key)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def copy(self):
+        return self.to_dict()
+
+    def to_dict(self):
+        """
+        Format all of the urls into a plain dictionary.
+        """
+        return {key: self[key] for key in self.keys()}
+
+
+class GrassGridMember(object):
+    """
+    Re-iterable stream of the chunks of a member of a zip archive of GRASS ASCII grids. Given the header of the ESRI ASCII grid (arcgrid) equivalent, the GRASS header of the member is replaced with it and the body is copied as it is, so the grid is converted without being extracted or loaded into memory.  # noqa: E501
+
+    Args:
+      archive (string): Path to the zip archive.
+      member (string): Name of the member in the archive.
+      header (bytes, optional): ESRI ASCII grid header that replaces the GRASS header. The member is copied as it is if not given.  # noqa: E501
+      chunk_size (int, optional): Number of bytes read from the member at a time. Defaults to 1 MB.
+    """
+    HEADER_LINES = 6
+
+    def __init__(self, archive, member, header=None, chunk_size=1024 * 1024):
+        self.archive = archive
+        self.member = member
+        self.header = header
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        with ZipFile(self.archive) as archive, archive.open(self.member) as member:
+            if self.header is not None:
+                for _ in range(self.HEADER_LINES):
+                    member.readline()
+                yield self.header
+
+            for chunk in iter(lambda: member.read(self.chunk_size), b''):
+                yield chunk
+
+    @classmethod
+    def arc_grid_header(cls, member):
+        """
+        Read the GRASS header of a grid file object and return the equivalent ESRI ASCII grid header, or None if the header is not valid.  # noqa: E501
+        """
+        # Defaults
+        north = 90.0
+        south = -90.0
+        east = -180.0
+        rows = 360
+        cols = 720
+
+        for _ in range(cls.HEADER_LINES):
+            line = member.readline().decode('latin-1')
+
+            if 'north' in line:
+                north = float(line.split(':')[1].strip())
+            elif 'south' in line:
+                south = float(line.split(':')[1].strip())
+            elif 'east' in line:
+                east = float(line.split(':')[1].strip())
+            elif 'west' in line:
+                pass
+            elif 'rows' in line:
+                rows = int(line.split(':')[1].strip())
+            elif 'cols' in line:
+                cols = int(line.split(':')[1].strip())
+            else:
+                return None
+
+        # Calcuate new header
+        xllcorner = east
+        yllcorner = south
+        cellsize = (north - south) / rows
+
+        header = ['ncols         {0}\n'.format(cols),
+                  'nrows         {0}\n'.format(rows),
+                  'xllcorner     {0}\n'.format(xllcorner),
+                  'yllcorner     {0}\n'.format(yllcorner),
+                  'cellsize      {0}\n'.format(cellsize)]
+
+        return ''.join(header).encode('ascii')
 
 
 class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
     """
     Definition for GeoServer Dataset Engine objects.
     """
+    # OGC url families injected into transcribed objects and the attributes needed to build them
+    URL_FAMILIES = ('wms', 'wcs', 'wfs')
+    URL_ATTRIBUTES = frozenset(('resource_type', 'name', 'workspace', 'resource', 'default_style', 'bounds'))
+
+    # (key, output format) pairs of the urls injected for each family
+    WMS_FORMATS = (
+        ('png', 'image/png'),
+        ('png8', 'image/png8'),
+        ('jpeg', 'image/jpeg'),
+        ('gif', 'image/gif'),
+        ('tiff', 'image/tiff'),
+        ('tiff8', 'image/tiff8'),
+        ('geotiff', 'image/geotiff'),
+        ('geotiff8', 'image/geotiff8'),
+        ('svg', 'image/svg'),
+        ('pdf', 'application/pdf'),
+        ('georss', 'rss'),
+        ('kml', 'kml'),
+        ('kmz', 'kmz'),
+        ('openlayers', 'application/openlayers'),
+    )
+    WCS_FORMATS = (
+        ('png', 'png'),
+        ('gif', 'gif'),
+        ('jpeg', 'jpeg'),
+        ('tiff', 'tif'),
+        ('bmp', 'bmp'),
+        ('geotiff', 'geotiff'),
+        ('gtopo30', 'gtopo30'),
+        ('arcgrid', 'ArcGrid'),
+        ('arcgrid_gz', 'ArcGrid-GZIP'),
+    )
+    WFS_FORMATS = (
+        ('gml3', 'GML3'),
+        ('gml2', 'GML2'),
+        ('shapefile', 'shape-zip'),
+        ('geojson', 'application/json'),
+        ('geojsonp', 'text/javascript'),
+        ('csv', 'csv'),
+    )
+    # Layer groups have always used the misspelled "geptiff" key
+    LAYER_GROUP_WMS_FORMATS = tuple(('geptiff' if key == 'geotiff' else key, output_format)
+                                    for key, output_format in WMS_FORMATS)
+
+    # Values of the return_result argument of the create methods
+    RETURN_RESULTS = ('full', 'name', None)
+
     @property
     def type(self):
         """
@@ -35,7 +241,15 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
     def gwc_endpoint(self):
         return self._gwc_endpoint
 
-    def __init__(self, endpoint, apikey=None, username=None, password=None):
+    @property
+    def retry_policy(self):
+        """
+        The RetryPolicy applied to the requests of the engine. Its counters report the retries made.
+        """
+        return self._retry_policy
+
+    def __init__(self, endpoint, apikey=None, username=None, password=None, catalog_ttl=300, max_workers=8,
+                 retry_policy=None, visibility_timeout=5.0):
         """
         Default constructor for Dataset Engines.
 
@@ -44,6 +258,10 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
           apikey (string, optional): API key that will be used to authenticate with the dataset service.
           username (string, optional): Username that will be used to authenticate with the dataset service.
           password (string, optional): Password that will be used to authenticate with the dataset service.
+          catalog_ttl (float, optional): Seconds the GeoServer catalog object is reused before a new one is created. Use None to reuse it until refresh() is called. Defaults to 300.  # noqa: E501
+          max_workers (int, optional): Maximum number of concurrent requests used to fetch object properties when listing with properties. Defaults to 8.  # noqa: E501
+          retry_policy (RetryPolicy, optional): Policy used to retry failed requests. Defaults to RetryPolicy(). Use RetryPolicy(max_attempts=1) to disable retries.  # noqa: E501
+          visibility_timeout (float, optional): Maximum number of seconds to wait for a newly created object to become visible in the catalog. Defaults to 5.  # noqa: E501
         """
         # Set custom property /geoserver/rest/ -> /geoserver/gwc/rest/
         if '/' == endpoint[-1]:
@@ -58,6 +276,23 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
             password=password
         )
 
+        # Cached catalog
+        self._catalog_ttl = catalog_ttl
+        self._catalog = None
+        self._catalog_expires = None
+        self._default_workspace = None
+        self._catalog_lock = threading.RLock()
+
+        # Catalogs of the transcription worker threads, one per thread
+        self._catalog_generation = 0
+        self._worker_catalogs = threading.local()
+        self._thread_catalogs = weakref.WeakSet()
+        self._executor = None
+
+        self._max_workers = max_workers
+        self._retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self._visibility_timeout = visibility_timeout
+
     def _apply_changes_to_gs_object(self, attributes_dict, gs_object):
         # Catalog object
         catalog = self._get_geoserver_catalog_object()
@@ -125,10 +360,79 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
 
     def _get_geoserver_catalog_object(self):
         """
-        Internal method used to get the connection object to GeoServer.
+        Internal method used to get the connection object to GeoServer. The catalog is reused between calls until it expires or refresh() is called.  # noqa: E501
+        """
+        with self._catalog_lock:
+            if self._catalog is None or (self._catalog_expires is not None and time.monotonic() >= self._catalog_expires):  # noqa: E501
+                self._catalog = self._new_geoserver_catalog()
+                self._default_workspace = None
+
+                if self._catalog_ttl is not None:
+                    self._catalog_expires = time.monotonic() + self._catalog_ttl
+
+            return self._catalog
+
+    def _get_thread_catalog_object(self):
+        """
+        Get the gsconfig catalog of the calling worker thread. Like the shared catalog, it is reused between calls until it expires or refresh() is called.  # noqa: E501
+        """
+        worker = self._worker_catalogs
+
+        with self._catalog_lock:
+            generation = self._catalog_generation
+
+        expires = getattr(worker, 'expires', None)
+
+        if getattr(worker, 'generation', None) != generation or (expires is not None and time.monotonic() >= expires):
+            self._close_geoserver_catalog(getattr(worker, 'catalog', None))
+            worker.catalog = self._new_geoserver_catalog()
+            worker.generation = generation
+            worker.expires = time.monotonic() + self._catalog_ttl if self._catalog_ttl is not None else None
+
+            with self._catalog_lock:
+                if generation == self._catalog_generation:
+                    self._thread_catalogs.add(worker.catalog)
+
+        return worker.catalog
+
+    def _get_executor(self):
+        """
+        Get the thread pool used to transcribe geoserver objects. Its threads, and their catalogs, are kept between calls.  # noqa: E501
+        """
+        with self._catalog_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers)
+
+            return self._executor
+
+    @staticmethod
+    def _close_geoserver_catalog(catalog):
+        """
+        Close the requests session of a gsconfig catalog that is no longer used.
+        """
+        session = getattr(catalog, '_session', None)
+
+        if isinstance(session, requests.Session):
+            session.close()
+
+    def _new_geoserver_catalog(self):
+        """
+        Create a gsconfig catalog, with its own requests session and cache.
         """
         return GeoServerCatalog(self.endpoint, username=self.username, password=self.password)
 
+    def _get_default_workspace_name(self):
+        """
+        Get the name of the default workspace. The name is cached with the catalog.
+        """
+        with self._catalog_lock:
+            catalog = self._get_geoserver_catalog_object()
+
+            if self._default_workspace is None:
+                self._default_workspace = catalog.get_default_workspace().name
+
+            return self._default_workspace
+
     def _get_wms_url(self, layer_id, style='', srs='EPSG:4326', bbox='-180,-90,180,90', version='1.1.0',
                      width='512', height='512', output_format='image/png', tiled=False, transparent=True):
         """
@@ -191,6 +495,46 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
 
         return wfs_url
 
+    def refresh(self):
+        """
+        Discard the cached GeoServer catalogs. New catalogs, with empty caches, will be created on next use.
+        """
+        with self._catalog_lock:
+            self._catalog = None
+            self._catalog_expires = None
+            self._default_workspace = None
+            self._catalog_generation += 1
+            self._thread_catalogs = weakref.WeakSet()
+
+    def invalidate(self, *paths):
+        """
+        Drop cached GeoServer REST responses so they are fetched again on next access.
+
+        Args:
+          *paths (string): REST paths or path fragments of the entries to drop (e.g.: 'layers', 'workspaces/my_workspace/datastores'). All cached entries are dropped if none are given.  # noqa: E501
+
+        Examples:
+
+          engine.invalidate('workspaces/my_workspace/datastores/my_store')
+        """
+        with self._catalog_lock:
+            if not paths or any('workspaces/default' in path or path.startswith('workspaces.xml') for path in paths):
+                self._default_workspace = None
+
+            for catalog in [self._catalog] + list(self._thread_catalogs):
+                cache = getattr(catalog, '_cache', None)
+
+                if not isinstance(cache, dict):
+                    continue
+
+                if not paths:
+                    cache.clear()
+                    continue
+
+                for url in list(cache):
+                    if any(path in url for path in paths):
+                        cache.pop(url, None)
+
     @staticmethod
     def _handle_debug(return_object, debug):
         """
@@ -213,6 +557,17 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
                 # Execute
                 catalog.delete(config_object=gs_object, purge=purge, recurse=recurse)
 
+                # Drop the deleted object and the listing that contained it from the cache
+                href = getattr(gs_object, 'href', None)
+
+                if isinstance(href, str):
+                    invalid_paths = [href.rsplit('/', 1)[0]]
+
+                    if recurse:
+                        invalid_paths.extend(['layers', 'layergroups'])
+
+                    self.invalidate(*invalid_paths)
+
                 # Update response dictionary
                 response_dict['success'] = True
                 response_dict['result'] = None
@@ -230,11 +585,11 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
         self._handle_debug(response_dict, debug)
         return response_dict
 
-    def _handle_list(self, gs_objects, with_properties, debug):
+    def _handle_list(self, gs_objects, with_properties, debug, fields=None):
         """
         Handle list calls
         """
-        if not with_properties:
+        if not with_properties and fields is None:
             names = []
 
             for gs_object in gs_objects:
@@ -249,7 +604,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
             return response_dict
 
         # Handle the debug and return
-        gs_object_dicts = self._transcribe_geoserver_objects(gs_objects)
+        gs_object_dicts = self._transcribe_geoserver_objects(gs_objects, fields)
 
         # Assemble Response
         response_dict = {'success': True,
@@ -272,19 +627,114 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
 
         return workspace, name
 
-    def _transcribe_geoserver_objects(self, gs_object_list):
+    def _wait_until_visible(self, func):
+        """
+        Call func until it returns the newly created object, backing off exponentially from 50 ms. Returns None if the object is not visible before the visibility timeout.  # noqa: E501
+        """
+        return wait_until(func, timeout=self._visibility_timeout, retry_on=(geoserver.catalog.FailedRequestError,))
+
+    @staticmethod
+    def _created_object_dict(response, resource_type, name, workspace, store=None):
+        """
+        Build the result of a create request from its response, without reading the new object from the catalog. The names are taken from the XML description of the object or of its store that GeoServer returns with some responses (e.g.: file uploads).  # noqa: E501
+        """
+        description = None
+        text = getattr(response, 'text', None)
+
+        if isinstance(text, basestring) and text.lstrip().startswith('<'):
+            try:
+                description = ElementTree.fromstring(text)
+            except ElementTree.ParseError:
+                pass
+
+        if description is not None:
+            if description.tag == resource_type:
+                name = description.findtext('name', name)
+            elif store is not None and description.tag in ('dataStore', 'coverageStore'):
+                store = description.findtext('name', store)
+
+            workspace = description.findtext('workspace/name', workspace)
+
+        object_dictionary = {'name': name,
+                             'workspace': workspace,
+                             'resource_type': resource_type,
+                             'href': response.headers.get('Location') if response is not None else None}
+
+        if store is not None:
+            object_dictionary['store'] = store
+
+        return object_dictionary
+
+    def _check_return_result(self, return_result):
+        """
+        Raise ValueError if return_result is not a valid return_result argument of a create method.
+        """
+        if return_result not in self.RETURN_RESULTS:
+            raise ValueError('"{0}" is not a valid return_result. Use either "full", "name" or None.'.format(
+                return_result))
+
+    def _create_result(self, return_result, get_object, response, resource_type, name, workspace, store=None):
+        """
+        Build the result of a create method for its return_result argument: the description of the new object returned by get_object ('full'), the result built from the create response without reading the object from the catalog ('name') or None.  # noqa: E501
+        """
+        if return_result == 'full':
+            gs_object = get_object()
+            return self._transcribe_geoserver_object(gs_object) if gs_object is not None else {}
+
+        if return_result == 'name':
+            return self._created_object_dict(response, resource_type, name, workspace, store=store)
+
+        return None
+
+    @staticmethod
+    def _rewind(*bodies):
+        """
+        Rewind the file objects of request bodies (files dictionaries or file objects) so they can be sent again.
         """
-        Convert a list of geoserver objects to a list of Python dictionaries.
+        for body in bodies:
+            for value in (body.values() if isinstance(body, dict) else [body]):
+                if hasattr(value, 'seek'):
+                    value.seek(0)
+
+    def _transcribe_geoserver_objects(self, gs_object_list, fields=None):
         """
-        gs_dict_list = []
-        for gs_object in gs_object_list:
-            gs_dict_list.append(self._transcribe_geoserver_object(gs_object))
+        Convert a list of geoserver objects to a list of Python dictionaries. The objects are transcribed concurrently, because reading their properties may require a request to GeoServer for each object.  # noqa: E501
+
+        A gsconfig catalog (its requests session and its response cache) is not thread-safe, so each worker thread reads through a catalog of its own: the objects are rebound to the catalog of the worker that transcribes them.  # noqa: E501
+        """
+        gs_object_list = list(gs_object_list)
+
+        if self._max_workers is None or self._max_workers <= 1 or len(gs_object_list) <= 1:
+            return [self._safe_transcribe_geoserver_object(gs_object, fields) for gs_object in gs_object_list]
+
+        def transcribe(gs_object):
+            if getattr(gs_object, 'catalog', None) is not None:
+                gs_object.catalog = self._get_thread_catalog_object()
+
+            return self._safe_transcribe_geoserver_object(gs_object, fields)
+
+        return list(self._get_executor().map(transcribe, gs_object_list))
+
+    def _safe_transcribe_geoserver_object(self, gs_object, fields=None):
+        """
+        Convert a geoserver object to a Python dictionary. Failures are reported in the dictionary instead of raised, so one bad object does not fail a whole listing.  # noqa: E501
+        """
+        try:
+            return self._transcribe_geoserver_object(gs_object, fields)
 
-        return gs_dict_list
+        except Exception as e:
+            name = getattr(gs_object, 'name', None)
+            log.exception('Unable to retrieve properties of GeoServer object "{0}".'.format(name))
+            return {'name': name,
+                    'error': str(e)}
 
-    def _transcribe_geoserver_object(self, gs_object):
+    def _transcribe_geoserver_object(self, gs_object, fields=None):
         """
         Convert geoserver objects to Python dictionaries.
+
+        Args:
+          gs_object (object): gsconfig object to convert.
+          fields (iterable, optional): Names of the properties to include. Only these attributes are read from the object. Use "wms", "wcs" or "wfs" for all URLs of a family or "family.key" (e.g.: "wms.png") for one URL. Defaults to all properties.  # noqa: E501
         """
         # Constants
         NAMED_OBJECTS = ('store', 'workspace')
@@ -295,14 +745,25 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
         object_dictionary = {}
         resource_object = None
 
-        # Get the non-private attributes
-        attributes = [a for a in dir(gs_object) if not a.startswith('__') and not a.startswith('_')]
+        attributes, url_families = self._parse_fields(fields)
+
+        if attributes is None:
+            # Get the non-private attributes
+            attributes = [a for a in dir(gs_object) if not a.startswith('__') and not a.startswith('_')]
+        elif url_families:
+            # Read the attributes needed to build the requested urls as well
+            attributes = attributes | self.URL_ATTRIBUTES
 
         for attribute in attributes:
-            if not callable(getattr(gs_object, attribute)):
+            value = getattr(gs_object, attribute, None)
+
+            if value is None and not hasattr(gs_object, attribute):
+                continue
+
+            if not callable(value):
                 # Handle special cases upfront
                 if attribute in NAMED_OBJECTS:
-                    sub_object = getattr(gs_object, attribute)
+                    sub_object = value
                     if not sub_object or isinstance(sub_object, str):
                         object_dictionary[attribute] = sub_object
                     else:
@@ -310,7 +771,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
 
                 elif attribute in NAMED_OBJECTS_WITH_WORKSPACE:
                     # Append workspace if applicable
-                    sub_object = getattr(gs_object, attribute)
+                    sub_object = value
                     # Stash resource for later use
                     if attribute == 'resource':
                         resource_object = sub_object
@@ -326,7 +787,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
                         else:
                             object_dictionary[attribute] = sub_object.name
                     elif isinstance(sub_object, str):
-                        object_dictionary[attribute] = getattr(gs_object, attribute)
+                        object_dictionary[attribute] = value
 
                 elif attribute in OMIT_ATTRIBUTES:
                     # Omit these attributes
@@ -334,11 +795,10 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
 
                 elif attribute == 'catalog':
                     # Store URL in place of catalog
-                    catalog_object = getattr(gs_object, 'catalog')
-                    object_dictionary[attribute] = catalog_object.gs_base_url
+                    object_dictionary[attribute] = value.gs_base_url
 
                 elif attribute == 'styles':
-                    styles = getattr(gs_object, attribute)
+                    styles = value
                     styles_names = []
 
                     for style in styles:
@@ -349,40 +809,33 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
                                 else:
                                     styles_names.append(style.name)
                             else:
-                                styles_names = getattr(gs_object, attribute)
+                                styles_names = value
 
                     object_dictionary[attribute] = styles_names
 
                 # Store attribute properties as is
                 else:
-                    object_dictionary[attribute] = getattr(gs_object, attribute)
+                    object_dictionary[attribute] = value
 
         # Inject appropriate WFS and WMS URLs
         if 'resource_type' in object_dictionary:
             # Feature Types Get WFS
-            if object_dictionary['resource_type'] == 'featureType':
+            if object_dictionary['resource_type'] == 'featureType' and 'wfs' in url_families:
                 if object_dictionary['workspace']:
                     resource_id = '{0}:{1}'.format(object_dictionary['workspace'], object_dictionary['name'])
                 else:
                     resource_id = object_dictionary['name']
 
-                object_dictionary['wfs'] = {
-                    'gml3': self._get_wfs_url(resource_id, 'GML3'),
-                    'gml2': self._get_wfs_url(resource_id, 'GML2'),
-                    'shapefile': self._get_wfs_url(resource_id, 'shape-zip'),
-                    'geojson': self._get_wfs_url(resource_id, 'application/json'),
-                    'geojsonp': self._get_wfs_url(resource_id, 'text/javascript'),
-                    'csv': self._get_wfs_url(resource_id, 'csv')
-                }
+                object_dictionary['wfs'] = OgcUrlMap(self._get_wfs_url,
+                                                     self._select_formats(self.WFS_FORMATS, url_families['wfs']),
+                                                     resource_id=resource_id)
 
             # Coverage Types Get WCS
-            elif object_dictionary['resource_type'] == 'coverage':
+            elif object_dictionary['resource_type'] == 'coverage' and 'wcs' in url_families:
                 workspace = None
                 name = object_dictionary['name']
                 bbox = '-180,-90,180,90'
                 srs = 'EPSG:4326'
-                width = '512'
-                height = '512'
 
                 if object_dictionary['workspace']:
                     workspace = object_dictionary['workspace']
@@ -390,34 +843,14 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
                 if resource_object and resource_object.native_bbox:
                     # Find the native bounding box
                     nbbox = resource_object.native_bbox
-                    minx = nbbox[0]
-                    maxx = nbbox[1]
-                    miny = nbbox[2]
-                    maxy = nbbox[3]
                     srs = resource_object.projection
-                    bbox = '{0},{1},{2},{3}'.format(minx, miny, maxx, maxy)
+                    bbox = '{0},{1},{2},{3}'.format(nbbox[0], nbbox[2], nbbox[1], nbbox[3])
 
-                    # Resize the width to be proportionate to the image aspect ratio
-                    aspect_ratio = (float(maxx) - float(minx)) / (float(maxy) - float(miny))
-                    width = str(int(aspect_ratio * float(height)))
+                object_dictionary['wcs'] = OgcUrlMap(self._get_wcs_url,
+                                                     self._select_formats(self.WCS_FORMATS, url_families['wcs']),
+                                                     resource_id=name, namespace=workspace, srs=srs, bbox=bbox)
 
-                object_dictionary['wcs'] = {
-                    'png': self._get_wcs_url(name, output_format='png', namespace=workspace, srs=srs, bbox=bbox),
-                    'gif': self._get_wcs_url(name, output_format='gif', namespace=workspace, srs=srs, bbox=bbox),
-                    'jpeg': self._get_wcs_url(name, output_format='jpeg', namespace=workspace, srs=srs, bbox=bbox),
-                    'tiff': self._get_wcs_url(name, output_format='tif', namespace=workspace, srs=srs, bbox=bbox),
-                    'bmp': self._get_wcs_url(name, output_format='bmp', namespace=workspace, srs=srs, bbox=bbox),
-                    'geotiff': self._get_wcs_url(name, output_format='geotiff', namespace=workspace, srs=srs,
-                                                 bbox=bbox),
-                    'gtopo30': self._get_wcs_url(name, output_format='gtopo30', namespace=workspace, srs=srs,
-                                                 bbox=bbox),
-                    'arcgrid': self._get_wcs_url(name, output_format='ArcGrid', namespace=workspace, srs=srs,
-                                                 bbox=bbox),
-                    'arcgrid_gz': self._get_wcs_url(name, output_format='ArcGrid-GZIP', namespace=workspace, srs=srs,
-                                                    bbox=bbox),
-                }
-
-            elif object_dictionary['resource_type'] == 'layer':
+            elif object_dictionary['resource_type'] in ('layer', 'layerGroup') and 'wms' in url_families:
                 # Defaults
                 bbox = '-180,-90,180,90'
                 srs = 'EPSG:4326'
@@ -430,114 +863,84 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
                 if 'default_style' in object_dictionary:
                     style = object_dictionary['default_style']
 
-                # Try to extract the bounding box from the resource which was saved earlier
-                if resource_object and resource_object.native_bbox:
-                    # Find the native bounding box
-                    nbbox = resource_object.native_bbox
-                    minx = nbbox[0]
-                    maxx = nbbox[1]
-                    miny = nbbox[2]
-                    maxy = nbbox[3]
-                    srs = resource_object.projection
-                    bbox = '{0},{1},{2},{3}'.format(minx, miny, maxx, maxy)
+                nbbox = None
 
-                    # Resize the width to be proportionate to the image aspect ratio
-                    aspect_ratio = (float(maxx) - float(minx)) / (float(maxy) - float(miny))
-                    width = str(int(aspect_ratio * float(height)))
+                if object_dictionary['resource_type'] == 'layer':
+                    # Try to extract the bounding box from the resource which was saved earlier
+                    if resource_object and resource_object.native_bbox:
+                        nbbox = resource_object.native_bbox
+                        srs = resource_object.projection
 
-                object_dictionary['wms'] = {
-                    'png': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                             output_format='image/png'),
-                    'png8': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                              output_format='image/png8'),
-                    'jpeg': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                              output_format='image/jpeg'),
-                    'gif': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                             output_format='image/gif'),
-                    'tiff': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                              output_format='image/tiff'),
-                    'tiff8': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                               output_format='image/tiff8'),
-                    'geotiff': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                                 output_format='image/geotiff'),
-                    'geotiff8': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                                  output_format='image/geotiff8'),
-                    'svg': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                             output_format='image/svg'),
-                    'pdf': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                             output_format='application/pdf'),
-                    'georss': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                                output_format='rss'),
-                    'kml': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                             output_format='kml'),
-                    'kmz': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                             output_format='kmz'),
-                    'openlayers': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                                    output_format='application/openlayers')
-                }
-
-            elif object_dictionary['resource_type'] == 'layerGroup':
-                # Defaults
-                bbox = '-180,-90,180,90'
-                srs = 'EPSG:4326'
-                width = '512'
-                height = '512'
-                style = ''
+                    formats = self.WMS_FORMATS
 
-                # Layer and style
-                layer = object_dictionary['name']
-                if 'default_style' in object_dictionary:
-                    style = object_dictionary['default_style']
+                else:
+                    # Try to extract the bounding box from the layer group bounds
+                    if 'bounds' in object_dictionary and object_dictionary['bounds']:
+                        nbbox = object_dictionary['bounds']
+                        srs = nbbox[4]
+
+                    formats = self.LAYER_GROUP_WMS_FORMATS
 
-                # Try to extract the bounding box from the resource which was saved earlier
-                if 'bounds' in object_dictionary and object_dictionary['bounds']:
+                if nbbox:
                     # Find the native bounding box
-                    nbbox = object_dictionary['bounds']
                     minx = nbbox[0]
                     maxx = nbbox[1]
                     miny = nbbox[2]
                     maxy = nbbox[3]
-                    srs = nbbox[4]
                     bbox = '{0},{1},{2},{3}'.format(minx, miny, maxx, maxy)
 
                     # Resize the width to be proportionate to the image aspect ratio
                     aspect_ratio = (float(maxx) - float(minx)) / (float(maxy) - float(miny))
                     width = str(int(aspect_ratio * float(height)))
 
-                object_dictionary['wms'] = {
-                    'png': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                             output_format='image/png'),
-                    'png8': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                              output_format='image/png8'),
-                    'jpeg': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                              output_format='image/jpeg'),
-                    'gif': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                             output_format='image/gif'),
-                    'tiff': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                              output_format='image/tiff'),
-                    'tiff8': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                               output_format='image/tiff8'),
-                    'geptiff': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                                 output_format='image/geotiff'),
-                    'geotiff8': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                                  output_format='image/geotiff8'),
-                    'svg': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                             output_format='image/svg'),
-                    'pdf': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                             output_format='application/pdf'),
-                    'georss': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                                output_format='rss'),
-                    'kml': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                             output_format='kml'),
-                    'kmz': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                             output_format='kmz'),
-                    'openlayers': self._get_wms_url(layer, style, bbox=bbox, srs=srs, width=width, height=height,
-                                                    output_format='application/openlayers')
-                }
+                object_dictionary['wms'] = OgcUrlMap(self._get_wms_url,
+                                                     self._select_formats(formats, url_families['wms']),
+                                                     layer_id=layer, style=style, bbox=bbox, srs=srs, width=width,
+                                                     height=height)
+
+        # Drop the attributes that were only read to build the urls
+        if fields is not None:
+            requested = set(fields)
+            object_dictionary = {k: v for k, v in object_dictionary.items() if k in requested or k in url_families}
 
         return object_dictionary
 
-    def list_resources(self, with_properties=False, store=None, workspace=None, debug=False):
+    def _parse_fields(self, fields):
+        """
+        Split the fields requested of a transcription into attribute names and the keys requested of each url family.
+
+        Returns:
+          tuple: set of attribute names (None for all) and dictionary mapping url family to set of keys (None for all).
+        """
+        if fields is None:
+            return None, {family: None for family in self.URL_FAMILIES}
+
+        attributes = set()
+        url_families = {}
+
+        for field in fields:
+            family, _, key = field.partition('.')
+
+            if family not in self.URL_FAMILIES:
+                attributes.add(field)
+            elif not key:
+                url_families[family] = None
+            elif family not in url_families or url_families[family] is not None:
+                url_families.setdefault(family, set()).add(key)
+
+        return attributes, url_families
+
+    @staticmethod
+    def _select_formats(formats, keys):
+        """
+        Get the (key, output_format) pairs of a url family that were requested.
+        """
+        if keys is None:
+            return formats
+
+        return [(key, output_format) for key, output_format in formats if key in keys]
+
+    def list_resources(self, with_properties=False, store=None, workspace=None, debug=False, fields=None):
         """
         List the names of all resources available from the spatial dataset service.
 
@@ -546,6 +949,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
           store (string, optional): Return only resources belonging to a certain store.
           workspace (string, optional): Return only resources belonging to a certain workspace.
           debug (bool, optional): Pretty print the response dictionary to the console for debugging. Defaults to False.
+          fields (iterable, optional): Names of the properties to return for each object (e.g.: ['name', 'wms.png']). Use 'wms', 'wcs' or 'wfs' to get all urls of a family. Only the requested properties are retrieved from GeoServer. Implies with_properties. Defaults to all properties.  # noqa: E501
 
         Returns:
           (dict): Response dictionary
@@ -563,7 +967,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
         catalog = self._get_geoserver_catalog_object()
         try:
             resource_objects = catalog.get_resources(store=store, workspace=workspace)
-            return self._handle_list(resource_objects, with_properties, debug)
+            return self._handle_list(resource_objects, with_properties, debug, fields)
         except geoserver.catalog.AmbiguousRequestError as e:
             response_object = {'success': False,
                                'error': str(e)}
@@ -573,13 +977,14 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
         self._handle_debug(response_object, debug)
         return response_object
 
-    def list_layers(self, with_properties=False, debug=False):
+    def list_layers(self, with_properties=False, debug=False, fields=None):
         """
         List names of all layers available from the spatial dataset service.
 
         Args:
           with_properties (bool, optional): Return list of layer dictionaries instead of a list of layer names.
           debug (bool, optional): Pretty print the response dictionary to the console for debugging. Defaults to False.
+          fields (iterable, optional): Names of the properties to return for each object (e.g.: ['name', 'wms.png']). Use 'wms', 'wcs' or 'wfs' to get all urls of a family. Only the requested properties are retrieved from GeoServer. Implies with_properties. Defaults to all properties.  # noqa: E501
 
         Returns:
           (dict): Response dictionary
@@ -589,19 +994,22 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
           response = engine.list_layers()
 
           response = engine.list_layers(with_properties=True)
+
+          response = engine.list_layers(fields=['name', 'wms.png'])
         """
         # Get a GeoServer catalog object and query for list of layers
         catalog = self._get_geoserver_catalog_object()
         layer_objects = catalog.get_layers()
-        return self._handle_list(layer_objects, with_properties, debug)
+        return self._handle_list(layer_objects, with_properties, debug, fields)
 
-    def list_layer_groups(self, with_properties=False, debug=False):
+    def list_layer_groups(self, with_properties=False, debug=False, fields=None):
         """
         List the names of all layer groups available from the spatial dataset service.
 
         Args:
           with_properties (bool, optional): Return list of layer group dictionaries instead of a list of layer group names.  # noqa: E501
           debug (bool, optional): Pretty print the response dictionary to the console for debugging. Defaults to False.
+          fields (iterable, optional): Names of the properties to return for each object (e.g.: ['name', 'wms.png']). Use 'wms', 'wcs' or 'wfs' to get all urls of a family. Only the requested properties are retrieved from GeoServer. Implies with_properties. Defaults to all properties.  # noqa: E501
 
         Returns:
           (dict): Response dictionary
@@ -615,15 +1023,16 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
         # Get a GeoServer catalog object and query for list of layer groups
         catalog = self._get_geoserver_catalog_object()
         layer_group_objects = catalog.get_layergroups()
-        return self._handle_list(layer_group_objects, with_properties, debug)
+        return self._handle_list(layer_group_objects, with_properties, debug, fields)
 
-    def list_workspaces(self, with_properties=False, debug=False):
+    def list_workspaces(self, with_properties=False, debug=False, fields=None):
         """
         List the names of all workspaces available from the spatial dataset service.
 
         Args:
           with_properties (bool, optional): Return list of workspace dictionaries instead of a list of workspace names.
           debug (bool, optional): Pretty print the response dictionary to the console for debugging. Defaults to False.
+          fields (iterable, optional): Names of the properties to return for each object (e.g.: ['name', 'wms.png']). Use 'wms', 'wcs' or 'wfs' to get all urls of a family. Only the requested properties are retrieved from GeoServer. Implies with_properties. Defaults to all properties.  # noqa: E501
 
         Returns:
           (dict): Response dictionary
@@ -637,9 +1046,9 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
         # Get a GeoServer catalog object and query for list of layer groups
         catalog = self._get_geoserver_catalog_object()
         workspaces = catalog.get_workspaces()
-        return self._handle_list(workspaces, with_properties, debug)
+        return self._handle_list(workspaces, with_properties, debug, fields)
 
-    def list_stores(self, workspace=None, with_properties=False, debug=False):
+    def list_stores(self, workspace=None, with_properties=False, debug=False, fields=None):
         """
         List the names of all stores available from the spatial dataset service.
 
@@ -647,6 +1056,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
           workspace (string, optional): List long stores belonging to this workspace.
           with_properties (bool, optional): Return list of store dictionaries instead of a list of store names.
           debug (bool, optional): Pretty print the response dictionary to the console for debugging. Defaults to False.
+          fields (iterable, optional): Names of the properties to return for each object (e.g.: ['name', 'wms.png']). Use 'wms', 'wcs' or 'wfs' to get all urls of a family. Only the requested properties are retrieved from GeoServer. Implies with_properties. Defaults to all properties.  # noqa: E501
 
         Returns:
           (dict): Response dictionary
@@ -662,7 +1072,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
 
         try:
             stores = catalog.get_stores(workspace=workspace)
-            return self._handle_list(stores, with_properties, debug)
+            return self._handle_list(stores, with_properties, debug, fields)
 
         except AttributeError:
             response_dict = {'success': False,
@@ -670,7 +1080,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
         self._handle_debug(response_dict, debug)
         return response_dict
 
-    def list_styles(self, workspace=None, with_properties=False, debug=False):
+    def list_styles(self, workspace=None, with_properties=False, debug=False, fields=None):
         """
         List the names of all styles available from the spatial dataset service.
 
@@ -678,6 +1088,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
           workspace (string): Return only resources belonging to a certain workspace.
           with_properties (bool, optional): Return list of style dictionaries instead of a list of style names.
           debug (bool, optional): Pretty print the response dictionary to the console for debugging. Defaults to False.
+          fields (iterable, optional): Names of the properties to return for each object (e.g.: ['name', 'wms.png']). Use 'wms', 'wcs' or 'wfs' to get all urls of a family. Only the requested properties are retrieved from GeoServer. Implies with_properties. Defaults to all properties.  # noqa: E501
 
         Returns:
           (dict): Response dictionary
@@ -691,9 +1102,9 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
         # Get a GeoServer catalog object and query for list of layer groups
         catalog = self._get_geoserver_catalog_object()
         styles = catalog.get_styles(workspace=workspace)
-        return self._handle_list(styles, with_properties, debug)
+        return self._handle_list(styles, with_properties, debug, fields)
 
-    def get_resource(self, resource_id, store_id=None, debug=False):
+    def get_resource(self, resource_id, store_id=None, debug=False, fields=None):
         """
         Retrieve a resource object.
 
@@ -701,6 +1112,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
           resource_id (string): Identifier of the resource to retrieve. Can be a name or a workspace-name combination (e.g.: "name" or "workspace:name").  # noqa: E501
           store (string, optional): Get resource from this store.
           debug (bool, optional): Pretty print the response dictionary to the console for debugging. Defaults to False.
+          fields (iterable, optional): Names of the properties to return (e.g.: ['name', 'wms.png']). Use 'wms', 'wcs' or 'wfs' to get all urls of a family. Only the requested properties are retrieved from GeoServer. Defaults to all properties.  # noqa: E501
 
         Returns:
           (dict): Response dictionary
@@ -720,7 +1132,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
 
         # Get default work space if none is given
         if not workspace:
-            workspace = catalog.get_default_workspace().name
+            workspace = self._get_default_workspace_name()
 
         # Get resource
         try:
@@ -729,7 +1141,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
                 response_dict = {'success': False,
                                  'error': 'Resource "{0}" not found.'.format(resource_id)}
             else:
-                resource_dict = self._transcribe_geoserver_object(resource)
+                resource_dict = self._transcribe_geoserver_object(resource, fields)
 
                 # Assemble Response
                 response_dict = {'success': True,
@@ -743,7 +1155,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
         self._handle_debug(response_dict, debug)
         return response_dict
 
-    def get_layer(self, layer_id, store_id=None, debug=False):
+    def get_layer(self, layer_id, store_id=None, debug=False, fields=None):
         """
         Retrieve a layer object.
 
@@ -751,6 +1163,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
           layer_id (string): Identifier of the layer to retrieve. Can be a name or a workspace-name combination (e.g.: "name" or "workspace:name").  # noqa: E501
           store_id (string, optional): Return only resources belonging to a certain store.
           debug (bool, optional): Pretty print the response dictionary to the console for debugging. Defaults to False.
+          fields (iterable, optional): Names of the properties to return (e.g.: ['name', 'wms.png']). Use 'wms', 'wcs' or 'wfs' to get all urls of a family. Only the requested properties are retrieved from GeoServer. Defaults to all properties.  # noqa: E501
         Returns:
           (dict): Response dictionary
 
@@ -772,17 +1185,18 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
                 response_dict = {'success': False,
                                  'error': 'Layer "{0}" not found.'.format(layer_id)}
             else:
-                layer_dict = self._transcribe_geoserver_object(layer)
+                layer_dict = self._transcribe_geoserver_object(layer, fields)
 
                 # Get layer caching properties (gsconfig doesn't support this)
-                gwc_url = '{0}layers/{1}.xml'.format(self.gwc_endpoint, layer_id)
-                auth = (self.username, self.password)
-                r = requests.get(gwc_url, auth=auth)
+                if fields is None or 'tile_caching' in fields:
+                    gwc_url = '{0}layers/{1}.xml'.format(self.gwc_endpoint, layer_id)
+                    auth = (self.username, self.password)
+                    r = self._retry_policy.request('GET', requests.get, gwc_url, auth=auth)
 
-                if r.status_code == 200:
-                    root = ElementTree.XML(r.text)
-                    tile_caching_dict = ConvertXmlToDict(root)
-                    layer_dict['tile_caching'] = tile_caching_dict['GeoServerLayer']
+                    if r.status_code == 200:
+                        root = ElementTree.XML(r.text)
+                        tile_caching_dict = ConvertXmlToDict(root)
+                        layer_dict['tile_caching'] = tile_caching_dict['GeoServerLayer']
 
                 # Assemble Response
                 response_dict = {'success': True,
@@ -796,13 +1210,14 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
         self._handle_debug(response_dict, debug)
         return response_dict
 
-    def get_layer_group(self, layer_group_id, debug=False):
+    def get_layer_group(self, layer_group_id, debug=False, fields=None):
         """
         Retrieve a layer group object.
 
         Args:
           layer_group_id (string): Identifier of the layer group to retrieve. Can be a name or a workspace-name combination (e.g.: "name" or "workspace:name").  # noqa: E501
           debug (bool, optional): Pretty print the response dictionary to the console for debugging. Defaults to False.
+          fields (iterable, optional): Names of the properties to return (e.g.: ['name', 'wms.png']). Use 'wms', 'wcs' or 'wfs' to get all urls of a family. Only the requested properties are retrieved from GeoServer. Defaults to all properties.  # noqa: E501
 
         Returns:
           (dict): Response dictionary
@@ -825,7 +1240,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
                 response_dict = {'success': False,
                                  'error': 'Layer Group "{0}" not found.'.format(layer_group_id)}
             else:
-                layer_group_dict = self._transcribe_geoserver_object(layer_group)
+                layer_group_dict = self._transcribe_geoserver_object(layer_group, fields)
 
                 # Assemble Response
                 response_dict = {'success': True,
@@ -839,13 +1254,14 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
         self._handle_debug(response_dict, debug)
         return response_dict
 
-    def get_store(self, store_id, debug=False):
+    def get_store(self, store_id, debug=False, fields=None):
         """
         Retrieve a store object.
 
         Args:
           store_id (string): Identifier of the store to retrieve. Can be a name or a workspace-name combination (e.g.: "name" or "workspace:name").  # noqa: E501
           debug (bool, optional): Pretty print the response dictionary to the console for debugging. Defaults to False.
+          fields (iterable, optional): Names of the properties to return (e.g.: ['name', 'wms.png']). Use 'wms', 'wcs' or 'wfs' to get all urls of a family. Only the requested properties are retrieved from GeoServer. Defaults to all properties.  # noqa: E501
 
         Returns:
           (dict): Response dictionary
@@ -864,7 +1280,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
 
         # Get default work space if none is given
         if not workspace:
-            workspace = catalog.get_default_workspace().name
+            workspace = self._get_default_workspace_name()
 
         try:
             # Get resource
@@ -874,7 +1290,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
                 response_dict = {'success': False,
                                  'error': 'Store "{0}" not found.'.format(store_id)}
             else:
-                store_dict = self._transcribe_geoserver_object(store)
+                store_dict = self._transcribe_geoserver_object(store, fields)
 
                 # Assemble Response
                 response_dict = {'success': True,
@@ -888,13 +1304,14 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
         self._handle_debug(response_dict, debug)
         return response_dict
 
-    def get_workspace(self, workspace_id, debug=False):
+    def get_workspace(self, workspace_id, debug=False, fields=None):
         """
         Retrieve a workspace object.
 
         Args:
           workspace_id (string): Identifier of the workspace to retrieve.
           debug (bool, optional): Pretty print the response dictionary to the console for debugging. Defaults to False.
+          fields (iterable, optional): Names of the properties to return (e.g.: ['name', 'wms.png']). Use 'wms', 'wcs' or 'wfs' to get all urls of a family. Only the requested properties are retrieved from GeoServer. Defaults to all properties.  # noqa: E501
 
         Returns:
           (dict): Response dictionary
@@ -914,7 +1331,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
                 response_dict = {'success': False,
                                  'error': 'Workspace "{0}" not found.'.format(workspace_id)}
             else:
-                workspace_dict = self._transcribe_geoserver_object(workspace)
+                workspace_dict = self._transcribe_geoserver_object(workspace, fields)
 
                 # Assemble Response
                 response_dict = {'success': True,
@@ -928,13 +1345,14 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
         self._handle_debug(response_dict, debug)
         return response_dict
 
-    def get_style(self, style_id, debug=False):
+    def get_style(self, style_id, debug=False, fields=None):
         """
         Retrieve a style object.
 
         Args:
           style_id (string): Identifier of the style to retrieve.
           debug (bool, optional): Pretty print the response dictionary to the console for debugging. Defaults to False.
+          fields (iterable, optional): Names of the properties to return (e.g.: ['name', 'wms.png']). Use 'wms', 'wcs' or 'wfs' to get all urls of a family. Only the requested properties are retrieved from GeoServer. Defaults to all properties.  # noqa: E501
 
         Returns:
           (dict): Response dictionary
@@ -952,7 +1370,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
 
         # Get default work space if none is given
         if not workspace:
-            workspace = catalog.get_default_workspace().name
+            workspace = self._get_default_workspace_name()
 
         try:
             # Get style
@@ -962,7 +1380,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
                 response_dict = {'success': False,
                                  'error': 'Workspace "{0}" not found.'.format(style_id)}
             else:
-                style_dict = self._transcribe_geoserver_object(style)
+                style_dict = self._transcribe_geoserver_object(style, fields)
 
                 # Assemble Response
                 response_dict = {'success': True,
@@ -1003,7 +1421,8 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
         )
         return response
 
-    def create_postgis_feature_resource(self, store_id, host, port, database, user, password, table=None, debug=False):
+    def create_postgis_feature_resource(self, store_id, host, port, database, user, password, table=None, wait=True,
+                                        return_result='full', debug=False):
         """
         Use this method to link an existing PostGIS database to GeoServer as a feature store. Note that this method only works for data in vector formats.  # noqa: E501
 
@@ -1015,6 +1434,8 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
           user (string): Database user that has access to the database.
           password (string): Password of database user.
           table (string, optional): Name of existing table to add as a feature resource to the newly created feature store. A layer will automatically be created for the feature resource as well. Both the layer and the resource will share the same name as the table.  # noqa: E501
+          wait (bool, optional): Wait until the new store or resource is visible in the catalog and return its full description. If False, the catalog is not polled and a 'full' result is built from the create response, as with 'name'. Defaults to True.  # noqa: E501
+          return_result (string, optional): Result of a successful create: 'full' for the description of the new object read from GeoServer, 'name' for its name, workspace, resource_type and href built from the create response without reading it, or None for no result. Defaults to 'full'.  # noqa: E501
           debug (bool, optional): Pretty print the response dictionary to the console for debugging. Defaults to False.
 
         Returns:
@@ -1031,6 +1452,11 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
           response = engine.create_postgis_resource(store_id='workspace:store_name', host='localhost', port='5432', database='database_name', user='user', password='pass')  # noqa: E501
 
         """
+        self._check_return_result(return_result)
+
+        # Results of new objects are built from the create response if not waiting for them
+        created_result = 'name' if return_result == 'full' and not wait else return_result
+
         # Get a GeoServer catalog object and query for list of layer groups
         catalog = self._get_geoserver_catalog_object()
 
@@ -1039,7 +1465,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
 
         # Get default work space if none is given
         if not workspace:
-            workspace = catalog.get_default_workspace().name
+            workspace = self._get_default_workspace_name()
 
         # Determine if store exists
         store = catalog.get_store(name=name, workspace=workspace)
@@ -1071,10 +1497,8 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
             url = self._assemble_url('workspaces', workspace, 'datastores')
 
             # Execute: POST /workspaces/<ws>/datastores
-            response = requests.post(url=url,
-                                     data=xml,
-                                     headers=headers,
-                                     auth=HTTPBasicAuth(username=self.username, password=self.password))
+            response = self._retry_policy.request('POST', requests.post, url=url, data=xml, headers=headers,
+                                                  auth=HTTPBasicAuth(username=self.username, password=self.password))
 
             # Return with error if this doesn't work
             if response.status_code != 201:
@@ -1084,23 +1508,18 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
                 self._handle_debug(response_dict, debug)
                 return response_dict
 
+            self.invalidate('workspaces/{0}/datastores'.format(workspace))
+
         if not table:
             # Wrap up successfully with new store created
-            MAX_ATTEMPTS = 5
-            attempts = 0
-            resource_dict = {}
-
-            while attempts < MAX_ATTEMPTS:
-                attempts += 1
-                try:
-                    new_store = catalog.get_store(name=name, workspace=workspace)
-                    if not new_store:
-                        raise geoserver.catalog.FailedRequestError()
-
-                    resource_dict = self._transcribe_geoserver_object(new_store)
-                    break
-                except geoserver.catalog.FailedRequestError:
-                    time.sleep(1)
+            if store_exists:
+                resource_dict = self._create_result(return_result, lambda: store, None, 'dataStore', name, workspace)
+            else:
+                resource_dict = self._create_result(
+                    created_result, lambda: self._wait_until_visible(lambda: catalog.get_store(name=name,
+                                                                                               workspace=workspace)),
+                    response, 'dataStore', name, workspace
+                )
 
             response_dict = {'success': True,
                              'result': resource_dict}
@@ -1126,27 +1545,8 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
         except geoserver.catalog.FailedRequestError:
             pass
 
-        # Prepare file for adding the table
-        xml = """
-              <featureType>
-                <name>{0}</name>
-              </featureType>
-              """.format(table)
-
-        # Prepare headers
-        headers = {
-            "Content-type": "text/xml",
-            "Accept": "application/xml"
-        }
-
-        # Prepare URL
-        url = self._assemble_url('workspaces', workspace, 'datastores', name, 'featuretypes')
-
         # Execute: POST /workspaces/<ws>/datastores/<ds>/featuretypes
-        response = requests.post(url=url,
-                                 data=xml,
-                                 headers=headers,
-                                 auth=HTTPBasicAuth(username=self.username, password=self.password))
+        response = self._post_feature_type(workspace, name, table)
 
         # Handle failure
         if response.status_code != 201:
@@ -1156,22 +1556,28 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
             self._handle_debug(response_dict, debug)
             return response_dict
 
+        self.invalidate('workspaces/{0}/datastores/{1}'.format(workspace, name), 'layers')
+
         # Wrap up successfully
-        new_resource = catalog.get_resource(name=table, store=name, workspace=workspace)
-        resource_dict = self._transcribe_geoserver_object(new_resource)
+        resource_dict = self._create_result(
+            created_result,
+            lambda: self._wait_until_visible(lambda: catalog.get_resource(name=table, store=name, workspace=workspace)),
+            response, 'featureType', table, workspace, store=name
+        )
 
         response_dict = {'success': True,
                          'result': resource_dict}
         self._handle_debug(response_dict, debug)
         return response_dict
 
-    def add_table_to_postgis_store(self, store_id, table, debug=False):
+    def add_table_to_postgis_store(self, store_id, table, return_result='full', debug=False):
         """
         Add an existing postgis table as a feature resource to a postgis store that already exists.
 
         Args
           store_id (string): Identifier for the store to add the resource to. Can be a store name or a workspace name combination (e.g.: "name" or "workspace:name"). Note that the workspace must be an existing workspace. If no workspace is given, the default workspace will be assigned.  # noqa: E501
           table (string): Name of existing table to add as a feature resource. A layer will automatically be created for this resource. Both the resource and the layer will share the same name as the table.  # noqa: E501
+          return_result (string, optional): Result of a successful add: 'full' for the description of the store read from GeoServer, 'name' for the name, workspace, store, resource_type and href of the new resource built from the create response, or None for no result. Defaults to 'full'.  # noqa: E501
           debug (bool, optional): Pretty print the response dictionary to the console for debugging. Defaults to False.
 
         Returns:
@@ -1181,6 +1587,8 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
 
           response = engine.add_table_to_postgis_store(store_id='workspace:store_name', table='table_name')
         """
+        self._check_return_result(return_result)
+
         # Get a GeoServer catalog object and query for list of layer groups
         catalog = self._get_geoserver_catalog_object()
 
@@ -1189,7 +1597,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
 
         # Get default work space if none is given
         if not workspace:
-            workspace = catalog.get_default_workspace().name
+            workspace = self._get_default_workspace_name()
 
         # Throw error store does not exist
         try:
@@ -1205,6 +1613,124 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
             self._handle_debug(response_dict, debug)
             return response_dict
 
+        # Execute: POST /workspaces/<ws>/datastores/<ds>/featuretypes
+        response = self._post_feature_type(workspace, name, table)
+
+        if response.status_code != 201:
+            response_dict = {'success': False,
+                             'error': '{1}({0}): {2}'.format(response.status_code, response.reason, response.text)}
+
+            self._handle_debug(response_dict, debug)
+            return response_dict
+
+        self.invalidate('workspaces/{0}/datastores/{1}'.format(workspace, name), 'layers')
+
+        # Wrap up successfully
+        resource_dict = self._create_result(return_result, lambda: catalog.get_store(name=name, workspace=workspace),
+                                            response, 'featureType', table, workspace, store=name)
+
+        response_dict = {'success': True,
+                         'result': resource_dict}
+        self._handle_debug(response_dict, debug)
+        return response_dict
+
+    def add_tables_to_postgis_store(self, store_id, tables, max_workers=None, return_result='full', debug=False):
+        """
+        Add existing postgis tables as feature resources to a postgis store that already exists. The store is validated once and the tables are published concurrently.  # noqa: E501
+
+        Args
+          store_id (string): Identifier for the store to add the resources to. Can be a store name or a workspace name combination (e.g.: "name" or "workspace:name"). Note that the workspace must be an existing workspace. If no workspace is given, the default workspace will be assigned.  # noqa: E501
+          tables (iterable): Names of existing tables to add as feature resources. A layer will automatically be created for each resource. Both the resource and the layer will share the same name as the table. Repeated names are published once.  # noqa: E501
+          max_workers (int, optional): Maximum number of tables published at once. Defaults to the max_workers of the engine.
+          return_result (string, optional): Result of each table, like add_table_to_postgis_store: 'full' for the description of the store, which is read once after all tables are published, 'name' for the name, workspace, store, resource_type and href of the new resource built from its create response, or None for no result. Defaults to 'full'.  # noqa: E501
+          debug (bool, optional): Pretty print the response dictionary to the console for debugging. Defaults to False.
+
+        Returns:
+          (dict): Response dictionary. Its result maps each table to the response dictionary of the table. If any table failed, success is False and the error lists the failed tables.  # noqa: E501
+
+        Examples:
+
+          response = engine.add_tables_to_postgis_store(store_id='workspace:store_name', tables=['roads', 'rivers'], max_workers=16)  # noqa: E501
+        """
+        self._check_return_result(return_result)
+
+        # Get a GeoServer catalog object and query for list of layer groups
+        catalog = self._get_geoserver_catalog_object()
+
+        # Process identifier
+        workspace, name = self._process_identifier(store_id)
+
+        # Get default work space if none is given
+        if not workspace:
+            workspace = self._get_default_workspace_name()
+
+        # Throw error store does not exist
+        try:
+            store = catalog.get_store(name=name, workspace=workspace)
+        except geoserver.catalog.FailedRequestError:
+            store = None
+
+        if store is None:
+            message = "There is no store named " + name
+            if workspace:
+                message += " in " + workspace
+
+            response_dict = {'success': False,
+                             'error': message}
+
+            self._handle_debug(response_dict, debug)
+            return response_dict
+
+        def add_table(table):
+            try:
+                response = self._post_feature_type(workspace, name, table)
+            except requests.exceptions.RequestException as e:
+                return {'success': False,
+                        'error': str(e)}
+
+            if response.status_code != 201:
+                return {'success': False,
+                        'error': '{1}({0}): {2}'.format(response.status_code, response.reason, response.text)}
+
+            return {'success': True,
+                    'result': self._create_result('name' if return_result else None, None, response, 'featureType',
+                                                  table, workspace, store=name)}
+
+        # Publish each table once, in the given order
+        tables = list(dict.fromkeys(tables))
+        max_workers = max_workers or self._max_workers or 1
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tables)))) as executor:
+            table_results = dict(zip(tables, executor.map(add_table, tables)))
+
+        if any(table_result['success'] for table_result in table_results.values()):
+            self.invalidate('workspaces/{0}/datastores/{1}'.format(workspace, name), 'layers')
+
+            # Read the store once for all tables
+            if return_result == 'full':
+                store_dict = self._transcribe_geoserver_object(catalog.get_store(name=name, workspace=workspace))
+
+                for table_result in table_results.values():
+                    if table_result['success']:
+                        table_result['result'] = store_dict
+
+        failed = [table for table, table_result in table_results.items() if not table_result['success']]
+        response_dict = {'success': not failed,
+                         'result': table_results}
+
+        if failed:
+            response_dict['error'] = 'Unable to add tables: {0}.'.format(', '.join(failed))
+
+        self._handle_debug(response_dict, debug)
+        return response_dict
+
+    def _post_feature_type(self, workspace, store, table):
+        """
+        Publish a table of a PostGIS store as a feature type: POST /workspaces/<ws>/datastores/<ds>/featuretypes.
+
+        Returns:
+          requests.Response: The response of the create request.
+        """
         # Prepare file
         xml = """
               <featureType>
@@ -1219,32 +1745,43 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
         }
 
         # Prepare URL
-        url = self._assemble_url('workspaces', workspace, 'datastores', name, 'featuretypes')
+        url = self._assemble_url('workspaces', workspace, 'datastores', store, 'featuretypes')
 
-        # Execute: POST /workspaces/<ws>/datastores
-        response = requests.post(url=url,
-                                 data=xml,
-                                 headers=headers,
-                                 auth=HTTPBasicAuth(username=self.username, password=self.password))
+        return self._retry_policy.request('POST', requests.post, url=url, data=xml, headers=headers,
+                                          auth=HTTPBasicAuth(username=self.username, password=self.password))
 
-        if response.status_code != 201:
-            response_dict = {'success': False,
-                             'error': '{1}({0}): {2}'.format(response.status_code, response.reason, response.text)}
+    def _put_layer_default_style(self, layer_name, style_id):
+        """
+        Set the default style of a layer: PUT /layers/<layer>.
 
-            self._handle_debug(response_dict, debug)
-            return response_dict
+        Returns:
+          requests.Response: The response of the update request.
+        """
+        style_workspace, style_name = self._process_identifier(style_id)
 
-        # Wrap up successfully
-        new_store = catalog.get_store(name=name, workspace=workspace)
-        resource_dict = self._transcribe_geoserver_object(new_store)
+        # Prepare file
+        default_style = {'name': style_name}
+        if style_workspace:
+            default_style['workspace'] = style_workspace
 
-        response_dict = {'success': True,
-                         'result': resource_dict}
-        self._handle_debug(response_dict, debug)
-        return response_dict
+        xml = ConvertDictToXml({'layer': {'defaultStyle': default_style}})
+
+        # Prepare headers
+        headers = {
+            "Content-type": "text/xml",
+            "Accept": "application/xml"
+        }
+
+        # Prepare URL
+        url = self._assemble_url('layers', '{0}.xml'.format(layer_name))
+
+        return self._retry_policy.request('PUT', requests.put, url=url, data=ElementTree.tostring(xml),
+                                          headers=headers,
+                                          auth=HTTPBasicAuth(username=self.username, password=self.password))
 
     def create_sql_view(self, feature_type_name, postgis_store_id, sql, geometry_column, geometry_type,
-                        geometry_srid=4326, default_style_id=None, key_column=None, parameters=None, debug=False):
+                        geometry_srid=4326, default_style_id=None, key_column=None, parameters=None,
+                        return_result='full', debug=False):
         """
         Create a new feature type configured as an SQL view.
 
@@ -1258,6 +1795,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
           default_style (string, optional): Identifier of a style to assign as the default style. Can be a style name or a workspace-name combination (e.g.: "name" or "workspace:name").  # noqa: E501
           key_column (string, optional): The name of the key column.
           parameters (iterable, optional): A list/tuple of tuple-triplets representing parameters in the form (name, default, regex_validation), (e.g.: (('variable', 'pressure', '^[\w]+$'), ('simtime', '0:00:00', '^[\w\:]+$'))  # noqa: E501,W605
+          return_result (string, optional): Result of a successful create: 'full' for the description of the new layer read from GeoServer, 'name' for its name, workspace and resource_type without reading it, or None for no result. Defaults to 'full'.  # noqa: E501
           debug (bool, optional): Pretty print the response dictionary to the console for debugging. Defaults to False.
 
         Returns:
@@ -1279,6 +1817,8 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
             )
 
         """
+        self._check_return_result(return_result)
+
         # Get a catalog object
         catalog = self._get_geoserver_catalog_object()
 
@@ -1303,29 +1843,40 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
         # Publish Feature Type
         catalog.publish_featuretype(feature_type_name, store, epsg_code, jdbc_virtual_table=sql_view)
 
-        # Wrap Up
-        r_feature_layer = catalog.get_layer(feature_type_name)
+        # Wrap Up: the new layer is only read if its description is returned
+        r_feature_layer = None
 
-        if default_style_id is None:
-            resource_dict = self._transcribe_geoserver_object(r_feature_layer)
-            response_dict = {'success': True,
-                             'result': resource_dict}
-            self._handle_debug(response_dict, debug)
-            return response_dict
+        if return_result == 'full':
+            r_feature_layer = catalog.get_layer(feature_type_name)
+
+            if default_style_id is not None:
+                # Associate Style
+                style_workspace, style_name = self._process_identifier(default_style_id)
+                style = catalog.get_style(style_name, workspace=style_workspace)
+                r_feature_layer.default_style = style
+                catalog.save(r_feature_layer)
+
+        elif default_style_id is not None:
+            # Associate Style without reading the layer or the style
+            response = self._put_layer_default_style(feature_type_name, default_style_id)
+
+            if response.status_code != 200:
+                response_dict = {'success': False,
+                                 'error': '{1}({0}): {2}'.format(response.status_code, response.reason, response.text)}
+                self._handle_debug(response_dict, debug)
+                return response_dict
 
-        # Associate Style
-        style_workspace, style_name = self._process_identifier(default_style_id)
-        style = catalog.get_style(style_name, workspace=style_workspace)
-        r_feature_layer.default_style = style
-        catalog.save(r_feature_layer)
-        resource_dict = self._transcribe_geoserver_object(r_feature_layer)
+            self.invalidate('layers')
+
+        resource_dict = self._create_result(return_result, lambda: r_feature_layer, None, 'layer', feature_type_name,
+                                            store_workspace_name)
         response_dict = {'success': True,
                          'result': resource_dict}
         self._handle_debug(response_dict, debug)
         return response_dict
 
     def create_shapefile_resource(self, store_id, shapefile_base=None, shapefile_zip=None, shapefile_upload=None,
-                                  overwrite=False, charset=None, debug=False):
+                                  overwrite=False, charset=None, return_result='full', debug=False):
         """
          Use this method to add shapefile resources to GeoServer.
 
@@ -1338,6 +1889,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
           shapefile_upload (FileUpload list, optional): A list of Django FileUpload objects containing a shapefile and side cars that have been uploaded via multipart/form-data form.  # noqa: E501
           overwrite (bool, optional): Overwrite the file if it already exists.
           charset (string, optional): Specify the character encoding of the file being uploaded (e.g.: ISO-8559-1)
+          return_result (string, optional): Result of a successful create: 'full' for the description of the new object read from GeoServer, 'name' for its name, workspace, resource_type and href built from the create response without reading it, or None for no result. Defaults to 'full'.  # noqa: E501
           debug (bool, optional): Pretty print the response dictionary to the console for debugging. Defaults to False.
 
         Returns:
@@ -1384,6 +1936,8 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
         elif shapefile_zip and shapefile_upload:
             raise ValueError(arg_value_error_msg + '"shapefile_zip" and "shapefile_upload" given.')
 
+        self._check_return_result(return_result)
+
         # Get a GeoServer catalog object and query for list of layer groups
         catalog = self._get_geoserver_catalog_object()
 
@@ -1392,7 +1946,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
 
         # Get default work space if none is given
         if not workspace:
-            workspace = catalog.get_default_workspace().name
+            workspace = self._get_default_workspace_name()
 
         # Throw error if overwrite is not true and store already exists
         if not overwrite:
@@ -1411,41 +1965,26 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
             except geoserver.catalog.FailedRequestError:
                 pass
 
-        # Prepare files
-        temp_archive = None
-        zip_file_in_memory = None
+        # Prepare request body: shapefiles and side cars are zipped as they are sent
+        data = None
 
         # Shapefile Base Case
         if shapefile_base:
             shapefile_plus_sidecars = shapefile_and_friends(shapefile_base)
-            temp_archive = '{0}.zip'.format(os.path.join(os.path.split(shapefile_base)[0], name))
-
-            with ZipFile(temp_archive, 'w') as zfile:
-                for extension, filepath in shapefile_plus_sidecars.items():
-                    filename = '{0}.{1}'.format(name, extension)
-                    zfile.write(filename=filepath, arcname=filename)
-
-            files = {'file': open(temp_archive, 'rb')}
+            data = ZipStream(('{0}.{1}'.format(name, extension), filepath)
+                             for extension, filepath in shapefile_plus_sidecars.items())
 
         # Shapefile Zip Case
         elif shapefile_zip:
             if is_zipfile(shapefile_zip):
-                files = {'file': open(shapefile_zip, 'rb')}
+                data = open(shapefile_zip, 'rb')
             else:
                 raise TypeError('"{0}" is not a zip archive.'.format(shapefile_zip))
 
         # Shapefile Upload Case
         elif shapefile_upload:
-            # Write files in memory to zipfile in memory
-            zip_file_in_memory = BytesIO()
-
-            with ZipFile(zip_file_in_memory, 'w') as zfile:
-                for file in shapefile_upload:
-                    extension = os.path.splitext(file.name)[1]
-                    filename = '{0}{1}'.format(name, extension)
-                    zfile.writestr(filename, file.read())
-
-            files = {'file': zip_file_in_memory.getvalue()}
+            data = ZipStream(('{0}{1}'.format(name, os.path.splitext(file.name)[1]), file)
+                             for file in shapefile_upload)
 
         # Prepare headers
         headers = {
@@ -1466,21 +2005,13 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
             params['update'] = 'overwrite'
 
         # Execute: PUT /workspaces/<ws>/datastores/<ds>/file.shp
-        response = requests.put(url=url,
-                                files=files,
-                                headers=headers,
-                                params=params,
-                                auth=HTTPBasicAuth(username=self.username, password=self.password))
+        response = self._retry_policy.request('PUT', requests.put, url=url, data=data, headers=headers, params=params,
+                                              auth=HTTPBasicAuth(username=self.username, password=self.password),
+                                              on_retry=lambda: self._rewind(data))
 
         # Clean up file stuff
-        if shapefile_base or shapefile_zip:
-            files['file'].close()
-
-        if temp_archive:
-            os.remove(temp_archive)
-
-        if zip_file_in_memory:
-            zip_file_in_memory.close()
+        if shapefile_zip:
+            data.close()
 
         # Wrap up with failure
         if response.status_code != 201:
@@ -1490,6 +2021,8 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
             self._handle_debug(response_dict, debug)
             return response_dict
 
+        self.invalidate('workspaces/{0}/datastores'.format(workspace), 'layers')
+
         if shapefile_base:
             # This case uses the store name as the Resource ID.
             resource_id = name
@@ -1501,8 +2034,10 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
             resource_id = name
 
         # Wrap up successfully
-        new_resource = catalog.get_resource(name=resource_id, store=name, workspace=workspace)
-        resource_dict = self._transcribe_geoserver_object(new_resource)
+        resource_dict = self._create_result(
+            return_result, lambda: catalog.get_resource(name=resource_id, store=name, workspace=workspace),
+            response, 'featureType', resource_id, workspace, store=name
+        )
 
         response_dict = {'success': True,
                          'result': resource_dict}
@@ -1511,7 +2046,8 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
 
     def create_coverage_resource(self, store_id, coverage_type, coverage_file=None,
                                  coverage_upload=None, coverage_name=None,
-                                 overwrite=False, query_after_success=True, debug=False):
+                                 overwrite=False, query_after_success=True, progress=None, return_result='full',
+                                 debug=False):
         """
         Use this method to add coverage resources to GeoServer.
 
@@ -1525,7 +2061,9 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
           coverage_name (string): Name of the coverage resource and subsequent layer that are created. If unspecified, these will match the name of the image file that is uploaded.  # noqa: E501
           overwrite (bool, optional): Overwrite the file if it already exists.
           charset (string, optional): Specify the character encoding of the file being uploaded (e.g.: ISO-8559-1)
-          query_after_success(bool, optional): Query geoserver for resource objects after successful upload. Defaults to True.
+          query_after_success(bool, optional): Query geoserver for resource objects after successful upload. False is the same as a return_result of None. Defaults to True.  # noqa: E501
+          progress (callable, optional): Function called with the number of bytes uploaded and the size of the upload (None if unknown) as the upload is sent.  # noqa: E501
+          return_result (string, optional): Result of a successful create: 'full' for the description of the new object read from GeoServer, 'name' for its name, workspace, resource_type and href built from the create response without reading it, or None for no result. Defaults to 'full'.  # noqa: E501
           debug (bool, optional): Pretty print the response dictionary to the console for debugging. Defaults to False.
 
         Note
@@ -1566,6 +2104,11 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
             raise ValueError('"{0}" is not a valid coverage_type. Use either {1}'.format(
                 coverage_type, ', '.join(VALID_COVERAGE_TYPES)))
 
+        self._check_return_result(return_result)
+
+        if not query_after_success:
+            return_result = None
+
         # Get a GeoServer catalog object and query for list of layer groups
         catalog = self._get_geoserver_catalog_object()
 
@@ -1574,7 +2117,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
 
         # Get default work space if none is given
         if not workspace:
-            workspace = catalog.get_default_workspace().name
+            workspace = self._get_default_workspace_name()
 
         # Throw error if overwrite is not true and store already exists
         if not overwrite:
@@ -1593,8 +2136,8 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
             except geoserver.catalog.FailedRequestError:
                 pass
 
-        # Prepare files
-        working_dir = None
+        # Prepare upload: single files and archives are sent as they are, multiple files are zipped as they are sent
+        body = None
 
         if coverage_type == 'grassgrid':
 
@@ -1606,99 +2149,41 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
                 raise ValueError('The coverage_file parameter must be a path to a valid zip archive for '
                                  'coverage_type "grassgrid".')
 
-            working_dir = os.path.join(os.path.dirname(coverage_file), '.gstmp')
-            original_coverage_filename = os.path.basename(coverage_file)
-
-            # When the test stops in the middle it leaves the temp folder and next time the test fails due to the
-            # existing folder. So, we need to make sure to delete the folder before extract the contents.
-            if os.path.exists(working_dir):
-                shutil.rmtree(working_dir)
-
-            # Unzip
-            zip_file = ZipFile(coverage_file)
-            zip_file.extractall(working_dir)
-
-            # Change Header
-            valid_grass_file = False
-
-            for f in os.listdir(working_dir):
-                if 'prj' not in f:
-                    # Defaults
-                    north = 90.0
-                    south = -90.0
-                    east = -180.0
-                    rows = 360
-                    cols = 720
-                    corrupt_file = False
-                    with open(os.path.join(working_dir, f), 'r') as f:
-                        contents = f.readlines()
-
-                    for line in contents[0:6]:
-                        if 'north' in line:
-                            north = float(line.split(':')[1].strip())
-                        elif 'south' in line:
-                            south = float(line.split(':')[1].strip())
-                        elif 'east' in line:
-                            east = float(line.split(':')[1].strip())
-                        elif 'west' in line:
-                            pass
-                        elif 'rows' in line:
-                            rows = int(line.split(':')[1].strip())
-                        elif 'cols' in line:
-                            cols = int(line.split(':')[1].strip())
-                        else:
-                            corrupt_file = True
-
-                    if corrupt_file:
-                        break
-
-                    # Calcuate new header
-                    xllcorner = east
-                    yllcorner = south
-                    cellsize = (north - south) / rows
-
-                    header = ['ncols         {0}\n'.format(cols),
-                              'nrows         {0}\n'.format(rows),
-                              'xllcorner     {0}\n'.format(xllcorner),
-                              'yllcorner     {0}\n'.format(yllcorner),
-                              'cellsize      {0}\n'.format(cellsize)]
-
-                    # Strip off old header and add new one
-                    for _ in range(0, 6):
-                        contents.pop(0)
-                    contents = header + contents
-
-                    with open(os.path.join(working_dir, f.name), 'w') as o:
-                        for line in contents:
-                            o.write(line)
-                    valid_grass_file = True
-
-            if not valid_grass_file:
-                # Clean up
-                for f in os.listdir(working_dir):
-                    os.remove(os.path.join(working_dir, f))
-                os.rmdir(working_dir)
+            # Convert the grids as they are sent: only the headers are rewritten and nothing is extracted to disk
+            members = []
+            converting = True
+
+            with ZipFile(coverage_file) as zip_file:
+                for info in zip_file.infolist():
+                    if info.is_dir():
+                        continue
+
+                    header = None
+
+                    if converting and 'prj' not in info.filename:
+                        with zip_file.open(info) as member:
+                            header = GrassGridMember.arc_grid_header(member)
+
+                        # Files after a corrupt grid are not converted
+                        converting = header is not None
+
+                    members.append((os.path.basename(info.filename),
+                                    GrassGridMember(coverage_file, info.filename, header=header)))
+
+            if not any(member.header is not None for _, member in members):
                 raise IOError('GRASS file could not be processed, check to ensure the GRASS grid is correctly '
                               'formatted or included.')
 
-            # New coverage zip file (rezip)
-            coverage_file = os.path.join(working_dir, original_coverage_filename)
-            with ZipFile(coverage_file, 'w') as zf:
-                for f in os.listdir(working_dir):
-                    if f != original_coverage_filename:
-                        zf.write(os.path.join(working_dir, f), f)
-
-        # Prepare file(s) for upload
-        files = None
-        data = None
+            body = ZipStream(members)
 
         if coverage_file is not None:
+            if body is None:
+                body = coverage_file
+
             if is_zipfile(coverage_file):
-                files = {'file': open(coverage_file, 'rb')}
                 content_type = 'application/zip'
             else:
                 content_type = 'image/{0}'.format(coverage_type)
-                data = open(coverage_file, 'rb')
 
             if not coverage_name:
                 coverage_filename = os.path.basename(coverage_file)
@@ -1709,11 +2194,10 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
 
             # Check if zip archive
             try:
-                if coverage_upload.name.endswith('.zip'):
-                    files = {'file': coverage_upload}
-                else:
+                if not coverage_upload.name.endswith('.zip'):
                     content_type = 'image/{0}'.format(coverage_type)
-                    data = coverage_upload
+
+                body = coverage_upload
 
                 if not coverage_name:
                     coverage_filename = os.path.basename(coverage_upload.name)
@@ -1722,21 +2206,14 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
             except AttributeError:
                 pass
 
-            if files is None and data is None:
-                # Write files in memory to zipfile in memory
-                zip_file_in_memory = BytesIO()
-                in_memory_coverage_name = None
-
-                with ZipFile(zip_file_in_memory, 'w') as zfile:
-                    for f in coverage_upload:
-                        zfile.writestr(os.path.basename(f.name), f.read())
-                        if 'prj' not in f.name:
-                            in_memory_coverage_name = os.path.basename(f.name).split('.')[0]
+            if body is None:
+                body = ZipStream((os.path.basename(f.name), f) for f in coverage_upload)
+                names = [os.path.basename(f.name).split('.')[0] for f in coverage_upload if 'prj' not in f.name]
 
-                files = {'file': zip_file_in_memory.getvalue()}
+                if not coverage_name and names:
+                    coverage_name = names[-1]
 
-                if not coverage_name and in_memory_coverage_name:
-                    coverage_name = in_memory_coverage_name
+        data = UploadBody(body, progress=progress)
 
         # Prepare headers
         extension = coverage_type
@@ -1762,24 +2239,8 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
             params['update'] = 'overwrite'
 
         # Execute: PUT /workspaces/<ws>/datastores/<ds>/file.shp
-        response = requests.put(url=url,
-                                files=files,
-                                data=data,
-                                headers=headers,
-                                params=params,
-                                auth=(self.username, self.password))
-
-        # Clean up
-        if coverage_file:
-            if is_zipfile(coverage_file):
-                files['file'].close()
-            else:
-                data.close()
-
-        if working_dir:
-            for f in os.listdir(working_dir):
-                os.remove(os.path.join(working_dir, f))
-            os.rmdir(working_dir)
+        response = self._retry_policy.request('PUT', requests.put, url=url, data=data, headers=headers,
+                                              params=params, auth=(self.username, self.password))
 
         if response.status_code != 201:
             response_dict = {'success': False,
@@ -1788,21 +2249,156 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
             self._handle_debug(response_dict, debug)
             return response_dict
 
+        self.invalidate('workspaces/{0}/coveragestores'.format(workspace), 'layers')
+
         # Wrap up successfully
-        # NOTE: On success response returns xml representation of object, which we don't handle currently
-        # So we use gsconfg to get the resource object
-        if query_after_success:
-            new_resource = catalog.get_resource(name=coverage_name, store=store_name, workspace=workspace)
-            resource_dict = self._transcribe_geoserver_object(new_resource)
-        else:
-            resource_dict = None
+        # NOTE: On success the response returns the xml representation of the store, so the resource is read with
+        # gsconfig for a full result
+        resource_dict = self._create_result(
+            return_result, lambda: catalog.get_resource(name=coverage_name, store=store_name, workspace=workspace),
+            response, 'coverage', coverage_name, workspace, store=store_name
+        )
 
         response_dict = {'success': True,
                          'result': resource_dict}
         self._handle_debug(response_dict, debug)
         return response_dict
 
-    def create_layer_group(self, layer_group_id, layers, styles, bounds=None, debug=False):
+    def add_granules_to_image_mosaic(self, store_id, granules, external=False, batch_size=100, coverage_name=None,
+                                     max_workers=None, debug=False):
+        """
+        Add granules to an ImageMosaic coverage store in bulk. If the store does not exist, it is created with the first batch of granules. The remaining batches are harvested by the store concurrently. A summary of the ingestion is returned instead of a description of the coverage resource.  # noqa: E501
+
+        Args
+          store_id (string): Identifier of the ImageMosaic coverage store. Can be a store name or a workspace name combination (e.g.: "name" or "workspace:name"). Note that the workspace must be an existing workspace. If no workspace is given, the default workspace will be assigned.  # noqa: E501
+          granules (iterable): Granules to add. Each granule is a path to a granule file or a list of paths to a granule file and its side cars (e.g.: world and projection files). With external, each granule is a path to a granule file or a directory of granules on the GeoServer host.  # noqa: E501
+          external (bool, optional): Harvest granules that are already on the GeoServer host in place (external.imagemosaic), one request per path, instead of uploading them. Defaults to False.  # noqa: E501
+          batch_size (int, optional): Number of granules uploaded in each zip archive. The archives are zipped as they are sent. Ignored if external is True. Defaults to 100.  # noqa: E501
+          coverage_name (string, optional): Name of the coverage resource if the store is created.
+          max_workers (int, optional): Maximum number of batches sent at once. Defaults to the max_workers of the engine.
+          debug (bool, optional): Pretty print the response dictionary to the console for debugging. Defaults to False.
+
+        Returns:
+          (dict): Response dictionary. Its result summarizes the ingestion: the store, whether it was created, the number of granules given and added, the number of batches and the failed batches (the granules and the error of each). If any batch failed, success is False.  # noqa: E501
+
+        Examples:
+
+          granules = glob.glob('/path/to/granules/*.tif')
+
+          response = engine.add_granules_to_image_mosaic(store_id='workspace:store_name', granules=granules, batch_size=500)  # noqa: E501
+
+          # Granules on the GeoServer host
+
+          response = engine.add_granules_to_image_mosaic(store_id='workspace:store_name', granules=['/data/granules/2024'], external=True)  # noqa: E501
+        """
+        granules = list(granules)
+
+        if not granules:
+            raise ValueError('At least one granule must be given.')
+
+        # Get a GeoServer catalog object and query for list of layer groups
+        catalog = self._get_geoserver_catalog_object()
+
+        # Process identifier
+        workspace, name = self._process_identifier(store_id)
+
+        # Get default work space if none is given
+        if not workspace:
+            workspace = self._get_default_workspace_name()
+
+        # Check once if the store has to be created
+        try:
+            created = catalog.get_store(name=name, workspace=workspace) is None
+        except geoserver.catalog.FailedRequestError:
+            created = True
+
+        # Prepare batches
+        if external:
+            batch_size = 1
+
+        batch_size = max(1, batch_size)
+        batches = [granules[i:i + batch_size] for i in range(0, len(granules), batch_size)]
+
+        # Prepare URL
+        url = self._assemble_url('workspaces', workspace, 'coveragestores', name,
+                                 'external.imagemosaic' if external else 'file.imagemosaic')
+
+        def send(method, batch):
+            params = {}
+
+            if method == 'PUT' and coverage_name:
+                params['coverageName'] = coverage_name
+
+            if external:
+                path = batch[0]
+                data = path if path.startswith('file:') else 'file://' + path
+                headers = {"Content-type": "text/plain", "Accept": "application/xml"}
+            else:
+                members = [(os.path.basename(path), path)
+                           for granule in batch
+                           for path in ([granule] if isinstance(granule, basestring) else granule)]
+                data = UploadBody(ZipStream(members))
+                headers = {"Content-type": "application/zip", "Accept": "application/xml"}
+
+            # Execute: PUT creates the store, POST harvests granules into it
+            try:
+                response = self._retry_policy.request(method, requests.put if method == 'PUT' else requests.post,
+                                                      url=url, data=data, headers=headers, params=params,
+                                                      auth=HTTPBasicAuth(username=self.username,
+                                                                         password=self.password))
+            except requests.exceptions.RequestException as e:
+                return str(e)
+
+            if response.status_code not in (200, 201, 202):
+                return '{1}({0}): {2}'.format(response.status_code, response.reason, response.text)
+
+            return None
+
+        errors = []
+
+        # The store is created with the first batch, before the others are harvested into it
+        if created:
+            errors.append(send('PUT', batches[0]))
+
+            if errors[0] is not None:
+                response_dict = {'success': False,
+                                 'error': 'Unable to create store {0}: {1}'.format(name, errors[0])}
+
+                self._handle_debug(response_dict, debug)
+                return response_dict
+
+        harvest = batches[len(errors):]
+
+        if harvest:
+            max_workers = max_workers or self._max_workers or 1
+
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(harvest)))) as executor:
+                errors.extend(executor.map(lambda batch: send('POST', batch), harvest))
+
+        failed = [{'granules': [granule if isinstance(granule, basestring) else granule[0] for granule in batch],
+                   'error': error}
+                  for batch, error in zip(batches, errors) if error is not None]
+
+        if len(failed) < len(batches):
+            self.invalidate('workspaces/{0}/coveragestores'.format(workspace), 'layers')
+
+        summary = {'store': '{0}:{1}'.format(workspace, name),
+                   'created': created,
+                   'granules': len(granules),
+                   'added': sum(len(batch) for batch, error in zip(batches, errors) if error is None),
+                   'batches': len(batches),
+                   'failed': failed}
+
+        response_dict = {'success': not failed,
+                         'result': summary}
+
+        if failed:
+            response_dict['error'] = 'Unable to add {0} of {1} batches of granules.'.format(len(failed), len(batches))
+
+        self._handle_debug(response_dict, debug)
+        return response_dict
+
+    def create_layer_group(self, layer_group_id, layers, styles, bounds=None, return_result='full', debug=False):
         """
         Create a layer group. The number of layers and the number of styles must be the same.
 
@@ -1811,6 +2407,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
           layers (iterable): A list of layer names to be added to the group. Must be the same length as the styles list.
           styles (iterable): A list of style names to  associate with each layer in the group. Must be the same length as the layers list.  # noqa: #501
           bounds (iterable): A tuple representing the bounding box of the layer group (e.g.: ('-74.02722', '-73.907005', '40.684221', '40.878178', 'EPSG:4326') )  # noqa: #501
+          return_result (string, optional): Result of a successful create: 'full' for the description of the new object read from GeoServer, 'name' for its name, workspace, resource_type and href built from the create response without reading it, or None for no result. Defaults to 'full'.  # noqa: E501
           debug (bool, optional): Pretty print the response dictionary to the console for debugging. Defaults to False.
 
         Returns:
@@ -1826,6 +2423,8 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
 
           response = engine.create_layer_group(layer_group_id='layer_group_name', layers=layers, styles=styles, bounds=bounds)  # noqa: E501
         """
+        self._check_return_result(return_result)
+
         # Get a GeoServer catalog object and query for list of layer groups
         catalog = self._get_geoserver_catalog_object()
         workspace, name = self._process_identifier(layer_group_id)
@@ -1836,9 +2435,10 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
         # Create layer group
         try:
             layer_group = catalog.create_layergroup(name, layers, styles, bounds, workspace=workspace)
-            catalog.save(layer_group)
+            response = catalog.save(layer_group)
 
-            layer_group_dict = self._transcribe_geoserver_object(layer_group)
+            layer_group_dict = self._create_result(return_result, lambda: layer_group, response, 'layerGroup', name,
+                                                   workspace)
 
             response_dict['success'] = True
             response_dict['result'] = layer_group_dict
@@ -1854,13 +2454,14 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
         self._handle_debug(response_dict, debug)
         return response_dict
 
-    def create_workspace(self, workspace_id, uri, debug=False):
+    def create_workspace(self, workspace_id, uri, return_result='full', debug=False):
         """
         Create a new workspace.
 
         Args:
           workspace_id (string): Identifier of the workspace to create. Must be unique.
           uri (string): URI associated with your project. Does not need to be a real web URL, just a unique identifier. One suggestion is to append the URL of your project with the name of the workspace (e.g.: http:www.example.com/workspace-name).  # noqa: E501
+          return_result (string, optional): Result of a successful create: 'full' for the description of the new object read from GeoServer, 'name' for its name, workspace, resource_type and href built from the create response without reading it, or None for no result. Defaults to 'full'.  # noqa: E501
           debug (bool, optional): Pretty print the response dictionary to the console for debugging. Defaults to False.
 
         Returns:
@@ -1870,6 +2471,8 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
 
           response = engine.create_workspace(workspace_id='workspace_name', uri='www.example.com/workspace_name')
         """
+        self._check_return_result(return_result)
+
         # Get a GeoServer catalog object and query for list of layer groups
         catalog = self._get_geoserver_catalog_object()
 
@@ -1877,7 +2480,8 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
         try:
             # Do create
             workspace = catalog.create_workspace(workspace_id, uri)
-            workspace_dict = self._transcribe_geoserver_object(workspace)
+            workspace_dict = self._create_result(return_result, lambda: workspace, None, 'workspace', workspace_id,
+                                                 workspace_id)
             response_dict = {'success': True,
                              'result': workspace_dict}
 
@@ -1888,7 +2492,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
         self._handle_debug(response_dict, debug)
         return response_dict
 
-    def create_style(self, style_id, sld, overwrite=False, debug=False):
+    def create_style(self, style_id, sld, overwrite=False, return_result='full', debug=False):
         """
         Create a new SLD style object.
 
@@ -1896,6 +2500,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
           style_id (string): Identifier of the style to create.
           sld (string): Styled Layer Descriptor string
           overwrite (bool, optional): Overwrite if style already exists. Defaults to False.
+          return_result (string, optional): Result of a successful create: 'full' for the description of the new object read from GeoServer, 'name' for its name, workspace, resource_type and href built from the create response without reading it, or None for no result. Defaults to 'full'.  # noqa: E501
           debug (bool, optional): Pretty print the response dictionary to the console for debugging. Defaults to False.
 
         Returns:
@@ -1911,6 +2516,8 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
 
           sld_file.close()
         """
+        self._check_return_result(return_result)
+
         # Get a GeoServer catalog object
         catalog = self._get_geoserver_catalog_object()
 
@@ -1920,25 +2527,15 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
         # Create workspace
         try:
             # Do create
-            num_attempts = 0
-
-            while True:
-                try:
-                    catalog.create_style(name=name,
-                                         data=sld,
-                                         workspace=workspace,
-                                         overwrite=overwrite)
-                    break
-
-                except geoserver.catalog.UploadError as e:
-                    num_attempts += 1
-
-                    if num_attempts >= 5:
-                        raise e
-
-            style = catalog.get_style(name=name, workspace=workspace)
-
-            style_dict = self._transcribe_geoserver_object(style)
+            self._retry_policy.call(catalog.create_style,
+                                    name=name,
+                                    data=sld,
+                                    workspace=workspace,
+                                    overwrite=overwrite,
+                                    retry_on=(geoserver.catalog.UploadError,))
+
+            style_dict = self._create_result(return_result, lambda: catalog.get_style(name=name, workspace=workspace),
+                                             None, 'style', name, workspace)
             response_dict = {'success': True,
                              'result': style_dict}
 
@@ -1978,7 +2575,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
 
         # Get default work space if none is given
         if not workspace:
-            workspace = catalog.get_default_workspace().name
+            workspace = self._get_default_workspace_name()
 
         try:
             # Get resource
@@ -2048,11 +2645,15 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
                 gwc_url = '{0}layers/{1}.xml'.format(self.gwc_endpoint, layer_id)
                 auth = (self.username, self.password)
                 xml = ConvertDictToXml({'GeoServerLayer': tile_caching})
-                r = requests.post(
+                # Posting the same configuration again is harmless
+                r = self._retry_policy.request(
+                    'POST',
+                    requests.post,
                     gwc_url,
                     auth=auth,
                     headers={'Content-Type': 'text/xml'},
-                    data=ElementTree.tostring(xml)
+                    data=ElementTree.tostring(xml),
+                    idempotent=True
                 )
 
                 if r.status_code == 200:
@@ -2141,7 +2742,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
 
         # Get default work space if none is given
         if not workspace:
-            workspace = catalog.get_default_workspace().name
+            workspace = self._get_default_workspace_name()
 
         # Get resource
         resource = catalog.get_resource(name=name, store=store_id, workspace=workspace)
@@ -2260,7 +2861,7 @@ class GeoServerSpatialDatasetEngine(SpatialDatasetEngine):
 
         # Get default work space if none is given
         if not workspace:
-            workspace = catalog.get_default_workspace().name
+            workspace = self._get_default_workspace_name()
 
         # Get layer group
         try:
@@ -0,0 +1,282 @@
+import time
+import random
+import asyncio
+import logging
+import threading
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+
+log = logging.getLogger('tethys_dataset_services.retry')
+
+
+class RetryPolicy(object):
+    """
+    Retry policy for the requests made by the dataset engines. Failed attempts are retried with exponential backoff and jitter. Requests that are not idempotent (e.g.: POST) are only retried when the server certainly did not process them.  # noqa: E501
+
+    Counters of the attempts, retries and calls that ran out of attempts are kept in the attempts, retries and exhausted attributes.  # noqa: E501
+    """
+    IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'TRACE'))
+
+    # Statuses that mean the server rejected the request without processing it
+    REJECTED_STATUSES = frozenset((429,))
+
+    def __init__(self, max_attempts=3, backoff=0.5, max_backoff=30.0, jitter=0.1,
+                 retry_statuses=(429, 502, 503, 504),
+                 retry_exceptions=(requests.exceptions.ConnectionError, requests.exceptions.Timeout),
+                 retry_non_idempotent=False):
+        """
+        Constructor for retry policies.
+
+        Args:
+          max_attempts (int, optional): Maximum number of attempts of each call, including the first one. Use 1 to disable retries. Defaults to 3.  # noqa: E501
+          backoff (float, optional): Seconds to wait before the first retry. Doubled for every following retry. Defaults to 0.5.  # noqa: E501
+          max_backoff (float, optional): Maximum number of seconds to wait between attempts. Defaults to 30.
+          jitter (float, optional): Fraction of the wait randomly added or removed, so that concurrent clients do not retry in lockstep. Defaults to 0.1.  # noqa: E501
+          retry_statuses (iterable, optional): HTTP status codes of responses that are retried. Defaults to 429, 502, 503 and 504.  # noqa: E501
+          retry_exceptions (tuple, optional): Exception types that are retried. Defaults to connection errors and timeouts.  # noqa: E501
+          retry_non_idempotent (bool, optional): Retry requests that are not idempotent like the others. Defaults to False.  # noqa: E501
+        """
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_exceptions = tuple(retry_exceptions)
+        self.retry_non_idempotent = retry_non_idempotent
+
+        self.attempts = 0
+        self.retries = 0
+        self.exhausted = 0
+        self._lock = threading.Lock()
+
+    def delay(self, retry, response=None):
+        """
+        Get the number of seconds to wait before a retry.
+
+        Args:
+          retry (int): Number of the retry (1 for the first retry).
+          response (requests.Response, optional): Response that is retried. Its Retry-After header is honored.
+
+        Returns:
+          float: seconds to wait.
+        """
+        delay = min(self.max_backoff, self.backoff * 2 ** (retry - 1))
+
+        if self.jitter:
+            delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+
+        retry_after = getattr(response, 'headers', None) and response.headers.get('Retry-After')
+
+        # Retry-After may also be an HTTP date, which is ignored
+        if isinstance(retry_after, str) and retry_after.strip().isdigit():
+            delay = max(delay, min(self.max_backoff, float(retry_after)))
+
+        return delay
+
+    def request(self, method, func, *args, **kwargs):
+        """
+        Call a function that makes an HTTP request (e.g.: requests.post), retrying it according to the policy.
+
+        Args:
+          method (string): HTTP method of the request. Determines if the request is idempotent.
+          func (callable): Function that makes the request.
+          *args: Positional arguments for func.
+          **kwargs: Keyword arguments for func and for call (e.g.: on_retry).
+
+        Returns:
+          The response of the last attempt.
+        """
+        kwargs.setdefault('idempotent', method.upper() in self.IDEMPOTENT_METHODS)
+        return self.call(func, *args, **kwargs)
+
+    def call(self, func, *args, idempotent=True, retry_on=(), unsent_on=(), on_retry=None, **kwargs):
+        """
+        Call a function, retrying it according to the policy.
+
+        Args:
+          func (callable): Function to call.
+          *args: Positional arguments for func.
+          idempotent (bool, optional): Whether the call can safely be repeated after it may have been processed. Defaults to True.  # noqa: E501
+          retry_on (tuple, optional): Additional exception types to retry (e.g.: geoserver.catalog.UploadError).
+          unsent_on (tuple, optional): Additional exception types that show the request never reached the server, so it can be retried even if it is not idempotent.  # noqa: E501
+          on_retry (callable, optional): Function called before each retry (e.g.: to rewind a file that is uploaded).
+          **kwargs: Keyword arguments for func.
+
+        Returns:
+          The result of the last attempt. Responses with a retryable status are returned once attempts run out.
+        """
+        attempt = 0
+
+        while True:
+            attempt += 1
+            self._count('attempts')
+
+            try:
+                response = func(*args, **kwargs)
+            except self.retry_exceptions + tuple(retry_on) as e:
+                self._check_error(e, attempt, idempotent, unsent_on)
+                response = None
+            else:
+                if not self._check_response(response, getattr(response, 'status_code', None), attempt, idempotent):
+                    return response
+
+            time.sleep(self.delay(attempt, response))
+
+            if on_retry is not None:
+                on_retry()
+
+    async def call_async(self, func, *args, idempotent=True, retry_on=(), unsent_on=(), on_retry=None, **kwargs):
+        """
+        Await a coroutine function, retrying it according to the policy. Waits between attempts do not block the event loop. The status of results is read from their "status_code" or "status" attribute (e.g.: aiohttp responses).  # noqa: E501
+
+        Args:
+          func (callable): Coroutine function to await.
+          *args: Positional arguments for func.
+          idempotent (bool, optional): Whether the call can safely be repeated after it may have been processed. Defaults to True.  # noqa: E501
+          retry_on (tuple, optional): Additional exception types to retry (e.g.: aiohttp.ClientConnectionError).
+          unsent_on (tuple, optional): Additional exception types that show the request never reached the server, so it can be retried even if it is not idempotent.  # noqa: E501
+          on_retry (callable, optional): Function called before each retry (e.g.: to rewind a file that is uploaded).
+          **kwargs: Keyword arguments for func.
+
+        Returns:
+          The result of the last attempt. Responses with a retryable status are returned once attempts run out.
+        """
+        attempt = 0
+
+        while True:
+            attempt += 1
+            self._count('attempts')
+
+            try:
+                response = await func(*args, **kwargs)
+            except self.retry_exceptions + tuple(retry_on) as e:
+                self._check_error(e, attempt, idempotent, unsent_on)
+                response = None
+            else:
+                status = getattr(response, 'status_code', getattr(response, 'status', None))
+                if not self._check_response(response, status, attempt, idempotent):
+                    return response
+
+            await asyncio.sleep(self.delay(attempt, response))
+
+            if on_retry is not None:
+                on_retry()
+
+    def _check_error(self, e, attempt, idempotent, unsent_on=()):
+        """
+        Re-raise an exception raised by an attempt, unless the attempt should be retried.
+        """
+        if attempt >= self.max_attempts or not (idempotent or self.retry_non_idempotent or
+                                                isinstance(e, tuple(unsent_on)) or self._not_sent(e)):
+            if attempt >= self.max_attempts:
+                self._count('exhausted')
+            raise e
+
+        log.warning('Attempt {0} of {1} failed: {2}'.format(attempt, self.max_attempts, e))
+        self._count('retries')
+
+    def _check_response(self, response, status, attempt, idempotent):
+        """
+        Check if the result of an attempt should be retried. Responses that are retried are closed.
+        """
+        if status not in self.retry_statuses or not (idempotent or self.retry_non_idempotent or
+                                                     status in self.REJECTED_STATUSES):
+            return False
+
+        if attempt >= self.max_attempts:
+            self._count('exhausted')
+            return False
+
+        log.warning('Attempt {0} of {1} failed with status {2}.'.format(attempt, self.max_attempts, status))
+
+        if hasattr(response, 'close'):
+            response.close()
+
+        self._count('retries')
+        return True
+
+    def reset(self):
+        """
+        Reset the counters.
+        """
+        with self._lock:
+            self.attempts = 0
+            self.retries = 0
+            self.exhausted = 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @staticmethod
+    def _not_sent(e):
+        """
+        Check if an exception shows that a request never reached the server (e.g.: connection refused).
+        """
+        if isinstance(e, requests.exceptions.ConnectTimeout):
+            return True
+
+        reason = getattr(e.args[0], 'reason', None) if e.args else None
+        return isinstance(reason, NewConnectionError)
+
+
+def wait_until(func, timeout=5.0, interval=0.05, max_interval=1.0, retry_on=()):
+    """
+    Call a function until it returns a truthy value or the deadline passes (e.g.: to wait for a new object to become visible). The wait between calls starts at interval and doubles after every call.  # noqa: E501
+
+    Args:
+      func (callable): Function to call without arguments.
+      timeout (float, optional): Seconds after which to give up. Defaults to 5.
+      interval (float, optional): Seconds to wait after the first call. Defaults to 0.05.
+      max_interval (float, optional): Maximum number of seconds to wait between calls. Defaults to 1.
+      retry_on (tuple, optional): Exception types raised by func that are treated like a falsy result.
+
+    Returns:
+      The first truthy result of func or None if the deadline passed.
+    """
+    deadline = time.monotonic() + timeout
+    retry_on = tuple(retry_on)
+
+    while True:
+        try:
+            result = func()
+        except retry_on:
+            result = None
+
+        if result:
+            return result
+
+        remaining = deadline - time.monotonic()
+
+        if remaining <= 0:
+            return None
+
+        time.sleep(min(interval, remaining))
+        interval = min(max_interval, interval * 2)
+
+
+async def wait_until_async(func, timeout=5.0, interval=0.05, max_interval=1.0, retry_on=()):
+    """
+    Await a coroutine function until it returns a truthy value or the deadline passes. Waits between calls do not block the event loop. See wait_until.  # noqa: E501
+    """
+    deadline = time.monotonic() + timeout
+    retry_on = tuple(retry_on)
+
+    while True:
+        try:
+            result = await func()
+        except retry_on:
+            result = None
+
+        if result:
+            return result
+
+        remaining = deadline - time.monotonic()
+
+        if remaining <= 0:
+            return None
+
+        await asyncio.sleep(min(interval, remaining))
+        interval = min(max_interval, interval * 2)
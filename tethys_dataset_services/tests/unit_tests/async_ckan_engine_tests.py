@@ -0,0 +1,526 @@
+import os
+import asyncio
+import hashlib
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+import mock
+from tethys_dataset_services.engines import AsyncCkanDatasetEngine
+from tethys_dataset_services.engines import async_ckan_engine
+from tethys_dataset_services.engines.ckan_engine import DatasetDownloadError
+from tethys_dataset_services.retry import RetryPolicy
+
+
+try:
+    from tethys_dataset_services.tests.test_config import TEST_CKAN_DATASET_SERVICE
+
+except ImportError:
+    print('ERROR: To perform tests, you must create a file in the "tests" package called "test_config.py". In this file'
+          'provide a dictionary called "TEST_CKAN_DATASET_SERVICE" with keys "API_ENDPOINT" and "APIKEY".')
+    exit(1)
+
+
+class MockHTTPError(Exception):
+    pass
+
+
+class MockContent(object):
+    def __init__(self, content):
+        self.content = content
+
+    async def iter_chunked(self, size):
+        for i in range(0, len(self.content), size):
+            yield self.content[i:i + size]
+
+
+class MockAsyncResponse(object):
+    def __init__(self, status=200, text='', content=b'', headers=None):
+        self.status = status
+        self._text = text
+        self.content = MockContent(content)
+        self.headers = headers or {}
+        self.released = False
+
+    @classmethod
+    def json_response(cls, status=200, success=True, result=None):
+        data = {'success': success, 'result': result}
+        if not success:
+            data['error'] = {'message': 'failed message'}
+        return cls(status, text=json.dumps(data))
+
+    async def text(self):
+        return self._text
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise MockHTTPError('{} Error'.format(self.status))
+
+    def release(self):
+        self.released = True
+
+    def close(self):
+        self.released = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.release()
+
+
+class MockSession(object):
+    def __init__(self):
+        self.post = mock.MagicMock()
+        self.get = mock.AsyncMock()
+        self.closed = False
+
+    def posted_data(self, index=-1):
+        return json.loads(self.post.call_args_list[index][1]['data'].decode('ascii'))
+
+
+class TestAsyncCkanDatasetEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.session = MockSession()
+        self.endpoint = TEST_CKAN_DATASET_SERVICE['ENDPOINT']
+        self.engine = AsyncCkanDatasetEngine(endpoint=self.endpoint,
+                                             apikey=TEST_CKAN_DATASET_SERVICE['APIKEY'],
+                                             session=self.session,
+                                             retry_policy=RetryPolicy(backoff=0, jitter=0))
+
+        self.tests_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.support_path = os.path.join(self.tests_path, 'support')
+
+    def run_async(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def assert_posted(self, method, index=-1):
+        self.assertEqual('/'.join((self.endpoint.rstrip('/'), method)), self.session.post.call_args_list[index][0][0])
+
+    def test_get_dataset(self):
+        self.session.post.return_value = MockAsyncResponse.json_response(result={'id': 'dataset-id'})
+
+        result = self.run_async(self.engine.get_dataset('dataset-id'))
+
+        self.assertTrue(result['success'])
+        self.assertEqual('dataset-id', result['result']['id'])
+        self.assert_posted('package_show')
+        self.assertEqual({'id': 'dataset-id'}, self.session.posted_data())
+        headers = self.session.post.call_args[1]['headers']
+        self.assertEqual('application/json', headers['Content-Type'])
+        self.assertEqual(str(TEST_CKAN_DATASET_SERVICE['APIKEY']), headers['X-CKAN-API-Key'])
+
+    def test_get_dataset_not_json(self):
+        self.session.post.return_value = MockAsyncResponse(500, text='Internal Server Error')
+
+        with mock.patch('tethys_dataset_services.engines.ckan_engine.log'):
+            result = self.run_async(self.engine.get_dataset('dataset-id'))
+
+        self.assertIsNone(result)
+
+    def test_search_datasets(self):
+        self.session.post.return_value = MockAsyncResponse.json_response(result={'count': 0, 'results': []})
+
+        result = self.run_async(self.engine.search_datasets(query={'name': 'foo'}, filtered_query={'tags': 'bar'},
+                                                            rows=5))
+
+        self.assertTrue(result['success'])
+        self.assert_posted('package_search')
+        self.assertEqual({'q': 'name:foo', 'fq': 'tags:bar', 'rows': 5}, self.session.posted_data())
+
+    def test_search_datasets_no_queries(self):
+        self.assertRaises(Exception, self.run_async, self.engine.search_datasets())
+
+    def test_iter_search_datasets(self):
+        pages = [
+            MockAsyncResponse.json_response(result={'count': 3, 'results': [{'name': 'a'}, {'name': 'b'}]}),
+            MockAsyncResponse.json_response(result={'count': 3, 'results': [{'name': 'c'}]}),
+        ]
+        self.session.post.side_effect = pages
+
+        async def collect():
+            return [dataset['name'] async for dataset in self.engine.iter_search_datasets(query={'tags': 'x'},
+                                                                                          page_size=2)]
+
+        self.assertEqual(['a', 'b', 'c'], self.run_async(collect()))
+        self.assertEqual([0, 2], [self.session.posted_data(i)['start'] for i in range(2)])
+
+    def test_list_datasets_with_resources(self):
+        self.session.post.return_value = MockAsyncResponse.json_response(result=[])
+
+        self.run_async(self.engine.list_datasets(with_resources=True))
+
+        self.assert_posted('current_package_list_with_resources')
+
+    def test_create_resource_url(self):
+        self.session.post.return_value = MockAsyncResponse.json_response(result={'id': 'resource-id'})
+
+        result = self.run_async(self.engine.create_resource('dataset-id', url='http://example.com/data.csv'))
+
+        self.assertTrue(result['success'])
+        self.assert_posted('resource_create')
+        self.assertEqual({'package_id': 'dataset-id', 'url': 'http://example.com/data.csv'},
+                         self.session.posted_data())
+
+    def test_create_resource_file_not_exist(self):
+        self.assertRaises(IOError, self.run_async, self.engine.create_resource('dataset-id', file='/not/a/file.txt'))
+        self.session.post.assert_not_called()
+
+    @unittest.skipIf(async_ckan_engine.aiohttp is None, 'aiohttp is not installed')
+    def test_create_resource_file(self):
+        file_to_upload = os.path.join(self.support_path, 'upload_test.txt')
+        self.session.post.return_value = MockAsyncResponse.json_response(result={'id': 'resource-id'})
+        progress = mock.MagicMock()
+
+        result = self.run_async(self.engine.create_resource('dataset-id', file=file_to_upload, progress=progress))
+
+        self.assertTrue(result['success'])
+        form = self.session.post.call_args[1]['data']
+        self.assertIsInstance(form, async_ckan_engine.aiohttp.FormData)
+
+    def test_create_resource_dedupe(self):
+        file_to_upload = os.path.join(self.support_path, 'upload_test.txt')
+        with open(file_to_upload, 'rb') as f:
+            content = f.read()
+        existing = {'id': 'existing', 'size': str(len(content)), 'hash': hashlib.sha256(content).hexdigest()}
+        self.session.post.return_value = MockAsyncResponse.json_response(result={'resources': [existing]})
+
+        result = self.run_async(self.engine.create_resource('dataset-id', file=file_to_upload, dedupe=True))
+
+        self.assertEqual({'success': True, 'result': existing}, result)
+        self.session.post.assert_called_once()
+        self.assert_posted('package_show')
+
+    def test_update_dataset(self):
+        self.session.post.return_value = MockAsyncResponse.json_response(result={'id': 'dataset-id'})
+
+        self.run_async(self.engine.update_dataset('dataset-id', title='Title'))
+
+        self.assert_posted('package_patch')
+        self.assertEqual({'id': 'dataset-id', 'title': 'Title'}, self.session.posted_data())
+
+    def test_update_dataset_no_patch(self):
+        self.session.post.side_effect = [
+            MockAsyncResponse(400, text='{"success": false, "error": {"message": "Action name not known"}}'),
+            MockAsyncResponse.json_response(result={'resources': ['r'], 'tags': ['t']}),
+            MockAsyncResponse.json_response(result={'id': 'dataset-id'}),
+        ]
+
+        result = self.run_async(self.engine.update_dataset('dataset-id', title='Title'))
+
+        self.assertTrue(result['success'])
+        self.assert_posted('package_show', 1)
+        self.assert_posted('package_update', 2)
+        self.assertEqual({'id': 'dataset-id', 'title': 'Title', 'resources': ['r'], 'tags': ['t']},
+                         self.session.posted_data())
+        self.assertIn('package_patch', self.engine._unsupported_methods)
+
+    def test_update_resource(self):
+        self.session.post.return_value = MockAsyncResponse.json_response(result={'id': 'resource-id'})
+
+        self.run_async(self.engine.update_resource('resource-id', url='http://example.com'))
+
+        self.assert_posted('resource_patch')
+        self.assertEqual({'id': 'resource-id', 'url': 'http://example.com'}, self.session.posted_data())
+
+    def test_delete_resource(self):
+        self.session.post.return_value = MockAsyncResponse.json_response()
+
+        self.run_async(self.engine.delete_resource('resource-id'))
+
+        self.assert_posted('resource_delete')
+
+    def test_execute_batch(self):
+        running = []
+        max_running = []
+
+        def post(url, data=None, headers=None):
+            request = json.loads(data.decode('ascii'))
+
+            class Response(MockAsyncResponse):
+                async def __aenter__(self):
+                    running.append(request['id'])
+                    max_running.append(len(running))
+                    await asyncio.sleep(0)
+                    running.remove(request['id'])
+                    return self
+
+            return Response(text=json.dumps({'success': True, 'result': request}))
+
+        self.session.post.side_effect = post
+        calls = [('package_show', {'id': str(i)}) for i in range(10)] + [(self.engine.get_resource,
+                                                                          {'resource_id': 'r'})]
+
+        results = self.run_async(self.engine.execute_batch(calls, max_workers=3))
+
+        self.assertEqual([str(i) for i in range(10)] + ['r'], [r['result']['id'] for r in results])
+        self.assertEqual(3, max(max_running))
+
+    def test_execute_batch_error(self):
+        self.session.post.side_effect = ValueError('bad')
+
+        with mock.patch('tethys_dataset_services.engines.async_ckan_engine.log'):
+            results = self.run_async(self.engine.execute_batch([('package_show', {'id': 'a'})]))
+
+        self.assertEqual([{'success': False, 'error': {'message': 'bad'}}], results)
+
+    def test_execute_api_method_retry(self):
+        self.session.post.side_effect = [MockAsyncResponse(503), MockAsyncResponse.json_response(result={})]
+
+        with mock.patch('tethys_dataset_services.retry.log'):
+            result = self.run_async(self.engine.get_dataset('dataset-id'))
+
+        self.assertTrue(result['success'])
+        self.assertEqual(2, self.session.post.call_count)
+        self.assertEqual(1, self.engine.retry_policy.retries)
+
+    def test_execute_api_method_create_not_retried(self):
+        self.session.post.return_value = MockAsyncResponse(503, text='Unavailable')
+
+        with mock.patch('tethys_dataset_services.engines.ckan_engine.log'):
+            result = self.run_async(self.engine.create_dataset('dataset'))
+
+        self.assertIsNone(result)
+        self.session.post.assert_called_once()
+
+    def download_resource_setup(self, part_content=None, part_validators=None, **kwargs):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        local_file = os.path.join(location, 'resource.nc')
+
+        if part_content is not None:
+            with open(local_file + '.part', 'wb') as f:
+                f.write(part_content)
+
+        if part_validators is not None:
+            with open(local_file + '.part.validators', 'w') as f:
+                json.dump(part_validators, f)
+
+        resource = {'id': 'resource-id', 'url': 'http://example.com/resource.nc', 'name': 'resource',
+                    'format': 'nc'}
+        resource.update(kwargs)
+        return location, local_file, resource
+
+    def read_file(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_download_resource(self):
+        location, local_file, resource = self.download_resource_setup()
+        self.session.post.return_value = MockAsyncResponse.json_response(result=resource)
+        response = MockAsyncResponse(content=b'abcdefghij')
+        self.session.get.return_value = response
+
+        result = self.run_async(self.engine.download_resource('resource-id', location=location))
+
+        self.assertEqual(local_file, result)
+        self.assertEqual(b'abcdefghij', self.read_file(local_file))
+        self.assertFalse(os.path.exists(local_file + '.part'))
+        self.assertTrue(response.released)
+        self.session.get.assert_called_once_with(resource['url'], headers=None)
+
+    def test_download_resource_resume(self):
+        location, local_file, resource = self.download_resource_setup(part_content=b'abc',
+                                                                      part_validators={'etag': '"v1"'})
+        self.session.get.return_value = MockAsyncResponse(206, content=b'def')
+
+        self.run_async(self.engine._download_resource(resource, location))
+
+        self.assertEqual(b'abcdef', self.read_file(local_file))
+        self.assertFalse(os.path.exists(local_file + '.part.validators'))
+        self.session.get.assert_called_once_with(resource['url'], headers={'Range': 'bytes=3-', 'If-Range': '"v1"'})
+
+    def test_download_resource_resume_range_ignored(self):
+        location, local_file, resource = self.download_resource_setup(part_content=b'xyz',
+                                                                      part_validators={'etag': '"v1"'})
+        self.session.get.return_value = MockAsyncResponse(200, content=b'abcdef', headers={'ETag': '"v2"'})
+
+        self.run_async(self.engine._download_resource(resource, location))
+
+        # The resource changed: the download restarts from zero
+        self.assertEqual(b'abcdef', self.read_file(local_file))
+
+    def test_download_resource_resume_no_validators(self):
+        location, local_file, resource = self.download_resource_setup(part_content=b'xyz')
+        self.session.get.return_value = MockAsyncResponse(200, content=b'abcdef')
+
+        self.run_async(self.engine._download_resource(resource, location))
+
+        self.assertEqual(b'abcdef', self.read_file(local_file))
+        self.session.get.assert_called_once_with(resource['url'], headers=None)
+
+    def test_download_resource_resume_not_satisfiable(self):
+        location, local_file, resource = self.download_resource_setup(part_content=b'abcdef',
+                                                                      part_validators={'etag': '"v1"'})
+        self.session.get.side_effect = [MockAsyncResponse(416), MockAsyncResponse(200, content=b'abc')]
+
+        self.run_async(self.engine._download_resource(resource, location))
+
+        self.assertEqual(b'abc', self.read_file(local_file))
+        self.assertEqual(mock.call(resource['url'], headers=None), self.session.get.call_args)
+
+    def test_download_resource_cache_not_modified(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        engine = AsyncCkanDatasetEngine(endpoint=self.endpoint, session=self.session, download_cache=cache_dir,
+                                        retry_policy=RetryPolicy(backoff=0, jitter=0))
+        location, local_file, resource = self.download_resource_setup(last_modified='2020-01-01T00:00:00')
+        key = engine._download_cache.resource_key(resource)
+        self.session.get.return_value = MockAsyncResponse(content=b'abcdef', headers={'ETag': '"v1"'})
+        self.run_async(engine._download_resource(resource, location))
+
+        self.session.get.return_value = MockAsyncResponse(304, headers={'ETag': '"v2"'})
+        self.run_async(engine._download_resource(resource, location))
+
+        self.assertEqual(b'abcdef', self.read_file(local_file))
+        self.assertEqual(mock.call(resource['url'], headers={'If-None-Match': '"v1"'}), self.session.get.call_args)
+        self.assertEqual('"v2"', engine._download_cache.get(key)['etag'])
+
+    def test_download_resource_cache_off_loop(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        engine = AsyncCkanDatasetEngine(endpoint=self.endpoint, session=self.session, download_cache=cache_dir,
+                                        retry_policy=RetryPolicy(backoff=0, jitter=0))
+        location, local_file, resource = self.download_resource_setup()
+        self.session.get.return_value = MockAsyncResponse(content=b'abcdef', headers={'ETag': '"v1"'})
+        cache = engine._download_cache
+        threads = {}
+
+        def record(name, method):
+            def wrapper(*args, **kwargs):
+                threads[name] = threading.current_thread()
+                return method(*args, **kwargs)
+            return wrapper
+
+        with mock.patch.object(cache, 'get', side_effect=record('get', cache.get)), \
+                mock.patch.object(cache, 'put', side_effect=record('put', cache.put)), \
+                mock.patch.object(cache, 'link', side_effect=record('link', cache.link)):
+            self.run_async(engine._download_resource(resource, location))
+
+        self.assertEqual(b'abcdef', self.read_file(local_file))
+        self.assertEqual({'get', 'put', 'link'}, set(threads))
+        # The blocking cache operations do not run on the event loop thread
+        self.assertNotIn(threading.main_thread(), threads.values())
+
+    def test_download_resource_hash_mismatch(self):
+        location, local_file, resource = self.download_resource_setup(hash=hashlib.md5(b'other').hexdigest())
+        self.session.get.return_value = MockAsyncResponse(content=b'abc')
+
+        with mock.patch('tethys_dataset_services.engines.async_ckan_engine.log'):
+            self.assertRaises(ValueError, self.run_async,
+                              self.engine._download_resource(resource, location, verify_hash=True))
+
+        self.assertFalse(os.path.exists(local_file))
+        self.assertFalse(os.path.exists(local_file + '.part'))
+
+    def test_download_resource_error(self):
+        location, local_file, resource = self.download_resource_setup()
+        self.session.get.return_value = MockAsyncResponse(404)
+
+        with mock.patch('tethys_dataset_services.engines.async_ckan_engine.log') as mock_log:
+            self.assertRaises(MockHTTPError, self.run_async, self.engine._download_resource(resource, location))
+
+        mock_log.exception.assert_called_once()
+
+    def test_download_dataset(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        resources = [{'id': str(i), 'name': 'r{}'.format(i), 'format': 'txt', 'url': 'http://example.com/{}'.format(i)}
+                     for i in range(3)]
+        self.session.post.return_value = MockAsyncResponse.json_response(
+            result={'name': 'dataset', 'resources': resources}
+        )
+
+        def get(url, headers=None):
+            if url.endswith('1'):
+                return MockAsyncResponse(500)
+            return MockAsyncResponse(content=url.encode('ascii'))
+
+        self.session.get.side_effect = get
+
+        with mock.patch('tethys_dataset_services.engines.async_ckan_engine.log'):
+            with self.assertRaises(DatasetDownloadError) as context:
+                self.run_async(self.engine.download_dataset('dataset', location=location, max_per_host=1))
+
+        downloaded = context.exception.downloaded
+        self.assertEqual([os.path.join(location, 'r0.txt'), None, os.path.join(location, 'r2.txt')], downloaded)
+        self.assertEqual(['1'], list(context.exception.failures))
+        self.assertEqual(b'http://example.com/2', self.read_file(downloaded[2]))
+
+    def test_download_dataset_busy_host(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        urls = ['http://busy.test/0', 'http://busy.test/1', 'http://busy.test/2', 'http://idle.test/3']
+        resources = [{'id': str(i), 'name': 'r{}'.format(i), 'format': 'txt', 'url': url}
+                     for i, url in enumerate(urls)]
+        self.session.post.return_value = MockAsyncResponse.json_response(
+            result={'name': 'dataset', 'resources': resources}
+        )
+        idle_started = asyncio.Event()
+        waited = []
+
+        async def get(url, headers=None):
+            if 'idle' in url:
+                idle_started.set()
+            elif not idle_started.is_set():
+                # The idle host gets a free global slot while the busy host is downloading
+                try:
+                    await asyncio.wait_for(idle_started.wait(), 1)
+                except asyncio.TimeoutError:
+                    waited.append(url)
+            return MockAsyncResponse(content=url.encode('ascii'))
+
+        self.session.get.side_effect = get
+
+        downloaded = self.run_async(self.engine.download_dataset('dataset', location=location, max_workers=2,
+                                                                 max_per_host=1))
+
+        self.assertEqual(4, len(downloaded))
+        self.assertEqual([], waited)
+
+    def test_download_dataset_same_names(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        resources = [{'id': str(i), 'name': 'data', 'format': 'txt', 'url': 'http://example.com/{}'.format(i)}
+                     for i in range(2)]
+        self.session.post.return_value = MockAsyncResponse.json_response(
+            result={'name': 'dataset', 'resources': resources}
+        )
+        self.session.get.side_effect = lambda url, headers=None: MockAsyncResponse(content=url.encode('ascii'))
+
+        downloaded = self.run_async(self.engine.download_dataset('dataset', location=location))
+
+        self.assertEqual([os.path.join(location, 'data-0.txt'), os.path.join(location, 'data-1.txt')], downloaded)
+        self.assertEqual(b'http://example.com/1', self.read_file(downloaded[1]))
+
+    def test_validate(self):
+        self.session.get = mock.MagicMock(return_value=MockAsyncResponse(text='{"version": 3}'))
+
+        self.run_async(self.engine.validate())
+
+        self.session.get.assert_called_once_with(self.engine._get_api_root())
+
+    def test_validate_not_ckan(self):
+        self.session.get = mock.MagicMock(return_value=MockAsyncResponse(text='{}'))
+
+        self.assertRaises(AssertionError, self.run_async, self.engine.validate())
+
+    def test_close_given_session(self):
+        self.session.close = mock.AsyncMock()
+
+        async def use():
+            async with self.engine:
+                pass
+
+        self.run_async(use())
+
+        self.session.close.assert_not_called()
+        self.assertRaises(TypeError, self.engine.__enter__)
+
+    @mock.patch('tethys_dataset_services.engines.async_ckan_engine.aiohttp', None)
+    def test_session_requires_aiohttp(self):
+        engine = AsyncCkanDatasetEngine(endpoint=self.endpoint)
+
+        self.assertRaises(ImportError, getattr, engine, 'session')
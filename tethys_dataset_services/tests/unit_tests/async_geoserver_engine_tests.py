@@ -0,0 +1,679 @@
+import os
+import asyncio
+import json
+import threading
+import unittest
+import mock
+from tethys_dataset_services.engines import AsyncGeoServerSpatialDatasetEngine
+from tethys_dataset_services.retry import RetryPolicy
+
+
+try:
+    from tethys_dataset_services.tests.test_config import TEST_GEOSERVER_DATASET_SERVICE
+
+except ImportError:
+    print('ERROR: To perform tests, you must create a file in the "tests" package called "test_config.py". In this file'
+          'provide a dictionary called "TEST_GEOSERVER_DATASET_SERVICE" with keys "API_ENDPOINT" and "APIKEY".')
+    exit(1)
+
+
+class MockAsyncResponse(object):
+    def __init__(self, status=200, text='', headers=None, reason='OK'):
+        self.status = status
+        self._text = text
+        self.headers = headers or {}
+        self.reason = reason
+
+    async def text(self):
+        return self._text
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class MockSession(object):
+    """
+    Session that answers requests by method and REST path. Unknown paths answer 404.
+    """
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.routes = {}
+        self.request = mock.MagicMock(side_effect=self._respond)
+        self.closed = False
+
+    def add(self, method, path, body=None, status=200, text='', headers=None, reason='OK'):
+        if body is not None:
+            text = json.dumps(body)
+        self.routes[(method, path)] = MockAsyncResponse(status, text=text, headers=headers, reason=reason)
+
+    def _respond(self, method, url, **kwargs):
+        path = url[len(self.endpoint):] if url.startswith(self.endpoint) else url
+        return self.routes.get((method, path), MockAsyncResponse(404, text='Not Found', reason='Not Found'))
+
+    def requests(self, method=None):
+        return [(c[0][0], c[0][1][len(self.endpoint):]) for c in self.request.call_args_list
+                if method is None or c[0][0] == method]
+
+    def sent(self, method, path):
+        for c in self.request.call_args_list:
+            if c[0][0] == method and c[0][1] in (self.endpoint + path, path):
+                return c[1]
+
+
+class TestAsyncGeoServerSpatialDatasetEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.endpoint = TEST_GEOSERVER_DATASET_SERVICE['ENDPOINT'].rstrip('/') + '/'
+        self.session = MockSession(self.endpoint)
+        self.engine = AsyncGeoServerSpatialDatasetEngine(endpoint=self.endpoint,
+                                                         username=TEST_GEOSERVER_DATASET_SERVICE['USERNAME'],
+                                                         password=TEST_GEOSERVER_DATASET_SERVICE['PASSWORD'],
+                                                         session=self.session,
+                                                         retry_policy=RetryPolicy(backoff=0, jitter=0),
+                                                         visibility_timeout=0)
+
+        self.session.add('GET', 'workspaces/default.json', {'workspace': {'name': 'topp'}})
+        self.files_root = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'files')
+
+    def run_async(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def add_feature_type(self, path='workspaces/topp/featuretypes/states'):
+        self.session.add('GET', path + '.json', {'featureType': {
+            'name': 'states',
+            'nativeName': 'states',
+            'namespace': {'name': 'topp'},
+            'store': {'@class': 'dataStore', 'name': 'topp:states_shapefile'},
+            'title': 'USA Population',
+            'keywords': {'string': ['census', 'states']},
+            'srs': 'EPSG:4326',
+            'nativeBoundingBox': {'minx': -124.7, 'maxx': -66.9, 'miny': 24.9, 'maxy': 49.3, 'crs': 'EPSG:4326'},
+            'latLonBoundingBox': {'minx': -124.7, 'maxx': -66.9, 'miny': 24.9, 'maxy': 49.3, 'crs': 'EPSG:4326'},
+            'projectionPolicy': 'FORCE_DECLARED',
+            'enabled': True,
+            'attributes': {'attribute': [{'name': 'the_geom'}, {'name': 'STATE_NAME'}]},
+        }})
+
+    def add_layer(self):
+        resource_path = 'workspaces/topp/datastores/states_shapefile/featuretypes/states'
+        self.session.add('GET', 'layers/topp:states.json', {'layer': {
+            'name': 'states',
+            'type': 'VECTOR',
+            'defaultStyle': {'name': 'population'},
+            'styles': {'@class': 'linked-hash-set', 'style': {'name': 'topp:pophatch'}},
+            'resource': {'@class': 'featureType', 'name': 'topp:states',
+                         'href': self.endpoint + resource_path + '.json'},
+            'attribution': {'title': 'Census', 'logoWidth': 0},
+        }})
+        self.add_feature_type(resource_path)
+
+    def test_get_layer(self):
+        self.add_layer()
+        self.session.add('GET', self.engine.gwc_endpoint + 'layers/topp:states.xml',
+                         text='<GeoServerLayer><enabled>true</enabled></GeoServerLayer>')
+
+        response = self.run_async(self.engine.get_layer('topp:states'))
+
+        self.assertTrue(response['success'])
+        result = response['result']
+        self.assertEqual('topp:states', result['name'])
+        self.assertEqual('layer', result['resource_type'])
+        self.assertEqual('topp:states', result['resource'])
+        self.assertEqual('population', result['default_style'])
+        self.assertEqual(['topp:pophatch'], result['styles'])
+        self.assertEqual('Census', result['attribution'])
+        self.assertEqual(self.endpoint + 'layers/topp:states.xml', result['href'])
+        self.assertEqual(self.engine._get_non_rest_endpoint() + '/', result['catalog'])
+        self.assertEqual({'enabled': 'true'}, result['tile_caching'])
+        self.assertIn('bbox=-124.7,24.9,-66.9,49.3', result['wms']['png'])
+        self.assertIn('styles=population', result['wms']['png'])
+        self.assertNotIn('_path', result)
+
+    def test_get_layer_fields(self):
+        self.add_layer()
+
+        response = self.run_async(self.engine.get_layer('topp:states', fields=['name', 'wms.png']))
+
+        self.assertEqual({'name', 'wms'}, set(response['result']))
+        self.assertEqual(['png'], list(response['result']['wms']))
+        # No tile caching request
+        self.assertEqual([('GET', 'layers/topp:states.json'),
+                          ('GET', 'workspaces/topp/datastores/states_shapefile/featuretypes/states.json')],
+                         self.session.requests())
+
+    def test_get_layer_not_found(self):
+        response = self.run_async(self.engine.get_layer('topp:missing'))
+
+        self.assertFalse(response['success'])
+        self.assertEqual('Layer "topp:missing" not found.', response['error'])
+
+    def test_get_resource_default_workspace(self):
+        self.session.add('GET', 'workspaces/topp/coverages/dem.json', {'coverage': {
+            'name': 'dem',
+            'namespace': {'name': 'topp'},
+            'store': {'name': 'topp:dem'},
+            'srs': 'EPSG:32612',
+            'nativeBoundingBox': {'minx': 0, 'maxx': 10, 'miny': 0, 'maxy': 5,
+                                  'crs': {'@class': 'projected', '$': 'EPSG:32612'}},
+            'supportedFormats': {'string': 'GeoTIFF'},
+        }})
+
+        response = self.run_async(self.engine.get_resource('dem'))
+
+        self.assertTrue(response['success'])
+        result = response['result']
+        self.assertEqual('coverage', result['resource_type'])
+        self.assertEqual('topp', result['workspace'])
+        self.assertEqual('dem', result['store'])
+        self.assertEqual(('0', '10', '0', '5', 'EPSG:32612'), result['native_bbox'])
+        self.assertEqual(['GeoTIFF'], result['supported_formats'])
+        self.assertIn('wcs', result)
+        self.assertEqual([('GET', 'workspaces/default.json'), ('GET', 'workspaces/topp/featuretypes/dem.json'),
+                          ('GET', 'workspaces/topp/coverages/dem.json')], self.session.requests())
+
+    def test_get_resource_store(self):
+        self.session.add('GET', 'workspaces/topp/datastores/states_shapefile.json',
+                         {'dataStore': {'name': 'states_shapefile', 'workspace': {'name': 'topp'}}})
+        self.add_feature_type('workspaces/topp/datastores/states_shapefile/featuretypes/states')
+
+        response = self.run_async(self.engine.get_resource('topp:states', store_id='states_shapefile'))
+
+        result = response['result']
+        self.assertEqual('featureType', result['resource_type'])
+        self.assertEqual('states_shapefile', result['store'])
+        self.assertEqual(['census', 'states'], result['keywords'])
+        self.assertEqual(['the_geom', 'STATE_NAME'], result['attributes'])
+        self.assertEqual('true', result['enabled'])
+        self.assertIn('wfs', result)
+
+    def test_get_resource_failed_request(self):
+        self.session.add('GET', 'workspaces/topp/featuretypes/states.json', status=500, text='Oops')
+
+        with mock.patch('tethys_dataset_services.retry.log'):
+            response = self.run_async(self.engine.get_resource('topp:states'))
+
+        self.assertFalse(response['success'])
+        self.assertIn('500 status code', response['error'])
+        self.assertIn('Oops', response['error'])
+
+    def test_get_store(self):
+        self.session.add('GET', 'workspaces/topp/datastores/postgis.json', {'dataStore': {
+            'name': 'postgis',
+            'type': 'PostGIS',
+            'enabled': True,
+            'workspace': {'name': 'topp'},
+            'connectionParameters': {'entry': [{'@key': 'host', '$': 'localhost'}, {'@key': 'port', '$': '5432'}]},
+        }})
+
+        response = self.run_async(self.engine.get_store('postgis'))
+
+        result = response['result']
+        self.assertEqual('dataStore', result['resource_type'])
+        self.assertEqual('topp', result['workspace'])
+        self.assertEqual({'host': 'localhost', 'port': '5432'}, result['connection_parameters'])
+
+    def test_get_layer_group(self):
+        self.session.add('GET', 'workspaces/topp/layergroups/usa.json', {'layerGroup': {
+            'name': 'usa',
+            'workspace': {'name': 'topp'},
+            'publishables': {'published': [{'@type': 'layer', 'name': 'topp:states'},
+                                           {'@type': 'layer', 'name': 'topp:roads'}]},
+            'styles': {'style': ['', {'name': 'line'}]},
+            'bounds': {'minx': -10, 'maxx': 10, 'miny': -5, 'maxy': 5, 'crs': 'EPSG:4326'},
+            'abstractTxt': 'Roads and states',
+        }})
+
+        response = self.run_async(self.engine.get_layer_group('topp:usa'))
+
+        result = response['result']
+        self.assertEqual(['topp:states', 'topp:roads'], result['layers'])
+        # Like gsconfig, the default style of a layer is listed as None
+        self.assertEqual([None, 'line'], result['styles'])
+        self.assertEqual('Roads and states', result['abstract'])
+        self.assertIn('width=1024', result['wms']['png'])
+        self.assertIn('geptiff', result['wms'])
+
+    def test_get_style_not_found(self):
+        response = self.run_async(self.engine.get_style('missing'))
+
+        self.assertFalse(response['success'])
+        self.assertEqual('Style "missing" not found.', response['error'])
+
+    def test_list_layers(self):
+        self.session.add('GET', 'layers.json', {'layers': {'layer': [{'name': 'topp:states'},
+                                                                     {'name': 'topp:roads'}]}})
+
+        response = self.run_async(self.engine.list_layers())
+
+        self.assertEqual({'success': True, 'result': ['topp:states', 'topp:roads']}, response)
+        self.assertEqual([('GET', 'layers.json')], self.session.requests())
+
+    def test_list_layers_with_properties(self):
+        self.session.add('GET', 'layers.json', {'layers': {'layer': [{'name': 'topp:states'},
+                                                                     {'name': 'topp:roads'}]}})
+        self.add_layer()
+        self.session.add('GET', 'layers/topp:roads.json', status=500, text='Oops')
+
+        with mock.patch('tethys_dataset_services.engines.async_geoserver_engine.log'), \
+                mock.patch('tethys_dataset_services.retry.log'):
+            response = self.run_async(self.engine.list_layers(with_properties=True))
+
+        self.assertTrue(response['success'])
+        states, roads = response['result']
+        self.assertEqual('topp:states', states['resource'])
+        self.assertEqual('topp:roads', roads['name'])
+        self.assertIn('500 status code', roads['error'])
+
+    def test_list_workspaces_single(self):
+        self.session.add('GET', 'workspaces.json', {'workspaces': {'workspace': {'name': 'topp'}}})
+
+        response = self.run_async(self.engine.list_workspaces(with_properties=True))
+
+        self.assertEqual(1, len(response['result']))
+        self.assertEqual('topp', response['result'][0]['name'])
+        self.assertEqual(self.endpoint + 'workspaces/topp/datastores.xml', response['result'][0]['datastore_url'])
+
+    def test_list_stores(self):
+        self.session.add('GET', 'workspaces/topp.json', {'workspace': {'name': 'topp'}})
+        self.session.add('GET', 'workspaces/topp/datastores.json',
+                         {'dataStores': {'dataStore': [{'name': 'postgis'}]}})
+        self.session.add('GET', 'workspaces/topp/coveragestores.json',
+                         {'coverageStores': {'coverageStore': [{'name': 'dem'}]}})
+        self.session.add('GET', 'workspaces/topp/wmsstores.json', {'wmsStores': ''})
+
+        response = self.run_async(self.engine.list_stores(workspace='topp'))
+
+        self.assertEqual(['postgis', 'dem'], response['result'])
+
+    def test_list_stores_invalid_workspace(self):
+        response = self.run_async(self.engine.list_stores(workspace='missing'))
+
+        self.assertEqual({'success': False, 'error': 'Invalid workspace "missing".'}, response)
+
+    def test_list_resources(self):
+        self.session.add('GET', 'workspaces.json', {'workspaces': {'workspace': [{'name': 'topp'},
+                                                                                 {'name': 'sf'}]}})
+        self.session.add('GET', 'workspaces/topp/featuretypes.json',
+                         {'featureTypes': {'featureType': [{'name': 'states'}]}})
+        self.session.add('GET', 'workspaces/sf/coverages.json', {'coverages': {'coverage': [{'name': 'dem'}]}})
+        self.add_feature_type()
+
+        response = self.run_async(self.engine.list_resources())
+        self.assertEqual(['states', 'dem'], response['result'])
+
+        response = self.run_async(self.engine.list_resources(workspace='topp', fields=['name', 'title']))
+        self.assertEqual([{'name': 'states', 'title': 'USA Population'}], response['result'])
+
+    def test_list_resources_store_not_found(self):
+        response = self.run_async(self.engine.list_resources(store='missing'))
+
+        self.assertEqual({'success': False, 'error': 'Store "missing" not found.'}, response)
+
+    def test_create_postgis_feature_resource_no_wait(self):
+        self.session.add('POST', 'workspaces/topp/datastores.json', status=201,
+                         headers={'Location': self.endpoint + 'workspaces/topp/datastores/postgis'})
+        self.session.add('POST', 'workspaces/topp/datastores/postgis/featuretypes.json', status=201,
+                         headers={'Location': 'states-href'})
+
+        response = self.run_async(self.engine.create_postgis_feature_resource(
+            'postgis', 'localhost', 5432, 'db', 'user', 'pass', table='states', wait=False
+        ))
+
+        self.assertEqual({'name': 'states', 'workspace': 'topp', 'resource_type': 'featureType',
+                          'href': 'states-href', 'store': 'postgis'}, response['result'])
+        body = json.loads(self.session.sent('POST', 'workspaces/topp/datastores.json')['data'])
+        self.assertEqual('postgis', body['dataStore']['name'])
+        self.assertIn({'@key': 'port', '$': '5432'}, body['dataStore']['connectionParameters']['entry'])
+        self.assertIn({'@key': 'dbtype', '$': 'postgis'}, body['dataStore']['connectionParameters']['entry'])
+        body = json.loads(self.session.sent('POST', 'workspaces/topp/datastores/postgis/featuretypes.json')['data'])
+        self.assertEqual({'featureType': {'name': 'states'}}, body)
+
+    def test_create_postgis_feature_resource_wait(self):
+        self.session.add('GET', 'workspaces/topp/datastores/postgis.json',
+                         {'dataStore': {'name': 'postgis', 'workspace': {'name': 'topp'}}})
+        self.session.add('POST', 'workspaces/topp/datastores/postgis/featuretypes.json', status=201)
+        self.add_feature_type('workspaces/topp/datastores/postgis/featuretypes/states')
+
+        # Not visible on the first read
+        responses = iter([MockAsyncResponse(404), None])
+        respond = self.session._respond
+
+        def first_read_not_found(method, url, **kwargs):
+            if url.endswith('postgis/featuretypes/states.json'):
+                response = next(responses, None)
+                if response is not None:
+                    return response
+            return respond(method, url, **kwargs)
+
+        self.session.request.side_effect = first_read_not_found
+        self.engine._visibility_timeout = 5
+
+        with mock.patch('tethys_dataset_services.retry.asyncio.sleep', new_callable=mock.AsyncMock):
+            response = self.run_async(self.engine.create_postgis_feature_resource(
+                'topp:postgis', 'localhost', 5432, 'db', 'user', 'pass', table='states'
+            ))
+
+        self.assertTrue(response['success'])
+        self.assertEqual('USA Population', response['result']['title'])
+        # The existing store is not created again
+        self.assertEqual([('POST', 'workspaces/topp/datastores/postgis/featuretypes.json')],
+                         self.session.requests('POST'))
+
+    def test_create_postgis_feature_resource_failed(self):
+        self.session.add('POST', 'workspaces/topp/datastores.json', status=500, text='Oops',
+                         reason='Internal Server Error')
+
+        response = self.run_async(self.engine.create_postgis_feature_resource(
+            'postgis', 'localhost', 5432, 'db', 'user', 'pass'
+        ))
+
+        self.assertEqual({'success': False, 'error': 'Internal Server Error(500): Oops'}, response)
+
+    def test_add_table_to_postgis_store_no_store(self):
+        response = self.run_async(self.engine.add_table_to_postgis_store('topp:missing', 'states'))
+
+        self.assertEqual({'success': False, 'error': 'There is no store named missing in topp'}, response)
+        self.assertEqual([], self.session.requests('POST'))
+
+    def test_add_tables_to_postgis_store(self):
+        self.session.add('GET', 'workspaces/topp/datastores/postgis.json',
+                         {'dataStore': {'name': 'postgis', 'workspace': {'name': 'topp'}}})
+        respond = self.session._respond
+
+        def post(method, url, **kwargs):
+            if method == 'POST':
+                if 'bad' in kwargs['data']:
+                    return MockAsyncResponse(500, text='Oops', reason='Internal Server Error')
+                return MockAsyncResponse(201)
+            return respond(method, url, **kwargs)
+
+        self.session.request.side_effect = post
+
+        response = self.run_async(self.engine.add_tables_to_postgis_store('postgis', ['points', 'bad', 'lines'],
+                                                                          max_workers=2))
+
+        self.assertFalse(response['success'])
+        r = response['result']
+        self.assertEqual('postgis', r['points']['result']['name'])
+        self.assertEqual('postgis', r['lines']['result']['name'])
+        self.assertEqual({'success': False, 'error': 'Internal Server Error(500): Oops'}, r['bad'])
+        # The store is read once to validate it and once for all tables
+        self.assertEqual(2, self.session.requests().count(('GET', 'workspaces/topp/datastores/postgis.json')))
+
+    def test_add_tables_to_postgis_store_return_none(self):
+        self.session.add('GET', 'workspaces/topp/datastores/postgis.json',
+                         {'dataStore': {'name': 'postgis', 'workspace': {'name': 'topp'}}})
+        self.session.add('POST', 'workspaces/topp/datastores/postgis/featuretypes.json', status=201)
+
+        response = self.run_async(self.engine.add_tables_to_postgis_store('topp:postgis', ['points', 'lines'],
+                                                                          return_result=None))
+
+        self.assertEqual({'success': True, 'result': {'points': {'success': True, 'result': None},
+                                                      'lines': {'success': True, 'result': None}}}, response)
+        # The store is only read to validate it
+        self.assertEqual(1, self.session.requests().count(('GET', 'workspaces/topp/datastores/postgis.json')))
+
+    def test_add_tables_to_postgis_store_duplicates(self):
+        self.session.add('GET', 'workspaces/topp/datastores/postgis.json',
+                         {'dataStore': {'name': 'postgis', 'workspace': {'name': 'topp'}}})
+        self.session.add('POST', 'workspaces/topp/datastores/postgis/featuretypes.json', status=201)
+
+        response = self.run_async(self.engine.add_tables_to_postgis_store('topp:postgis', ['points', 'points'],
+                                                                          return_result=None))
+
+        self.assertEqual({'success': True, 'result': {'points': {'success': True, 'result': None}}}, response)
+        self.assertEqual([('POST', 'workspaces/topp/datastores/postgis/featuretypes.json')],
+                         self.session.requests('POST'))
+
+    def test_link_sqlalchemy_db_to_geoserver(self):
+        sqlalchemy_engine = mock.MagicMock()
+        sqlalchemy_engine.url.translate_connect_args.return_value = {
+            'host': 'localhost', 'port': 5432, 'database': 'db', 'username': 'user', 'password': 'pass'
+        }
+
+        with mock.patch.object(self.engine, 'create_postgis_feature_resource', new_callable=mock.AsyncMock,
+                               return_value={'success': True}) as mock_create:
+            response = self.run_async(self.engine.link_sqlalchemy_db_to_geoserver('postgis', sqlalchemy_engine,
+                                                                                  docker=True))
+
+        self.assertEqual({'success': True}, response)
+        mock_create.assert_awaited_once_with(store_id='postgis', host='172.17.0.1', port=5432, database='db',
+                                             user='user', password='pass', debug=False)
+
+    def sync_response(self, status_code=201, text='', headers=None):
+        self.sync_threads = getattr(self, 'sync_threads', [])
+        response = mock.MagicMock(status_code=status_code, text=text, headers=headers or {})
+
+        def respond(*args, **kwargs):
+            self.sync_threads.append(threading.current_thread())
+            if 'data' in kwargs and not isinstance(kwargs['data'], (str, bytes)):
+                b''.join(kwargs['data'])
+            return response
+
+        return respond
+
+    def assert_ran_in_executor(self):
+        self.assertTrue(self.sync_threads)
+        self.assertNotIn(threading.main_thread(), self.sync_threads)
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.put')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_create_shapefile_resource(self, _, mock_put):
+        mock_put.side_effect = self.sync_response()
+
+        response = self.run_async(self.engine.create_shapefile_resource(
+            'states', shapefile_base=os.path.join(self.files_root, 'shapefile', 'test'), overwrite=True,
+            return_result='name'
+        ))
+
+        self.assertTrue(response['success'])
+        self.assertEqual('topp', response['result']['workspace'])
+        # The default workspace is read through the session, the upload runs in the executor
+        self.assertEqual([('GET', 'workspaces/default.json')], self.session.requests())
+        self.assertEqual(self.endpoint + 'workspaces/topp/datastores/states/file.shp', mock_put.call_args[1]['url'])
+        self.assert_ran_in_executor()
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.put')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_create_coverage_resource(self, _, mock_put):
+        mock_put.side_effect = self.sync_response()
+
+        response = self.run_async(self.engine.create_coverage_resource(
+            'dem', 'geotiff', coverage_file=os.path.join(self.files_root, 'adem.tif'), overwrite=True,
+            query_after_success=False, return_result=None
+        ))
+
+        self.assertEqual({'success': True, 'result': None}, response)
+        self.assertEqual(self.endpoint + 'workspaces/topp/coveragestores/dem/file.geotiff',
+                         mock_put.call_args[1]['url'])
+        self.assert_ran_in_executor()
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_add_granules_to_image_mosaic(self, _, mock_post):
+        mock_post.side_effect = self.sync_response(202)
+
+        response = self.run_async(self.engine.add_granules_to_image_mosaic('mosaic', ['/data/a.tif'], external=True))
+
+        self.assertTrue(response['success'])
+        self.assertEqual(1, response['result']['added'])
+        self.assertEqual(self.endpoint + 'workspaces/topp/coveragestores/mosaic/external.imagemosaic',
+                         mock_post.call_args[1]['url'])
+        self.assert_ran_in_executor()
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_create_sql_view(self, mock_catalog):
+        mc = mock_catalog()
+        mc.publish_featuretype.side_effect = lambda *args, **kwargs: self.sync_response()()
+
+        response = self.run_async(self.engine.create_sql_view('pipes', 'topp:postgis', 'SELECT * FROM pipes',
+                                                              'geometry', 'LineString', return_result='name'))
+
+        self.assertEqual({'success': True, 'result': {'name': 'pipes', 'workspace': 'topp', 'resource_type': 'layer',
+                                                      'href': None}}, response)
+        mc.get_store.assert_called_once_with('postgis', workspace='topp')
+        self.assert_ran_in_executor()
+
+    def test_create_layer_group(self):
+        self.session.add('POST', 'layergroups.json', status=201)
+        group = {'layerGroup': {'name': 'usa', 'publishables': {'published': {'name': 'topp:states'}}}}
+        responses = iter([MockAsyncResponse(404)])
+        respond = self.session._respond
+
+        def created(method, url, **kwargs):
+            if url.endswith('layergroups/usa.json'):
+                return next(responses, MockAsyncResponse(200, text=json.dumps(group)))
+            return respond(method, url, **kwargs)
+
+        self.session.request.side_effect = created
+
+        response = self.run_async(self.engine.create_layer_group('usa', ['topp:states'], ['topp:pophatch'],
+                                                                 bounds=('-10', '10', '-5', '5', 'EPSG:4326')))
+
+        self.assertTrue(response['success'])
+        self.assertEqual(['topp:states'], response['result']['layers'])
+        body = json.loads(self.session.sent('POST', 'layergroups.json')['data'])['layerGroup']
+        self.assertEqual([{'@type': 'layer', 'name': 'topp:states'}], body['publishables']['published'])
+        self.assertEqual([{'name': 'pophatch', 'workspace': 'topp'}], body['styles']['style'])
+        self.assertEqual({'minx': '-10', 'maxx': '10', 'miny': '-5', 'maxy': '5', 'crs': 'EPSG:4326'},
+                         body['bounds'])
+
+    def test_create_layer_group_return_name(self):
+        href = self.endpoint + 'layergroups/usa'
+        self.session.add('POST', 'layergroups.json', status=201, headers={'Location': href})
+
+        response = self.run_async(self.engine.create_layer_group('usa', ['topp:states'], ['topp:pophatch'],
+                                                                 return_result='name'))
+
+        self.assertEqual({'success': True, 'result': {'name': 'usa', 'workspace': None,
+                                                      'resource_type': 'layerGroup', 'href': href}}, response)
+        # The new layer group is not read back
+        self.assertEqual(1, self.session.requests('GET').count(('GET', 'layergroups/usa.json')))
+
+    def test_create_layer_group_exists(self):
+        self.session.add('GET', 'layergroups/usa.json', {'layerGroup': {'name': 'usa'}})
+
+        response = self.run_async(self.engine.create_layer_group('usa', [], []))
+
+        self.assertEqual({'success': False, 'error': 'LayerGroup named usa already exists!'}, response)
+
+    def test_create_workspace(self):
+        self.session.add('POST', 'namespaces.json', status=201)
+
+        response = self.run_async(self.engine.create_workspace('topp', 'http://example.com/topp'))
+
+        self.assertTrue(response['success'])
+        self.assertEqual('topp', response['result']['name'])
+        self.assertEqual({'namespace': {'prefix': 'topp', 'uri': 'http://example.com/topp'}},
+                         json.loads(self.session.sent('POST', 'namespaces.json')['data']))
+
+    def test_create_style(self):
+        self.session.add('POST', 'workspaces/topp/styles.json', status=201)
+        self.session.add('PUT', 'workspaces/topp/styles/roads.sld')
+        style = {'style': {'name': 'roads', 'workspace': {'name': 'topp'}, 'filename': 'roads.sld'}}
+        responses = iter([MockAsyncResponse(404)])
+        respond = self.session._respond
+
+        def created(method, url, **kwargs):
+            if url.endswith('styles/roads.json'):
+                return next(responses, MockAsyncResponse(200, text=json.dumps(style)))
+            return respond(method, url, **kwargs)
+
+        self.session.request.side_effect = created
+
+        response = self.run_async(self.engine.create_style('topp:roads', '<sld/>'))
+
+        self.assertTrue(response['success'])
+        self.assertEqual('topp:roads', response['result']['fqn'])
+        sent = self.session.sent('PUT', 'workspaces/topp/styles/roads.sld')
+        self.assertEqual('<sld/>', sent['data'])
+        self.assertEqual('application/vnd.ogc.sld+xml', sent['headers']['Content-Type'])
+
+    def test_create_style_exists(self):
+        self.session.add('GET', 'styles/roads.json', {'style': {'name': 'roads'}})
+
+        response = self.run_async(self.engine.create_style('roads', '<sld/>'))
+
+        self.assertEqual({'success': False, 'error': 'There is already a style named roads'}, response)
+        self.assertEqual([], self.session.requests('PUT'))
+
+    def test_update_resource(self):
+        self.add_feature_type()
+        self.session.add('PUT', 'workspaces/topp/featuretypes/states.json')
+
+        response = self.run_async(self.engine.update_resource('topp:states', title='New Title',
+                                                              keywords=['a'], projection='EPSG:3857',
+                                                              not_an_attribute=True))
+
+        self.assertTrue(response['success'])
+        body = json.loads(self.session.sent('PUT', 'workspaces/topp/featuretypes/states.json')['data'])
+        self.assertEqual({'featureType': {'title': 'New Title', 'keywords': {'string': ['a']},
+                                          'srs': 'EPSG:3857'}}, body)
+
+    def test_update_resource_not_found(self):
+        response = self.run_async(self.engine.update_resource('topp:missing', title='New Title'))
+
+        self.assertEqual({'success': False, 'error': 'Resource "topp:missing" not found.'}, response)
+
+    def test_update_layer(self):
+        self.add_layer()
+        self.session.add('PUT', 'layers/topp:states.json')
+        gwc_url = self.engine.gwc_endpoint + 'layers/topp:states.xml'
+        self.session.add('POST', gwc_url)
+
+        response = self.run_async(self.engine.update_layer('topp:states', default_style='topp:pophatch',
+                                                           styles=['population'],
+                                                           tile_caching={'enabled': 'true'}))
+
+        self.assertTrue(response['success'])
+        self.assertEqual({'enabled': 'true'}, response['result']['tile_caching'])
+        body = json.loads(self.session.sent('PUT', 'layers/topp:states.json')['data'])
+        self.assertEqual({'layer': {'defaultStyle': {'name': 'pophatch', 'workspace': 'topp'},
+                                    'styles': {'style': [{'name': 'population'}]}}}, body)
+        self.assertIn(b'<enabled>true</enabled>', self.session.sent('POST', gwc_url)['data'])
+
+    def test_delete_store(self):
+        self.session.add('GET', 'workspaces/topp/coveragestores/dem.json',
+                         {'coverageStore': {'name': 'dem', 'workspace': {'name': 'topp'}}})
+        self.session.add('DELETE', 'workspaces/topp/coveragestores/dem.json')
+
+        response = self.run_async(self.engine.delete_store('topp:dem', purge='all', recurse=True))
+
+        self.assertEqual({'success': True, 'result': None}, response)
+        self.assertEqual({'purge': 'all', 'recurse': 'true'},
+                         self.session.sent('DELETE', 'workspaces/topp/coveragestores/dem.json')['params'])
+
+    def test_delete_layer_not_found(self):
+        response = self.run_async(self.engine.delete_layer('topp:missing'))
+
+        self.assertEqual({'success': False, 'error': 'GeoServer object does not exist: "topp:missing".'}, response)
+        self.assertEqual([], self.session.requests('DELETE'))
+
+    def test_validate(self):
+        self.session.add('GET', '', text='Geoserver Configuration API')
+        self.run_async(self.engine.validate())
+
+        self.session.add('GET', '', status=401)
+        self.assertRaises(AssertionError, self.run_async, self.engine.validate())
+
+    def test_context_manager(self):
+        self.session.close = mock.AsyncMock()
+
+        async def use():
+            async with self.engine:
+                pass
+
+        self.run_async(use())
+
+        self.session.close.assert_not_called()
+        self.assertRaises(TypeError, self.engine.__enter__)
+
+    @mock.patch('tethys_dataset_services.engines.async_geoserver_engine.aiohttp', None)
+    def test_session_requires_aiohttp(self):
+        engine = AsyncGeoServerSpatialDatasetEngine(endpoint=self.endpoint)
+
+        self.assertRaises(ImportError, getattr, engine, 'session')
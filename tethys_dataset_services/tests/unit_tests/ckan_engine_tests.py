@@ -1,18 +1,21 @@
+import gc
 import os
-import sys
 import random
+import shutil
 import string
+import tempfile
+import threading
+import time
 import unittest
+import hashlib
 import json
 import mock
 import requests
+from requests_toolbelt import MultipartEncoder
 from tethys_dataset_services.engines import CkanDatasetEngine
-
-
-if sys.version_info[0] == 3:
-    from io import StringIO
-else:
-    from StringIO import StringIO
+from tethys_dataset_services.engines.ckan_engine import DatasetDownloadError
+from tethys_dataset_services.download_cache import DownloadCache
+from tethys_dataset_services.retry import RetryPolicy
 
 
 try:
@@ -45,6 +48,31 @@ class MockJsonResponse(object):
             # self.encode = encode
 
 
+class MockStreamResponse(object):
+    def __init__(self, status_code=200, content=b'', headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.closed = False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError('{} Error'.format(self.status_code))
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
 class MockResponse(object):
     def __init__(self, status_code, text=None, json=None, reason=None):
         self.status_code = status_code
@@ -78,7 +106,7 @@ class TestCkanDatasetEngine(unittest.TestCase):
     def tearDown(self):
         pass
 
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
     def test_list_datasets_defaults(self, mock_post):
         mock_post.return_value = MockJsonResponse(200, result='Datasetname')
 
@@ -90,7 +118,7 @@ class TestCkanDatasetEngine(unittest.TestCase):
         self.assertIn('Datasetname', result['result'])
 
     @mock.patch('tethys_dataset_services.engines.ckan_engine.log')
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
     def test_list_datasets_defaults_no_json(self, mock_post, mock_log):
         mock_post.return_value = MockJsonResponse(201, result='Datasetname', json_format=False)
 
@@ -101,7 +129,7 @@ class TestCkanDatasetEngine(unittest.TestCase):
         call_args = mock_log.exception.call_args_list
         self.assertIn('Status Code 201', call_args[0][0][0])
 
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
     def test_list_datasets_with_resources(self, mock_post):
         mock_post.return_value = MockJsonResponse(200, result='Datasetname')
         # Execute
@@ -111,7 +139,7 @@ class TestCkanDatasetEngine(unittest.TestCase):
         self.assertTrue(result['success'])
         self.assertIn('Datasetname', result['result'])
 
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
     def test_list_datasets_with_params(self, mock_post):
         data_list = ['1', '2', '3', '4', '5', '6', '7', '8', '9', '10']
         mock_post.return_value = MockJsonResponse(200, result=data_list)
@@ -144,7 +172,7 @@ class TestCkanDatasetEngine(unittest.TestCase):
         if number_all > 5:
             self.assertNotEqual(result_page_1, result_page_2)
 
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
     def test_search_resources(self, mock_post):
         result_data = {'results': [{'format': 'ZIP'}, {'format': 'ZIP'}]}
         mock_post.return_value = MockJsonResponse(200, result=result_data)
@@ -161,7 +189,7 @@ class TestCkanDatasetEngine(unittest.TestCase):
             for result in search_results:
                 self.assertIn('zip', result['format'].lower())
 
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
     def test_search_datasets(self, mock_post):
         version = '1.0'
         result_data = {'results': [{'version': version}, {'version': version}]}
@@ -181,7 +209,7 @@ class TestCkanDatasetEngine(unittest.TestCase):
                 self.assertIn('version', result)
                 self.assertEqual(result['version'], version)
 
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
     def test_search_datasets_filtered(self, mock_post):
         version = '1.0'
         result_data = {'results': [{'version': version}, {'version': version}]}
@@ -201,7 +229,7 @@ class TestCkanDatasetEngine(unittest.TestCase):
                 self.assertIn('version', result)
                 self.assertEqual(result['version'], version)
 
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
     def test_search_datasets_no_queries(self, mock_post):
         version = '1.0'
         result_data = {'results': [{'version': version}, {'version': version}]}
@@ -210,7 +238,57 @@ class TestCkanDatasetEngine(unittest.TestCase):
         # Execute
         self.assertRaises(Exception, self.engine.search_datasets, console=False)
 
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
+    def mock_search_pages(self, count):
+        def search(url, data, **kwargs):
+            data_dict = json.loads(data.decode('ascii'))
+            start, rows = data_dict['start'], data_dict['rows']
+            results = [{'name': 'dataset{}'.format(i)} for i in range(start, min(start + rows, count))]
+            return MockJsonResponse(200, result={'count': count, 'results': results})
+        return search
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_iter_search_datasets(self, mock_post):
+        mock_post.side_effect = self.mock_search_pages(25)
+
+        result = list(self.engine.iter_search_datasets(query={'version': '1.0'}, page_size=10))
+
+        self.assertEqual(['dataset{}'.format(i) for i in range(25)], [d['name'] for d in result])
+        self.assertEqual(3, mock_post.call_count)
+        data_dict = json.loads(mock_post.call_args_list[0][1]['data'].decode('ascii'))
+        self.assertEqual('version:1.0', data_dict['q'])
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_iter_search_datasets_no_prefetch(self, mock_post):
+        mock_post.side_effect = self.mock_search_pages(20)
+
+        result = list(self.engine.iter_search_datasets(filtered_query={'version': '1.0'}, page_size=10,
+                                                       prefetch=False, start=5))
+
+        self.assertEqual(['dataset{}'.format(i) for i in range(5, 20)], [d['name'] for d in result])
+        self.assertEqual(2, mock_post.call_count)
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_iter_search_datasets_early_stop(self, mock_post):
+        mock_post.side_effect = self.mock_search_pages(1000)
+
+        datasets = self.engine.iter_search_datasets(query={'version': '1.0'}, page_size=10)
+        first = next(datasets)
+        datasets.close()
+
+        self.assertEqual('dataset0', first['name'])
+        # First page and at most one prefetched page
+        self.assertLessEqual(mock_post.call_count, 2)
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_iter_search_datasets_error(self, mock_post):
+        mock_post.return_value = MockJsonResponse(200, success=False)
+
+        self.assertRaises(Exception, list, self.engine.iter_search_datasets(query={'version': '1.0'}))
+
+    def test_iter_search_datasets_no_queries(self):
+        self.assertRaises(Exception, list, self.engine.iter_search_datasets())
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
     def test_create_dataset(self, mock_post):
         # Setup
         new_dataset_name = random_string_generator(10)
@@ -226,7 +304,7 @@ class TestCkanDatasetEngine(unittest.TestCase):
         # Should return the new one
         self.assertEqual(new_dataset_name, result['result']['name'])
 
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
     def test_create_resource_url(self, mock_post):
         # Setup
         new_resource_name = random_string_generator(5)
@@ -271,7 +349,7 @@ class TestCkanDatasetEngine(unittest.TestCase):
         self.assertRaises(IOError, self.engine.create_resource, dataset_id=self.test_dataset_name,
                           file=file_to_upload)
 
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
     def test_create_resource_file_upload(self, mock_post):
         # Prepare
         file_name = 'upload_test.txt'
@@ -290,7 +368,7 @@ class TestCkanDatasetEngine(unittest.TestCase):
         self.assertEqual(result['result']['name'], 'upload_test.txt')
         self.assertEqual(result['result']['url_type'], 'upload')
 
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
     def test_create_resource_file_upload_no_ext(self, mock_post):
         # Prepare
         file_name = 'upload_test.txt'
@@ -312,7 +390,7 @@ class TestCkanDatasetEngine(unittest.TestCase):
         self.assertEqual(result['result']['url_type'], 'upload')
 
     @mock.patch('tethys_dataset_services.engines.ckan_engine.pprint')
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
     def test_get_dataset(self, mock_post, _):
         result_data = {'name': self.test_dataset_name, 'id': self.test_dataset_name}
         mock_post.return_value = MockJsonResponse(200, result=result_data)
@@ -326,7 +404,7 @@ class TestCkanDatasetEngine(unittest.TestCase):
         self.assertEqual(result['result']['name'], self.test_dataset_name)
 
     @mock.patch('tethys_dataset_services.engines.ckan_engine.pprint')
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
     def test_get_resource(self, mock_post, mock_pprint):
         result_data = {'name': self.test_dataset_name, 'url': self.test_resource_url}
         mock_post.return_value = MockJsonResponse(200, result=result_data)
@@ -344,7 +422,7 @@ class TestCkanDatasetEngine(unittest.TestCase):
 
     @mock.patch('tethys_dataset_services.engines.ckan_engine.log')
     @mock.patch('tethys_dataset_services.engines.ckan_engine.pprint')
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
     def test_get_resource_console_error(self, mock_post, mock_pprint, mock_log):
         mock_pprint.pprint.side_effect = Exception('Fake Exception')
 
@@ -364,7 +442,7 @@ class TestCkanDatasetEngine(unittest.TestCase):
         mock_log.exception.assert_called()
 
     @mock.patch('tethys_dataset_services.engines.ckan_engine.log')
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
     def test_get_resource_get_error(self, mock_post, mock_log):
         result_data = {'name': self.test_dataset_name, 'url': self.test_resource_url}
         mock_post.return_value = MockJsonResponse(200, result=result_data, success=False)
@@ -380,7 +458,7 @@ class TestCkanDatasetEngine(unittest.TestCase):
         self.assertEqual(result['result']['url'], self.test_resource_url)
         mock_log.error.assert_called()
 
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
     def test_update_dataset(self, mock_post):
         # Setup
         test_version = '2.0'
@@ -399,7 +477,7 @@ class TestCkanDatasetEngine(unittest.TestCase):
         self.assertEqual(result['result']['resources'], self.test_resource_name,)
         self.assertEqual(result['result']['tags'], 'tag_test')
 
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
     def test_update_resource_property_change(self, mock_post):
         # Setup
         new_format = 'web'
@@ -416,7 +494,7 @@ class TestCkanDatasetEngine(unittest.TestCase):
         self.assertEqual(result['result']['format'], new_format)
         self.assertEqual(result['result']['url'], self.test_resource_url)
 
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
     def test_update_resource_url_change(self, mock_post):
         # Setup
         new_url = 'http://www.utah.edu'
@@ -432,7 +510,7 @@ class TestCkanDatasetEngine(unittest.TestCase):
         # Verify New URL Property
         self.assertEqual(result['result']['url'], new_url)
 
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
     def test_update_resource_file_upload(self, mock_post):
         # Setup
         file_name = 'upload_test.txt'
@@ -476,7 +554,7 @@ class TestCkanDatasetEngine(unittest.TestCase):
         self.assertRaises(IOError, self.engine.update_resource, resource_id=self.test_resource_name,
                           file=file_to_upload)
 
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
     def test_delete_resource(self, mock_post):
         result_data = None
         mock_post.return_value = MockJsonResponse(200, result=result_data)
@@ -489,7 +567,7 @@ class TestCkanDatasetEngine(unittest.TestCase):
         # Delete requests should return nothing
         self.assertEqual(result['result'], None)
 
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
     def test_delete_dataset(self, mock_post):
         result_data = None
         mock_post.return_value = MockJsonResponse(200, result=result_data)
@@ -502,8 +580,10 @@ class TestCkanDatasetEngine(unittest.TestCase):
         # Delete requests should return nothing
         self.assertEqual(result['result'], None)
 
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
-    def test_download_resource(self, mock_post):
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_download_resource(self, mock_post, mock_get):
+        mock_get.return_value = MockStreamResponse(content=b'data')
         location = self.files_path
         local_file_name = 'test_resource.test'
         location_final = os.path.join(self.files_path, local_file_name)
@@ -521,8 +601,10 @@ class TestCkanDatasetEngine(unittest.TestCase):
         if os.path.isfile(location_final):
             os.remove(location_final)
 
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
-    def test_download_resource_no_location(self, mock_post):
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_download_resource_no_location(self, mock_post, mock_get):
+        mock_get.return_value = MockStreamResponse(content=b'data')
         local_file_name = 'test_resource.test'
         location_check = os.path.join('./', local_file_name)
 
@@ -546,10 +628,10 @@ class TestCkanDatasetEngine(unittest.TestCase):
 
         mock_ckan.assert_called_with(self.test_dataset_name, console=False)
 
-    @mock.patch('sys.stdout', new_callable=StringIO)
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.get')
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
-    def test_download_resource_request_get_exception(self, mock_post, mock_get, mock_print):
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.log')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_download_resource_request_get_exception(self, mock_post, mock_get, mock_log):
         mock_get.side_effect = Exception('Requests.get Exception')
         location = self.files_path
         local_file_name = 'test_resource.test'
@@ -557,17 +639,20 @@ class TestCkanDatasetEngine(unittest.TestCase):
         result_data = {'url': self.test_resource_url}
         mock_post.return_value = MockJsonResponse(200, result=result_data)
 
-        self.engine.download_resource(self.test_resource_name, location=location,
-                                      local_file_name=local_file_name)
-
-        output = mock_print.getvalue()
+        with self.assertRaises(Exception) as context:
+            self.engine.download_resource(self.test_resource_name, location=location,
+                                          local_file_name=local_file_name)
 
         # check results
-        self.assertIn('Requests.get Exception', output)
+        self.assertEqual('Requests.get Exception', str(context.exception))
+        mock_log.exception.assert_called_once()
+        self.assertFalse(os.path.isfile(os.path.join(location, local_file_name)))
 
     @mock.patch('tethys_dataset_services.engines.ckan_engine.warnings')
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
-    def test_download_resouce(self, mock_post, mock_warnings):
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_download_resouce(self, mock_post, mock_get, mock_warnings):
+        mock_get.return_value = MockStreamResponse(content=b'data')
         location = self.files_path
         local_file_name = 'test_resource.test'
         location_final = os.path.join(self.files_path, local_file_name)
@@ -594,8 +679,10 @@ class TestCkanDatasetEngine(unittest.TestCase):
         mock_warnings.warn.assert_called()
 
     @mock.patch('tethys_dataset_services.engines.ckan_engine.pprint')
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.post')
-    def test_download_dataset(self, mock_post, _):
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_download_dataset(self, mock_post, mock_get, _):
+        mock_get.return_value = MockStreamResponse(content=b'data')
         location = self.files_path
         location_final = os.path.join(self.files_path, 'resource1.txt')
         result_check = [location_final]
@@ -636,12 +723,12 @@ class TestCkanDatasetEngine(unittest.TestCase):
         self.assertIn(TEST_CKAN_DATASET_SERVICE['APIKEY'], result[2]['X-CKAN-API-Key'])
         self.assertIn(method, result[0])
 
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.get')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
     def test_validate(self, mock_get):
         mock_get.side_effect = requests.exceptions.MissingSchema
         self.assertRaises(AssertionError, self.engine.validate)
 
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.get')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
     def test_validate_status_code(self, mock_get):
         self.engine = CkanDatasetEngine(endpoint="http://localhost:5000/api/3/action",
                                         apikey=TEST_CKAN_DATASET_SERVICE['APIKEY'])
@@ -651,8 +738,877 @@ class TestCkanDatasetEngine(unittest.TestCase):
 
         self.assertRaises(AssertionError, self.engine.validate)
 
-    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.get')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
     def test_validate_no_version(self, mock_get):
         mock_get.return_value = MockResponse(200, json='')
 
         self.assertRaises(AssertionError, self.engine.validate)
+
+    def test_session_reused(self):
+        session = self.engine.session
+
+        # Same thread gets the same session
+        self.assertIs(session, self.engine.session)
+        self.assertIsInstance(session, requests.Session)
+
+    def test_session_pool_settings(self):
+        engine = CkanDatasetEngine(endpoint=TEST_CKAN_DATASET_SERVICE['ENDPOINT'], pool_connections=2,
+                                   pool_maxsize=16, pool_block=True)
+        adapter = engine.session.get_adapter('https://example.com')
+
+        self.assertEqual(2, adapter._pool_connections)
+        self.assertEqual(16, adapter._pool_maxsize)
+        self.assertTrue(adapter._pool_block)
+        self.assertIs(adapter, engine.session.get_adapter('http://example.com'))
+
+    def test_session_per_thread_shared_adapter(self):
+        import threading
+        sessions = []
+
+        def worker():
+            sessions.append(self.engine.session)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+        self.assertIsNot(sessions[0], self.engine.session)
+        self.assertIs(sessions[0].get_adapter('http://example.com'),
+                      self.engine.session.get_adapter('http://example.com'))
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_session_per_thread_released(self, mock_post):
+        mock_post.return_value = MockJsonResponse(200, result={})
+        calls = [(self.engine.get_dataset, {'dataset_id': 'dataset{}'.format(i)}) for i in range(4)]
+
+        for _ in range(5):
+            self.engine.execute_batch(calls, max_workers=4)
+
+        gc.collect()
+
+        # The sessions of the workers of finished batches are not kept by the engine
+        self.assertLessEqual(len(self.engine._sessions), 4)
+
+    def test_session_no_keep_alive(self):
+        engine = CkanDatasetEngine(endpoint=TEST_CKAN_DATASET_SERVICE['ENDPOINT'], keep_alive=False)
+        self.assertEqual('close', engine.session.headers['Connection'])
+        self.assertEqual('keep-alive', self.engine.session.headers['Connection'])
+
+    def test_close(self):
+        session = self.engine.session
+
+        with mock.patch.object(session, 'close') as mock_close:
+            self.engine.close()
+
+        mock_close.assert_called()
+        self.assertIsNot(session, self.engine.session)
+
+    def test_context_manager(self):
+        with mock.patch.object(CkanDatasetEngine, 'close') as mock_close:
+            with CkanDatasetEngine(endpoint=TEST_CKAN_DATASET_SERVICE['ENDPOINT']) as engine:
+                self.assertIsInstance(engine, CkanDatasetEngine)
+
+        mock_close.assert_called_once()
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_execute_api_method_timeout(self, mock_post):
+        mock_post.return_value = MockJsonResponse(200, result='Datasetname')
+        engine = CkanDatasetEngine(endpoint=TEST_CKAN_DATASET_SERVICE['ENDPOINT'], timeout=30)
+
+        engine.list_datasets()
+
+        self.assertEqual(30, mock_post.call_args[1]['timeout'])
+
+    @mock.patch('tethys_dataset_services.retry.log')
+    @mock.patch('tethys_dataset_services.retry.time.sleep')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_execute_batch(self, mock_post, _, __):
+        def package_show(url, data, **kwargs):
+            data_dict = json.loads(data.decode('ascii'))
+            if data_dict['id'] == 'bad':
+                raise requests.exceptions.ConnectionError('Connection refused')
+            return MockJsonResponse(200, result={'id': data_dict['id']})
+
+        mock_post.side_effect = package_show
+        ids = ['a', 'b', 'bad', 'c']
+
+        result = self.engine.execute_batch([('package_show', {'id': i}) for i in ids], max_workers=4)
+
+        self.assertEqual(4, len(result))
+        self.assertEqual('a', result[0]['result']['id'])
+        self.assertEqual('b', result[1]['result']['id'])
+        self.assertFalse(result[2]['success'])
+        self.assertIn('Connection refused', result[2]['error']['message'])
+        self.assertEqual('c', result[3]['result']['id'])
+        self.assertTrue(mock_post.call_args_list[0][0][0].endswith('package_show'))
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_execute_batch_engine_methods(self, mock_post):
+        mock_post.return_value = MockJsonResponse(200, result={'name': self.test_dataset_name})
+
+        result = self.engine.execute_batch([(self.engine.get_dataset, {'dataset_id': self.test_dataset_name}),
+                                            (self.engine.get_resource, {'resource_id': self.test_resource_name})])
+
+        self.assertTrue(result[0]['success'])
+        self.assertTrue(result[1]['success'])
+        self.assertTrue(mock_post.call_args_list[0][0][0].endswith('package_show') or
+                        mock_post.call_args_list[1][0][0].endswith('package_show'))
+
+    def test_execute_batch_empty(self):
+        self.assertEqual([], self.engine.execute_batch([]))
+
+    def download_resource_setup(self, part_content=None, part_validators=None, **kwargs):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        local_file = os.path.join(location, 'resource.nc')
+
+        if part_content is not None:
+            with open(local_file + '.part', 'wb') as f:
+                f.write(part_content)
+
+        if part_validators is not None:
+            with open(local_file + '.part.validators', 'w') as f:
+                json.dump(part_validators, f)
+
+        resource = {'id': 'resource-id', 'url': self.test_resource_url}
+        resource.update(kwargs)
+        return location, local_file, resource
+
+    def read_file(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    def test_download_resource_chunk_size(self, mock_get):
+        engine = CkanDatasetEngine(endpoint=TEST_CKAN_DATASET_SERVICE['ENDPOINT'], download_chunk_size=4)
+        location, local_file, resource = self.download_resource_setup()
+        response = MockStreamResponse(content=b'abcdefghij')
+        response.iter_content = mock.MagicMock(wraps=response.iter_content)
+        mock_get.return_value = response
+
+        result = engine._download_resource(resource, location, 'resource.nc')
+
+        self.assertEqual(local_file, result)
+        self.assertEqual(b'abcdefghij', self.read_file(local_file))
+        self.assertFalse(os.path.exists(local_file + '.part'))
+        mock_get.assert_called_once_with(self.test_resource_url, stream=True, headers=None, timeout=None)
+        response.iter_content.assert_called_once_with(chunk_size=4)
+        self.assertTrue(response.closed)
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    def test_download_resource_resume(self, mock_get):
+        location, local_file, resource = self.download_resource_setup(part_content=b'abc',
+                                                                      part_validators={'etag': '"v1"'})
+        mock_get.return_value = MockStreamResponse(206, content=b'def')
+
+        self.engine._download_resource(resource, location, 'resource.nc')
+
+        self.assertEqual(b'abcdef', self.read_file(local_file))
+        self.assertEqual({'Range': 'bytes=3-', 'If-Range': '"v1"'}, mock_get.call_args[1]['headers'])
+        self.assertFalse(os.path.exists(local_file + '.part.validators'))
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    def test_download_resource_resume_last_modified(self, mock_get):
+        last_modified = 'Wed, 21 Oct 2015 07:28:00 GMT'
+        location, local_file, resource = self.download_resource_setup(
+            part_content=b'abc', part_validators={'etag': 'W/"v1"', 'last_modified': last_modified}
+        )
+        mock_get.return_value = MockStreamResponse(206, content=b'def')
+
+        self.engine._download_resource(resource, location, 'resource.nc')
+
+        self.assertEqual(b'abcdef', self.read_file(local_file))
+        # Weak ETags can not be used in If-Range
+        self.assertEqual({'Range': 'bytes=3-', 'If-Range': last_modified}, mock_get.call_args[1]['headers'])
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    def test_download_resource_resume_no_validators(self, mock_get):
+        location, local_file, resource = self.download_resource_setup(part_content=b'xyz')
+        mock_get.return_value = MockStreamResponse(200, content=b'abcdef')
+
+        self.engine._download_resource(resource, location, 'resource.nc')
+
+        self.assertEqual(b'abcdef', self.read_file(local_file))
+        self.assertIsNone(mock_get.call_args[1]['headers'])
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    def test_download_resource_resume_range_ignored(self, mock_get):
+        location, local_file, resource = self.download_resource_setup(part_content=b'xyz',
+                                                                      part_validators={'etag': '"v1"'})
+        mock_get.return_value = MockStreamResponse(200, content=b'abcdef', headers={'ETag': '"v2"'})
+
+        self.engine._download_resource(resource, location, 'resource.nc')
+
+        # The resource changed: the download restarts from zero
+        self.assertEqual(b'abcdef', self.read_file(local_file))
+        self.assertEqual({'Range': 'bytes=3-', 'If-Range': '"v1"'}, mock_get.call_args[1]['headers'])
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    def test_download_resource_interrupted_stores_validators(self, mock_get):
+        location, local_file, resource = self.download_resource_setup()
+        response = MockStreamResponse(200, content=b'abcdef', headers={'ETag': '"v1"'})
+        response.iter_content = mock.MagicMock(side_effect=requests.ConnectionError('Interrupted'))
+        mock_get.return_value = response
+
+        with mock.patch('tethys_dataset_services.engines.ckan_engine.log'):
+            self.assertRaises(requests.ConnectionError, self.engine._download_resource, resource, location,
+                              'resource.nc')
+
+        self.assertEqual('"v1"', CkanDatasetEngine._get_part_if_range(local_file + '.part'))
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    def test_download_resource_resume_range_not_satisfiable(self, mock_get):
+        location, local_file, resource = self.download_resource_setup(part_content=b'abcdefgh',
+                                                                      part_validators={'etag': '"v1"'})
+        mock_get.side_effect = [MockStreamResponse(416), MockStreamResponse(200, content=b'abcdef')]
+
+        self.engine._download_resource(resource, location, 'resource.nc')
+
+        self.assertEqual(b'abcdef', self.read_file(local_file))
+        self.assertEqual({'Range': 'bytes=8-', 'If-Range': '"v1"'}, mock_get.call_args_list[0][1]['headers'])
+        self.assertIsNone(mock_get.call_args_list[1][1]['headers'])
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    def test_download_resource_no_resume(self, mock_get):
+        location, local_file, resource = self.download_resource_setup(part_content=b'abc')
+        mock_get.return_value = MockStreamResponse(200, content=b'abcdef')
+
+        self.engine._download_resource(resource, location, 'resource.nc', resume=False)
+
+        self.assertEqual(b'abcdef', self.read_file(local_file))
+        self.assertIsNone(mock_get.call_args[1]['headers'])
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.log')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    def test_download_resource_http_error(self, mock_get, mock_log):
+        location, local_file, resource = self.download_resource_setup()
+        mock_get.return_value = MockStreamResponse(404)
+
+        self.assertRaises(requests.HTTPError, self.engine._download_resource, resource, location, 'resource.nc')
+
+        self.assertFalse(os.path.exists(local_file))
+        mock_log.exception.assert_called_once()
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    def test_download_resource_verify_hash(self, mock_get):
+        resource_hash = hashlib.md5(b'abcdef').hexdigest()
+        location, local_file, resource = self.download_resource_setup(part_content=b'abc',
+                                                                      part_validators={'etag': '"v1"'},
+                                                                      hash=resource_hash)
+        mock_get.return_value = MockStreamResponse(206, content=b'def')
+
+        self.engine._download_resource(resource, location, 'resource.nc', verify_hash=True)
+
+        self.assertEqual(b'abcdef', self.read_file(local_file))
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    def test_download_resource_verify_hash_prefixed(self, mock_get):
+        resource_hash = 'SHA256:' + hashlib.sha256(b'abcdef').hexdigest().upper()
+        location, local_file, resource = self.download_resource_setup(hash=resource_hash)
+        mock_get.return_value = MockStreamResponse(200, content=b'abcdef')
+
+        self.engine._download_resource(resource, location, 'resource.nc', verify_hash=True)
+
+        self.assertEqual(b'abcdef', self.read_file(local_file))
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.log')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    def test_download_resource_verify_hash_mismatch(self, mock_get, mock_log):
+        resource_hash = hashlib.sha1(b'abcdef').hexdigest()
+        location, local_file, resource = self.download_resource_setup(hash=resource_hash)
+        mock_get.return_value = MockStreamResponse(200, content=b'abcdeX')
+
+        self.assertRaises(ValueError, self.engine._download_resource, resource, location, 'resource.nc',
+                          verify_hash=True)
+
+        self.assertFalse(os.path.exists(local_file))
+        self.assertFalse(os.path.exists(local_file + '.part'))
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.log')
+    def test_get_resource_hasher(self, mock_log):
+        self.assertEqual((None, None), CkanDatasetEngine._get_resource_hasher({'hash': ''}))
+        self.assertEqual((None, None), CkanDatasetEngine._get_resource_hasher({'hash': 'not-a-digest'}))
+        self.assertEqual((None, None), CkanDatasetEngine._get_resource_hasher({'id': 'r', 'hash': 'foo:123'}))
+        mock_log.warning.assert_called_once()
+
+        hasher, digest = CkanDatasetEngine._get_resource_hasher({'hash': 'a' * 40})
+        self.assertEqual('sha1', hasher.name)
+        self.assertEqual('a' * 40, digest)
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_download_resource_verify_hash_option(self, mock_post, mock_get):
+        resource_hash = hashlib.md5(b'abcdef').hexdigest()
+        location, local_file, resource = self.download_resource_setup(hash=resource_hash)
+        mock_post.return_value = MockJsonResponse(200, result=resource)
+        mock_get.return_value = MockStreamResponse(200, content=b'abcdeX')
+
+        self.assertRaises(ValueError, self.engine.download_resource, 'resource-id', location=location,
+                          local_file_name='resource.nc', verify_hash=True)
+
+    def mock_dataset_resources(self, mock_post, urls):
+        resources = [{'id': 'resource{}'.format(i), 'name': 'resource{}'.format(i), 'format': 'txt', 'url': url}
+                     for i, url in enumerate(urls)]
+        mock_post.return_value = MockJsonResponse(200, result={'name': self.test_dataset_name,
+                                                               'resources': resources})
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        return location
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_download_dataset_same_names(self, mock_post, mock_get):
+        resources = [{'id': 'a', 'name': 'data', 'format': 'csv', 'url': 'http://host.test/a'},
+                     {'id': 'b', 'name': 'Data', 'format': 'CSV', 'url': 'http://host.test/b'},
+                     {'id': 'c', 'name': 'other', 'format': 'csv', 'url': 'http://host.test/c'}]
+        mock_post.return_value = MockJsonResponse(200, result={'name': self.test_dataset_name,
+                                                               'resources': resources})
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        mock_get.side_effect = lambda url, **kwargs: MockStreamResponse(content=url.encode())
+
+        result = self.engine.download_dataset(self.test_dataset_name, location=location, max_workers=3)
+
+        # Resources with the same name and format are downloaded to different files
+        self.assertEqual([os.path.join(location, 'data-a.csv'), os.path.join(location, 'Data-b.CSV'),
+                          os.path.join(location, 'other.csv')], result)
+        for path, resource in zip(result, resources):
+            self.assertEqual(resource['url'].encode(), self.read_file(path))
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_download_dataset_parallel(self, mock_post, mock_get):
+        urls = ['http://host{}.test/file{}'.format(i % 2, i) for i in range(8)]
+        location = self.mock_dataset_resources(mock_post, urls)
+        lock = threading.Lock()
+        active = {}
+        max_active = {}
+
+        def get(url, **kwargs):
+            host = url.split('/')[2]
+            with lock:
+                active[host] = active.get(host, 0) + 1
+                max_active[host] = max(max_active.get(host, 0), active[host])
+            time.sleep(0.02)
+            with lock:
+                active[host] -= 1
+            return MockStreamResponse(content=url.encode())
+
+        mock_get.side_effect = get
+
+        result = self.engine.download_dataset(self.test_dataset_name, location=location, max_workers=6,
+                                              max_per_host=2)
+
+        expected = [os.path.join(location, 'resource{}.txt'.format(i)) for i in range(8)]
+        self.assertEqual(expected, result)
+        for path, url in zip(result, urls):
+            self.assertEqual(url.encode(), self.read_file(path))
+        self.assertEqual({'host0.test': 2, 'host1.test': 2}, max_active)
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.log')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_download_dataset_failures(self, mock_post, mock_get, _):
+        urls = ['http://host.test/file0', 'http://host.test/missing', 'http://host.test/file2']
+        location = self.mock_dataset_resources(mock_post, urls)
+        mock_get.side_effect = lambda url, **kwargs: MockStreamResponse(404 if 'missing' in url else 200, b'data')
+
+        with self.assertRaises(DatasetDownloadError) as context:
+            self.engine.download_dataset(self.test_dataset_name, location=location)
+
+        error = context.exception
+        self.assertEqual([os.path.join(location, 'resource0.txt'), None, os.path.join(location, 'resource2.txt')],
+                         error.downloaded)
+        self.assertEqual(['resource1'], list(error.failures))
+        self.assertIsInstance(error.failures['resource1'], requests.HTTPError)
+        self.assertIn('Unable to download 1 of 3 resources', str(error))
+        self.assertTrue(os.path.isfile(os.path.join(location, 'resource2.txt')))
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_download_dataset_no_resources(self, mock_post, mock_get):
+        location = self.mock_dataset_resources(mock_post, [])
+
+        self.assertEqual([], self.engine.download_dataset(self.test_dataset_name, location=location))
+        mock_get.assert_not_called()
+
+    def download_cache_setup(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        engine = CkanDatasetEngine(endpoint=TEST_CKAN_DATASET_SERVICE['ENDPOINT'], download_cache=cache_dir)
+        location, local_file, resource = self.download_resource_setup(last_modified='2020-01-01T00:00:00')
+        return engine, location, local_file, resource
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    def test_download_resource_cache_revalidate(self, mock_get):
+        engine, location, local_file, resource = self.download_cache_setup()
+        self.assertIsInstance(engine._download_cache, DownloadCache)
+        mock_get.return_value = MockStreamResponse(200, b'abcdef', headers={'ETag': '"v1"',
+                                                                            'Last-Modified': 'Wed, 01 Jan 2020'})
+
+        engine._download_resource(resource, location, 'resource.nc')
+
+        self.assertEqual(b'abcdef', self.read_file(local_file))
+        self.assertIsNone(mock_get.call_args[1]['headers'])
+
+        # Not modified: the cached copy is placed without downloading it again
+        os.remove(local_file)
+        mock_get.return_value = MockStreamResponse(304)
+
+        engine._download_resource(resource, location, 'resource.nc')
+
+        self.assertEqual(b'abcdef', self.read_file(local_file))
+        self.assertEqual({'If-None-Match': '"v1"', 'If-Modified-Since': 'Wed, 01 Jan 2020'},
+                         mock_get.call_args[1]['headers'])
+
+        # Modified: the new content replaces the cached copy
+        mock_get.return_value = MockStreamResponse(200, b'ghijkl', headers={'ETag': '"v2"'})
+
+        engine._download_resource(resource, location, 'resource.nc')
+
+        self.assertEqual(b'ghijkl', self.read_file(local_file))
+        key = DownloadCache.resource_key(resource)
+        self.assertEqual('"v2"', engine._download_cache.get(key)['etag'])
+        self.assertEqual(b'ghijkl', self.read_file(engine._download_cache.data_path(key)))
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    def test_download_resource_cache_not_modified_updates_entry(self, mock_get):
+        engine, location, local_file, resource = self.download_cache_setup()
+        key = DownloadCache.resource_key(resource)
+        mock_get.return_value = MockStreamResponse(200, b'abcdef', headers={'ETag': '"v1"',
+                                                                            'Last-Modified': 'Wed, 01 Jan 2020'})
+        engine._download_resource(resource, location, 'resource.nc')
+        meta_path = engine._download_cache.data_path(key) + '.json'
+        os.utime(meta_path, (0, 0))
+        mock_get.return_value = MockStreamResponse(304, headers={'ETag': '"v2"'})
+
+        with mock.patch.object(engine._download_cache, 'update', wraps=engine._download_cache.update) as mock_update:
+            engine._download_resource(resource, location, 'resource.nc')
+
+        mock_update.assert_called_once_with(key, link_to=local_file, etag='"v2"')
+        meta = engine._download_cache.get(key)
+        self.assertEqual('"v2"', meta['etag'])
+        self.assertEqual('Wed, 01 Jan 2020', meta['last_modified'])
+        # The entry is marked as recently used
+        self.assertGreater(os.path.getmtime(meta_path), 0)
+        self.assertEqual(b'abcdef', self.read_file(local_file))
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    def test_download_resource_cache_evicted_while_revalidating(self, mock_get):
+        engine, location, local_file, resource = self.download_cache_setup()
+        key = DownloadCache.resource_key(resource)
+        mock_get.return_value = MockStreamResponse(200, b'abcdef', headers={'ETag': '"v1"'})
+        engine._download_resource(resource, location, 'resource.nc')
+        os.remove(local_file)
+
+        def not_modified_after_eviction(url, headers=None, **kwargs):
+            if headers:
+                engine._download_cache.remove(key)
+                return MockStreamResponse(304)
+            return MockStreamResponse(200, b'ghijkl', headers={'ETag': '"v2"'})
+
+        mock_get.side_effect = not_modified_after_eviction
+
+        engine._download_resource(resource, location, 'resource.nc')
+
+        # The evicted entry is downloaded again instead of failing
+        self.assertEqual(b'ghijkl', self.read_file(local_file))
+        self.assertEqual('"v2"', engine._download_cache.get(key)['etag'])
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    def test_download_resource_cache_no_validators(self, mock_get):
+        engine, location, local_file, resource = self.download_cache_setup()
+        mock_get.return_value = MockStreamResponse(200, b'abcdef')
+
+        engine._download_resource(resource, location, 'resource.nc')
+        engine._download_resource(resource, location, 'copy.nc')
+
+        self.assertEqual(b'abcdef', self.read_file(os.path.join(location, 'copy.nc')))
+        mock_get.assert_called_once()
+
+        # A new version of the resource has a new cache key
+        resource['last_modified'] = '2020-02-01T00:00:00'
+        mock_get.return_value = MockStreamResponse(200, b'ghijkl')
+
+        engine._download_resource(resource, location, 'resource.nc')
+
+        self.assertEqual(b'ghijkl', self.read_file(local_file))
+        self.assertEqual(2, mock_get.call_count)
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_update_dataset_patch(self, mock_post):
+        mock_post.return_value = MockJsonResponse(200, result={'version': '2.0'})
+
+        result = self.engine.update_dataset(dataset_id=self.test_dataset_name, version='2.0')
+
+        self.assertTrue(result['success'])
+        mock_post.assert_called_once()
+        self.assertTrue(mock_post.call_args[0][0].endswith('/package_patch'))
+        self.assertEqual({'id': self.test_dataset_name, 'version': '2.0'},
+                         json.loads(mock_post.call_args[1]['data'].decode('ascii')))
+        self.assertNotIn('package_patch', self.engine._unsupported_methods)
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_update_dataset_patch_not_supported(self, mock_post):
+        not_known = MockResponse(400, text='Bad request - Action name not known: package_patch')
+        original = MockJsonResponse(200, result={'resources': ['r1'], 'tags': ['t1']})
+        updated = MockJsonResponse(200, result={'version': '2.0', 'resources': ['r1'], 'tags': ['t1']})
+        mock_post.side_effect = [not_known, original, updated, original, updated]
+
+        result = self.engine.update_dataset(dataset_id=self.test_dataset_name, version='2.0')
+
+        self.assertTrue(result['success'])
+        self.assertEqual(['package_patch', 'package_show', 'package_update'],
+                         [c[0][0].rsplit('/', 1)[1] for c in mock_post.call_args_list])
+        self.assertEqual({'id': self.test_dataset_name, 'version': '2.0', 'resources': ['r1'], 'tags': ['t1']},
+                         json.loads(mock_post.call_args[1]['data'].decode('ascii')))
+        self.assertIn('package_patch', self.engine._unsupported_methods)
+
+        # The fallback is remembered
+        self.engine.update_dataset(dataset_id=self.test_dataset_name, version='2.0')
+
+        self.assertEqual(['package_show', 'package_update'],
+                         [c[0][0].rsplit('/', 1)[1] for c in mock_post.call_args_list[3:]])
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_update_dataset_patch_error(self, mock_post):
+        mock_post.return_value = MockJsonResponse(409, success=False)
+
+        result = self.engine.update_dataset(dataset_id=self.test_dataset_name, version='2.0')
+
+        self.assertFalse(result['success'])
+        mock_post.assert_called_once()
+        self.assertNotIn('package_patch', self.engine._unsupported_methods)
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_update_resource_patch(self, mock_post):
+        mock_post.return_value = MockJsonResponse(200, result={'format': 'web', 'url': self.test_resource_url})
+
+        result = self.engine.update_resource(resource_id=self.test_resource_name, format='web')
+
+        self.assertTrue(result['success'])
+        mock_post.assert_called_once()
+        self.assertTrue(mock_post.call_args[0][0].endswith('/resource_patch'))
+        self.assertEqual({'id': self.test_resource_name, 'format': 'web'},
+                         json.loads(mock_post.call_args[1]['data'].decode('ascii')))
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_update_resource_patch_not_supported(self, mock_post):
+        not_known = MockResponse(400, text='Bad request - Action name not known: resource_patch')
+        original = MockJsonResponse(200, result={'url': self.test_resource_url})
+        updated = MockJsonResponse(200, result={'format': 'web', 'url': self.test_resource_url})
+        mock_post.side_effect = [not_known, original, updated, updated]
+
+        result = self.engine.update_resource(resource_id=self.test_resource_name, format='web')
+
+        self.assertTrue(result['success'])
+        self.assertEqual(['resource_patch', 'resource_show', 'resource_update'],
+                         [c[0][0].rsplit('/', 1)[1] for c in mock_post.call_args_list])
+        self.assertEqual({'id': self.test_resource_name, 'format': 'web', 'url': self.test_resource_url},
+                         json.loads(mock_post.call_args[1]['data'].decode('ascii')))
+
+        # The known resource saves the lookup of the url
+        self.engine.update_resource(resource_id=self.test_resource_name, format='web',
+                                    known_resource={'url': 'http://known.test'})
+
+        self.assertEqual(['resource_update'], [c[0][0].rsplit('/', 1)[1] for c in mock_post.call_args_list[3:]])
+        self.assertEqual('http://known.test', json.loads(mock_post.call_args[1]['data'].decode('ascii'))['url'])
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_update_resource_patch_not_supported_file(self, mock_post):
+        file_to_upload = os.path.join(self.support_path, 'upload_test.txt')
+        not_known = MockResponse(400, text='Bad request - Action name not known: resource_patch')
+        updated = MockJsonResponse(200, result={'name': 'upload_test.txt'})
+        mock_post.side_effect = [not_known, updated]
+
+        result = self.engine.update_resource(resource_id=self.test_resource_name, file=file_to_upload,
+                                             known_resource={'url': 'http://known.test'})
+
+        self.assertTrue(result['success'])
+        self.assertEqual(['resource_patch', 'resource_update'],
+                         [c[0][0].rsplit('/', 1)[1] for c in mock_post.call_args_list])
+        fields = mock_post.call_args[1]['data'].fields
+        self.assertEqual('http://known.test', fields['url'])
+        self.assertEqual('upload_test.txt', fields['upload'][0])
+
+    def mock_streaming_post(self, mock_post, result):
+        bodies = []
+
+        def post(url, data=None, headers=None, **kwargs):
+            # Read the body in chunks like requests does when streaming
+            bodies.append(b''.join(iter(lambda: data.read(8192), b'')))
+            return MockJsonResponse(200, result=result)
+
+        mock_post.side_effect = post
+        return bodies
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_create_resource_progress(self, mock_post):
+        file_to_upload = os.path.join(self.support_path, 'upload_test.txt')
+        bodies = self.mock_streaming_post(mock_post, {'name': 'upload_test.txt'})
+        progress = mock.MagicMock()
+
+        result = self.engine.create_resource(dataset_id=self.test_dataset_name, file=file_to_upload,
+                                             progress=progress)
+
+        self.assertTrue(result['success'])
+        total = len(bodies[0])
+        self.assertEqual(total, mock_post.call_args[1]['data'].len)
+        self.assertIn(b'filename="upload_test.txt"', bodies[0])
+        self.assertEqual(mock.call(total, total), progress.call_args)
+        sent = [c[0][0] for c in progress.call_args_list]
+        self.assertEqual(sorted(sent), sent)
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_update_resource_progress(self, mock_post):
+        file_to_upload = os.path.join(self.support_path, 'upload_test.txt')
+        bodies = self.mock_streaming_post(mock_post, {'name': 'upload_test.txt'})
+        progress = mock.MagicMock()
+
+        result = self.engine.update_resource(resource_id=self.test_resource_name, file=file_to_upload,
+                                             progress=progress)
+
+        self.assertTrue(result['success'])
+        self.assertTrue(mock_post.call_args[0][0].endswith('/resource_patch'))
+        self.assertIn(b'filename="upload_test.txt"', bodies[0])
+        self.assertEqual(mock.call(len(bodies[0]), len(bodies[0])), progress.call_args)
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_create_resource_no_progress(self, mock_post):
+        file_to_upload = os.path.join(self.support_path, 'upload_test.txt')
+        mock_post.return_value = MockJsonResponse(200, result={'name': 'upload_test.txt'})
+
+        self.engine.create_resource(dataset_id=self.test_dataset_name, file=file_to_upload)
+
+        self.assertIsInstance(mock_post.call_args[1]['data'], MultipartEncoder)
+
+    def mock_multipart_server(self, mock_post, upload=None, failures=None):
+        # Mock the multipart API methods of ckanext-cloudstorage, failures maps part numbers to times they fail
+        server = {'parts': {}, 'calls': [], 'upload': upload}
+        failures = dict(failures or {})
+
+        def post(url, data=None, **kwargs):
+            action = url.rsplit('/', 1)[1]
+            server['calls'].append(action)
+
+            if action == 'cloudstorage_upload_multipart':
+                part_number = int(data.fields['partNumber'])
+                if failures.get(part_number):
+                    failures[part_number] -= 1
+                    raise requests.ConnectionError('Connection reset')
+                server['parts'][part_number] = data.fields['upload'][1].read()
+                return MockJsonResponse(200, result={'partNumber': part_number})
+
+            data = json.loads(data.decode('ascii'))
+            if action == 'cloudstorage_check_multipart':
+                return MockJsonResponse(200, result=server['upload'] and {'upload': server['upload']})
+            if action == 'cloudstorage_initiate_multipart':
+                server['initiate'] = data
+                return MockJsonResponse(200, result={'id': 'upload-id', 'name': data['name']})
+            if action == 'resource_create':
+                server['resource'] = data
+                return MockJsonResponse(200, result=dict(data, id='resource-id'))
+            return MockJsonResponse(200, result=data)
+
+        mock_post.side_effect = post
+        return server
+
+    def make_upload_file(self, content):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        path = os.path.join(location, 'large.tif')
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_upload_resource_chunked(self, mock_post):
+        server = self.mock_multipart_server(mock_post)
+        path = self.make_upload_file(b'0123456789')
+        progress = mock.MagicMock()
+
+        result = self.engine.upload_resource_chunked('resource-id', path, part_size=4, progress=progress)
+
+        self.assertTrue(result['success'])
+        self.assertEqual({'id': 'resource-id', 'uploadId': 'upload-id'}, result['result'])
+        self.assertEqual({'id': 'resource-id', 'name': 'large.tif', 'size': 10}, server['initiate'])
+        self.assertEqual({1: b'0123', 2: b'4567', 3: b'89'}, server['parts'])
+        self.assertEqual([mock.call(4, 10), mock.call(8, 10), mock.call(10, 10)], progress.call_args_list)
+        self.assertEqual('cloudstorage_finish_multipart', server['calls'][-1])
+
+    @mock.patch('tethys_dataset_services.retry.log')
+    @mock.patch('tethys_dataset_services.retry.time.sleep')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_upload_resource_chunked_retry(self, mock_post, mock_sleep, _):
+        server = self.mock_multipart_server(mock_post, failures={2: 2})
+        path = self.make_upload_file(b'0123456789')
+        engine = CkanDatasetEngine(endpoint=TEST_CKAN_DATASET_SERVICE['ENDPOINT'],
+                                   retry_policy=RetryPolicy(backoff=0.5, jitter=0))
+
+        result = engine.upload_resource_chunked('resource-id', path, part_size=4)
+
+        self.assertTrue(result['success'])
+        self.assertEqual({1: b'0123', 2: b'4567', 3: b'89'}, server['parts'])
+        self.assertEqual([mock.call(0.5), mock.call(1.0)], mock_sleep.call_args_list)
+        self.assertEqual(2, engine.retry_policy.retries)
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.log')
+    @mock.patch('tethys_dataset_services.retry.log')
+    @mock.patch('tethys_dataset_services.retry.time.sleep')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_upload_resource_chunked_part_fails(self, mock_post, mock_sleep, _, __):
+        server = self.mock_multipart_server(mock_post, failures={2: 3})
+        path = self.make_upload_file(b'0123456789')
+
+        result = self.engine.upload_resource_chunked('resource-id', path, part_size=4)
+
+        self.assertFalse(result['success'])
+        self.assertIn('Connection reset', result['error']['message'])
+        self.assertEqual({1: b'0123'}, server['parts'])
+        self.assertEqual(2, mock_sleep.call_count)
+        self.assertNotIn('cloudstorage_finish_multipart', server['calls'])
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_upload_resource_chunked_resume(self, mock_post):
+        server = self.mock_multipart_server(mock_post, upload={'id': 'previous-id', 'name': 'large.tif', 'parts': 2})
+        path = self.make_upload_file(b'0123456789')
+
+        result = self.engine.upload_resource_chunked('resource-id', path, part_size=4)
+
+        self.assertTrue(result['success'])
+        self.assertEqual('previous-id', result['result']['uploadId'])
+        self.assertEqual({3: b'89'}, server['parts'])
+        self.assertNotIn('cloudstorage_initiate_multipart', server['calls'])
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_upload_resource_chunked_other_upload(self, mock_post):
+        server = self.mock_multipart_server(mock_post, upload={'id': 'previous-id', 'name': 'other.tif', 'parts': 2})
+        path = self.make_upload_file(b'0123456789')
+
+        result = self.engine.upload_resource_chunked('resource-id', path, part_size=4)
+
+        self.assertTrue(result['success'])
+        self.assertEqual('upload-id', result['result']['uploadId'])
+        self.assertEqual(['cloudstorage_check_multipart', 'cloudstorage_abort_multipart',
+                          'cloudstorage_initiate_multipart'], server['calls'][:3])
+        self.assertEqual([1, 2, 3], sorted(server['parts']))
+
+    def test_upload_resource_chunked_file_not_exist(self):
+        self.assertRaises(IOError, self.engine.upload_resource_chunked, 'resource-id',
+                          os.path.join(self.support_path, 'upload_test1.txt'))
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_create_resource_part_size(self, mock_post):
+        server = self.mock_multipart_server(mock_post)
+        path = self.make_upload_file(b'0123456789')
+
+        result = self.engine.create_resource(dataset_id=self.test_dataset_name, file=path, part_size=4)
+
+        self.assertTrue(result['success'])
+        self.assertEqual({'package_id': self.test_dataset_name, 'name': 'large.tif', 'url': 'large.tif',
+                          'url_type': 'upload'}, server['resource'])
+        self.assertEqual({1: b'0123', 2: b'4567', 3: b'89'}, server['parts'])
+        self.assertEqual(['resource_create', 'cloudstorage_check_multipart'], server['calls'][:2])
+        self.assertEqual('resource_show', server['calls'][-1])
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_create_resource_dedupe_match(self, mock_post):
+        path = self.make_upload_file(b'0123456789')
+        resources = [
+            {'id': 'other-size', 'size': 11, 'hash': hashlib.md5(b'0123456789').hexdigest()},
+            {'id': 'no-hash', 'size': 10, 'hash': ''},
+            {'id': 'other-hash', 'size': None, 'hash': hashlib.md5(b'9876543210').hexdigest()},
+            {'id': 'duplicate', 'size': '10', 'hash': hashlib.sha1(b'0123456789').hexdigest()},
+        ]
+        mock_post.return_value = MockJsonResponse(200, result={'resources': resources})
+
+        result = self.engine.create_resource(dataset_id=self.test_dataset_name, file=path, dedupe=True)
+
+        self.assertTrue(result['success'])
+        self.assertEqual('duplicate', result['result']['id'])
+        mock_post.assert_called_once()
+        self.assertTrue(mock_post.call_args[0][0].endswith('/package_show'))
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_create_resource_dedupe_no_match(self, mock_post):
+        path = self.make_upload_file(b'0123456789')
+        resources = [{'id': 'other-hash', 'size': 10, 'hash': hashlib.sha256(b'9876543210').hexdigest()}]
+        mock_post.side_effect = [MockJsonResponse(200, result={'resources': resources}),
+                                 MockJsonResponse(200, result={'id': 'new'})]
+
+        result = self.engine.create_resource(dataset_id=self.test_dataset_name, file=path, dedupe=True)
+
+        self.assertEqual('new', result['result']['id'])
+        self.assertTrue(mock_post.call_args[0][0].endswith('/resource_create'))
+        fields = mock_post.call_args[1]['data'].fields
+        self.assertEqual(hashlib.sha256(b'0123456789').hexdigest(), fields['hash'])
+        self.assertEqual('10', fields['size'])
+
+    def test_create_resource_dedupe_file_not_exist(self):
+        self.assertRaises(IOError, self.engine.create_resource, dataset_id=self.test_dataset_name,
+                          file=os.path.join(self.support_path, 'upload_test1.txt'), dedupe=True)
+
+    def test_hash_file(self):
+        content = os.urandom(5000)
+        path = self.make_upload_file(content)
+
+        result = CkanDatasetEngine._hash_file(path, {'md5', 'sha256'}, buffer_size=1024)
+
+        self.assertEqual({'md5': hashlib.md5(content).hexdigest(), 'sha256': hashlib.sha256(content).hexdigest()},
+                         result)
+
+    @mock.patch('tethys_dataset_services.retry.log')
+    @mock.patch('tethys_dataset_services.retry.time')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_execute_api_method_retry(self, mock_post, mock_time, _):
+        mock_post.side_effect = [MockResponse(502, text='Bad Gateway'), MockJsonResponse(200, result={'id': 'a'})]
+
+        result = self.engine.get_dataset('a')
+
+        self.assertEqual('a', result['result']['id'])
+        self.assertEqual(2, mock_post.call_count)
+        self.assertEqual(1, self.engine.retry_policy.retries)
+
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.log')
+    @mock.patch('tethys_dataset_services.retry.log')
+    @mock.patch('tethys_dataset_services.retry.time')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_execute_api_method_create_not_retried(self, mock_post, mock_time, _, __):
+        mock_post.return_value = MockResponse(502, text='Bad Gateway')
+
+        result = self.engine.create_dataset(self.test_dataset_name)
+
+        self.assertIsNone(result)
+        mock_post.assert_called_once()
+
+    @mock.patch('tethys_dataset_services.retry.log')
+    @mock.patch('tethys_dataset_services.retry.time')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.post')
+    def test_update_resource_upload_retry(self, mock_post, mock_time, _):
+        file_to_upload = os.path.join(self.support_path, 'upload_test.txt')
+        bodies = []
+
+        def post(url, data=None, **kwargs):
+            bodies.append(data.read())
+            return MockResponse(503, text='Unavailable') if len(bodies) == 1 else MockJsonResponse(200, result={})
+
+        mock_post.side_effect = post
+
+        result = self.engine.update_resource(resource_id=self.test_resource_name, file=file_to_upload)
+
+        self.assertTrue(result['success'])
+        self.assertEqual(2, len(bodies))
+        self.assertIn(b'filename="upload_test.txt"', bodies[0])
+        self.assertEqual(len(bodies[0]), len(bodies[1]))
+
+    @mock.patch('tethys_dataset_services.retry.log')
+    @mock.patch('tethys_dataset_services.retry.time')
+    @mock.patch('tethys_dataset_services.engines.ckan_engine.requests.Session.get')
+    def test_download_resource_retry(self, mock_get, mock_time, _):
+        location, local_file, resource = self.download_resource_setup()
+        mock_get.side_effect = [requests.exceptions.ConnectionError('reset'), MockStreamResponse(content=b'abc')]
+
+        self.engine._download_resource(resource, location, 'resource.nc')
+
+        self.assertEqual(b'abc', self.read_file(local_file))
+        self.assertEqual(2, mock_get.call_count)
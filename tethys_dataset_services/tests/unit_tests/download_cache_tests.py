@@ -0,0 +1,152 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import mock
+from tethys_dataset_services.download_cache import DownloadCache
+
+
+class TestDownloadCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.work_dir = tempfile.mkdtemp()
+        self.cache = DownloadCache(os.path.join(self.cache_dir, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+        shutil.rmtree(self.work_dir)
+
+    def make_file(self, name, content):
+        path = os.path.join(self.work_dir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def read_file(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def set_last_used(self, key, timestamp):
+        os.utime(os.path.join(self.cache.directory, key + '.json'), (timestamp, timestamp))
+
+    def test_resource_key(self):
+        resource = {'id': 'r1', 'last_modified': '2020-01-01', 'hash': 'abc', 'name': 'foo'}
+        key = DownloadCache.resource_key(resource)
+
+        self.assertEqual(key, DownloadCache.resource_key(dict(resource, name='bar')))
+        self.assertNotEqual(key, DownloadCache.resource_key(dict(resource, id='r2')))
+        self.assertNotEqual(key, DownloadCache.resource_key(dict(resource, last_modified='2020-01-02')))
+        self.assertNotEqual(key, DownloadCache.resource_key(dict(resource, hash='abd')))
+
+    def test_put_get(self):
+        path = self.make_file('a', b'abc')
+
+        data_path = self.cache.put('key', path, etag='"1"')
+
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(b'abc', self.read_file(data_path))
+        self.assertEqual({'etag': '"1"', 'size': 3}, self.cache.get('key'))
+        self.assertIsNone(self.cache.get('missing'))
+
+    def test_update(self):
+        self.cache.put('key', self.make_file('a', b'abc'), etag='"1"')
+
+        self.cache.update('key', etag='"2"')
+        self.cache.update('missing', etag='"2"')
+
+        self.assertEqual({'etag': '"2"', 'size': 3}, self.cache.get('key'))
+        self.assertIsNone(self.cache.get('missing'))
+
+    def test_update_link_to(self):
+        self.cache.put('key', self.make_file('a', b'abc'), etag='"1"')
+        destination = os.path.join(self.work_dir, 'dest')
+
+        self.assertTrue(self.cache.update('key', link_to=destination, etag='"2"'))
+        self.assertFalse(self.cache.update('missing', link_to=destination + '2', etag='"2"'))
+
+        self.assertEqual(b'abc', self.read_file(destination))
+        self.assertFalse(os.path.exists(destination + '2'))
+
+    def test_put_link_to_not_evicted(self):
+        self.cache.max_size = 4
+        self.cache.put('a', self.make_file('a', b'1234'))
+        destination = os.path.join(self.work_dir, 'dest')
+        link = self.cache.link
+        others = []
+
+        def link_while_putting(key, path):
+            # Another put (and its eviction) waits for the locked put that links the entry
+            other = threading.Thread(target=self.cache.put, args=('c', self.make_file('c', b'5678')))
+            other.start()
+            other.join(0.1)
+            others.append(other)
+            link(key, path)
+
+        with mock.patch.object(self.cache, 'link', side_effect=link_while_putting):
+            self.cache.put('b', self.make_file('b', b'abcd'), link_to=destination)
+
+        others[0].join()
+        self.assertEqual(b'abcd', self.read_file(destination))
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('c'))
+
+    def test_link(self):
+        self.cache.put('key', self.make_file('a', b'abc'))
+        destination = self.make_file('b', b'old')
+
+        self.cache.link('key', destination)
+
+        self.assertEqual(b'abc', self.read_file(destination))
+        self.assertTrue(os.path.samefile(self.cache.data_path('key'), destination))
+
+    @mock.patch('tethys_dataset_services.download_cache.os.link')
+    def test_link_copy(self, mock_link):
+        mock_link.side_effect = OSError('Invalid cross-device link')
+        self.cache.put('key', self.make_file('a', b'abc'))
+        destination = os.path.join(self.work_dir, 'b')
+
+        self.cache.link('key', destination)
+
+        self.assertEqual(b'abc', self.read_file(destination))
+        self.assertFalse(os.path.samefile(self.cache.data_path('key'), destination))
+
+    def test_remove(self):
+        self.cache.put('key', self.make_file('a', b'abc'))
+
+        self.cache.remove('key')
+        self.cache.remove('key')
+
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual([], self.cache.entries())
+
+    def test_evict_lru(self):
+        self.cache.max_size = 10
+        self.cache.put('a', self.make_file('a', b'1234'))
+        self.set_last_used('a', 1000)
+        self.cache.put('b', self.make_file('b', b'1234'))
+        self.set_last_used('b', 2000)
+
+        # Using "a" makes "b" the least recently used entry
+        self.cache.get('a')
+        self.cache.put('c', self.make_file('c', b'1234'))
+
+        self.assertEqual(['a', 'c'], sorted(key for key, _, _ in self.cache.entries()))
+        self.assertEqual(8, self.cache.size())
+
+    def test_evict_keeps_new_entry(self):
+        self.cache.max_size = 2
+        self.cache.put('a', self.make_file('a', b'1'))
+
+        self.cache.put('b', self.make_file('b', b'1234'))
+
+        self.assertEqual(['b'], [key for key, _, _ in self.cache.entries()])
+
+    def test_evict_no_limit(self):
+        self.cache.put('a', self.make_file('a', b'1234'))
+        self.cache.put('b', self.make_file('b', b'1234'))
+
+        self.cache.evict()
+
+        self.assertEqual(8, self.cache.size())
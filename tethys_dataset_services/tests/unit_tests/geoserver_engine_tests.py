@@ -1,15 +1,21 @@
 from builtins import *  # noqa: F403, F401
 
 import os
+import json
 import sys
 import random
 import string
+import threading
 import unittest
 import mock
 import geoserver
 import requests
+from io import BytesIO
+from zipfile import ZipFile
 from sqlalchemy import create_engine
 from tethys_dataset_services.engines import GeoServerSpatialDatasetEngine
+from tethys_dataset_services.engines.geoserver_engine import OgcUrlMap
+from tethys_dataset_services.utilities import ZipStream
 
 if sys.version_info[0] == 3:
     from io import StringIO
@@ -63,11 +69,12 @@ def mock_get_resource_create_postgis_feature_resource(name, **kwargs):
 
 
 class MockResponse(object):
-    def __init__(self, status_code, text=None, json=None, reason=None):
+    def __init__(self, status_code, text=None, json=None, reason=None, headers=None):
         self.status_code = status_code
         self.text = text
         self.json_obj = json
         self.reason = reason
+        self.headers = headers or {}
 
     def json(self):
         return self.json_obj
@@ -385,6 +392,8 @@ class TestGeoServerDatasetEngine(unittest.TestCase):
 
     @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
     def test_list_layer_groups_with_properties(self, mock_catalog):
+        # Worker catalogs are created against the same endpoint
+        mock_catalog.return_value = self.mock_catalog
         mc = mock_catalog()
         mc.get_layergroups.return_value = self.mock_layer_groups
 
@@ -1754,6 +1763,34 @@ class TestGeoServerDatasetEngine(unittest.TestCase):
         mc.get_resource.assert_called_with(name=self.store_names[0], store=self.store_names[0],
                                            workspace=self.workspace_name[0])
 
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.put')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_create_shapefile_resource_streams_zip(self, mock_catalog, mock_put):
+        archives = []
+
+        def put(url, data, **kwargs):
+            self.assertIsInstance(data, ZipStream)
+            archives.append(ZipFile(BytesIO(b''.join(data))))
+            return MockResponse(201)
+
+        mock_put.side_effect = put
+        mock_catalog().get_resource.return_value = self.mock_resources[0]
+        shapefile_dir = os.path.join(self.files_root, 'shapefile')
+        store_id = '{}:{}'.format(self.workspace_name, self.store_names[0])
+
+        response = self.engine.create_shapefile_resource(store_id=store_id,
+                                                         shapefile_base=os.path.join(shapefile_dir, 'test'),
+                                                         overwrite=True)
+
+        self.assertTrue(response['success'])
+        archive = archives[0]
+        self.assertIsNone(archive.testzip())
+        self.assertIn(self.store_names[0] + '.shp', archive.namelist())
+        with open(os.path.join(shapefile_dir, 'test.shp'), 'rb') as shp:
+            self.assertEqual(shp.read(), archive.read(self.store_names[0] + '.shp'))
+        # No temporary archive is written next to the shapefile
+        self.assertFalse(os.path.exists(os.path.join(shapefile_dir, self.store_names[0] + '.zip')))
+
     @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.put')
     @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
     def test_create_shapefile_resource_zipfile(self, mock_catalog, mock_put):
@@ -2252,6 +2289,57 @@ class TestGeoServerDatasetEngine(unittest.TestCase):
         self.assertEqual(expected_headers, put_call_args[0][1]['headers'])
         self.assertEqual(expected_params, put_call_args[0][1]['params'])
 
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.put')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_create_coverage_resource_streams_file(self, mock_catalog, mock_put):
+        store_id = '{}:{}'.format(self.workspace_names[0], self.store_names[0])
+        coverage_file = os.path.join(self.files_root, 'adem.tif')
+        progress = mock.MagicMock()
+        uploads = []
+
+        def put(url, data, **kwargs):
+            uploads.append((data.len, b''.join(data)))
+            return MockResponse(201)
+
+        mock_put.side_effect = put
+
+        response = self.engine.create_coverage_resource(store_id=store_id, coverage_type='geotiff',
+                                                        coverage_file=coverage_file, overwrite=True,
+                                                        query_after_success=False, progress=progress)
+
+        self.assertTrue(response['success'])
+        size = os.path.getsize(coverage_file)
+
+        with open(coverage_file, 'rb') as f:
+            self.assertEqual([(size, f.read())], uploads)
+
+        progress.assert_called_with(size, size)
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.put')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_create_coverage_resource_streams_multiple_files(self, mock_catalog, mock_put):
+        store_id = '{}:{}'.format(self.workspace_names[0], self.store_names[0])
+        arc_sample = os.path.join(self.files_root, 'arc_sample')
+        archives = []
+
+        def put(url, data, **kwargs):
+            # The size of the zip archive is not known up front, so it is sent with chunked transfer encoding
+            self.assertIsNone(data.len)
+            archives.append(ZipFile(BytesIO(b''.join(data))))
+            return MockResponse(201)
+
+        mock_put.side_effect = put
+
+        with open(os.path.join(arc_sample, 'precip30min.asc'), 'rb') as coverage_upload, \
+                open(os.path.join(arc_sample, 'precip30min.prj'), 'rb') as prj_upload:
+            response = self.engine.create_coverage_resource(store_id=store_id, coverage_type='arcgrid',
+                                                            coverage_upload=[coverage_upload, prj_upload],
+                                                            overwrite=True, query_after_success=False)
+
+        self.assertTrue(response['success'])
+        self.assertEqual(['precip30min.asc', 'precip30min.prj'], archives[0].namelist())
+        self.assertEqual('precip30min', mock_put.call_args[1]['params']['coverageName'])
+
     @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
     def test_create_coverage_resource_no_overwrite_store_exists(self, _):
         expected_store_id = '{}:{}'.format(self.workspace_names[0], self.store_names[0])
@@ -2623,67 +2711,43 @@ class TestGeoServerDatasetEngine(unittest.TestCase):
 
     @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.put')
     @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
-    def test_create_coverage_resource_grass_grid_existing_folder(self, mock_catalog, mock_put):
+    def test_create_coverage_resource_grass_grid_converts_headers(self, mock_catalog, mock_put):
         expected_store_id = '{}:{}'.format(self.workspace_names[0], self.store_names[0])
-        expected_coverage_type = 'grassgrid'
-        coverage_file_name = 'my_grass.zip'
-        coverage_name = coverage_file_name.split('.')[0]
-        coverage_file = os.path.join(self.files_root, "grass_ascii", coverage_file_name)
+        grass_dir = os.path.join(self.files_root, 'grass_ascii')
+        archives = []
 
-        mc = mock_catalog()
-        mock_resource = mock.NonCallableMagicMock(workspace=self.workspace_names[0])
-        mock_resource.name = coverage_name
-        mc.get_resource.return_value = mock_resource
-        mock_put.return_value = MockResponse(201)
+        def put(url, data, **kwargs):
+            archives.append(ZipFile(BytesIO(b''.join(data))))
+            return MockResponse(201)
 
-        # Creating temp folder
-        working_dir = os.path.join(os.path.dirname(coverage_file), '.gstmp')
-        os.makedirs(working_dir)
+        mock_put.side_effect = put
 
-        # Execute
         response = self.engine.create_coverage_resource(store_id=expected_store_id,
-                                                        coverage_type=expected_coverage_type,
-                                                        coverage_file=coverage_file,
+                                                        coverage_type='grassgrid',
+                                                        coverage_file=os.path.join(grass_dir, 'my_grass.zip'),
                                                         overwrite=True,
-                                                        debug=False)
-        # Validate response object
-        self.assert_valid_response_object(response)
+                                                        query_after_success=False)
 
-        # Success
         self.assertTrue(response['success'])
+        archive = archives[0]
+        self.assertEqual(['my_grass.asc', 'my_grass.prj'], archive.namelist())
 
-        # Extract Result
-        r = response['result']
+        with open(os.path.join(grass_dir, 'my_grass.asc'), 'rb') as f:
+            grass_lines = f.read().split(b'\n')
 
-        # Type
-        self.assertIsInstance(r, dict)
+        arc_lines = archive.read('my_grass.asc').split(b'\n')
+        self.assertEqual([b'ncols         720',
+                          b'nrows         360',
+                          b'xllcorner     -180.0',
+                          b'yllcorner     -90.0',
+                          b'cellsize      0.5'], arc_lines[:5])
+        self.assertEqual(grass_lines[6:], arc_lines[5:])
 
-        # Tests
-        self.assertEqual(coverage_name, r['name'])
-        self.assertEqual(self.workspace_names[0], r['workspace'])
+        with ZipFile(os.path.join(grass_dir, 'my_grass.zip')) as original:
+            self.assertEqual(original.read('my_grass.prj'), archive.read('my_grass.prj'))
 
-        mc.get_resource.assert_called_with(name=coverage_name, store=self.store_names[0],
-                                           workspace=self.workspace_names[0])
-
-        # PUT Tests
-        put_call_args = mock_put.call_args_list
-        expected_url = '{endpoint}workspaces/{w}/coveragestores/{s}/file.{ext}'.format(
-            endpoint=self.endpoint,
-            w=self.workspace_names[0],
-            s=self.store_names[0],
-            ext='arcgrid'
-        )
-        expected_headers = {
-            "Content-type": "application/zip",
-            "Accept": "application/xml"
-        }
-        expected_params = {
-            'update': 'overwrite',
-            'coverageName': coverage_name
-        }
-        self.assertEqual(expected_url, put_call_args[0][1]['url'])
-        self.assertEqual(expected_headers, put_call_args[0][1]['headers'])
-        self.assertEqual(expected_params, put_call_args[0][1]['params'])
+        # Nothing is extracted next to the archive
+        self.assertFalse(os.path.exists(os.path.join(grass_dir, '.gstmp')))
 
     @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
     def test_create_coverage_resource_grass_grid_invalid_file(self, _):
@@ -2728,6 +2792,93 @@ class TestGeoServerDatasetEngine(unittest.TestCase):
                           overwrite=True,
                           debug=False)
 
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.put')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_add_granules_to_image_mosaic(self, mock_catalog, mock_put, mock_post):
+        mc = mock_catalog()
+        mc.get_store.side_effect = geoserver.catalog.FailedRequestError()
+        mosaic_sample = os.path.join(self.files_root, 'mosaic_sample')
+        granules = [[os.path.join(mosaic_sample, 'global_mosaic_{0}.{1}'.format(i, ext))
+                     for ext in ('png', 'pgw', 'prj')] for i in range(25)]
+        archives = []
+
+        def upload(status_code):
+            def send(url, data, **kwargs):
+                archives.append(ZipFile(BytesIO(b''.join(data))))
+                return MockResponse(status_code)
+            return send
+
+        mock_put.side_effect = upload(201)
+        mock_post.side_effect = upload(202)
+        store_id = '{}:{}'.format(self.workspace_names[0], self.store_names[0])
+
+        response = self.engine.add_granules_to_image_mosaic(store_id=store_id, granules=granules, batch_size=10,
+                                                            coverage_name='global_mosaic')
+
+        self.assert_valid_response_object(response)
+        self.assertTrue(response['success'])
+        self.assertEqual({'store': store_id, 'created': True, 'granules': 25, 'added': 25, 'batches': 3, 'failed': []},
+                         response['result'])
+
+        # The store is created with the first batch and the other batches are harvested
+        expected_url = '{}workspaces/{}/coveragestores/{}/file.imagemosaic'.format(
+            self.endpoint, self.workspace_names[0], self.store_names[0])
+        mock_put.assert_called_once()
+        self.assertEqual(expected_url, mock_put.call_args[1]['url'])
+        self.assertEqual({'coverageName': 'global_mosaic'}, mock_put.call_args[1]['params'])
+        self.assertEqual(2, mock_post.call_count)
+        self.assertEqual({}, mock_post.call_args[1]['params'])
+        self.assertEqual(['global_mosaic_0.png', 'global_mosaic_0.pgw', 'global_mosaic_0.prj'],
+                         archives[0].namelist()[:3])
+        self.assertEqual([30, 30, 15], sorted((len(archive.namelist()) for archive in archives), reverse=True))
+        mc.get_resource.assert_not_called()
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_add_granules_to_image_mosaic_external(self, mock_catalog, mock_post):
+        mock_post.side_effect = [MockResponse(202), MockResponse(500, text='Harvest failed', reason='Error')]
+        store_id = '{}:{}'.format(self.workspace_names[0], self.store_names[0])
+
+        response = self.engine.add_granules_to_image_mosaic(store_id=store_id, external=True, max_workers=1,
+                                                            granules=['/data/2024/a.tif', 'file:///data/2024/b.tif'])
+
+        self.assert_valid_response_object(response)
+        self.assertFalse(response['success'])
+        self.assertIn('1 of 2', response['error'])
+        result = response['result']
+        self.assertFalse(result['created'])
+        self.assertEqual(1, result['added'])
+        self.assertEqual([{'granules': ['file:///data/2024/b.tif'], 'error': 'Error(500): Harvest failed'}],
+                         result['failed'])
+
+        expected_url = '{}workspaces/{}/coveragestores/{}/external.imagemosaic'.format(
+            self.endpoint, self.workspace_names[0], self.store_names[0])
+        self.assertEqual(expected_url, mock_post.call_args_list[0][1]['url'])
+        self.assertEqual(['file:///data/2024/a.tif', 'file:///data/2024/b.tif'],
+                         [c[1]['data'] for c in mock_post.call_args_list])
+        self.assertEqual('text/plain', mock_post.call_args[1]['headers']['Content-type'])
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.put')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_add_granules_to_image_mosaic_create_failed(self, mock_catalog, mock_put, mock_post):
+        mock_catalog().get_store.return_value = None
+        mock_put.return_value = MockResponse(400, text='Bad mosaic', reason='Bad Request')
+        granule = os.path.join(self.files_root, 'adem.tif')
+
+        response = self.engine.add_granules_to_image_mosaic(store_id='{}:{}'.format(self.workspace_names[0],
+                                                                                    self.store_names[0]),
+                                                            granules=[granule, granule], batch_size=1)
+
+        self.assert_valid_response_object(response)
+        self.assertFalse(response['success'])
+        self.assertIn('Bad Request(400): Bad mosaic', response['error'])
+        mock_post.assert_not_called()
+
+    def test_add_granules_to_image_mosaic_no_granules(self):
+        self.assertRaises(ValueError, self.engine.add_granules_to_image_mosaic, store_id='foo', granules=[])
+
     @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
     def test_create_workspace(self, mock_catalog):
         mc = mock_catalog()
@@ -2831,8 +2982,10 @@ class TestGeoServerDatasetEngine(unittest.TestCase):
         # Properties
         self.assertIn('Conflictingdata error', r)
 
+    @mock.patch('tethys_dataset_services.retry.log')
+    @mock.patch('tethys_dataset_services.retry.time')
     @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
-    def test_create_style_upload_error(self, mock_catalog):
+    def test_create_style_upload_error(self, mock_catalog, mock_time, _):
         mc = mock_catalog()
         mc.create_style.side_effect = geoserver.catalog.UploadError()
         expected_style_id = 'style1'
@@ -2845,9 +2998,12 @@ class TestGeoServerDatasetEngine(unittest.TestCase):
                           sld=expected_sld)
 
         mc.create_style.assert_called_with(name=expected_style_id, data=expected_sld, workspace=None, overwrite=False)
+        self.assertEqual(self.engine.retry_policy.max_attempts, mc.create_style.call_count)
 
+    @mock.patch('tethys_dataset_services.retry.log')
+    @mock.patch('tethys_dataset_services.retry.time')
     @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
-    def test_create_style_upload_error_recover(self, mock_catalog):
+    def test_create_style_upload_error_recover(self, mock_catalog, mock_time, _):
         mc = mock_catalog()
         mc.create_style.side_effect = self.mock_upload_fail_three_times
         expected_style_id = 'style1'
@@ -2856,6 +3012,8 @@ class TestGeoServerDatasetEngine(unittest.TestCase):
         # Should Fail
         response = self.engine.create_style(style_id=expected_style_id, sld=expected_sld)
 
+        self.assertEqual(2, mock_time.sleep.call_count)
+
         # Validate response object
         self.assert_valid_response_object(response)
 
@@ -3007,6 +3165,103 @@ class TestGeoServerDatasetEngine(unittest.TestCase):
 
         mc.get_layer.assert_called_with(feature_type_name)
 
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.get')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.put')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.JDBCVirtualTable')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.JDBCVirtualTableGeometry')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_create_sql_view_return_name(self, mock_catalog, _, __, mock_put, mock_get):
+        mc = mock_catalog()
+        mock_put.return_value = MockResponse(200)
+
+        response = self.engine.create_sql_view(feature_type_name='foo',
+                                               postgis_store_id='{}:{}'.format(self.workspace_names[0],
+                                                                               self.store_names[0]),
+                                               sql='Select * from pipes', geometry_column='geometry',
+                                               geometry_type='LineString',
+                                               default_style_id='{}:pipes'.format(self.workspace_names[0]),
+                                               return_result='name')
+
+        self.assertTrue(response['success'])
+        self.assertEqual({'name': 'foo', 'workspace': self.workspace_names[0], 'resource_type': 'layer',
+                          'href': None}, response['result'])
+
+        # The style is set on the new layer without reading the layer or the style
+        mock_get.assert_not_called()
+        mc.get_layer.assert_not_called()
+        mc.get_style.assert_not_called()
+        mc.save.assert_not_called()
+        mock_put.assert_called_once()
+        self.assertEqual('{}layers/foo.xml'.format(self.endpoint), mock_put.call_args[1]['url'])
+        self.assertEqual('<layer><defaultStyle><name>pipes</name><workspace>{}</workspace></defaultStyle></layer>'
+                         .format(self.workspace_names[0]), mock_put.call_args[1]['data'].decode())
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.put')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.JDBCVirtualTable')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.JDBCVirtualTableGeometry')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_create_sql_view_return_none_style_failed(self, mock_catalog, _, __, mock_put):
+        mock_put.return_value = MockResponse(404, text='No such style', reason='Not Found')
+
+        response = self.engine.create_sql_view(feature_type_name='foo', postgis_store_id='ws:store',
+                                               sql='Select * from pipes', geometry_column='geometry',
+                                               geometry_type='LineString', default_style_id='pipes',
+                                               return_result=None)
+
+        self.assertEqual({'success': False, 'error': 'Not Found(404): No such style'}, response)
+        self.assertEqual('<layer><defaultStyle><name>pipes</name></defaultStyle></layer>',
+                         mock_put.call_args[1]['data'].decode())
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.put')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_create_shapefile_resource_return_name(self, mock_catalog, mock_put):
+        mc = mock_catalog()
+        store_xml = '<dataStore><name>{0}</name><workspace><name>{1}</name></workspace></dataStore>'.format(
+            self.store_names[0], self.workspace_names[0])
+        mock_put.return_value = MockResponse(201, text=store_xml, headers={'Location': 'store-href'})
+
+        response = self.engine.create_shapefile_resource(store_id='{}:{}'.format(self.workspace_names[0],
+                                                                                 self.store_names[0]),
+                                                         shapefile_base=os.path.join(self.files_root, 'shapefile',
+                                                                                     'test'),
+                                                         overwrite=True, return_result='name')
+
+        self.assertTrue(response['success'])
+        self.assertEqual({'name': self.store_names[0], 'workspace': self.workspace_names[0],
+                          'store': self.store_names[0], 'resource_type': 'featureType', 'href': 'store-href'},
+                         response['result'])
+        mc.get_resource.assert_not_called()
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_create_style_return_none(self, mock_catalog):
+        mc = mock_catalog()
+
+        response = self.engine.create_style(style_id='foo', sld='<sld/>', return_result=None)
+
+        self.assertEqual({'success': True, 'result': None}, response)
+        mc.create_style.assert_called_once()
+        mc.get_style.assert_not_called()
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_add_table_to_postgis_store_return_none(self, mock_catalog, mock_post):
+        mc = mock_catalog()
+        mock_post.return_value = MockResponse(201)
+        store_id = '{}:{}'.format(self.workspace_names[0], self.store_names[0])
+
+        response = self.engine.add_table_to_postgis_store(store_id=store_id, table='points', return_result=None)
+
+        self.assertEqual({'success': True, 'result': None}, response)
+
+        # The store is only read to validate it
+        mc.get_store.assert_called_once_with(name=self.store_names[0], workspace=self.workspace_names[0])
+
+    def test_create_invalid_return_result(self):
+        self.assertRaises(ValueError, self.engine.create_workspace, workspace_id='foo', uri='foo',
+                          return_result='names')
+        self.assertRaises(ValueError, self.engine.create_coverage_resource, store_id='foo', coverage_type='geotiff',
+                          coverage_file='foo.tif', return_result=True)
+
     @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
     def test_apply_changes_to_gs_object(self, mock_catalog):
         mc = mock_catalog()
@@ -3498,12 +3753,14 @@ class TestGeoServerDatasetEngine(unittest.TestCase):
 
         mc.get_store.assert_called_with(name=self.store_names[0], workspace=self.workspace_name)
 
-    @mock.patch('tethys_dataset_services.engines.geoserver_engine.time')
+    @mock.patch('tethys_dataset_services.retry.time')
     @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.post')
     @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
     def test_create_postgis_feature_resource_table_none_no_store(self, mock_catalog, mock_post, mock_time):
         mc = mock_catalog()
         mc.get_store.return_value = None
+        # Deadline is 5 seconds after the first call
+        mock_time.monotonic.side_effect = [0, 0.1, 0.3, 4.5, 5.1]
 
         mock_post.return_value = MockResponse(201)
 
@@ -3533,7 +3790,7 @@ class TestGeoServerDatasetEngine(unittest.TestCase):
         self.assertEqual({}, r)
 
         mc.get_store.assert_called_with(name=self.store_names[0], workspace=self.workspace_name)
-        mock_time.sleep.assert_called_with(1)
+        self.assertEqual([mock.call(0.05), mock.call(0.1), mock.call(0.2)], mock_time.sleep.call_args_list)
 
     @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.post')
     @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
@@ -3725,3 +3982,539 @@ class TestGeoServerDatasetEngine(unittest.TestCase):
         self.assertEqual(expected_headers, post_call_args[0][1]['headers'])
 
         mc.get_store.assert_called_with(name=self.store_names[0], workspace=self.workspace_names[0])
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_add_tables_to_postgis_store(self, mock_catalog, mock_post):
+        mc = mock_catalog()
+        mc.get_store.return_value = self.mock_stores[0]
+        store_id = '{}:{}'.format(self.workspace_names[0], self.store_names[0])
+
+        def post(url, data, **kwargs):
+            if '<name>bad</name>' in data:
+                return MockResponse(500, text='Oops', reason='Internal Server Error')
+            return MockResponse(201)
+
+        mock_post.side_effect = post
+
+        response = self.engine.add_tables_to_postgis_store(store_id=store_id, tables=['points', 'bad', 'lines'],
+                                                           max_workers=2)
+
+        self.assert_valid_response_object(response)
+        self.assertFalse(response['success'])
+        self.assertEqual('Unable to add tables: bad.', response['error'])
+        r = response['result']
+        self.assertEqual(['points', 'bad', 'lines'], list(r))
+        self.assertTrue(r['points']['success'])
+        self.assertIn(self.store_names[0], r['points']['result']['name'])
+        self.assertIs(r['points']['result'], r['lines']['result'])
+        self.assertEqual({'success': False, 'error': 'Internal Server Error(500): Oops'}, r['bad'])
+        self.assertEqual(3, mock_post.call_count)
+
+        # The store is read once to validate it and once for all tables
+        self.assertEqual(2, mc.get_store.call_count)
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_add_tables_to_postgis_store_return_name(self, mock_catalog, mock_post):
+        mc = mock_catalog()
+        mc.get_store.return_value = self.mock_stores[0]
+        store_id = '{}:{}'.format(self.workspace_names[0], self.store_names[0])
+        mock_post.return_value = MockResponse(201, headers={'Location': 'points-href'})
+
+        response = self.engine.add_tables_to_postgis_store(store_id=store_id, tables=['points'], return_result='name')
+
+        self.assertTrue(response['success'])
+        self.assertEqual({'points': {'success': True,
+                                     'result': {'name': 'points', 'workspace': self.workspace_names[0],
+                                                'resource_type': 'featureType', 'href': 'points-href',
+                                                'store': self.store_names[0]}}},
+                         response['result'])
+        mc.get_store.assert_called_once_with(name=self.store_names[0], workspace=self.workspace_names[0])
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_add_tables_to_postgis_store_duplicates(self, mock_catalog, mock_post):
+        mc = mock_catalog()
+        mc.get_store.return_value = self.mock_stores[0]
+        store_id = '{}:{}'.format(self.workspace_names[0], self.store_names[0])
+        mock_post.return_value = MockResponse(201)
+
+        response = self.engine.add_tables_to_postgis_store(store_id=store_id, tables=['points', 'lines', 'points'],
+                                                           return_result=None)
+
+        self.assertEqual({'success': True, 'result': {'points': {'success': True, 'result': None},
+                                                      'lines': {'success': True, 'result': None}}}, response)
+        # Each table is published once
+        self.assertEqual(2, mock_post.call_count)
+        posted = sorted(c[1]['data'] for c in mock_post.call_args_list)
+        self.assertIn('<name>lines</name>', posted[0])
+        self.assertIn('<name>points</name>', posted[1])
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_add_tables_to_postgis_store_no_store(self, mock_catalog, mock_post):
+        mc = mock_catalog()
+        mc.get_store.return_value = None
+        store_id = '{}:{}'.format(self.workspace_names[0], self.store_names[0])
+
+        response = self.engine.add_tables_to_postgis_store(store_id=store_id, tables=['points'])
+
+        self.assertFalse(response['success'])
+        self.assertIn('There is no store named', response['error'])
+        mock_post.assert_not_called()
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_catalog_reused(self, mock_catalog):
+        catalog = self.engine._get_geoserver_catalog_object()
+
+        self.assertIs(catalog, self.engine._get_geoserver_catalog_object())
+        mock_catalog.assert_called_once_with(self.endpoint, username=TEST_GEOSERVER_DATASET_SERVICE['USERNAME'],
+                                             password=TEST_GEOSERVER_DATASET_SERVICE['PASSWORD'])
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.time.monotonic')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_catalog_ttl_expired(self, mock_catalog, mock_monotonic):
+        engine = GeoServerSpatialDatasetEngine(endpoint=self.endpoint, catalog_ttl=10)
+        mock_monotonic.return_value = 100
+        engine._get_geoserver_catalog_object()
+        mock_monotonic.return_value = 105
+        engine._get_geoserver_catalog_object()
+
+        self.assertEqual(1, mock_catalog.call_count)
+
+        mock_monotonic.return_value = 111
+        engine._get_geoserver_catalog_object()
+
+        self.assertEqual(2, mock_catalog.call_count)
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_catalog_no_ttl(self, mock_catalog):
+        engine = GeoServerSpatialDatasetEngine(endpoint=self.endpoint, catalog_ttl=None)
+        engine._get_geoserver_catalog_object()
+        engine._get_geoserver_catalog_object()
+
+        mock_catalog.assert_called_once()
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_refresh(self, mock_catalog):
+        self.engine._get_geoserver_catalog_object()
+        self.engine.refresh()
+        self.engine._get_geoserver_catalog_object()
+
+        self.assertEqual(2, mock_catalog.call_count)
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_default_workspace_cached(self, mock_catalog):
+        mc = mock_catalog()
+        mc.get_default_workspace.return_value = self.mock_workspaces[0]
+
+        self.assertEqual(self.workspace_names[0], self.engine._get_default_workspace_name())
+        self.assertEqual(self.workspace_names[0], self.engine._get_default_workspace_name())
+        mc.get_default_workspace.assert_called_once()
+
+        self.engine.invalidate('workspaces/default')
+        self.engine._get_default_workspace_name()
+        self.assertEqual(2, mc.get_default_workspace.call_count)
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_invalidate(self, mock_catalog):
+        mc = mock_catalog()
+        layers_url = '{}layers.xml'.format(self.endpoint)
+        store_url = '{}workspaces/{}/datastores/{}.xml'.format(self.endpoint, self.workspace_name, self.store_name)
+        style_url = '{}styles/{}.xml'.format(self.endpoint, self.default_style_name)
+        mc._cache = {layers_url: 'layers', store_url: 'store', style_url: 'style'}
+
+        self.engine._get_geoserver_catalog_object()
+        self.engine.invalidate('layers', 'workspaces/{}/datastores'.format(self.workspace_name))
+
+        self.assertEqual({style_url: 'style'}, mc._cache)
+
+        self.engine.invalidate()
+        self.assertEqual({}, mc._cache)
+
+    def test_invalidate_no_catalog(self):
+        # Nothing to invalidate before the catalog has been created
+        self.engine.invalidate('layers')
+        self.assertIsNone(self.engine._catalog)
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_delete_layer_invalidates(self, mock_catalog):
+        mc = mock_catalog()
+        layer_url = '{}layers/{}.xml'.format(self.endpoint, self.layer_names[0])
+        style_url = '{}styles/{}.xml'.format(self.endpoint, self.default_style_name)
+        mc._cache = {layer_url: 'layer', style_url: 'style'}
+        self.mock_layers[0].href = layer_url
+        mc.get_layer.return_value = self.mock_layers[0]
+
+        response = self.engine.delete_layer(self.layer_names[0])
+
+        self.assertTrue(response['success'])
+        self.assertEqual({style_url: 'style'}, mc._cache)
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.put')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_create_shapefile_resource_invalidates(self, mock_catalog, mock_put):
+        mock_put.return_value = MockResponse(201)
+        mc = mock_catalog()
+        stores_url = '{}workspaces/{}/datastores.xml'.format(self.endpoint, self.workspace_name)
+        other_stores_url = '{}workspaces/{}/datastores.xml'.format(self.endpoint, self.workspace_names[0])
+        mc._cache = {stores_url: 'stores', other_stores_url: 'stores'}
+        mc.get_resource.return_value = self.mock_resources[0]
+        shapefile_name = os.path.join(self.files_root, 'shapefile', 'test')
+        store_id = '{}:{}'.format(self.workspace_name, self.store_names[0])
+
+        response = self.engine.create_shapefile_resource(store_id=store_id, shapefile_base=shapefile_name,
+                                                         overwrite=True)
+
+        self.assertTrue(response['success'])
+        self.assertEqual({other_stores_url: 'stores'}, mc._cache)
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_list_layers_with_properties_order(self, mock_catalog):
+        mc = mock_catalog()
+        mc.get_layers.return_value = self.mock_layers
+
+        response = self.engine.list_layers(with_properties=True)
+
+        self.assertTrue(response['success'])
+        self.assertEqual(self.layer_names, [r['name'] for r in response['result']])
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.log')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_list_layers_with_properties_failure_isolated(self, mock_catalog, mock_log):
+        mc = mock_catalog()
+        mc.get_layers.return_value = self.mock_layers
+        type(self.mock_layers[1]).resource = mock.PropertyMock(
+            side_effect=geoserver.catalog.FailedRequestError('Server error')
+        )
+
+        response = self.engine.list_layers(with_properties=True)
+
+        self.assertTrue(response['success'])
+        result = response['result']
+        self.assertEqual(3, len(result))
+        self.assertEqual({'name': self.layer_names[1], 'error': 'Server error'}, result[1])
+        self.assertEqual(self.workspace_name, result[0]['workspace'])
+        self.assertEqual(self.workspace_name, result[2]['workspace'])
+        mock_log.exception.assert_called_once()
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.ThreadPoolExecutor')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_list_layers_with_properties_serial(self, mock_catalog, mock_executor):
+        engine = GeoServerSpatialDatasetEngine(endpoint=self.endpoint, max_workers=1)
+        mc = mock_catalog()
+        mc.get_layers.return_value = self.mock_layers
+
+        response = engine.list_layers(with_properties=True)
+
+        self.assertEqual(self.layer_names, [r['name'] for r in response['result']])
+        mock_executor.assert_not_called()
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_transcribe_geoserver_objects_worker_catalogs(self, mock_catalog):
+        shared_catalog = mock.NonCallableMagicMock()
+        worker_catalogs = []
+
+        def new_catalog(*args, **kwargs):
+            catalog = mock.NonCallableMagicMock(_cache={'{}layers.xml'.format(self.endpoint): 'layers'})
+            catalog._session = mock.NonCallableMagicMock(spec=requests.Session)
+            worker_catalogs.append(catalog)
+            return catalog
+
+        mock_catalog.side_effect = new_catalog
+        engine = GeoServerSpatialDatasetEngine(endpoint=self.endpoint, max_workers=2)
+        seen = []
+
+        def transcribe(gs_object, fields):
+            seen.append((threading.get_ident(), gs_object.catalog))
+            return {}
+
+        def list_objects():
+            gs_objects = [mock.NonCallableMagicMock(catalog=shared_catalog) for _ in range(4)]
+            with mock.patch.object(engine, '_safe_transcribe_geoserver_object', side_effect=transcribe):
+                return engine._transcribe_geoserver_objects(gs_objects)
+
+        self.assertEqual(4, len(list_objects()))
+        self.assertEqual(4, len(list_objects()))
+
+        # No worker reads through the shared catalog, and each worker thread keeps one catalog across calls
+        self.assertNotIn(shared_catalog, [catalog for _, catalog in seen])
+        self.assertEqual(len({thread for thread, _ in seen}), len({id(catalog) for _, catalog in seen}))
+        self.assertTrue(1 <= len(worker_catalogs) <= 2)
+
+        # Worker catalogs are invalidated with the shared one
+        engine.invalidate('layers')
+        for catalog in worker_catalogs:
+            self.assertEqual({}, catalog._cache)
+
+        # ... and replaced on refresh
+        engine.refresh()
+        list_objects()
+        old_catalogs = [catalog for catalog in worker_catalogs if catalog._session.close.called]
+        self.assertTrue(1 <= len(old_catalogs) <= 2)
+        self.assertNotIn(old_catalogs[0], [catalog for _, catalog in seen[-4:]])
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.time.monotonic')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_thread_catalog_ttl(self, mock_catalog, mock_monotonic):
+        mock_monotonic.return_value = 100
+        engine = GeoServerSpatialDatasetEngine(endpoint=self.endpoint, catalog_ttl=60)
+
+        catalog = engine._get_thread_catalog_object()
+        self.assertIs(catalog, engine._get_thread_catalog_object())
+
+        mock_monotonic.return_value = 161
+        engine._get_thread_catalog_object()
+
+        self.assertEqual(2, mock_catalog.call_count)
+
+    def test_transcribe_geoserver_object_fields(self):
+        mock_resource = mock.NonCallableMagicMock(workspace=None, native_bbox=['0', '10', '2', '5'],
+                                                  projection='EPSG:3857')
+        mock_resource.name = self.resource_names[0]
+        mock_layer = mock.NonCallableMagicMock(resource_type='layer', workspace=self.workspace_name,
+                                               default_style=self.mock_default_style, resource=mock_resource,
+                                               store=self.mock_store, title='A Title')
+        mock_layer.name = self.layer_names[0]
+
+        result = self.engine._transcribe_geoserver_object(mock_layer, fields=['name', 'wms.png'])
+
+        self.assertEqual(['name', 'wms'], sorted(result))
+        self.assertEqual(self.layer_names[0], result['name'])
+        self.assertEqual(['png'], list(result['wms']))
+        self.assertIn('format=image/png', result['wms']['png'])
+        self.assertIn('bbox=0,2,10,5', result['wms']['png'])
+        self.assertIn('styles={}:{}'.format(self.workspace_name, self.default_style_name), result['wms']['png'])
+
+    def test_transcribe_geoserver_object_fields_no_urls(self):
+        mock_layer = mock.NonCallableMagicMock(resource_type='layer', workspace=self.workspace_name,
+                                               store=self.mock_store, title='A Title')
+        mock_layer.name = self.layer_names[0]
+        type(mock_layer).resource = mock.PropertyMock()
+
+        result = self.engine._transcribe_geoserver_object(mock_layer, fields=['name', 'store', 'missing'])
+
+        self.assertEqual({'name': self.layer_names[0], 'store': self.store_name}, result)
+        # Attributes needed only for urls are not read
+        type(mock_layer).resource.assert_not_called()
+
+    def test_transcribe_geoserver_object_fields_url_family(self):
+        mock_feature_type = mock.NonCallableMagicMock(resource_type='featureType', workspace=self.workspace_name)
+        mock_feature_type.name = self.resource_names[0]
+
+        result = self.engine._transcribe_geoserver_object(mock_feature_type, fields=['wfs', 'wfs.csv', 'wms'])
+
+        self.assertEqual(['wfs'], list(result))
+        self.assertEqual([key for key, _ in self.engine.WFS_FORMATS], list(result['wfs']))
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_list_layers_fields(self, mock_catalog):
+        mc = mock_catalog()
+        mc.get_layers.return_value = self.mock_layers
+
+        response = self.engine.list_layers(fields=['name', 'store'])
+
+        self.assertTrue(response['success'])
+        self.assertEqual([{'name': n, 'store': self.store_name} for n in self.layer_names], response['result'])
+
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.get')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_get_layer_fields(self, mock_catalog, mock_get):
+        mc = mock_catalog()
+        mc.get_layer.return_value = self.mock_layers[0]
+
+        response = self.engine.get_layer(self.layer_names[0], fields=['name'])
+
+        self.assertTrue(response['success'])
+        self.assertEqual({'name': self.layer_names[0]}, response['result'])
+        mock_get.assert_not_called()
+
+    def test_ogc_url_map(self):
+        build_url = mock.MagicMock(side_effect=lambda output_format, layer_id: '{}/{}'.format(layer_id, output_format))
+
+        url_map = OgcUrlMap(build_url, (('png', 'image/png'), ('kml', 'kml')), layer_id='foo')
+
+        # No url is formatted until accessed
+        build_url.assert_not_called()
+        self.assertEqual(2, len(url_map))
+        self.assertEqual(['png', 'kml'], list(url_map))
+        self.assertIn('kml', url_map)
+        build_url.assert_not_called()
+
+        self.assertEqual('foo/image/png', url_map['png'])
+        build_url.assert_called_once_with(output_format='image/png', layer_id='foo')
+        self.assertRaises(KeyError, url_map.__getitem__, 'gif')
+        self.assertEqual({'png': 'foo/image/png', 'kml': 'foo/kml'}, url_map.to_dict())
+        self.assertEqual({'png': 'foo/image/png', 'kml': 'foo/kml'}, url_map)
+        self.assertEqual(repr({'png': 'foo/image/png', 'kml': 'foo/kml'}), repr(url_map))
+
+    def test_ogc_url_map_is_dict(self):
+        build_url = mock.MagicMock(side_effect=lambda output_format, layer_id: '{}/{}'.format(layer_id, output_format))
+        expected = {'png': 'foo/image/png', 'kml': 'foo/kml'}
+
+        self.assertIsInstance(OgcUrlMap(build_url, (('png', 'image/png'), ('kml', 'kml')), layer_id='foo'), dict)
+        self.assertEqual(expected, json.loads(json.dumps(
+            OgcUrlMap(build_url, (('png', 'image/png'), ('kml', 'kml')), layer_id='foo')
+        )))
+        self.assertEqual(expected, dict(OgcUrlMap(build_url, (('png', 'image/png'), ('kml', 'kml')), layer_id='foo')))
+        self.assertEqual(expected, {**OgcUrlMap(build_url, (('png', 'image/png'), ('kml', 'kml')), layer_id='foo')})
+        self.assertEqual(
+            list(expected.values()),
+            list(OgcUrlMap(build_url, (('png', 'image/png'), ('kml', 'kml')), layer_id='foo').values())
+        )
+
+    def test_transcribe_geoserver_object_json(self):
+        mock_resource = mock.NonCallableMagicMock(workspace=None, native_bbox=['0', '10', '2', '5'],
+                                                  projection='EPSG:3857')
+        mock_resource.name = self.resource_names[0]
+        mock_layer = mock.NonCallableMagicMock(resource_type='layer', workspace=self.workspace_name,
+                                               default_style=self.mock_default_style, resource=mock_resource,
+                                               store=self.mock_store, title='A Title')
+        mock_layer.name = self.layer_names[0]
+
+        result = self.engine._transcribe_geoserver_object(mock_layer, fields=['name', 'title', 'wms'])
+        serialized = json.loads(json.dumps(result))
+
+        self.assertEqual(self.layer_names[0], serialized['name'])
+        self.assertEqual(sorted(result['wms']), sorted(serialized['wms']))
+        self.assertEqual(result['wms']['png'], serialized['wms']['png'])
+        self.assertIn('format=image/png', serialized['wms']['png'])
+
+    def test_transcribe_geoserver_object_lazy_urls(self):
+        mock_feature_type = mock.NonCallableMagicMock(resource_type='featureType', workspace=self.workspace_name)
+        mock_feature_type.name = self.resource_names[0]
+
+        with mock.patch.object(self.engine, '_get_wfs_url', return_value='url') as mock_get_wfs_url:
+            result = self.engine._transcribe_geoserver_object(mock_feature_type)
+            mock_get_wfs_url.assert_not_called()
+
+            self.assertIsInstance(result['wfs'], OgcUrlMap)
+            self.assertEqual('url', result['wfs']['csv'])
+            mock_get_wfs_url.assert_called_once_with(
+                output_format='csv', resource_id='{}:{}'.format(self.workspace_name, self.resource_names[0])
+            )
+
+    @mock.patch('tethys_dataset_services.retry.log')
+    @mock.patch('tethys_dataset_services.retry.time')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.put')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_create_shapefile_resource_retry(self, mock_catalog, mock_put, mock_time, _):
+        uploads = []
+
+        def put(url, data, **kwargs):
+            uploads.append(b''.join(data))
+            return MockResponse(502 if len(uploads) == 1 else 201)
+
+        mock_put.side_effect = put
+        mc = mock_catalog()
+        mc.get_resource.return_value = self.mock_resources[0]
+        shapefile_name = os.path.join(self.files_root, 'shapefile', 'test')
+        store_id = '{}:{}'.format(self.workspace_name, self.store_names[0])
+
+        response = self.engine.create_shapefile_resource(store_id=store_id, shapefile_base=shapefile_name,
+                                                         overwrite=True)
+
+        self.assertTrue(response['success'])
+        self.assertEqual(2, len(uploads))
+        self.assertTrue(uploads[0])
+        self.assertEqual(uploads[0], uploads[1])
+        mock_time.sleep.assert_called_once()
+        self.assertEqual(1, self.engine.retry_policy.retries)
+
+    @mock.patch('tethys_dataset_services.retry.log')
+    @mock.patch('tethys_dataset_services.retry.time')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_create_postgis_feature_resource_not_retried(self, mock_catalog, mock_post, mock_time, _):
+        mc = mock_catalog()
+        mc.get_store.return_value = None
+        mock_post.return_value = MockResponse(502)
+        store_id = '{}:{}'.format(self.workspace_name, self.store_names[0])
+
+        response = self.engine.create_postgis_feature_resource(store_id=store_id, host='localhost', port='5432',
+                                                               database='foo', user='user', password='pass')
+
+        # Creating a store is not idempotent: the request may have been processed
+        self.assertFalse(response['success'])
+        mock_post.assert_called_once()
+        mock_time.sleep.assert_not_called()
+
+    @mock.patch('tethys_dataset_services.retry.log')
+    @mock.patch('tethys_dataset_services.retry.time')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.get')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_get_layer_tile_caching_retry(self, mock_catalog, mock_get, mock_time, _):
+        mc = mock_catalog()
+        mc.get_layer.return_value = self.mock_layers[0]
+        mock_get.side_effect = [requests.exceptions.ReadTimeout('timeout'),
+                                MockResponse(200, text='<GeoServerLayer><enabled>true</enabled></GeoServerLayer>')]
+
+        response = self.engine.get_layer(self.layer_names[0], fields=['name', 'tile_caching'])
+
+        self.assertTrue(response['success'])
+        self.assertEqual({'enabled': 'true'}, response['result']['tile_caching'])
+        self.assertEqual(2, mock_get.call_count)
+
+    @mock.patch('tethys_dataset_services.retry.time')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_create_postgis_feature_resource_wait_visible(self, mock_catalog, mock_post, mock_time):
+        mc = mock_catalog()
+        mc.get_store.side_effect = [None, None, self.mock_stores[0]]
+        mock_time.monotonic.return_value = 0
+        mock_post.return_value = MockResponse(201)
+        store_id = '{}:{}'.format(self.workspace_name, self.store_names[0])
+
+        response = self.engine.create_postgis_feature_resource(store_id=store_id, host='localhost', port='5432',
+                                                               database='foo', user='user', password='pass')
+
+        self.assertTrue(response['success'])
+        self.assertEqual(self.store_names[0], response['result']['name'])
+        self.assertEqual(3, mc.get_store.call_count)
+        mock_time.sleep.assert_called_once_with(0.05)
+
+    @mock.patch('tethys_dataset_services.retry.time')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_create_postgis_feature_resource_no_wait(self, mock_catalog, mock_post, mock_time):
+        mc = mock_catalog()
+        mc.get_store.return_value = None
+        store_url = '{}workspaces/{}/datastores/{}'.format(self.endpoint, self.workspace_name, self.store_names[0])
+        mock_post.return_value = MockResponse(201, headers={'Location': store_url})
+        store_id = '{}:{}'.format(self.workspace_name, self.store_names[0])
+
+        response = self.engine.create_postgis_feature_resource(store_id=store_id, host='localhost', port='5432',
+                                                               database='foo', user='user', password='pass',
+                                                               wait=False)
+
+        self.assertTrue(response['success'])
+        expected = {'name': self.store_names[0], 'workspace': self.workspace_name, 'resource_type': 'dataStore',
+                    'href': store_url}
+        self.assertEqual(expected, response['result'])
+        mc.get_store.assert_called_once()
+        mock_time.sleep.assert_not_called()
+
+    @mock.patch('tethys_dataset_services.retry.time')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.requests.post')
+    @mock.patch('tethys_dataset_services.engines.geoserver_engine.GeoServerCatalog')
+    def test_create_postgis_feature_resource_table_no_wait(self, mock_catalog, mock_post, mock_time):
+        mc = mock_catalog()
+        mc.get_store.return_value = None
+        mc.get_resource.side_effect = geoserver.catalog.FailedRequestError
+        resource_url = '{}workspaces/{}/datastores/{}/featuretypes/points'.format(
+            self.endpoint, self.workspace_name, self.store_names[0]
+        )
+        mock_post.side_effect = [MockResponse(201), MockResponse(201, headers={'Location': resource_url})]
+        store_id = '{}:{}'.format(self.workspace_name, self.store_names[0])
+
+        response = self.engine.create_postgis_feature_resource(store_id=store_id, host='localhost', port='5432',
+                                                               database='foo', user='user', password='pass',
+                                                               table='points', wait=False)
+
+        self.assertTrue(response['success'])
+        expected = {'name': 'points', 'workspace': self.workspace_name, 'store': self.store_names[0],
+                    'resource_type': 'featureType', 'href': resource_url}
+        self.assertEqual(expected, response['result'])
+        mc.get_resource.assert_called_once()
+        mock_time.sleep.assert_not_called()
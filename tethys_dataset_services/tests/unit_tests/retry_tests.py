@@ -0,0 +1,267 @@
+import asyncio
+import unittest
+import mock
+import requests
+from urllib3.exceptions import NewConnectionError
+from tethys_dataset_services.retry import RetryPolicy, wait_until, wait_until_async
+
+
+class MockResponse(object):
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@mock.patch('tethys_dataset_services.retry.log')
+@mock.patch('tethys_dataset_services.retry.time')
+class TestRetryPolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.policy = RetryPolicy(max_attempts=3, backoff=1, jitter=0)
+
+    def test_call_success(self, mock_time, _):
+        func = mock.MagicMock(return_value=MockResponse(200))
+
+        result = self.policy.call(func, 'a', b='c')
+
+        self.assertEqual(200, result.status_code)
+        func.assert_called_once_with('a', b='c')
+        mock_time.sleep.assert_not_called()
+        self.assertEqual((1, 0, 0), (self.policy.attempts, self.policy.retries, self.policy.exhausted))
+
+    def test_call_retry_status(self, mock_time, _):
+        failed = MockResponse(502)
+        func = mock.MagicMock(side_effect=[failed, MockResponse(503), MockResponse(200)])
+
+        result = self.policy.call(func)
+
+        self.assertEqual(200, result.status_code)
+        self.assertTrue(failed.closed)
+        self.assertEqual([mock.call(1), mock.call(2)], mock_time.sleep.call_args_list)
+        self.assertEqual((3, 2, 0), (self.policy.attempts, self.policy.retries, self.policy.exhausted))
+
+    def test_call_exhausted_status(self, mock_time, _):
+        func = mock.MagicMock(return_value=MockResponse(504))
+
+        result = self.policy.call(func)
+
+        self.assertEqual(504, result.status_code)
+        self.assertEqual(3, func.call_count)
+        self.assertEqual((3, 2, 1), (self.policy.attempts, self.policy.retries, self.policy.exhausted))
+
+    def test_call_not_retried_status(self, mock_time, _):
+        func = mock.MagicMock(return_value=MockResponse(500))
+
+        self.assertEqual(500, self.policy.call(func).status_code)
+        func.assert_called_once()
+
+    def test_call_retry_exception(self, mock_time, _):
+        func = mock.MagicMock(side_effect=[requests.exceptions.ReadTimeout('timeout'), 'result'])
+
+        self.assertEqual('result', self.policy.call(func))
+        self.assertEqual(1, self.policy.retries)
+
+    def test_call_exhausted_exception(self, mock_time, _):
+        func = mock.MagicMock(side_effect=requests.exceptions.ConnectionError('reset'))
+
+        self.assertRaises(requests.exceptions.ConnectionError, self.policy.call, func)
+        self.assertEqual(3, func.call_count)
+        self.assertEqual(1, self.policy.exhausted)
+
+    def test_call_other_exception(self, mock_time, _):
+        func = mock.MagicMock(side_effect=ValueError('bad'))
+
+        self.assertRaises(ValueError, self.policy.call, func)
+        func.assert_called_once()
+
+    def test_call_retry_on(self, mock_time, _):
+        func = mock.MagicMock(side_effect=[ValueError('bad'), 'result'])
+
+        self.assertEqual('result', self.policy.call(func, retry_on=(ValueError,)))
+
+    def test_call_on_retry(self, mock_time, _):
+        on_retry = mock.MagicMock()
+        func = mock.MagicMock(side_effect=[MockResponse(502), MockResponse(200)])
+
+        self.policy.call(func, on_retry=on_retry)
+
+        on_retry.assert_called_once_with()
+
+    def test_call_non_idempotent(self, mock_time, _):
+        func = mock.MagicMock(return_value=MockResponse(502))
+
+        self.assertEqual(502, self.policy.call(func, idempotent=False).status_code)
+        func.assert_called_once()
+
+        func = mock.MagicMock(side_effect=requests.exceptions.ReadTimeout('timeout'))
+
+        self.assertRaises(requests.exceptions.ReadTimeout, self.policy.call, func, idempotent=False)
+        func.assert_called_once()
+
+    def test_call_non_idempotent_not_processed(self, mock_time, _):
+        # Rejected by the server
+        func = mock.MagicMock(side_effect=[MockResponse(429), MockResponse(201)])
+        self.assertEqual(201, self.policy.call(func, idempotent=False).status_code)
+
+        # Never sent
+        refused = requests.exceptions.ConnectionError(mock.MagicMock(reason=NewConnectionError(None, 'refused')))
+        func = mock.MagicMock(side_effect=[refused, requests.exceptions.ConnectTimeout('timeout'), 'result'])
+        self.assertEqual('result', self.policy.call(func, idempotent=False))
+
+    def test_call_retry_non_idempotent(self, mock_time, _):
+        self.policy.retry_non_idempotent = True
+        func = mock.MagicMock(side_effect=[MockResponse(502), MockResponse(201)])
+
+        self.assertEqual(201, self.policy.call(func, idempotent=False).status_code)
+
+    def test_request(self, mock_time, _):
+        func = mock.MagicMock(return_value=MockResponse(502))
+
+        self.policy.request('post', func, 'url')
+        self.assertEqual(1, func.call_count)
+
+        self.policy.request('PUT', func, 'url')
+        self.assertEqual(4, func.call_count)
+
+        self.policy.request('POST', func, 'url', idempotent=True)
+        self.assertEqual(7, func.call_count)
+        func.assert_called_with('url')
+
+    def test_max_attempts_one(self, mock_time, _):
+        policy = RetryPolicy(max_attempts=1)
+        func = mock.MagicMock(return_value=MockResponse(503))
+
+        policy.call(func)
+
+        func.assert_called_once()
+        mock_time.sleep.assert_not_called()
+
+    def test_delay(self, mock_time, _):
+        policy = RetryPolicy(backoff=0.5, max_backoff=3, jitter=0)
+
+        self.assertEqual([0.5, 1, 2, 3, 3], [policy.delay(retry) for retry in range(1, 6)])
+        self.assertEqual(2, policy.delay(1, MockResponse(429, {'Retry-After': '2'})))
+        self.assertEqual(3, policy.delay(1, MockResponse(429, {'Retry-After': '120'})))
+        self.assertEqual(0.5, policy.delay(1, MockResponse(429, {'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'})))
+
+    def test_delay_jitter(self, mock_time, _):
+        policy = RetryPolicy(backoff=1, jitter=0.5)
+
+        delays = [policy.delay(1) for _ in range(50)]
+
+        self.assertTrue(all(0.5 <= delay <= 1.5 for delay in delays))
+        self.assertGreater(len(set(delays)), 1)
+
+    def test_reset(self, mock_time, _):
+        self.policy.call(mock.MagicMock(side_effect=[MockResponse(502), MockResponse(200)]))
+
+        self.policy.reset()
+
+        self.assertEqual((0, 0, 0), (self.policy.attempts, self.policy.retries, self.policy.exhausted))
+
+
+class MockAsyncResponse(object):
+    def __init__(self, status, headers=None):
+        self.status = status
+        self.headers = headers or {}
+
+
+@mock.patch('tethys_dataset_services.retry.log')
+class TestRetryPolicyAsync(unittest.TestCase):
+
+    def setUp(self):
+        self.policy = RetryPolicy(max_attempts=3, backoff=0, jitter=0)
+
+    def test_call_async_retry_status(self, _):
+        func = mock.AsyncMock(side_effect=[MockAsyncResponse(503), MockAsyncResponse(200)])
+
+        result = asyncio.run(self.policy.call_async(func, 'a'))
+
+        self.assertEqual(200, result.status)
+        self.assertEqual(2, func.await_count)
+        func.assert_awaited_with('a')
+
+    def test_call_async_exhausted_exception(self, _):
+        func = mock.AsyncMock(side_effect=asyncio.TimeoutError())
+
+        self.assertRaises(asyncio.TimeoutError, asyncio.run,
+                          self.policy.call_async(func, retry_on=(asyncio.TimeoutError,)))
+        self.assertEqual(3, func.await_count)
+        self.assertEqual(1, self.policy.exhausted)
+
+    def test_call_async_non_idempotent(self, _):
+        func = mock.AsyncMock(side_effect=[ConnectionRefusedError(), MockAsyncResponse(201)])
+
+        # Not retried unless the error shows the request was never sent
+        self.assertRaises(ConnectionRefusedError, asyncio.run,
+                          self.policy.call_async(func, idempotent=False, retry_on=(OSError,)))
+
+        func.reset_mock(side_effect=True)
+        func.side_effect = [ConnectionRefusedError(), MockAsyncResponse(201)]
+        result = asyncio.run(self.policy.call_async(func, idempotent=False, retry_on=(OSError,),
+                                                    unsent_on=(ConnectionRefusedError,)))
+        self.assertEqual(201, result.status)
+
+
+@mock.patch('tethys_dataset_services.retry.time')
+class TestWaitUntil(unittest.TestCase):
+
+    def test_wait_until(self, mock_time):
+        mock_time.monotonic.return_value = 0
+        func = mock.MagicMock(side_effect=[None, {}, None, None, 'visible'])
+
+        self.assertEqual('visible', wait_until(func, interval=0.1, max_interval=0.3))
+
+        self.assertEqual([mock.call(0.1), mock.call(0.2), mock.call(0.3), mock.call(0.3)],
+                         mock_time.sleep.call_args_list)
+
+    def test_wait_until_first_call(self, mock_time):
+        self.assertEqual('visible', wait_until(lambda: 'visible'))
+        mock_time.sleep.assert_not_called()
+
+    def test_wait_until_deadline(self, mock_time):
+        mock_time.monotonic.side_effect = [10, 10.5, 11.9, 12.1]
+        func = mock.MagicMock(return_value=None)
+
+        self.assertIsNone(wait_until(func, timeout=2, interval=1))
+
+        self.assertEqual(3, func.call_count)
+        # The last wait is cut short by the deadline
+        self.assertEqual(1, mock_time.sleep.call_args_list[0][0][0])
+        self.assertAlmostEqual(0.1, mock_time.sleep.call_args_list[1][0][0])
+
+    def test_wait_until_retry_on(self, mock_time):
+        mock_time.monotonic.return_value = 0
+        func = mock.MagicMock(side_effect=[KeyError('missing'), 'visible'])
+
+        self.assertEqual('visible', wait_until(func, retry_on=(KeyError,)))
+
+        func = mock.MagicMock(side_effect=ValueError('bad'))
+        self.assertRaises(ValueError, wait_until, func, retry_on=(KeyError,))
+
+
+@mock.patch('tethys_dataset_services.retry.asyncio.sleep', new_callable=mock.AsyncMock)
+@mock.patch('tethys_dataset_services.retry.time')
+class TestWaitUntilAsync(unittest.TestCase):
+
+    def test_wait_until_async(self, mock_time, mock_sleep):
+        mock_time.monotonic.return_value = 0
+        func = mock.AsyncMock(side_effect=[None, KeyError('missing'), 'visible'])
+
+        result = asyncio.run(wait_until_async(func, interval=0.1, retry_on=(KeyError,)))
+
+        self.assertEqual('visible', result)
+        self.assertEqual([mock.call(0.1), mock.call(0.2)], mock_sleep.await_args_list)
+
+    def test_wait_until_async_deadline(self, mock_time, mock_sleep):
+        mock_time.monotonic.side_effect = [0, 0.5, 1.2]
+        func = mock.AsyncMock(return_value=None)
+
+        self.assertIsNone(asyncio.run(wait_until_async(func, timeout=1, interval=0.5)))
+
+        self.assertEqual(2, func.await_count)
+        mock_sleep.assert_awaited_once_with(0.5)
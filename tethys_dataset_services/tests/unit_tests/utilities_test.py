@@ -3,8 +3,10 @@ from builtins import *  # noqa: F403, F401
 import os
 import unittest
 import xml.etree.ElementTree as ET
+from io import BytesIO
+from zipfile import ZipFile
 from tethys_dataset_services import utilities
-from tethys_dataset_services.utilities import XmlDictObject
+from tethys_dataset_services.utilities import UploadBody, XmlDictObject, ZipStream
 
 
 class TestUtilities(unittest.TestCase):
@@ -95,3 +97,46 @@ class TestUtilities(unittest.TestCase):
         self.assertEqual(new_dict['x'], 10)
         self.assertEqual(new_dict['list1'], ['test1', 'test2'])
         self.assertEqual(new_dict['list2'], ['test3', 'test4'])
+
+    def test_ZipStream(self):
+        shp = os.path.join(self.files_root, 'shapefile', 'test.shp')
+        dbf = os.path.join(self.files_root, 'shapefile', 'test.dbf')
+
+        with open(dbf, 'rb') as dbf_upload:
+            stream = ZipStream([('a.shp', shp), ('a.dbf', dbf_upload)], chunk_size=64)
+            # Every iteration generates the whole archive, so a retried request sends it again
+            first = b''.join(stream)
+            second = b''.join(stream)
+
+        archive = ZipFile(BytesIO(first))
+        self.assertEqual(archive.read('a.dbf'), ZipFile(BytesIO(second)).read('a.dbf'))
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(['a.shp', 'a.dbf'], archive.namelist())
+
+        with open(shp, 'rb') as f:
+            self.assertEqual(f.read(), archive.read('a.shp'))
+        with open(dbf, 'rb') as f:
+            self.assertEqual(f.read(), archive.read('a.dbf'))
+
+    def test_UploadBody(self):
+        path = os.path.join(self.files_root, 'shapefile', 'test.dbf')
+        size = os.path.getsize(path)
+        progress = []
+
+        with open(path, 'rb') as f:
+            expected = f.read()
+
+            for source in (path, f):
+                body = UploadBody(source, progress=lambda sent, total: progress.append((sent, total)), chunk_size=4096)
+                self.assertEqual(size, body.len)
+                self.assertEqual(expected, b''.join(body))
+                self.assertEqual(expected, b''.join(body))
+
+        self.assertEqual((4096, size), progress[0])
+        self.assertEqual((size, size), progress[-1])
+
+    def test_UploadBody_unknown_size(self):
+        body = UploadBody(iter([b'a', b'', b'bc']))
+
+        self.assertIsNone(body.len)
+        self.assertEqual([b'a', b'bc'], list(body))
@@ -3,7 +3,10 @@
 from past.builtins import basestring
 from builtins import *  # noqa: F403, F401
 
+import os
+import time
 from xml.etree import ElementTree
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED
 
 
 class XmlDictObject(dict):
@@ -137,3 +140,144 @@ def ConvertXmlToDict(root, dictclass=XmlDictObject):
         raise TypeError('Expected ElementTree.Element or file path string')
 
     return dictclass({root.tag: _ConvertXmlToDictRecurse(root, dictclass)})
+
+
+class _ZipStreamBuffer(object):
+    """
+    Write-only, unseekable file object that collects what a ZipFile writes until it is drained.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ZipStream(object):
+    """
+    Iterable that generates a deflated zip archive of the given members in chunks, without writing the archive to disk or holding it in memory. Passed as the data of a request, the archive is sent with chunked transfer encoding. Each iteration generates the archive again (e.g.: when a request is retried), so file object members must be seekable to be sent more than once.  # noqa: E501
+
+    Args:
+      members (iterable): (arcname, source) pairs, where source is a file path, a binary file object (e.g.: a Django UploadedFile) or an iterable of bytes chunks that can be iterated more than once.  # noqa: E501
+      chunk_size (int, optional): Number of bytes read from each source at a time. Defaults to 1 MB.
+    """
+
+    def __init__(self, members, chunk_size=1024 * 1024):
+        self.members = list(members)
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        buffer = _ZipStreamBuffer()
+
+        with ZipFile(buffer, 'w', compression=ZIP_DEFLATED) as archive:
+            for arcname, source in self.members:
+                opened = isinstance(source, basestring)
+
+                if opened:
+                    info = ZipInfo.from_file(source, arcname)
+                    source = open(source, 'rb')
+                else:
+                    info = ZipInfo(arcname, time.localtime()[:6])
+                    info.file_size = getattr(source, 'size', None) or 0
+                    if hasattr(source, 'seek'):
+                        source.seek(0)
+
+                info.compress_type = ZIP_DEFLATED
+
+                if hasattr(source, 'read'):
+                    chunks = iter(lambda: source.read(self.chunk_size), b'')
+                else:
+                    chunks = iter(source)
+
+                try:
+                    # The size of a source without one is unknown, so allow for a large member
+                    with archive.open(info, 'w', force_zip64=not info.file_size) as member:
+                        for data in chunks:
+                            member.write(data)
+                            chunk = buffer.drain()
+                            if chunk:
+                                yield chunk
+                finally:
+                    if opened:
+                        source.close()
+
+        # Remaining data and the central directory
+        yield buffer.drain()
+
+
+class UploadBody(object):
+    """
+    Iterable request body that sends a file, a file object or a stream of chunks (e.g.: a ZipStream) in chunks with constant memory, reporting progress as it is sent. The len attribute holds the size of the body when it is known, which requests sends as the Content-Length; otherwise the body is sent with chunked transfer encoding. Each iteration sends the body from the start (e.g.: when a request is retried).  # noqa: E501
+
+    Args:
+      source (string, file or iterable): Path to a file, a binary file object (e.g.: a Django UploadedFile) or an iterable of bytes chunks.  # noqa: E501
+      progress (callable, optional): Function called with the number of bytes sent and the size of the body (None if unknown) after each chunk.  # noqa: E501
+      chunk_size (int, optional): Number of bytes read from a file at a time. Defaults to 1 MB.
+    """
+
+    def __init__(self, source, progress=None, chunk_size=1024 * 1024):
+        self.source = source
+        self.progress = progress
+        self.chunk_size = chunk_size
+        self.len = self._size(source)
+
+    @staticmethod
+    def _size(source):
+        """
+        Size of the source in bytes or None if it is not known up front.
+        """
+        if isinstance(source, basestring):
+            return os.path.getsize(source)
+
+        if getattr(source, 'size', None) is not None:
+            return source.size
+
+        try:
+            return os.fstat(source.fileno()).st_size
+        except (AttributeError, OSError, ValueError):
+            return None
+
+    def __iter__(self):
+        sent = 0
+
+        for chunk in self._chunks():
+            sent += len(chunk)
+            yield chunk
+
+            if self.progress is not None:
+                self.progress(sent, self.len)
+
+    def _chunks(self):
+        if isinstance(self.source, basestring):
+            with open(self.source, 'rb') as source:
+                for chunk in self._read(source):
+                    yield chunk
+
+        elif hasattr(self.source, 'read'):
+            if hasattr(self.source, 'seek'):
+                self.source.seek(0)
+
+            for chunk in self._read(self.source):
+                yield chunk
+
+        else:
+            for chunk in self.source:
+                if chunk:
+                    yield chunk
+
+    def _read(self, source):
+        while True:
+            chunk = source.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk